@@ -236,6 +236,7 @@ examples.
 .. _FDSN web service definitions: https://www.fdsn.org/webservices/
 """
 from .client import Client  # NOQA
+from .async_client import AsyncClient  # NOQA
 from .routing.routing_client import RoutingClient  # NOQA
 from .header import URL_MAPPINGS  # NOQA
 
@@ -247,7 +248,7 @@ if r"%s" in Client.__init__.__doc__:
         Client.__init__.__doc__ % \
         str(sorted(URL_MAPPINGS.keys())).strip("[]")
 
-__all__ = ["Client", "RoutingClient"]
+__all__ = ["Client", "AsyncClient", "RoutingClient"]
 
 
 if __name__ == '__main__':
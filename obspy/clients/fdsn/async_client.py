@@ -0,0 +1,592 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Asynchronous FDSN Web service client for ObsPy.
+
+:copyright:
+    The ObsPy Development Team (devs@obspy.org)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+import asyncio
+import email.parser
+import email.utils
+import gzip
+import http.client
+import io
+import ssl
+import time
+import warnings
+from collections import OrderedDict
+from urllib.parse import urljoin, urlparse
+import urllib.request as urllib_request
+
+from .client import (Client, REDIRECT_MSG, _get_response_queries,
+                     raise_on_error)
+from .header import FDSNException, FDSNRedirectException
+
+
+# Status codes of responses that are retried after a backoff.
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+REDIRECT_STATUS_CODES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 10
+# Maximum size of single reads from the network.
+READ_SIZE = 2 ** 16
+
+
+class _StaleConnectionError(ConnectionError):
+    """
+    Raised if a reused keep-alive connection has been closed by the server.
+    """
+    pass
+
+
+class _Response(object):
+    """
+    A fully read HTTP response.
+    """
+    def __init__(self, status, reason, headers, body):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+
+class _Host(object):
+    """
+    Idle keep-alive connections and request limits of a single host.
+    """
+    def __init__(self, max_connections):
+        self.semaphore = asyncio.Semaphore(max_connections)
+        self.idle = []
+        # Event loop time before which no request is sent to the host.
+        self.not_before = 0.0
+
+
+class _AsyncConnectionPool(object):
+    """
+    Minimal HTTP/1.1 client on top of asyncio streams, keeping a limited
+    number of persistent connections per host.
+
+    :type max_connections: int
+    :param max_connections: Maximum number of concurrent requests (and thus
+        open connections) per host.
+    :type timeout: float
+    :param timeout: Maximum time (in seconds) to wait for connecting and
+        for each read from the network.
+    """
+    def __init__(self, max_connections, timeout):
+        self.loop = asyncio.get_event_loop()
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._hosts = {}
+        self._ssl_context = None
+
+    def _get_host(self, key):
+        if key not in self._hosts:
+            self._hosts[key] = _Host(self.max_connections)
+        return self._hosts[key]
+
+    @staticmethod
+    def _host_key(url):
+        url = urlparse(url)
+        port = url.port or (443 if url.scheme == "https" else 80)
+        return (url.scheme, url.hostname, port)
+
+    def backoff(self, url, delay):
+        """
+        Delays all following requests to the host of the given URL.
+        """
+        host = self._get_host(self._host_key(url))
+        host.not_before = max(host.not_before, self.loop.time() + delay)
+
+    async def close(self):
+        """
+        Closes all idle connections.
+        """
+        for host in self._hosts.values():
+            while host.idle:
+                _, writer = host.idle.pop()
+                writer.close()
+
+    async def request(self, method, url, headers, body=None):
+        """
+        Sends a request and reads the complete response.
+
+        :rtype: :class:`_Response`
+        """
+        key = self._host_key(url)
+        host = self._get_host(key)
+        parsed = urlparse(url)
+        target = parsed.path or "/"
+        if parsed.query:
+            target += "?" + parsed.query
+        headers = OrderedDict(headers)
+        headers["Host"] = parsed.netloc
+        if body is not None:
+            headers["Content-Length"] = str(len(body))
+
+        async with host.semaphore:
+            delay = host.not_before - self.loop.time()
+            while delay > 0:
+                await asyncio.sleep(delay)
+                delay = host.not_before - self.loop.time()
+            while True:
+                reused = bool(host.idle)
+                if reused:
+                    conn = host.idle.pop()
+                else:
+                    conn = await self._connect(key)
+                try:
+                    response, keep_alive = await self._exchange(
+                        conn, method, target, headers, body, reused)
+                except _StaleConnectionError:
+                    conn[1].close()
+                    continue
+                except BaseException:
+                    conn[1].close()
+                    raise
+                if keep_alive:
+                    host.idle.append(conn)
+                else:
+                    conn[1].close()
+                return response
+
+    async def _connect(self, key):
+        scheme, hostname, port = key
+        ssl_context = None
+        if scheme == "https":
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            ssl_context = self._ssl_context
+        return await asyncio.wait_for(
+            asyncio.open_connection(hostname, port, ssl=ssl_context),
+            self.timeout)
+
+    async def _read(self, coroutine):
+        return await asyncio.wait_for(coroutine, self.timeout)
+
+    async def _read_exactly(self, reader, size):
+        chunks = []
+        while size > 0:
+            chunk = await self._read(
+                reader.readexactly(min(size, READ_SIZE)))
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    async def _exchange(self, conn, method, target, headers, body, reused):
+        reader, writer = conn
+        lines = ["%s %s HTTP/1.1" % (method, target)]
+        lines.extend("%s: %s" % (k, v) for k, v in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if body is not None:
+            writer.write(body)
+        try:
+            await writer.drain()
+            status_line = await self._read(reader.readline())
+        except (ConnectionError, asyncio.IncompleteReadError):
+            if reused:
+                raise _StaleConnectionError()
+            raise
+        if not status_line:
+            if reused:
+                raise _StaleConnectionError()
+            raise ConnectionError("Connection closed by server.")
+
+        try:
+            version, status, reason = \
+                status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        except ValueError:
+            version, status = \
+                status_line.decode("latin-1").rstrip("\r\n").split(" ", 1)
+            reason = ""
+        status = int(status)
+
+        header_lines = []
+        while True:
+            line = await self._read(reader.readline())
+            if line in (b"\r\n", b"\n", b""):
+                break
+            header_lines.append(line)
+        response_headers = email.parser.Parser(
+            _class=http.client.HTTPMessage).parsestr(
+                b"".join(header_lines).decode("latin-1"))
+
+        keep_alive = version == "HTTP/1.1" and \
+            response_headers.get("Connection", "").lower() != "close"
+        transfer_encoding = response_headers.get("Transfer-Encoding", "")
+        content_length = response_headers.get("Content-Length")
+        if method == "HEAD" or status in (204, 304) or status < 200:
+            data = b""
+        elif "chunked" in transfer_encoding.lower():
+            chunks = []
+            while True:
+                size = await self._read(reader.readline())
+                size = int(size.split(b";")[0], 16)
+                if size == 0:
+                    # Skip trailers.
+                    while await self._read(reader.readline()) not in (
+                            b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await self._read_exactly(reader, size))
+                await self._read(reader.readline())
+            data = b"".join(chunks)
+        elif content_length is not None:
+            data = await self._read_exactly(reader, int(content_length))
+        else:
+            chunks = []
+            while True:
+                chunk = await self._read(reader.read(READ_SIZE))
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            data = b"".join(chunks)
+            keep_alive = False
+        return _Response(status, reason, response_headers, data), keep_alive
+
+
+class AsyncClient(Client):
+    """
+    Asynchronous FDSN Web service request client.
+
+    Offers coroutine versions of the query methods of
+    :class:`~obspy.clients.fdsn.client.Client` so that many requests can be
+    in flight at the same time from a single thread, e.g. with
+    :func:`asyncio.gather`. Requests to the same host share a limited
+    number of persistent connections, all further requests wait until a
+    connection gets available. If a server responds with HTTP 429 (too many
+    requests) all requests to that host are paused for the time requested by
+    the server (or an exponential backoff) before being retried.
+
+    Service discovery, URL building, parameter checking and parsing of the
+    data is shared with :class:`~obspy.clients.fdsn.client.Client`. Note
+    that the services are discovered when initializing the client (this is
+    a blocking call, unless the services of the same server have already been
+    discovered before) and that parsing of the downloaded data happens in
+    the thread running the event loop.
+
+    >>> import asyncio
+    >>> from obspy import UTCDateTime
+    >>> from obspy.clients.fdsn import AsyncClient
+    >>> client = AsyncClient("IRIS")  # doctest: +SKIP
+    >>> t = UTCDateTime("2010-02-27T06:30:00.000")
+    >>> async def main():
+    ...     requests = [client.get_waveforms("IU", sta, "00", "LHZ", t, t + 5)
+    ...                 for sta in ("ANMO", "COLA", "KONO")]
+    ...     try:
+    ...         return await asyncio.gather(*requests)
+    ...     finally:
+    ...         await client.close()
+    >>> streams = asyncio.run(main())  # doctest: +SKIP
+    """
+    def __init__(self, base_url="IRIS", max_connections_per_host=10,
+                 **kwargs):
+        """
+        Initializes an asynchronous FDSN Web service client.
+
+        :type base_url: str
+        :param base_url: Base URL of FDSN web service compatible server
+            (e.g. "http://service.iris.edu") or key string for recognized
+            server.
+        :type max_connections_per_host: int
+        :param max_connections_per_host: Maximum number of concurrent
+            requests to a single host.
+
+        All other keyword arguments are passed on to
+        :meth:`Client.__init__() <obspy.clients.fdsn.client.Client.__init__>`,
+        ``timeout`` applies to connecting and to every single read from the
+        network, ``max_retries`` and ``backoff_factor`` control retrying of
+        failed requests.
+        """
+        self.max_connections_per_host = max_connections_per_host
+        self._connection_pool = None
+        Client.__init__(self, base_url=base_url, **kwargs)
+
+    def __str__(self):
+        return "Asynchronous " + Client.__str__(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def close(self):
+        """
+        Closes all idle persistent connections of the client.
+        """
+        if self._connection_pool is not None:
+            await self._connection_pool.close()
+
+    def _get_connection_pool(self):
+        # Connections belong to a single event loop.
+        loop = asyncio.get_event_loop()
+        if self._connection_pool is None or \
+                self._connection_pool.loop is not loop:
+            self._connection_pool = _AsyncConnectionPool(
+                self.max_connections_per_host, self.timeout)
+        return self._connection_pool
+
+    def _get_retry_delay(self, retry, headers=None):
+        """
+        Time to wait before a retry, honors the ``Retry-After`` header.
+        """
+        retry_after = headers.get("Retry-After") if headers else None
+        if retry_after:
+            try:
+                return max(float(retry_after), 0.0)
+            except ValueError:
+                date = email.utils.parsedate_tz(retry_after)
+                if date is not None:
+                    return max(email.utils.mktime_tz(date) - time.time(), 0.0)
+        return self._retries.backoff_factor * 2 ** retry
+
+    def _get_digest_authorization(self, url, method, data, challenge):
+        """
+        Returns the value of the authorization header answering a digest
+        authentication challenge or ``None`` without matching credentials.
+        """
+        handlers = [h for h in self._url_opener.handlers
+                    if isinstance(h, urllib_request.HTTPDigestAuthHandler)]
+        scheme, _, challenge = challenge.partition(" ")
+        if not handlers or scheme.lower() != "digest":
+            return None
+        challenge = urllib_request.parse_keqv_list(
+            filter(None, urllib_request.parse_http_list(challenge)))
+        request = urllib_request.Request(url, data=data, method=method)
+        authorization = handlers[0].get_authorization(request, challenge)
+        if not authorization:
+            return None
+        return "Digest %s" % authorization
+
+    async def _download_async(self, url, return_string=False, data=None,
+                              use_gzip=True, use_cache=False):
+        """
+        Coroutine version of :meth:`~Client._download`.
+        """
+        pool = self._get_connection_pool()
+        method = "GET" if data is None else "POST"
+        headers = self.request_headers
+        use_cache = use_cache and self.cache is not None
+        if use_cache:
+            key, entry, headers = self._lookup_cache(url, data)
+            if entry is not None and entry.fresh:
+                body = entry.body
+                return body if return_string else io.BytesIO(body)
+        headers = OrderedDict(headers)
+        if use_gzip:
+            headers["Accept-Encoding"] = "gzip"
+        if data is not None:
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        max_retries = self._retries.total or 0
+        retry = 0
+        redirects = 0
+        authenticated = False
+
+        while True:
+            if self.debug is True:
+                print("Downloading %s" % url)
+            try:
+                response = await pool.request(method, url, headers, data)
+            except asyncio.TimeoutError:
+                raise FDSNException("Timed Out")
+            except (OSError, asyncio.IncompleteReadError,
+                    http.client.HTTPException, ValueError) as e:
+                if retry < max_retries:
+                    await asyncio.sleep(self._get_retry_delay(retry))
+                    retry += 1
+                    continue
+                raise_on_error(None, e)
+
+            if response.status in REDIRECT_STATUS_CODES and \
+                    "Location" in response.headers:
+                if self.user is not None and not self._force_redirect:
+                    raise FDSNRedirectException(REDIRECT_MSG)
+                redirects += 1
+                if redirects > MAX_REDIRECTS:
+                    raise FDSNException("Too many redirects: %s" % url)
+                url = urljoin(url, response.headers["Location"])
+                url = url.replace(" ", "%20")
+                continue
+            if response.status == 401 and not authenticated:
+                authenticated = True
+                authorization = self._get_digest_authorization(
+                    url, method, data,
+                    response.headers.get("WWW-Authenticate", ""))
+                if authorization is not None:
+                    headers["Authorization"] = authorization
+                    continue
+            if response.status in RETRY_STATUS_CODES and \
+                    retry < max_retries:
+                delay = self._get_retry_delay(retry, response.headers)
+                retry += 1
+                if response.status == 429:
+                    # Rate limited: pause all requests to this host.
+                    pool.backoff(url, delay)
+                else:
+                    await asyncio.sleep(delay)
+                continue
+            break
+
+        body = response.body
+        if response.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        if self.debug is True:
+            print("Downloaded %s with HTTP code: %i" % (url, response.status))
+        if use_cache:
+            body = self._store_in_cache(
+                key, url, entry, response.status,
+                body if response.status == 200 else io.BytesIO(body),
+                response.headers)
+        else:
+            raise_on_error(response.status, io.BytesIO(body))
+        if return_string:
+            return body
+        return io.BytesIO(body)
+
+    async def _attach_responses_async(self, st):
+        """
+        Coroutine version of :meth:`~Client._attach_responses`.
+        """
+        inventories = await asyncio.gather(
+            *[self.get_stations(**kwargs)
+              for kwargs in _get_response_queries(st)],
+            return_exceptions=True)
+        for inv in inventories:
+            if isinstance(inv, Exception):
+                warnings.warn(str(inv))
+        st.attach_response([inv for inv in inventories
+                            if not isinstance(inv, Exception)])
+
+    async def get_events(self, starttime=None, endtime=None, minlatitude=None,
+                         maxlatitude=None, minlongitude=None,
+                         maxlongitude=None, latitude=None, longitude=None,
+                         minradius=None, maxradius=None, mindepth=None,
+                         maxdepth=None, minmagnitude=None, maxmagnitude=None,
+                         magnitudetype=None, includeallorigins=None,
+                         includeallmagnitudes=None, includearrivals=None,
+                         eventid=None, limit=None, offset=None, orderby=None,
+                         catalog=None, contributor=None, updatedafter=None,
+                         filename=None, **kwargs):
+        """
+        Query the event service of the client.
+
+        Coroutine version of
+        :meth:`Client.get_events()
+        <obspy.clients.fdsn.client.Client.get_events>`, see there for a
+        description of the parameters.
+
+        :rtype: :class:`~obspy.core.event.Catalog`
+        """
+        url = self._query_url("event", locals(), kwargs)
+        data_stream = await self._download_async(url, use_cache=True)
+        return self._read_response("event", data_stream, filename)
+
+    async def get_stations(self, starttime=None, endtime=None,
+                           startbefore=None, startafter=None, endbefore=None,
+                           endafter=None, network=None, station=None,
+                           location=None, channel=None, minlatitude=None,
+                           maxlatitude=None, minlongitude=None,
+                           maxlongitude=None, latitude=None, longitude=None,
+                           minradius=None, maxradius=None, level=None,
+                           includerestricted=None, includeavailability=None,
+                           updatedafter=None, matchtimeseries=None,
+                           filename=None, format=None, **kwargs):
+        """
+        Query the station service of the client.
+
+        Coroutine version of
+        :meth:`Client.get_stations()
+        <obspy.clients.fdsn.client.Client.get_stations>`, see there for a
+        description of the parameters.
+
+        :rtype: :class:`~obspy.core.inventory.inventory.Inventory`
+        """
+        url = self._query_url("station", locals(), kwargs)
+        data_stream = await self._download_async(url, use_cache=True)
+        return self._read_response("station", data_stream, filename)
+
+    async def get_waveforms(self, network, station, location, channel,
+                            starttime, endtime, quality=None,
+                            minimumlength=None, longestonly=None,
+                            filename=None, attach_response=False, **kwargs):
+        """
+        Query the dataselect service of the client.
+
+        Coroutine version of
+        :meth:`Client.get_waveforms()
+        <obspy.clients.fdsn.client.Client.get_waveforms>`, see there for a
+        description of the parameters.
+
+        :rtype: :class:`~obspy.core.stream.Stream`
+        """
+        url = self._query_url("dataselect", locals(), kwargs)
+        data_stream = await self._download_async(url, use_gzip=False)
+        st = self._read_response("dataselect", data_stream, filename)
+        if filename:
+            return
+        if attach_response:
+            await self._attach_responses_async(st)
+        self._attach_dataselect_url_to_stream(st)
+        st.trim(starttime, endtime)
+        return st
+
+    async def get_waveforms_bulk(self, bulk, quality=None, minimumlength=None,
+                                 longestonly=None, filename=None,
+                                 attach_response=False, **kwargs):
+        """
+        Query the dataselect service of the client. Bulk request.
+
+        Coroutine version of
+        :meth:`Client.get_waveforms_bulk()
+        <obspy.clients.fdsn.client.Client.get_waveforms_bulk>`, see there for
+        a description of the parameters.
+
+        :rtype: :class:`~obspy.core.stream.Stream`
+        """
+        arguments = OrderedDict(
+            quality=quality,
+            minimumlength=minimumlength,
+            longestonly=longestonly
+        )
+        url, bulk = self._bulk_query("dataselect", bulk, arguments)
+        data_stream = await self._download_async(url, data=bulk)
+        st = self._read_response("dataselect", data_stream, filename)
+        if filename:
+            return
+        if attach_response:
+            await self._attach_responses_async(st)
+        self._attach_dataselect_url_to_stream(st)
+        return st
+
+    async def get_stations_bulk(self, bulk, level=None,
+                                includerestricted=None,
+                                includeavailability=None, filename=None,
+                                **kwargs):
+        """
+        Query the station service of the client. Bulk request.
+
+        Coroutine version of
+        :meth:`Client.get_stations_bulk()
+        <obspy.clients.fdsn.client.Client.get_stations_bulk>`, see there for
+        a description of the parameters.
+
+        :rtype: :class:`~obspy.core.inventory.inventory.Inventory`
+        """
+        arguments = OrderedDict(
+            level=level,
+            includerestriced=includerestricted,
+            includeavailability=includeavailability
+        )
+        url, bulk = self._bulk_query("station", bulk, arguments)
+        data_stream = await self._download_async(url, data=bulk,
+                                                 use_cache=True)
+        return self._read_response("station", data_stream, filename)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(exclude_empty=True)
@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Persistent on-disk cache for responses of FDSN web services.
+
+:copyright:
+    The ObsPy Development Team (devs@obspy.org)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from obspy import UTCDateTime
+
+
+# Types of the WADL parameters of discovered services and their names in
+# the cache.
+PARAMETER_TYPES = {"str": str, "float": float, "int": int, "bool": bool,
+                   "UTCDateTime": UTCDateTime}
+PARAMETER_KEYS = {"required", "type", "options", "doc_title", "doc",
+                  "default_value"}
+
+
+def _services_to_json(services):
+    """
+    Serializes the services discovered by a client to JSON.
+
+    The WADL parameters of the services are stored with the names of their
+    types and :class:`~obspy.core.utcdatetime.UTCDateTime` values as
+    strings, the sets of available event catalogs and contributors as
+    sorted lists.
+    """
+    type_names = {value: key for key, value in PARAMETER_TYPES.items()}
+
+    def _encode(value):
+        return str(value) if isinstance(value, UTCDateTime) else value
+
+    result = {}
+    for name, service in services.items():
+        if isinstance(service, dict):
+            service = {
+                key: dict(param, type=type_names[param["type"]],
+                          options=[_encode(_i) for _i in param["options"]],
+                          default_value=_encode(param["default_value"]))
+                for key, param in service.items()}
+        elif isinstance(service, (set, frozenset)):
+            service = sorted(service)
+        result[name] = service
+    return json.dumps(result)
+
+
+def _services_from_json(data):
+    """
+    Reverses :func:`_services_to_json`.
+
+    Raises an exception if the data is not valid.
+    """
+    services = json.loads(data)
+    if not isinstance(services, dict):
+        raise ValueError("Invalid services.")
+    for name, service in services.items():
+        if not isinstance(service, dict):
+            if isinstance(service, list):
+                if not all(isinstance(_i, str) for _i in service):
+                    raise ValueError("Invalid service '%s'." % name)
+                services[name] = set(service)
+            elif not isinstance(service, bool):
+                raise ValueError("Invalid service '%s'." % name)
+            continue
+        for key, param in service.items():
+            if not isinstance(param, dict) or set(param) != PARAMETER_KEYS \
+                    or param["type"] not in PARAMETER_TYPES \
+                    or not isinstance(param["options"], list):
+                raise ValueError("Invalid parameter '%s' of service '%s'." %
+                                 (key, name))
+            param["type"] = PARAMETER_TYPES[param["type"]]
+            if param["type"] is UTCDateTime:
+                param["options"] = [UTCDateTime(_i)
+                                    for _i in param["options"]]
+                if param["default_value"] is not None:
+                    param["default_value"] = UTCDateTime(
+                        param["default_value"])
+    return services
+
+
+class CacheEntry(object):
+    """
+    A response stored in a :class:`ResponseCache`.
+
+    :ivar body: The uncompressed response body.
+    :ivar etag: Value of the ``ETag`` header of the response or ``None``.
+    :ivar last_modified: Value of the ``Last-Modified`` header of the
+        response or ``None``.
+    :ivar fresh: ``False`` if the time to live of the entry has expired and
+        it has to be revalidated with the server.
+    """
+    def __init__(self, body, etag, last_modified, fresh):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fresh = fresh
+
+    def get_revalidation_headers(self):
+        """
+        Headers for a conditional request revalidating the entry.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache(object):
+    """
+    Persistent cache for web service responses in a single SQLite database
+    file, safe to be shared by multiple clients and threads.
+
+    Responses are stored zlib compressed. Entries are served without
+    contacting the server during their time to live, afterwards they are
+    revalidated with the server if the response had an ``ETag`` or
+    ``Last-Modified`` header (and downloaded again otherwise). If the total
+    size of the stored responses exceeds ``max_size``, the least recently
+    used entries are evicted.
+
+    The cache also stores the services discovered by clients (see
+    :meth:`get_services`), so clients in other processes sharing the cache
+    file can skip the service discovery during the time to live. They are
+    stored as JSON and ignored if they cannot be parsed.
+
+    >>> from obspy.clients.fdsn import Client
+    >>> from obspy.clients.fdsn.cache import ResponseCache
+    >>> cache = ResponseCache("fdsn_cache.sqlite", ttl=3600)  # doctest: +SKIP
+    >>> client = Client("IRIS", cache=cache)  # doctest: +SKIP
+    >>> for _ in range(2):
+    ...     inv = client.get_stations(network="IU")  # doctest: +SKIP
+    >>> cache.get_statistics()  # doctest: +SKIP
+    {'hits': 1, 'misses': 1, 'revalidated': 0, 'entries': 1, 'size': 1010}
+
+    :type filename: str
+    :param filename: SQLite database file of the cache. Created if it does
+        not exist yet.
+    :type ttl: float
+    :param ttl: Time to live of entries in seconds.
+    :type max_size: int
+    :param max_size: Maximum total size of the compressed responses in
+        bytes.
+    """
+    def __init__(self, filename, ttl=86400.0, max_size=500 * 1024 ** 2):
+        self.filename = filename
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "revalidated": 0}
+        dirname = os.path.dirname(os.path.abspath(filename))
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        self._connection = sqlite3.connect(filename, timeout=60,
+                                           check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, url TEXT, body BLOB, etag TEXT, "
+                "last_modified TEXT, stored REAL, accessed REAL, "
+                "size INTEGER)")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS accessed_index "
+                "ON responses (accessed)")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS services ("
+                "key TEXT PRIMARY KEY, base_url TEXT, services BLOB, "
+                "stored REAL)")
+
+    def __str__(self):
+        return "ResponseCache('%s', ttl=%s, max_size=%i)" % (
+            self.filename, self.ttl, self.max_size)
+
+    def __repr__(self):
+        return self.__str__()
+
+    @staticmethod
+    def get_key(url, data=None, user=None):
+        """
+        Cache key of a request.
+
+        The query parameters of the URL are sorted and surrounding whitespace
+        of the lines of a POST payload is stripped so that equivalent requests
+        share the same key.
+
+        :type url: str
+        :param url: The URL of the request.
+        :type data: bytes
+        :param data: Payload of a POST request.
+        :type user: str
+        :param user: User name for authenticated requests.
+        """
+        parsed = urlparse(url)
+        query = urlencode(sorted(parse_qsl(parsed.query,
+                                           keep_blank_values=True)))
+        url = urlunparse(parsed._replace(query=query, fragment=""))
+        sha = hashlib.sha256(url.encode())
+        if data is not None:
+            if isinstance(data, str):
+                data = data.encode()
+            lines = [line.strip() for line in data.splitlines()]
+            sha.update(b"\0" + b"\n".join(line for line in lines if line))
+        if user is not None:
+            sha.update(b"\0" + user.encode())
+        return sha.hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached response for the given key or ``None``.
+
+        :rtype: :class:`CacheEntry`
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT body, etag, last_modified, stored FROM responses "
+                "WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?",
+                (now, key))
+            body, etag, last_modified, stored = row
+            fresh = now - stored < self.ttl
+            if fresh:
+                self._stats["hits"] += 1
+        return CacheEntry(zlib.decompress(body), etag, last_modified, fresh)
+
+    def put(self, key, url, body, etag=None, last_modified=None):
+        """
+        Stores a downloaded response.
+        """
+        compressed = zlib.compress(body)
+        now = time.time()
+        with self._lock, self._connection:
+            self._stats["misses"] += 1
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, sqlite3.Binary(compressed), etag, last_modified,
+                 now, now, len(compressed)))
+            self._evict()
+
+    def revalidate(self, key):
+        """
+        Marks an entry as confirmed to be unchanged by the server, resetting
+        its time to live.
+        """
+        with self._lock, self._connection:
+            self._stats["revalidated"] += 1
+            self._connection.execute(
+                "UPDATE responses SET stored = ? WHERE key = ?",
+                (time.time(), key))
+
+    def _evict(self):
+        """
+        Removes least recently used entries until the cache is small enough.
+        Must be called with the lock held and within a transaction.
+        """
+        total = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_size:
+            return
+        cursor = self._connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed")
+        evicted = []
+        for key, size in cursor:
+            if total <= self.max_size:
+                break
+            evicted.append((key,))
+            total -= size
+        self._connection.executemany(
+            "DELETE FROM responses WHERE key = ?", evicted)
+
+    @staticmethod
+    def _get_services_key(urls):
+        return hashlib.sha256(
+            "\n".join(sorted(urls)).encode()).hexdigest()
+
+    def get_services(self, urls):
+        """
+        Returns the services discovered with the given URLs of the WADL
+        files, catalogs and contributors of a server or ``None`` if they are
+        not cached or their time to live has expired.
+
+        :type urls: list of str
+        :param urls: The URLs queried by the service discovery. They
+            contain the base URL, service versions and custom service
+            mappings of the client.
+        :rtype: dict
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT services, stored FROM services WHERE key = ?",
+                (self._get_services_key(urls),)).fetchone()
+        if row is None or time.time() - row[1] >= self.ttl:
+            return None
+        try:
+            return _services_from_json(row[0])
+        except Exception:
+            # Invalid or written by an older version of the cache. The
+            # services are discovered and stored again.
+            return None
+
+    def put_services(self, urls, base_url, services):
+        """
+        Stores the services discovered with the given URLs.
+
+        :type urls: list of str
+        :param urls: The URLs queried by the service discovery.
+        :type base_url: str
+        :param base_url: The base URL of the server.
+        :type services: dict
+        :param services: The discovered services.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO services VALUES (?, ?, ?, ?)",
+                (self._get_services_key(urls), base_url,
+                 _services_to_json(services),
+                 time.time()))
+
+    def clear(self):
+        """
+        Removes all entries and discovered services from the cache.
+        """
+        with self._lock:
+            with self._connection:
+                self._connection.execute("DELETE FROM responses")
+                self._connection.execute("DELETE FROM services")
+            self._connection.execute("VACUUM")
+
+    def get_statistics(self):
+        """
+        Returns hits, misses and revalidations since the cache has been
+        opened, as well as the current number of entries and their total
+        compressed size in bytes.
+
+        Hits are served from the cache without contacting the server,
+        revalidated entries have been confirmed unchanged by the server
+        (HTTP 304) and misses had to be downloaded.
+
+        :rtype: dict
+        """
+        with self._lock:
+            entries, size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) "
+                "FROM responses").fetchone()
+            stats = dict(self._stats)
+        stats["entries"] = entries
+        stats["size"] = size
+        return stats
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(exclude_empty=True)
@@ -11,9 +11,11 @@ FDSN Web service client for ObsPy.
 """
 import copy
 import gzip
+import http.client
 import io
 import os
 import re
+import shutil
 from socket import timeout as socket_timeout
 import textwrap
 import threading
@@ -21,24 +23,42 @@ import warnings
 from collections import OrderedDict
 from urllib.parse import urlparse
 
+import urllib3
 from lxml import etree
 
+import numpy as np
+
 import obspy
-from obspy import UTCDateTime, read_inventory
+from obspy import Stream, UTCDateTime, read_inventory
 from obspy.core.compatibility import collections_abc
+from obspy.io.mseed.util import _get_complete_records_size
 from .header import (DEFAULT_PARAMETERS, DEFAULT_USER_AGENT, FDSNWS,
                      OPTIONAL_PARAMETERS, PARAMETER_ALIASES, URL_MAPPINGS,
                      WADL_PARAMETERS_NOT_TO_BE_PARSED, DEFAULT_SERVICES,
-                     FDSNException, FDSNRedirectException, FDSNNoDataException)
+                     FDSNException, FDSNRedirectException, FDSNNoDataException,
+                     FDSNTooManyRequestsException,
+                     FDSNServiceUnavailableException)
+from .cache import ResponseCache
 from .wadl_parser import WADLParser
 
 from urllib.parse import urlencode
 import urllib.request as urllib_request
+import urllib.response as urllib_response
 import queue
 
 
 DEFAULT_SERVICE_VERSIONS = {'dataselect': 1, 'station': 1, 'event': 1}
 
+REDIRECT_MSG = (
+    "Requests with credentials (username, password) are not being "
+    "redirected by default to improve security. To force redirects "
+    "and if you trust the data center, set `force_redirect` to True "
+    "when initializing the Client.")
+
+# Size of the chunks MiniSEED data is read and decoded in while it is
+# downloaded.
+MSEED_CHUNK_SIZE = 16 * 1024 ** 2
+
 
 class CustomRedirectHandler(urllib_request.HTTPRedirectHandler):
     """
@@ -79,11 +99,93 @@ class NoRedirectionHandler(urllib_request.HTTPRedirectHandler):
         """
         Copied and modified from the standard library.
         """
-        raise FDSNRedirectException(
-            "Requests with credentials (username, password) are not being "
-            "redirected by default to improve security. To force redirects "
-            "and if you trust the data center, set `force_redirect` to True "
-            "when initializing the Client.")
+        raise FDSNRedirectException(REDIRECT_MSG)
+
+
+class _NoReadTimeoutRetry(urllib3.util.Retry):
+    """
+    Retry configuration that never repeats a request after the server
+    failed to answer in time.
+
+    Connection errors, connections dropped by the server while idle in the
+    pool and "server busy" status codes are retried but a read timeout is
+    raised immediately so that a single request never takes much longer
+    than the timeout set by the user. For the same reason a ``Retry-After``
+    header of the server is honored up to ``MAX_RETRY_AFTER`` seconds.
+    """
+    MAX_RETRY_AFTER = 10.0
+
+    def get_retry_after(self, response):
+        retry_after = super(_NoReadTimeoutRetry, self).get_retry_after(
+            response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.MAX_RETRY_AFTER)
+
+    def increment(self, method=None, url=None, response=None, error=None,
+                  _pool=None, _stacktrace=None):
+        if isinstance(error, urllib3.exceptions.ReadTimeoutError):
+            raise error
+        return super(_NoReadTimeoutRetry, self).increment(
+            method=method, url=url, response=response, error=error,
+            _pool=_pool, _stacktrace=_stacktrace)
+
+
+class _PooledHandlerMixin(object):
+    """
+    Mixin for the HTTP(S) handlers of an opener sending all requests through
+    a shared pool of persistent (keep-alive) connections.
+
+    Everything else (authentication, redirects, error handling) is still
+    done by the other handlers of the opener. Requests routed through a
+    proxy are passed on to the standard library.
+    """
+    def __init__(self, pool_manager, retries=None, **kwargs):
+        super(_PooledHandlerMixin, self).__init__(**kwargs)
+        self._pool_manager = pool_manager
+        self._retries = retries
+
+    def _pooled_open(self, req, fallback):
+        if req._tunnel_host or req.host != urlparse(req.full_url).netloc:
+            return fallback(req)
+        if isinstance(req.timeout, (int, float)):
+            timeout = urllib3.Timeout(connect=req.timeout, read=req.timeout)
+        else:
+            timeout = urllib3.Timeout.DEFAULT_TIMEOUT
+        try:
+            r = self._pool_manager.urlopen(
+                req.get_method(), req.full_url, body=req.data,
+                headers=dict(req.header_items()), retries=self._retries,
+                redirect=False, timeout=timeout, preload_content=False,
+                decode_content=False)
+        except urllib3.exceptions.HTTPError as e:
+            raise urllib_request.URLError(getattr(e, "reason", None) or e)
+        headers = http.client.HTTPMessage()
+        for key, value in r.headers.items():
+            headers[key] = value
+        # The connection returns to the pool once the response is read.
+        response = urllib_response.addinfourl(
+            r, headers, req.full_url, r.status)
+        response.msg = r.reason
+        return response
+
+
+class PooledHTTPHandler(_PooledHandlerMixin, urllib_request.HTTPHandler):
+    """
+    HTTP handler using a pool of persistent connections.
+    """
+    def http_open(self, req):
+        return self._pooled_open(
+            req, super(PooledHTTPHandler, self).http_open)
+
+
+class PooledHTTPSHandler(_PooledHandlerMixin, urllib_request.HTTPSHandler):
+    """
+    HTTPS handler using a pool of persistent connections.
+    """
+    def https_open(self, req):
+        return self._pooled_open(
+            req, super(PooledHTTPSHandler, self).https_open)
 
 
 class Client(object):
@@ -130,7 +232,8 @@ class Client(object):
     def __init__(self, base_url="IRIS", major_versions=None, user=None,
                  password=None, user_agent=DEFAULT_USER_AGENT, debug=False,
                  timeout=120, service_mappings=None, force_redirect=False,
-                 eida_token=None, _discover_services=True):
+                 eida_token=None, pool_size=10, max_retries=3,
+                 backoff_factor=0.5, cache=None, _discover_services=True):
         """
         Initializes an FDSN Web Service client.
 
@@ -192,6 +295,33 @@ class Client(object):
             used. This mechanism is only available on select EIDA nodes. The
             token can be provided in form of the PGP message as a string, or
             the filename of a local file with the PGP message in it.
+        :type pool_size: int
+        :param pool_size: Maximum number of persistent (keep-alive)
+            connections kept open per host. All requests of the client (also
+            from multiple threads) reuse these connections instead of opening
+            a new connection for every request.
+        :type max_retries: int
+        :param max_retries: Maximum number of times a request is retried on
+            connection errors and on the HTTP codes 429, 502, 503 and 504
+            (server busy or temporarily unavailable). A ``Retry-After``
+            header sent by the server is honored, but the client never waits
+            longer than 10 seconds before a retry. Requests timing out while
+            waiting for the response are not retried. Set to ``0`` to
+            disable retries.
+        :type backoff_factor: float
+        :param backoff_factor: Factor for the exponential backoff between
+            retries, i.e. the client sleeps ``backoff_factor * 2 ** (n - 1)``
+            seconds before the n-th retry.
+        :type cache: str or :class:`~obspy.clients.fdsn.cache.ResponseCache`
+        :param cache: Persistent on-disk cache for responses of the station
+            and event services (used by :meth:`get_stations`,
+            :meth:`get_stations_bulk` and :meth:`get_events`) and for the
+            discovered services. Either a
+            :class:`~obspy.clients.fdsn.cache.ResponseCache` (which can be
+            shared by multiple clients) or the filename of its database, in
+            which case a cache with default settings is used. Clients in
+            other processes using the same database skip the service
+            discovery during the time to live of the cache.
         :type _discover_services: bool
         :param _discover_services: By default the client will query information
             about the FDSN endpoint when it is instantiated.  In certain cases,
@@ -204,6 +334,9 @@ class Client(object):
         self.user = user
         self.timeout = timeout
         self._force_redirect = force_redirect
+        if cache is not None and not isinstance(cache, ResponseCache):
+            cache = ResponseCache(cache)
+        self.cache = cache
 
         # Cache for the webservice versions. This makes interactive use of
         # the client more convenient.
@@ -227,6 +360,14 @@ class Client(object):
 
         self.base_url = base_url
 
+        # Connection pool shared by all openers of this client, keeps
+        # connections alive across requests and credential changes.
+        self._retries = _NoReadTimeoutRetry(
+            total=max_retries, redirect=False, raise_on_status=False,
+            backoff_factor=backoff_factor, allowed_methods=None,
+            status_forcelist=(429, 502, 503, 504))
+        self._pool_manager = urllib3.PoolManager(maxsize=pool_size)
+
         self._set_opener(user, password)
 
         self.request_headers = {"User-Agent": user_agent}
@@ -331,11 +472,32 @@ class Client(object):
         else:
             handlers.append(NoRedirectionHandler())
 
+        handlers.append(PooledHTTPHandler(self._pool_manager, self._retries))
+        handlers.append(PooledHTTPSHandler(self._pool_manager, self._retries))
+
         # Don't install globally to not mess with other codes.
         self._url_opener = urllib_request.build_opener(*handlers)
         if self.debug:
             print('Installed new opener with handlers: {!s}'.format(handlers))
 
+    def _copy_without_retries(self):
+        """
+        Returns a shallow copy of the client that never retries requests,
+        for callers handling busy servers themselves. The client itself
+        (and the connection pool it shares with the copy) is left untouched.
+        """
+        client = copy.copy(self)
+        client._retries = self._retries.new(total=0)
+        opener = urllib_request.OpenerDirector()
+        # Copies of the handlers as they are bound to their opener.
+        for handler in self._url_opener.handlers:
+            handler = copy.copy(handler)
+            if isinstance(handler, _PooledHandlerMixin):
+                handler._retries = client._retries
+            opener.add_handler(handler)
+        client._url_opener = opener
+        return client
+
     def _resolve_eida_token(self, token, validate=True):
         """
         Use the token to get credentials.
@@ -505,25 +667,9 @@ class Client(object):
         non-default parameters that the webservice does not support will raise
         an error.
         """
-        if "event" not in self.services:
-            msg = "The current client does not have an event service."
-            raise ValueError(msg)
-
-        locs = locals()
-        setup_query_dict('event', locs, kwargs)
-
-        url = self._create_url_from_parameters(
-            "event", DEFAULT_PARAMETERS['event'], kwargs)
-
-        data_stream = self._download(url)
-        data_stream.seek(0, 0)
-        if filename:
-            self._write_to_file_object(filename, data_stream)
-            data_stream.close()
-        else:
-            cat = obspy.read_events(data_stream, format="quakeml")
-            data_stream.close()
-            return cat
+        url = self._query_url("event", locals(), kwargs)
+        data_stream = self._download(url, use_cache=True)
+        return self._read_response("event", data_stream, filename)
 
     def get_stations(self, starttime=None, endtime=None, startbefore=None,
                      startafter=None, endbefore=None, endafter=None,
@@ -703,26 +849,9 @@ class Client(object):
         non-default parameters that the webservice does not support will raise
         an error.
         """
-        if "station" not in self.services:
-            msg = "The current client does not have a station service."
-            raise ValueError(msg)
-
-        locs = locals()
-        setup_query_dict('station', locs, kwargs)
-
-        url = self._create_url_from_parameters(
-            "station", DEFAULT_PARAMETERS['station'], kwargs)
-
-        data_stream = self._download(url)
-        data_stream.seek(0, 0)
-        if filename:
-            self._write_to_file_object(filename, data_stream)
-            data_stream.close()
-        else:
-            # This works with XML and StationXML data.
-            inventory = read_inventory(data_stream)
-            data_stream.close()
-            return inventory
+        url = self._query_url("station", locals(), kwargs)
+        data_stream = self._download(url, use_cache=True)
+        return self._read_response("station", data_stream, filename)
 
     def get_waveforms(self, network, station, location, channel, starttime,
                       endtime, quality=None, minimumlength=None,
@@ -816,58 +945,28 @@ class Client(object):
         non-default parameters that the webservice does not support will raise
         an error.
         """
-        if "dataselect" not in self.services:
-            msg = "The current client does not have a dataselect service."
-            raise ValueError(msg)
-
-        locs = locals()
-        setup_query_dict('dataselect', locs, kwargs)
-
-        # Special location handling. Convert empty strings to "--".
-        if "location" in kwargs and not kwargs["location"]:
-            kwargs["location"] = "--"
-
-        url = self._create_url_from_parameters(
-            "dataselect", DEFAULT_PARAMETERS['dataselect'], kwargs)
-
+        url = self._query_url("dataselect", locals(), kwargs)
         # Gzip not worth it for MiniSEED and most likely disabled for this
         # route in any case.
-        data_stream = self._download(url, use_gzip=False)
-        data_stream.seek(0, 0)
+        data_stream = self._download(url, use_gzip=False, stream=True)
+        st = self._read_response("dataselect", data_stream, filename)
         if filename:
-            self._write_to_file_object(filename, data_stream)
-            data_stream.close()
-        else:
-            st = obspy.read(data_stream, format="MSEED")
-            data_stream.close()
-            if attach_response:
-                self._attach_responses(st)
-            self._attach_dataselect_url_to_stream(st)
-            st.trim(starttime, endtime)
-            return st
+            return
+        if attach_response:
+            self._attach_responses(st)
+        self._attach_dataselect_url_to_stream(st)
+        st.trim(starttime, endtime)
+        return st
 
     def _attach_responses(self, st):
         """
         Helper method to fetch response via get_stations() and attach it to
         each trace in stream.
         """
-        netids = {}
-        for tr in st:
-            if tr.id not in netids:
-                netids[tr.id] = (tr.stats.starttime, tr.stats.endtime)
-                continue
-            netids[tr.id] = (
-                min(tr.stats.starttime, netids[tr.id][0]),
-                max(tr.stats.endtime, netids[tr.id][1]))
-
         inventories = []
-        for key, value in netids.items():
-            net, sta, loc, chan = key.split(".")
-            starttime, endtime = value
+        for kwargs in _get_response_queries(st):
             try:
-                inventories.append(self.get_stations(
-                    network=net, station=sta, location=loc, channel=chan,
-                    starttime=starttime, endtime=endtime, level="response"))
+                inventories.append(self.get_stations(**kwargs))
             except Exception as e:
                 warnings.warn(str(e))
         st.attach_response(inventories)
@@ -998,32 +1097,85 @@ class Client(object):
         non-default parameters that the webservice does not support will raise
         an error.
         """
-        if "dataselect" not in self.services:
-            msg = "The current client does not have a dataselect service."
-            raise ValueError(msg)
-
         arguments = OrderedDict(
             quality=quality,
             minimumlength=minimumlength,
             longestonly=longestonly
         )
-        bulk = get_bulk_string(bulk, arguments)
-
-        url = self._build_url("dataselect", "query")
+        url, bulk = self._bulk_query("dataselect", bulk, arguments)
 
-        data_stream = self._download(url,
-                                     data=bulk)
-        data_stream.seek(0, 0)
+        # Gzip not worth it for MiniSEED and most likely disabled for this
+        # route in any case.
+        data_stream = self._download(url, data=bulk, use_gzip=False,
+                                     stream=True)
+        st = self._read_response("dataselect", data_stream, filename)
         if filename:
-            self._write_to_file_object(filename, data_stream)
-            data_stream.close()
-        else:
-            st = obspy.read(data_stream, format="MSEED")
+            return
+        if attach_response:
+            self._attach_responses(st)
+        self._attach_dataselect_url_to_stream(st)
+        return st
+
+    def iter_waveforms_bulk(self, bulk, quality=None, minimumlength=None,
+                            longestonly=None, **kwargs):
+        r"""
+        Query the dataselect service of the client with a bulk request and
+        yield the traces while the data is still being downloaded.
+
+        The same as :meth:`get_waveforms_bulk` but instead of returning a
+        :class:`~obspy.core.stream.Stream` when the download is complete,
+        every trace is yielded as soon as it has been received completely.
+        This allows processing large requests without keeping all of the
+        data in memory.
+
+        >>> client = Client("IRIS")
+        >>> t = UTCDateTime("2010-02-27T06:30:00.000")
+        >>> bulk = [("IU", "ANMO", "*", "BHZ", t, t + 60),
+        ...         ("IU", "AFI", "1?", "LHZ", t, t + 60)]
+        >>> for tr in client.iter_waveforms_bulk(bulk):  # doctest: +SKIP
+        ...     print(tr)  # doctest: +ELLIPSIS
+        IU.ANMO.00.BHZ | 2010-02-27T06:30:00... | 20.0 Hz, 1201 samples
+        IU.ANMO.10.BHZ | 2010-02-27T06:30:00... | 40.0 Hz, 2401 samples
+        IU.AFI.10.LHZ  | 2010-02-27T06:30:00... | 1.0 Hz, 60 samples
+
+        Traces of a channel that continue in data received later are only
+        yielded once the data of the channel ends, so a channel might be
+        yielded as several traces if the server interleaves long runs of
+        records of different channels.
+
+        :type bulk: str, file or list of lists
+        :param bulk: Information about the requested data. See
+            :meth:`get_waveforms_bulk` for details.
+        :type quality: str, optional
+        :param quality: Select a specific SEED quality indicator, handling is
+            data center dependent. Ignored when `bulk` is provided as a
+            request string/file.
+        :type minimumlength: float, optional
+        :param minimumlength: Limit results to continuous data segments of a
+            minimum length specified in seconds. Ignored when `bulk` is
+            provided as a request string/file.
+        :type longestonly: bool, optional
+        :param longestonly: Limit results to the longest continuous segment
+            per channel. Ignored when `bulk` is provided as a request
+            string/file.
+        :rtype: generator of :class:`~obspy.core.trace.Trace`
+        """
+        arguments = OrderedDict(
+            quality=quality,
+            minimumlength=minimumlength,
+            longestonly=longestonly
+        )
+        url, bulk = self._bulk_query("dataselect", bulk, arguments)
+        # Gzip not worth it for MiniSEED and most likely disabled for this
+        # route in any case.
+        data_stream = self._download(url, data=bulk, use_gzip=False,
+                                     stream=True)
+        try:
+            for tr in _iter_mseed_traces(data_stream):
+                self._attach_dataselect_url_to_stream([tr])
+                yield tr
+        finally:
             data_stream.close()
-            if attach_response:
-                self._attach_responses(st)
-            self._attach_dataselect_url_to_stream(st)
-            return st
 
     def get_stations_bulk(self, bulk, level=None, includerestricted=None,
                           includeavailability=None, filename=None, **kwargs):
@@ -1144,38 +1296,87 @@ class Client(object):
         non-default parameters that the webservice does not support will raise
         an error.
         """
-        if "station" not in self.services:
-            msg = "The current client does not have a station service."
-            raise ValueError(msg)
-
         arguments = OrderedDict(
             level=level,
             includerestriced=includerestricted,
             includeavailability=includeavailability
         )
+        url, bulk = self._bulk_query("station", bulk, arguments)
+
+        data_stream = self._download(url, data=bulk, use_cache=True)
+        return self._read_response("station", data_stream, filename)
+
+    def _check_service(self, service):
+        """
+        Raises if the given service is not available for the client.
+        """
+        if service not in self.services:
+            msg = "The current client does not have %s %s service." % (
+                "an" if service[0] in "aeiou" else "a", service)
+            raise ValueError(msg)
+
+    def _query_url(self, service, locs, kwargs):
+        """
+        Builds the URL of a query from the arguments of one of the
+        ``get_*()`` methods.
+
+        :type service: str
+        :param service: One of ``"dataselect"``, ``"event"`` or
+            ``"station"``.
+        :type locs: dict
+        :param locs: The ``locals()`` of the calling method.
+        :type kwargs: dict
+        :param kwargs: Additional keyword arguments of the calling method.
+        """
+        self._check_service(service)
+        setup_query_dict(service, locs, kwargs)
+
+        # Special location handling. Convert empty strings to "--".
+        if service == "dataselect" and "location" in kwargs and \
+                not kwargs["location"]:
+            kwargs["location"] = "--"
+
+        return self._create_url_from_parameters(
+            service, DEFAULT_PARAMETERS[service], kwargs)
+
+    def _bulk_query(self, service, bulk, arguments):
+        """
+        Returns URL and POST payload of a bulk query.
+        """
+        self._check_service(service)
         bulk = get_bulk_string(bulk, arguments)
+        return self._build_url(service, "query"), bulk
 
-        url = self._build_url("station", "query")
+    def _read_response(self, service, data_stream, filename=None):
+        """
+        Parses the downloaded data of a query or saves it to a file.
 
-        data_stream = self._download(url,
-                                     data=bulk)
-        data_stream.seek(0, 0)
-        if filename:
-            self._write_to_file_object(filename, data_stream)
-            data_stream.close()
-            return
-        else:
-            # Works with text and StationXML data.
-            inv = obspy.read_inventory(data_stream)
+        Returns ``None`` if the data has been written to ``filename``.
+        """
+        # Waveform data is streamed from the connection.
+        if isinstance(data_stream, io.BytesIO):
+            data_stream.seek(0, 0)
+        try:
+            if filename:
+                self._write_to_file_object(filename, data_stream)
+                return None
+            if service == "event":
+                return obspy.read_events(data_stream, format="quakeml")
+            elif service == "station":
+                # This works with XML and StationXML data.
+                return read_inventory(data_stream)
+            return Stream(traces=list(
+                _iter_mseed_traces(data_stream, eager=False)))
+        finally:
             data_stream.close()
-            return inv
 
     def _write_to_file_object(self, filename_or_object, data_stream):
         if hasattr(filename_or_object, "write"):
-            filename_or_object.write(data_stream.read())
+            shutil.copyfileobj(data_stream, filename_or_object,
+                               MSEED_CHUNK_SIZE)
             return
         with open(filename_or_object, "wb") as fh:
-            fh.write(data_stream.read())
+            shutil.copyfileobj(data_stream, fh, MSEED_CHUNK_SIZE)
 
     def _create_url_from_parameters(self, service, default_params, parameters):
         """
@@ -1380,14 +1581,60 @@ class Client(object):
 
         print("\n".join(msg))
 
-    def _download(self, url, return_string=False, data=None, use_gzip=True):
+    def _download(self, url, return_string=False, data=None, use_gzip=True,
+                  use_cache=False, stream=False):
+        if use_cache and self.cache is not None:
+            key, entry, headers = self._lookup_cache(url, data)
+            if entry is not None and entry.fresh:
+                body = entry.body
+            else:
+                code, body, response_headers = download_url(
+                    url, opener=self._url_opener, headers=headers,
+                    debug=self.debug, return_string=True, data=data,
+                    timeout=self.timeout, use_gzip=use_gzip,
+                    return_headers=True)
+                body = self._store_in_cache(key, url, entry, code, body,
+                                            response_headers)
+            return body if return_string else io.BytesIO(body)
+
         code, data = download_url(
             url, opener=self._url_opener, headers=self.request_headers,
             debug=self.debug, return_string=return_string, data=data,
-            timeout=self.timeout, use_gzip=use_gzip)
+            timeout=self.timeout, use_gzip=use_gzip, stream=stream)
         raise_on_error(code, data)
         return data
 
+    def _lookup_cache(self, url, data=None):
+        """
+        Looks up a request in the cache.
+
+        Returns the cache key, the cached entry (or ``None``) and the request
+        headers, including the headers to revalidate a stale entry.
+        """
+        key = self.cache.get_key(url, data=data, user=self.user)
+        entry = self.cache.get(key)
+        headers = self.request_headers
+        if entry is not None and not entry.fresh:
+            headers = dict(headers, **entry.get_revalidation_headers())
+        if self.debug is True:
+            print("Cache %s for %s" % (
+                "miss" if entry is None else
+                "hit" if entry.fresh else "revalidation", url))
+        return key, entry, headers
+
+    def _store_in_cache(self, key, url, entry, code, body, headers):
+        """
+        Handles the response to a request that could not be answered from
+        the cache and returns the body of the response.
+        """
+        if code == 304 and entry is not None:
+            self.cache.revalidate(key)
+            return entry.body
+        raise_on_error(code, body)
+        self.cache.put(key, url, body, etag=headers.get("ETag"),
+                       last_modified=headers.get("Last-Modified"))
+        return body
+
     def _build_url(self, service, resource_type, parameters={}):
         """
         Builds the correct URL.
@@ -1429,6 +1676,16 @@ class Client(object):
             self.services = copy.deepcopy(
                 self.__service_discovery_cache[url_hash])
             return
+        # Services discovered by other processes sharing the on-disk cache.
+        if self.cache is not None:
+            services = self.cache.get_services(urls)
+            if services is not None:
+                if self.debug is True:
+                    print("Loading discovered services from on-disk cache.")
+                self.services = services
+                self.__service_discovery_cache[url_hash] = \
+                    copy.deepcopy(services)
+                return
 
         # Request all in parallel.
         wadl_queue = queue.Queue()
@@ -1542,6 +1799,8 @@ class Client(object):
             print("Storing discovered services in cache.")
         self.__service_discovery_cache[url_hash] = \
             copy.deepcopy(self.services)
+        if self.cache is not None:
+            self.cache.put_services(urls, self.base_url, self.services)
 
     def get_webservice_version(self, service):
         """
@@ -1587,6 +1846,127 @@ class Client(object):
             tr.stats._fdsnws_dataselect_url = url
 
 
+def _iter_mseed_traces(data_stream, chunk_size=None, eager=True):
+    """
+    Decodes MiniSEED data from a file-like object in chunks of complete
+    records and yields the traces.
+
+    Traces are joined across chunk boundaries if they are contiguous, so
+    the result is the same as reading all data at once while the size of
+    the undecoded data in memory is limited to about one chunk.
+
+    :type data_stream: file-like object
+    :param data_stream: Object to read the MiniSEED data from, e.g. an open
+        HTTP response.
+    :type chunk_size: int
+    :param chunk_size: Number of bytes to read and decode at once. Defaults
+        to ``MSEED_CHUNK_SIZE``.
+    :type eager: bool
+    :param eager: If ``True``, traces are yielded as soon as a chunk does not
+        continue them anymore. Otherwise all traces are yielded at the end.
+    """
+    chunk_size = chunk_size or MSEED_CHUNK_SIZE
+    buf = bytearray()
+    # Lists of contiguous traces in the order they started and the last of
+    # these lists for every channel.
+    segments = []
+    open_segments = {}
+    total_size = 0
+    eof = False
+    while not eof:
+        data = data_stream.read(chunk_size)
+        total_size += len(data)
+        buf += data
+        eof = not data
+        size = len(buf) if eof else _get_complete_records_size(buf)
+        if size is None:
+            # Unknown record structure, decode the remaining data at once.
+            data = data_stream.read()
+            total_size += len(data)
+            buf += data
+            size = len(buf)
+            eof = True
+        if not size:
+            continue
+        try:
+            st = obspy.read(io.BytesIO(bytes(buf[:size])), format="MSEED")
+        except Exception:
+            # Broken data at the end of a response would have been skipped
+            # if read together with the preceding records.
+            if not eof or size == total_size:
+                raise
+            msg = "Ignoring %i bytes of invalid MiniSEED data at the end " \
+                  "of the response." % size
+            warnings.warn(msg)
+            st = Stream()
+        del buf[:size]
+        continued = {}
+        for tr in st:
+            key = (tr.id, tr.stats.sampling_rate, tr.data.dtype)
+            segment = continued.get(key, open_segments.get(key))
+            if segment is not None and key not in continued:
+                last = segment[-1].stats
+                gap = tr.stats.starttime - last.endtime - last.delta
+                if abs(gap) <= 0.5 * last.delta:
+                    segment.append(tr)
+                    continued[key] = segment
+                    continue
+            continued[key] = [tr]
+            segments.append(continued[key])
+        if eager:
+            # Channels not continued by the chunk are complete.
+            open_segments = continued
+            open_ids = set(id(_i) for _i in open_segments.values())
+            for segment in segments:
+                if id(segment) not in open_ids:
+                    yield _join_traces(segment)
+            segments = [_i for _i in segments if id(_i) in open_ids]
+        else:
+            open_segments.update(continued)
+    for segment in segments:
+        tr = _join_traces(segment)
+        if not eager:
+            tr.stats.mseed.filesize = total_size
+        yield tr
+
+
+def _join_traces(traces):
+    """
+    Joins contiguous traces decoded from consecutive chunks of MiniSEED
+    data.
+    """
+    tr = traces[0]
+    if len(traces) > 1:
+        tr.data = np.concatenate([_i.data for _i in traces])
+        tr.stats.mseed.number_of_records = sum(
+            _i.stats.mseed.number_of_records for _i in traces)
+    return tr
+
+
+def _get_response_queries(st):
+    """
+    Returns the keyword arguments of the station queries needed to fetch the
+    responses of all traces in a stream.
+    """
+    netids = {}
+    for tr in st:
+        if tr.id not in netids:
+            netids[tr.id] = (tr.stats.starttime, tr.stats.endtime)
+            continue
+        netids[tr.id] = (
+            min(tr.stats.starttime, netids[tr.id][0]),
+            max(tr.stats.endtime, netids[tr.id][1]))
+
+    queries = []
+    for key, value in netids.items():
+        net, sta, loc, chan = key.split(".")
+        starttime, endtime = value
+        queries.append(dict(
+            network=net, station=sta, location=loc, channel=chan,
+            starttime=starttime, endtime=endtime, level="response"))
+    return queries
+
+
 def convert_to_string(value):
     """
     Takes any value and converts it to a string compliant with the FDSN
@@ -1728,13 +2108,14 @@ def raise_on_error(code, data):
         raise NotImplementedError(msg)
     elif code == 429:
         msg = ("Sent too many requests in a given amount of time ('rate "
-               "limiting'). Wait before making a new request.", server_info)
-        raise FDSNException(msg, server_info)
+               "limiting'). Wait before making a new request.")
+        raise FDSNTooManyRequestsException(msg, server_info)
     elif code == 500:
         raise FDSNException("Service responds: Internal server error",
                             server_info)
     elif code == 503:
-        raise FDSNException("Service temporarily unavailable", server_info)
+        raise FDSNServiceUnavailableException(
+            "Service temporarily unavailable", server_info)
     elif code is None:
         if "timeout" in str(data).lower():
             raise FDSNException("Timed Out")
@@ -1746,13 +2127,36 @@ def raise_on_error(code, data):
         raise FDSNException("Unknown HTTP code: %i" % code, server_info)
 
 
+class _GzipResponse(gzip.GzipFile):
+    """
+    Decompresses a HTTP response while reading it. Unlike
+    :class:`gzip.GzipFile` it also closes the response when it is closed,
+    so that the connection is released even if it has not been read
+    completely.
+    """
+    def __init__(self, response):
+        super(_GzipResponse, self).__init__(fileobj=response)
+        self._response = response
+
+    def close(self):
+        try:
+            super(_GzipResponse, self).close()
+        finally:
+            self._response.close()
+
+
 def download_url(url, opener, timeout=10, headers={}, debug=False,
-                 return_string=True, data=None, use_gzip=True):
+                 return_string=True, data=None, use_gzip=True,
+                 return_headers=False, stream=False):
     """
     Returns a pair of tuples.
 
     The first one is the returned HTTP code and the second the data as
-    string.
+    string. If `return_headers=True` the headers of the response (or
+    ``None`` if there was no response) are returned as a third item.
+    If `stream=True` the data is not read but an open file-like object
+    is returned instead which reads (and decompresses) the data from the
+    connection and which has to be closed by the caller.
 
     Will return a tuple of Nones if the service could not be found.
     All encountered exceptions will get raised unless `debug=True` is
@@ -1782,10 +2186,14 @@ def download_url(url, opener, timeout=10, headers={}, debug=False,
             msg = "HTTP error %i, reason %s, while downloading '%s': %s" % \
                   (e.code, str(e.reason), url, e.read())
             print(msg)
+        if return_headers:
+            return e.code, e, e.headers
         return e.code, e
     except Exception as e:
         if debug is True:
             print("Error while downloading: %s" % url)
+        if return_headers:
+            return None, e, None
         return None, e
 
     code = url_obj.getcode()
@@ -1794,15 +2202,14 @@ def download_url(url, opener, timeout=10, headers={}, debug=False,
     if url_obj.info().get("Content-Encoding") == "gzip":
         if debug is True:
             print("Uncompressing gzipped response for %s" % url)
-        # Cannot directly stream to gzip from urllib!
-        # http://www.enricozini.org/2011/cazzeggio/python-gzip/
-        buf = io.BytesIO(url_obj.read())
-        buf.seek(0, 0)
-        f = gzip.GzipFile(fileobj=buf)
+        # Decompress while reading from the socket.
+        f = _GzipResponse(url_obj)
     else:
         f = url_obj
 
-    if return_string is False:
+    if stream:
+        data = f
+    elif return_string is False:
         data = io.BytesIO(f.read())
     else:
         data = f.read()
@@ -1810,6 +2217,8 @@ def download_url(url, opener, timeout=10, headers={}, debug=False,
     if debug is True:
         print("Downloaded %s with HTTP code: %i" % (url, code))
 
+    if return_headers:
+        return code, data, url_obj.info()
     return code, data
 
 
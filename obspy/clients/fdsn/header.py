@@ -30,6 +30,14 @@ class FDSNNoDataException(FDSNException):
     pass
 
 
+class FDSNTooManyRequestsException(FDSNException):
+    pass
+
+
+class FDSNServiceUnavailableException(FDSNException):
+    pass
+
+
 # A curated list collecting some implementations:
 # https://www.fdsn.org/webservices/datacenters/
 # https://www.orfeus-eu.org/data/eida/nodes/
@@ -404,7 +404,11 @@ domain, restrictions, and path settings and off you go. Two more parameters of
 interest are the ``chunk_size_in_mb`` setting which controls how much data is
 requested per thread, client and request. ``threads_per_clients`` control how
 many threads are used to download data in parallel per data center - 3 is a
-value in agreement with some data centers.
+value in agreement with some data centers. Both are upper limits: the chunks
+get smaller for slow data centers and towards the end of the downloads and
+fewer requests are sent at once while a data center is throttling the
+requests. The measured performance of each data center is logged at the end
+and available as ``mdl.performance_report``.
 
 
 >>> mdl = MassDownloader()  # doctest: +SKIP
@@ -412,6 +416,21 @@ value in agreement with some data centers.
 ...              threads_per_client=3, mseed_storage=mseed_storage,
 ...              stationxml_storage=stationxml_storage)  # doctest: +SKIP
 
+Resuming Downloads
+~~~~~~~~~~~~~~~~~~
+
+By default every run checks the storage for existing MiniSEED files and
+parses all existing StationXML files to find out what is still missing. For
+large data sets that are topped up repeatedly this can be avoided with a
+:class:`~obspy.clients.fdsn.mass_downloader.ledger.DownloadLedger`. It records
+the status, checksum and provider of every file in a SQLite database so later
+runs can look them up instead. Files that already exist but are not part of
+the ledger are still found in the storage and added to the ledger.
+
+>>> mdl.download(domain, restrictions, mseed_storage=mseed_storage,
+...              stationxml_storage=stationxml_storage,
+...              ledger="downloads.sqlite")  # doctest: +SKIP
+
 
 How it Works
 ------------
@@ -446,8 +465,9 @@ and downloading whatever it offers. A bit more detail:
       minimum distance remain. This results in the maximum possible amount of
       chosen stations satisfying the constraints.
 
-   e) Download the MiniSEED data - this is threaded and it will use a bulk
-      request honoring the desired ``chunk_size_in_mb`` setting. Afterwards it
+   e) Download the MiniSEED data - this is threaded and it will use bulk
+      requests of at most the desired ``chunk_size_in_mb``, adapted to the
+      measured throughput and latency of the data center. Afterwards it
       splits the MiniSEED files again to match the desired restrictions. The
       split happens at the record level thus no information available in the
       original MiniSEED records is lost.
@@ -518,10 +538,11 @@ from .mass_downloader import MassDownloader  # NOQA
 from .restrictions import Restrictions  # NOQA
 from .domain import (Domain, RectangularDomain,  # NOQA
                      CircularDomain, GlobalDomain)  # NOQA
+from .ledger import DownloadLedger  # NOQA
 
 
 __all__ = ['MassDownloader', 'Restrictions', 'Domain', 'RectangularDomain',
-           'CircularDomain', 'GlobalDomain']
+           'CircularDomain', 'GlobalDomain', 'DownloadLedger']
 
 if SCIPY_VERSION < [0, 12]:
     msg = ('At least some parts of FDSN Mass downloader might not '
@@ -29,6 +29,8 @@ import obspy
 from obspy.core.util import Enum
 
 from . import utils
+from .ledger import get_checksum
+from .scheduler import THROTTLING_ERRORS, DownloadScheduler
 
 # The current status of an entity.
 STATUS = Enum(["none", "needs_downloading", "downloaded", "ignore", "exists",
@@ -124,11 +126,15 @@ class Station(_SlotsEqualityComparisionObject):
                     return True
         return False
 
-    def remove_files(self, logger, reason):
+    def remove_files(self, logger, reason, ledger=None):
         """
         Delete all files under it. Only delete stuff that actually has been
         downloaded!
+
+        :param ledger: The deleted files will be recorded as rejected in
+            this :class:`~.ledger.DownloadLedger` if given.
         """
+        records = []
         for chan in self.channels:
             for ti in chan.intervals:
                 if ti.status != STATUS.DOWNLOADED or not ti.filename:
@@ -137,6 +143,8 @@ class Station(_SlotsEqualityComparisionObject):
                     logger.info("Deleting MiniSEED file '%s'. Reason: %s" % (
                         ti.filename, reason))
                     utils.safe_delete(ti.filename)
+                    records.append(self.get_ledger_record(
+                        chan, ti, status=STATUS.DOWNLOAD_REJECTED))
 
         if self.stationxml_status == STATUS.DOWNLOADED and \
                 self.stationxml_filename and \
@@ -144,6 +152,30 @@ class Station(_SlotsEqualityComparisionObject):
             logger.info("Deleting StationXMl file '%s'. Reason: %s" %
                         (self.stationxml_filename, reason))
             utils.safe_delete(self.stationxml_filename)
+            if ledger is not None:
+                ledger.set_stationxml_status(
+                    self.stationxml_filename, self.network, self.station,
+                    STATUS.DOWNLOAD_REJECTED)
+        if ledger is not None and records:
+            ledger.set_mseed_status(records)
+
+    def get_ledger_record(self, channel, interval, status=None,
+                          provider=None, size=None, checksum=None):
+        """
+        Returns the record of a time interval for the
+        :class:`~.ledger.DownloadLedger`.
+
+        :param channel: The channel of the time interval.
+        :type channel: :class:`~.Channel`
+        :param interval: The time interval.
+        :type interval: :class:`~.TimeInterval`
+        :param status: The status to record. Defaults to the status of the
+            time interval.
+        """
+        return (interval.filename, self.network, self.station,
+                channel.location, channel.channel, interval.start,
+                interval.end, status or interval.status, provider, size,
+                checksum)
 
     @property
     def stationxml_filename(self):
@@ -201,11 +233,15 @@ class Station(_SlotsEqualityComparisionObject):
                            self.miss_station_information.keys()]),
             channels=channels)
 
-    def prepare_stationxml_download(self, stationxml_storage, logger):
+    def prepare_stationxml_download(self, stationxml_storage, logger,
+                                    ledger=None):
         """
         Figure out what to download.
 
         :param stationxml_storage:
+        :param ledger: The contents of existing StationXML files are looked
+            up in this :class:`~.ledger.DownloadLedger` if given instead of
+            parsing the files.
         """
         # Determine what channels actually want to have station information.
         # This will be a tuple of location code, channel code, starttime,
@@ -235,19 +271,28 @@ class Station(_SlotsEqualityComparisionObject):
         if isinstance(storage, (str, bytes)):
             filename = storage
             self.stationxml_filename = filename
+            info = None
+            if ledger is not None:
+                info = ledger.get_stationxml_contents(filename)
             # 1. The file does not yet exist. Thus all channels must be
             # downloaded.
-            if not os.path.exists(filename):
+            if info is None and not os.path.exists(filename):
                 self.miss_station_information = \
                     copy.deepcopy(self.want_station_information)
                 self.have_station_information = {}
                 self.stationxml_status = STATUS.NEEDS_DOWNLOADING
                 return
-            # 2. The file does exist. It will be parsed. If it contains ALL
-            # necessary information, nothing will happen. Otherwise it will
-            # be overwritten.
+            # 2. The file does exist. It will be parsed (if its contents are
+            # not known from the ledger). If it contains ALL necessary
+            # information, nothing will happen. Otherwise it will be
+            # overwritten.
             else:
-                info = utils.get_stationxml_contents(filename)
+                if info is None:
+                    info = utils.get_stationxml_contents(filename)
+                    if ledger is not None:
+                        ledger.set_stationxml_status(
+                            filename, self.network, self.station,
+                            STATUS.EXISTS, contents=info)
                 for c_id, times in self.want_station_information.items():
                     # Get the temporal range of information in the file.
                     c_info = [_i for _i in info if
@@ -324,7 +369,7 @@ class Station(_SlotsEqualityComparisionObject):
             else:
                 self.stationxml_status = STATUS.IGNORE
 
-    def prepare_mseed_download(self, mseed_storage):
+    def prepare_mseed_download(self, mseed_storage, existing_files=None):
         """
         Loop through all channels of the station and distribute filenames
         and the current status of the channel.
@@ -335,7 +380,12 @@ class Station(_SlotsEqualityComparisionObject):
         NEEDS_DOWNLOADING.
 
         :param mseed_storage:
+        :param existing_files: Files known to exist, e.g. from the
+            :class:`~.ledger.DownloadLedger`. All other files are checked in
+            the storage.
+        :type existing_files: set of str
         """
+        existing_files = existing_files or set()
         for channel in self.channels:
             for interval in channel.intervals:
                 interval.filename = utils.get_mseed_filename(
@@ -344,14 +394,15 @@ class Station(_SlotsEqualityComparisionObject):
                     interval.end)
                 if interval.filename is True:
                     interval.status = STATUS.IGNORE
-                elif os.path.exists(interval.filename):
+                elif interval.filename in existing_files or \
+                        os.path.exists(interval.filename):
                     interval.status = STATUS.EXISTS
                 else:
                     if not os.path.exists(os.path.dirname(interval.filename)):
                         os.makedirs(os.path.dirname(interval.filename))
                     interval.status = STATUS.NEEDS_DOWNLOADING
 
-    def sanitize_downloads(self, logger):
+    def sanitize_downloads(self, logger, ledger=None):
         """
         Should be run after the MiniSEED and StationXML downloads finished.
         It will make sure that every MiniSEED file also has a corresponding
@@ -360,6 +411,9 @@ class Station(_SlotsEqualityComparisionObject):
         It will delete MiniSEED files but never a StationXML file. The logic
         of the download helpers does not allow for a StationXML file with no
         data.
+
+        :param ledger: The deleted files will be recorded as rejected in
+            this :class:`~.ledger.DownloadLedger` if given.
         """
         from obspy.io.mseed.util import get_start_and_end_time
         # All or nothing for each channel.
@@ -388,6 +442,9 @@ class Station(_SlotsEqualityComparisionObject):
                        miss_start <= time_interval.end <= miss_end:
                         utils.safe_delete(time_interval.filename)
                         time_interval.status = STATUS.DOWNLOAD_REJECTED
+                        if ledger is not None:
+                            ledger.set_mseed_status([self.get_ledger_record(
+                                channel, time_interval)])
 
 
 class Channel(_SlotsEqualityComparisionObject):
@@ -478,9 +535,12 @@ class ClientDownloadHelper(object):
     :param mseed_storage: The MiniSEED storage settings.
     :param stationxml_storage: The StationXML storage settings.
     :param logger: An active logger instance.
+    :type ledger: :class:`~.ledger.DownloadLedger`
+    :param ledger: Optional ledger to look up existing files in and to
+        record the downloads in.
     """
     def __init__(self, client, client_name, restrictions, domain,
-                 mseed_storage, stationxml_storage, logger):
+                 mseed_storage, stationxml_storage, logger, ledger=None):
         self.client = client
         self.client_name = client_name
         self.restrictions = restrictions
@@ -488,8 +548,10 @@ class ClientDownloadHelper(object):
         self.mseed_storage = mseed_storage
         self.stationxml_storage = stationxml_storage
         self.logger = logger
+        self.ledger = ledger
         self.stations = {}
         self.is_availability_reliable = None
+        self.performance_report = None
 
     def __bool__(self):
         return bool(len(self))
@@ -522,7 +584,22 @@ class ClientDownloadHelper(object):
         downloading.
         """
         for station in self.stations.values():
-            station.prepare_mseed_download(mseed_storage=self.mseed_storage)
+            if self.ledger is None:
+                station.prepare_mseed_download(
+                    mseed_storage=self.mseed_storage)
+                continue
+            existing_files = self.ledger.get_existing_mseed_files(
+                station.network, station.station)
+            station.prepare_mseed_download(
+                mseed_storage=self.mseed_storage,
+                existing_files=existing_files)
+            # Add files found in the storage to the ledger.
+            self.ledger.set_mseed_status([
+                station.get_ledger_record(channel, interval)
+                for channel in station.channels
+                for interval in channel.intervals
+                if interval.status == STATUS.EXISTS and
+                interval.filename not in existing_files])
 
     def filter_stations_based_on_minimum_distance(
             self, existing_client_dl_helpers):
@@ -630,7 +707,8 @@ class ClientDownloadHelper(object):
         # stations.
         for station in rejected_stations:
             station.remove_files(logger=self.logger,
-                                 reason="Minimum distance filtering.")
+                                 reason="Minimum distance filtering.",
+                                 ledger=self.ledger)
         self.stations = {}
         for station in remaining_stations:
             self.stations[(station.network, station.station)] = station
@@ -648,7 +726,7 @@ class ClientDownloadHelper(object):
         for station in self.stations.values():
             station.prepare_stationxml_download(
                 stationxml_storage=self.stationxml_storage,
-                logger=self.logger)
+                logger=self.logger, ledger=self.ledger)
 
     def download_stationxml(self, threads=3):
         """
@@ -721,6 +799,10 @@ class ClientDownloadHelper(object):
                     "Client '%s' - File %s is not an XML file - it will be "
                     "deleted." % (self.client_name, filename))
                 utils.safe_delete(filename)
+                if self.ledger is not None:
+                    self.ledger.set_stationxml_status(
+                        filename, station.network, station.station,
+                        STATUS.DOWNLOAD_FAILED, provider=self.client_name)
                 continue
 
             still_missing = {}
@@ -758,6 +840,12 @@ class ClientDownloadHelper(object):
                 station.stationxml_status = STATUS.DOWNLOAD_PARTIALLY_FAILED
             else:
                 station.stationxml_status = STATUS.DOWNLOADED
+            if self.ledger is not None:
+                self.ledger.set_stationxml_status(
+                    filename, station.network, station.station,
+                    station.stationxml_status, contents=info,
+                    provider=self.client_name, size=size,
+                    checksum=get_checksum(filename))
 
         # Now loop over all stations and set the status of the ones that
         # still need downloading to download failed.
@@ -776,10 +864,17 @@ class ClientDownloadHelper(object):
         """
         Actually download MiniSEED data.
 
-        :param chunk_size_in_mb: Attempt to download data in chunks of this
-            size.
+        :param chunk_size_in_mb: Attempt to download data in chunks of at
+            most this size. Chunks are smaller for slow data centers and
+            towards the end of the downloads.
         :param threads_per_client: Threads to launch per client. 3 seems to
-            be a value in agreement with some data centers.
+            be a value in agreement with some data centers. Fewer requests
+            are sent concurrently while the data center is throttling the
+            requests.
+
+        The performance of the downloads is available as
+        ``performance_report`` afterwards, see
+        :meth:`~.scheduler.DownloadScheduler.get_report`.
         """
         # Estimate the download size to have equally sized chunks.
         channel_sampling_rate = {
@@ -788,10 +883,9 @@ class ClientDownloadHelper(object):
             "R": 0.001, "P": 0.0001, "T": 0.00001, "Q": 0.000001, "A": 5000,
             "O": 5000}
 
-        # Split into chunks of about equal size in terms of filesize.
-        chunks = []
-        chunks_curr = []
-        curr_chunks_mb = 0
+        # The items to download with their estimated size. They will be
+        # downloaded in chunks of adaptive size.
+        items = []
 
         # Don't request more than 50 chunks at once to not choke the servers.
         max_chunk_length = 50
@@ -816,22 +910,14 @@ class ClientDownloadHelper(object):
                     # some downloading.
                     if interval.status != STATUS.NEEDS_DOWNLOADING:
                         continue
-                    chunks_curr.append((
-                        sta.network, sta.station, cha.location, cha.channel,
-                        interval.start, interval.end, interval.filename))
                     # Assume that each sample needs 4 byte, STEIM
                     # compression reduces size to about a third.
                     # chunk size is in MB
                     duration = interval.end - interval.start
-                    curr_chunks_mb += \
-                        sr * duration * 4.0 / 3.0 / 1024.0 / 1024.0
-                    if curr_chunks_mb >= chunk_size_in_mb or \
-                            len(chunks_curr) >= max_chunk_length:
-                        chunks.append(chunks_curr)
-                        chunks_curr = []
-                        curr_chunks_mb = 0
-        if chunks_curr:
-            chunks.append(chunks_curr)
+                    items.append(((
+                        sta.network, sta.station, cha.location, cha.channel,
+                        interval.start, interval.end, interval.filename),
+                        sr * duration * 4.0 / 3.0 / 1024.0 / 1024.0))
 
         keys = sorted(counter.keys())
         for key in keys:
@@ -840,35 +926,43 @@ class ClientDownloadHelper(object):
                 "downloading: %s" % (self.client_name, counter[key],
                                      key.upper()))
 
-        if not chunks:
+        if not items:
             return
 
-        def star_download_mseed(args):
+        # The scheduler pauses and retries throttled requests itself, the
+        # client must not hide them behind its own retries and backoff.
+        client = self.client._copy_without_retries()
+
+        def download_chunk(chunk):
             """
-            Star maps the arguments to the
-            utils.download_and_split_mseed_bulk() function.
+            Maps the chunk to the utils.download_and_split_mseed_bulk()
+            function. Errors of throttled requests are handled by the
+            scheduler.
 
-            :param args: The arguments to be passed.
+            :param chunk: The bulk lines to download.
             """
             try:
                 ret_val = utils.download_and_split_mseed_bulk(
-                    *args, logger=self.logger)
+                    client, self.client_name, chunk, logger=self.logger)
+            except THROTTLING_ERRORS:
+                raise
             except utils.ERRORS as e:
-                msg = ("Client '%s' - " % args[1]) + str(e)
+                msg = ("Client '%s' - " % self.client_name) + str(e)
                 if "no data available" in msg.lower():
                     self.logger.info(msg.split("Detailed response")[0].strip())
+                    return []
                 else:
                     self.logger.error(msg)
-                return []
+                return None
             return ret_val
 
-        pool = ThreadPool(min(threads_per_client, len(chunks)))
-
+        scheduler = DownloadScheduler(
+            client_name=self.client_name, items=items,
+            download_function=download_chunk, logger=self.logger,
+            chunk_size_in_mb=chunk_size_in_mb, max_threads=threads_per_client,
+            max_chunk_length=max_chunk_length)
         d_start = timeit.default_timer()
-        pool.map(
-            star_download_mseed,
-            [(self.client, self.client_name, chunk) for chunk in chunks])
-        pool.close()
+        self.performance_report = scheduler.run()
         d_end = timeit.default_timer()
 
         self.logger.info("Client '%s' - Launching basic QC checks..." %
@@ -917,7 +1011,7 @@ class ClientDownloadHelper(object):
         StationXML file.
         """
         for station in self.stations.values():
-            station.sanitize_downloads(logger=self.logger)
+            station.sanitize_downloads(logger=self.logger, ledger=self.ledger)
 
     def _check_downloaded_data(self):
         """
@@ -929,6 +1023,7 @@ class ClientDownloadHelper(object):
         """
         downloaded_bytes = 0
         discarded_bytes = 0
+        checked = []
         for sta in self.stations.values():
             for cha in sta.channels:
                 for interval in cha.intervals:
@@ -936,6 +1031,7 @@ class ClientDownloadHelper(object):
                     # it did not require downloading in the first place.
                     if interval.status != STATUS.NEEDS_DOWNLOADING:
                         continue
+                    checked.append((sta, cha, interval))
 
                     # If the file does not exist, mark the time interval as
                     # download failed.
@@ -1004,6 +1100,19 @@ class ClientDownloadHelper(object):
 
                     downloaded_bytes += size
                     interval.status = STATUS.DOWNLOADED
+
+        if self.ledger is not None:
+            records = []
+            for sta, cha, interval in checked:
+                if interval.status == STATUS.DOWNLOADED:
+                    records.append(sta.get_ledger_record(
+                        cha, interval, provider=self.client_name,
+                        size=os.path.getsize(interval.filename),
+                        checksum=get_checksum(interval.filename)))
+                else:
+                    records.append(sta.get_ledger_record(
+                        cha, interval, provider=self.client_name))
+            self.ledger.set_mseed_status(records)
         return downloaded_bytes, discarded_bytes
 
     def _parse_miniseed_filenames(self, filenames, restrictions):
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Persistent ledger of the files downloaded by the mass downloader.
+
+:copyright:
+    The ObsPy Development Team (devs@obspy.org)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import obspy
+
+from .utils import ChannelAvailability
+
+
+# Statuses of files that are present in the storage.
+PRESENT = ("downloaded", "exists")
+
+
+def get_checksum(filename):
+    """
+    Returns the SHA256 checksum of a file.
+
+    :param filename: The path to the file.
+    """
+    sha = hashlib.sha256()
+    with open(filename, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 ** 2), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class DownloadLedger(object):
+    """
+    Ledger of the MiniSEED and StationXML files of the mass downloader in a
+    single SQLite database file.
+
+    It records the status of every time interval and station file the mass
+    downloader dealt with, together with the file, its size, checksum and
+    the provider it has been downloaded from. Subsequent runs look up the
+    existing files and the contents of existing StationXML files in the
+    ledger instead of checking and parsing all files in the storage. Files
+    that are not part of the ledger yet, e.g. from runs without a ledger,
+    are still checked in the storage and added to the ledger.
+
+    The ledger assumes to be the only one modifying the storage - files
+    removed by other means are not detected.
+
+    >>> from obspy.clients.fdsn.mass_downloader import (
+    ...     DownloadLedger, MassDownloader)
+    >>> ledger = DownloadLedger("downloads.sqlite")  # doctest: +SKIP
+    >>> mdl = MassDownloader()  # doctest: +SKIP
+    >>> mdl.download(domain, restrictions, mseed_storage="waveforms",
+    ...              stationxml_storage="stations",
+    ...              ledger=ledger)  # doctest: +SKIP
+    >>> ledger.get_statistics()  # doctest: +SKIP
+    {'mseed': {'downloaded': 120, 'download_failed': 3},
+     'stationxml': {'downloaded': 12}}
+
+    :type filename: str
+    :param filename: SQLite database file of the ledger. Created if it does
+        not exist yet.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self._lock = threading.Lock()
+        dirname = os.path.dirname(os.path.abspath(filename))
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        self._connection = sqlite3.connect(filename, timeout=60,
+                                           check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS mseed ("
+                "filename TEXT PRIMARY KEY, network TEXT, station TEXT, "
+                "location TEXT, channel TEXT, starttime TEXT, endtime TEXT, "
+                "status TEXT, provider TEXT, size INTEGER, checksum TEXT, "
+                "updated REAL)")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS mseed_station_index "
+                "ON mseed (network, station, status)")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS stationxml ("
+                "filename TEXT PRIMARY KEY, network TEXT, station TEXT, "
+                "status TEXT, provider TEXT, size INTEGER, checksum TEXT, "
+                "updated REAL)")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS stationxml_channels ("
+                "filename TEXT, network TEXT, station TEXT, location TEXT, "
+                "channel TEXT, starttime TEXT, endtime TEXT)")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS stationxml_channels_index "
+                "ON stationxml_channels (filename)")
+
+    def __str__(self):
+        return "DownloadLedger('%s')" % self.filename
+
+    def __repr__(self):
+        return self.__str__()
+
+    def get_existing_mseed_files(self, network, station):
+        """
+        Returns the set of the present MiniSEED files of a station.
+
+        :type network: str
+        :param network: The network code.
+        :type station: str
+        :param station: The station code.
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                "SELECT filename FROM mseed WHERE network = ? AND "
+                "station = ? AND status IN (?, ?)",
+                (network, station) + PRESENT)
+            return set(_i[0] for _i in cursor)
+
+    def set_mseed_status(self, records):
+        """
+        Records the status of MiniSEED files.
+
+        :type records: list of tuples
+        :param records: Each record is a tuple of filename, network,
+            station, location, channel, starttime, endtime, status, provider,
+            size and checksum of the file. The last three can be ``None``.
+        """
+        now = time.time()
+        rows = [tuple(_i[:5]) + (str(_i[5]), str(_i[6])) + tuple(_i[7:]) +
+                (now,) for _i in records]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO mseed VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def get_mseed_records(self, network=None, station=None, status=None):
+        """
+        Returns the recorded MiniSEED files as a list of dictionaries.
+
+        :type network: str
+        :param network: Only return files of this network.
+        :type station: str
+        :param station: Only return files of this station.
+        :type status: str
+        :param status: Only return files with this status.
+        """
+        conditions = []
+        values = []
+        for key, value in (("network", network), ("station", station),
+                           ("status", status)):
+            if value is not None:
+                conditions.append("%s = ?" % key)
+                values.append(value)
+        query = "SELECT * FROM mseed"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        with self._lock:
+            cursor = self._connection.execute(query + " ORDER BY filename",
+                                              values)
+            keys = [_i[0] for _i in cursor.description]
+            records = [dict(zip(keys, _i)) for _i in cursor]
+        for record in records:
+            record["starttime"] = obspy.UTCDateTime(record["starttime"])
+            record["endtime"] = obspy.UTCDateTime(record["endtime"])
+        return records
+
+    def get_stationxml_contents(self, filename):
+        """
+        Returns the recorded contents of a present StationXML file like
+        :func:`~.utils.get_stationxml_contents` or ``None`` if the file is
+        not part of the ledger.
+
+        :param filename: The path to the file.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT status FROM stationxml WHERE filename = ?",
+                (filename,)).fetchone()
+            if row is None or row[0] not in PRESENT:
+                return None
+            rows = self._connection.execute(
+                "SELECT network, station, location, channel, starttime, "
+                "endtime FROM stationxml_channels WHERE filename = ?",
+                (filename,)).fetchall()
+        return [ChannelAvailability(
+            _i[0], _i[1], _i[2], _i[3], obspy.UTCDateTime(_i[4]),
+            obspy.UTCDateTime(_i[5]), filename) for _i in rows]
+
+    def set_stationxml_status(self, filename, network, station, status,
+                              contents=None, provider=None, size=None,
+                              checksum=None):
+        """
+        Records the status of a StationXML file.
+
+        :param filename: The path to the file.
+        :type network: str
+        :param network: The network code.
+        :type station: str
+        :param station: The station code.
+        :type status: str
+        :param status: The status of the file.
+        :type contents: list of
+            :class:`~obspy.clients.fdsn.mass_downloader.utils.ChannelAvailability`
+        :param contents: The channels with response information in the file,
+            see :func:`~.utils.get_stationxml_contents`.
+        :type provider: str
+        :param provider: The provider the file has been downloaded from.
+        :type size: int
+        :param size: The size of the file in bytes.
+        :type checksum: str
+        :param checksum: The checksum of the file.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO stationxml VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?)",
+                (filename, network, station, status, provider, size,
+                 checksum, time.time()))
+            self._connection.execute(
+                "DELETE FROM stationxml_channels WHERE filename = ?",
+                (filename,))
+            self._connection.executemany(
+                "INSERT INTO stationxml_channels VALUES "
+                "(?, ?, ?, ?, ?, ?, ?)",
+                [(filename, _i.network, _i.station, _i.location, _i.channel,
+                  str(_i.starttime), str(_i.endtime))
+                 for _i in contents or []])
+
+    def get_statistics(self):
+        """
+        Returns the number of MiniSEED and StationXML files per status.
+
+        :rtype: dict
+        """
+        stats = {}
+        with self._lock:
+            for table in ("mseed", "stationxml"):
+                cursor = self._connection.execute(
+                    "SELECT status, COUNT(*) FROM %s GROUP BY status "
+                    "ORDER BY status" % table)
+                stats[table] = dict(cursor.fetchall())
+        return stats
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(exclude_empty=True)
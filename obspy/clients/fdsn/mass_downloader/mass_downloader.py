@@ -21,6 +21,7 @@ from obspy.clients.fdsn.client import Client
 
 from . import utils
 from .download_helpers import ClientDownloadHelper, STATUS
+from .ledger import DownloadLedger
 
 
 # Setup the logger.
@@ -101,6 +102,8 @@ class MassDownloader(object):
             providers = _p
 
         self.providers = tuple(providers)
+        # Performance of the MiniSEED downloads of the last run per client.
+        self.performance_report = collections.OrderedDict()
 
         # Initialize all clients.
         self._initialized_clients = collections.OrderedDict()
@@ -108,7 +111,7 @@ class MassDownloader(object):
 
     def download(self, domain, restrictions, mseed_storage,
                  stationxml_storage, download_chunk_size_in_mb=20,
-                 threads_per_client=3, print_report=True):
+                 threads_per_client=3, print_report=True, ledger=None):
         """
         Launch the actual data download.
 
@@ -132,10 +135,24 @@ class MassDownloader(object):
         :param threads_per_client: The number of download threads launched
             per client.
         :type threads_per_client: int
+        :param ledger: A ledger recording all downloaded files, or the
+            filename of its SQLite database. Existing files are then looked
+            up in the ledger instead of checking and parsing the files in
+            the storage.
+        :type ledger: str or :class:`~.ledger.DownloadLedger`
+
+        The MiniSEED downloads adapt the chunk size and the number of
+        concurrent requests to the performance of each data center. The
+        measured performance of the run is stored per client in the
+        ``performance_report`` attribute, see
+        :meth:`~.scheduler.DownloadScheduler.get_report`.
         """
         # The downloads from each client will be handled separately.
         # Nonetheless collect all in this dictionary.
         client_download_helpers = {}
+        self.performance_report = collections.OrderedDict()
+        if isinstance(ledger, str):
+            ledger = DownloadLedger(ledger)
 
         # Do it sequentially for each client. Doing it in parallel is not
         # really feasible as long as the availability queries are not
@@ -157,7 +174,8 @@ class MassDownloader(object):
                 client=client, client_name=client_name,
                 restrictions=restrictions, domain=domain,
                 mseed_storage=mseed_storage,
-                stationxml_storage=stationxml_storage, logger=logger)
+                stationxml_storage=stationxml_storage, logger=logger,
+                ledger=ledger)
             existing_client_dl_helpers = list(
                 client_download_helpers.values())
             client_download_helpers[client_name] = helper
@@ -201,6 +219,9 @@ class MassDownloader(object):
             helper.prepare_mseed_download()
             helper.download_mseed(chunk_size_in_mb=download_chunk_size_in_mb,
                                   threads_per_client=threads_per_client)
+            if helper.performance_report:
+                self.performance_report[client_name] = \
+                    helper.performance_report
 
             # Download StationXML data.
             helper.prepare_stationxml_download()
@@ -276,6 +297,20 @@ class MassDownloader(object):
             logger.info("Downloaded %.1f MB in total." % (
                 total_downloaded_filesize / 1024.0 ** 2))
 
+            for client_name, report in self.performance_report.items():
+                logger.info(
+                    "Client '%s' - %i MiniSEED requests (%i failed, %i "
+                    "throttled) in %.1f seconds [%.2f KB/sec], latency %s, "
+                    "final chunk size %.1f MB with %i concurrent "
+                    "request(s)." % (
+                        client_name, report["requests"],
+                        report["failed_requests"],
+                        report["throttled_requests"], report["duration"],
+                        (report["throughput"] or 0.0) / 1024.0,
+                        "unknown" if report["latency"] is None else
+                        "%.2f seconds" % report["latency"],
+                        report["chunk_size_in_mb"], report["concurrency"]))
+
         return client_download_helpers
 
     def _initialize_clients(self):
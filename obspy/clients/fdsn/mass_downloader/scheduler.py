@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Adaptive scheduling of the MiniSEED downloads of the mass downloader.
+
+:copyright:
+    The ObsPy Development Team (devs@obspy.org)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+import collections
+import os
+import threading
+import timeit
+
+import numpy as np
+
+from obspy.clients.fdsn.header import (FDSNServiceUnavailableException,
+                                       FDSNTooManyRequestsException)
+
+
+# Errors signaling that the data center is overloaded or rate limits the
+# requests.
+THROTTLING_ERRORS = (FDSNTooManyRequestsException,
+                     FDSNServiceUnavailableException)
+
+# Requests should not take much longer than this to keep the work well
+# distributed and to not lose too much when a request fails.
+TARGET_REQUEST_DURATION = 60.0
+
+# Chunks are made large enough so that the latency of a request is at most
+# this fraction of its duration.
+MAX_LATENCY_FRACTION = 0.1
+
+
+class DownloadScheduler(object):
+    """
+    Downloads MiniSEED data from a single provider in chunks of adaptive
+    size with an adaptive number of concurrent requests.
+
+    All worker threads pull their chunks from a shared queue so faster
+    connections automatically do more of the work. The throughput and the
+    latency of the provider are estimated from the finished requests and
+    used to size the following chunks: large enough for the latency to be
+    negligible, small enough for a request not to take much longer than
+    ``TARGET_REQUEST_DURATION`` and for all threads to have work until
+    the queue is empty. If the provider is overloaded or limits the request
+    rate (HTTP 503 or 429), all requests are paused with an exponential
+    backoff, the number of concurrent requests is halved and the chunk is
+    queued again. The number of concurrent requests grows again after
+    successful requests.
+
+    :type client_name: str
+    :param client_name: The name of the client. Only used for logging.
+    :type items: list of tuples
+    :param items: The items to download, each a tuple of the bulk request
+        line (network, station, location, channel, starttime, endtime and
+        filename) and the estimated size of the data in MB.
+    :type download_function: callable
+    :param download_function: Function downloading a chunk, called with a
+        list of bulk request lines. Returns the list of written files or
+        ``None`` if the download failed.
+    :param logger: An active logger instance.
+    :type chunk_size_in_mb: float
+    :param chunk_size_in_mb: The maximum estimated size of a chunk.
+    :type max_threads: int
+    :param max_threads: The maximum number of concurrent requests.
+    :type max_chunk_length: int
+    :param max_chunk_length: The maximum number of bulk request lines per
+        chunk.
+    :type max_attempts: int
+    :param max_attempts: How often a chunk is requested if the provider is
+        throttling the requests.
+    :type backoff: float
+    :param backoff: Initial pause in seconds after the provider throttled a
+        request, doubled for every consecutive throttled request.
+    :type max_backoff: float
+    :param max_backoff: Maximum pause in seconds.
+    """
+    def __init__(self, client_name, items, download_function, logger,
+                 chunk_size_in_mb=20, max_threads=3, max_chunk_length=50,
+                 max_attempts=3, backoff=2.0, max_backoff=120.0):
+        self.client_name = client_name
+        self.download_function = download_function
+        self.logger = logger
+        self.max_chunk_size_in_mb = float(chunk_size_in_mb)
+        self.min_chunk_size_in_mb = self.max_chunk_size_in_mb / 16.0
+        self.chunk_size_in_mb = self.max_chunk_size_in_mb
+        self.max_threads = max(1, max_threads)
+        self.concurrency = self.max_threads
+        self.max_chunk_length = max_chunk_length
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # Each entry is a list of the bulk line, the estimated size and the
+        # number of attempts.
+        self._queue = collections.deque([_i[0], _i[1], 0] for _i in items)
+        self._condition = threading.Condition()
+        self._active = 0
+        self._paused_until = 0.0
+        self._throttle_count = 0
+        self._successes = 0
+        self._start_time = None
+        self._end_time = None
+        self._error = None
+        self.requests = []
+
+    def run(self):
+        """
+        Downloads all items and returns the performance report.
+
+        :rtype: dict
+        """
+        self._start_time = timeit.default_timer()
+        threads = [threading.Thread(target=self._worker)
+                   for _ in range(min(self.max_threads, len(self._queue)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self._end_time = timeit.default_timer()
+        # Unexpected errors are raised in the calling thread.
+        if self._error is not None:
+            raise self._error
+        return self.get_report()
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while True:
+                    if not self._queue:
+                        return
+                    wait = self._paused_until - timeit.default_timer()
+                    if wait <= 0 and self._active < self.concurrency:
+                        break
+                    self._condition.wait(wait if wait > 0 else None)
+                chunk = self._next_chunk()
+                self._active += 1
+                concurrency = self._active
+            start = timeit.default_timer()
+            try:
+                filenames = self.download_function([_i[0] for _i in chunk])
+            except THROTTLING_ERRORS as e:
+                status = "throttled"
+                filenames = None
+                error = e
+            except Exception as e:
+                status = "failed"
+                filenames = None
+                # Stop all workers.
+                with self._condition:
+                    self._error = self._error or e
+                    self._queue.clear()
+            else:
+                status = "failed" if filenames is None else "ok"
+            duration = timeit.default_timer() - start
+            size = sum(os.path.getsize(_i) for _i in filenames or []
+                       if os.path.exists(_i))
+            with self._condition:
+                self._active -= 1
+                self.requests.append({
+                    "start": start - self._start_time,
+                    "duration": duration,
+                    "bytes": size,
+                    "estimated_bytes": sum(_i[1] for _i in chunk) * 1024 ** 2,
+                    "lines": len(chunk),
+                    "concurrency": concurrency,
+                    "status": status})
+                if status == "throttled":
+                    self._throttled(chunk, error)
+                else:
+                    self._successes += 1
+                    self._throttle_count = 0
+                    # Additive increase of the concurrency.
+                    if self.concurrency < self.max_threads and \
+                            self._successes >= self.concurrency:
+                        self.concurrency += 1
+                        self._successes = 0
+                    self._update_chunk_size()
+                self._condition.notify_all()
+
+    def _throttled(self, chunk, error):
+        """
+        Pauses all requests and reduces the concurrency after a throttled
+        request. Must be called with the lock held.
+        """
+        self._throttle_count += 1
+        self._successes = 0
+        self.concurrency = max(1, self.concurrency // 2)
+        pause = min(self.backoff * 2 ** (self._throttle_count - 1),
+                    self.max_backoff)
+        self._paused_until = max(self._paused_until,
+                                 timeit.default_timer() + pause)
+        retry = [_i for _i in chunk if _i[2] < self.max_attempts]
+        if len(retry) < len(chunk):
+            self.logger.error(
+                "Client '%s' - Giving up on %i bulk lines after %i "
+                "attempts: %s" % (self.client_name, len(chunk) - len(retry),
+                                  self.max_attempts,
+                                  str(error).splitlines()[0]))
+        self._queue.extendleft(reversed(retry))
+        self.logger.info(
+            "Client '%s' - Data center is throttling requests. Pausing "
+            "for %.1f seconds, now using %i concurrent request(s)." % (
+                self.client_name, pause, self.concurrency))
+
+    def _next_chunk(self):
+        """
+        Takes the next chunk from the queue. Must be called with the lock
+        held.
+        """
+        limit = self.chunk_size_in_mb
+        # Once the provider responds, make sure all threads get some work
+        # towards the end.
+        if self.requests:
+            remaining = sum(_i[1] for _i in self._queue)
+            limit = min(limit, max(remaining / self.concurrency,
+                                   self.min_chunk_size_in_mb))
+        chunk = []
+        size = 0.0
+        while self._queue and len(chunk) < self.max_chunk_length:
+            item = self._queue.popleft()
+            item[2] += 1
+            chunk.append(item)
+            size += item[1]
+            if size >= limit:
+                break
+        return chunk
+
+    def get_statistics(self):
+        """
+        Estimates the latency of requests in seconds and the throughput of
+        a single connection in bytes per second from the successful
+        requests.
+
+        The duration of a request is modeled as the latency plus the size
+        divided by the throughput. The latency can only be estimated from
+        requests of different sizes. Returns ``None`` for unknown values.
+        """
+        requests = [_i for _i in self.requests if _i["status"] == "ok"]
+        if not requests:
+            return None, None
+        durations = np.array([_i["duration"] for _i in requests])
+        sizes = np.array([_i["bytes"] for _i in requests], dtype=np.float64)
+        latency = None
+        if len(requests) >= 3 and sizes.std() > 0.1 * sizes.mean():
+            intercept = np.polyfit(sizes, durations, 1)[1]
+            latency = min(max(intercept, 0.0), durations.min())
+        transfer_time = durations.sum() - len(durations) * (latency or 0.0)
+        if sizes.sum() == 0 or transfer_time <= 0:
+            return latency, None
+        return latency, sizes.sum() / transfer_time
+
+    def _update_chunk_size(self):
+        """
+        Adapts the chunk size to the measured performance of the provider.
+        Must be called with the lock held.
+        """
+        latency, throughput = self.get_statistics()
+        requests = [_i for _i in self.requests if _i["status"] == "ok"]
+        estimated = sum(_i["estimated_bytes"] for _i in requests)
+        if throughput is None or not estimated:
+            return
+        # Size of the data relative to the estimated size.
+        ratio = sum(_i["bytes"] for _i in requests) / estimated
+        duration = max(TARGET_REQUEST_DURATION,
+                       (latency or 0.0) / MAX_LATENCY_FRACTION)
+        size_in_mb = throughput * duration / ratio / 1024.0 ** 2
+        self.chunk_size_in_mb = min(max(
+            size_in_mb, self.min_chunk_size_in_mb), self.max_chunk_size_in_mb)
+
+    def get_report(self):
+        """
+        Returns the performance report of the downloads.
+
+        :rtype: dict
+        """
+        latency, throughput = self.get_statistics()
+        counts = collections.Counter(_i["status"] for _i in self.requests)
+        size = sum(_i["bytes"] for _i in self.requests)
+        end = self._end_time or timeit.default_timer()
+        duration = end - self._start_time if self._start_time else 0.0
+        return {
+            "client": self.client_name,
+            "requests": len(self.requests),
+            "failed_requests": counts["failed"],
+            "throttled_requests": counts["throttled"],
+            "bytes": size,
+            "duration": duration,
+            "throughput": size / duration if duration else None,
+            "connection_throughput": throughput,
+            "latency": latency,
+            "chunk_size_in_mb": self.chunk_size_in_mb,
+            "concurrency": self.concurrency,
+            "request_log": list(self.requests)}
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(exclude_empty=True)
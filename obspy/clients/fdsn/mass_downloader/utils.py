@@ -24,7 +24,7 @@ import obspy
 from obspy.core import compatibility
 from obspy.core.util.base import NamedTemporaryFile
 from obspy.clients.fdsn.client import FDSNException
-from obspy.io.mseed.util import get_record_information
+from obspy.io.mseed.util import _decode_header_field, _get_record_table
 
 
 # Different types of errors that can happen when downloading data via the
@@ -94,99 +94,13 @@ def download_and_split_mseed_bulk(client, client_name, chunks, logger):
     # intervals, each of which will end up in a separate file.
     filenames = collections.defaultdict(list)
     for chunk in chunks:
-        candidate = {
-            "starttime": chunk[4],
-            "endtime": chunk[5],
-            "filename": chunk[6],
-            "current_latest_endtime": None,
-            "sequence_number": None}
+        candidate = (chunk[4], chunk[5], chunk[6])
         # Should not be necessary if chunks have been deduplicated before but
         # better safe than sorry.
         if candidate in filenames[tuple(chunk[:4])]:
             continue
         filenames[tuple(chunk[:4])].append(candidate)
 
-    sequence_number = [0]
-
-    def get_filename(starttime, endtime, c):
-        """
-        Helper function finding the corresponding filename in all filenames.
-
-        :param starttime: The start time of the record.
-        :param endtime: The end time of the record.
-        :param c: A list of candidates.
-        """
-        # Make two passes. First find all candidates. This assumes that a
-        # record cannot be larger than a single desired time interval. This
-        # is probably always given except if somebody wants to download
-        # files split into 1 second intervals...
-        candidates = [
-            _i for _i in c if
-            (_i["starttime"] <= starttime <= _i["endtime"]) or
-            (_i["starttime"] <= endtime <= _i["endtime"])]
-        if not candidates:
-            return None
-
-        # If more then one candidate, apply some heuristics to find the
-        # correct time interval. The main complication arises when the same
-        # record is downloaded twice as it overlaps into two different
-        # requested time intervals.
-        if len(candidates) == 2:
-            candidates.sort(key=lambda x: x["starttime"])
-            first, second = candidates
-
-            # Make sure the assumptions about the type of overlap are correct.
-            if starttime > first["endtime"] or endtime < second["starttime"]:
-                raise NotImplementedError
-
-            # It must either be the last record of the first, or the first
-            # record of the second candidate.
-            if first["sequence_number"] is None and \
-                    second["sequence_number"] is None:
-                candidates = [second]
-
-            # Unlikely to happen. Only if nothing but the very last record
-            # of the first interval was available and the second interval
-            # was first in the file.
-            elif first["sequence_number"] is None:
-                candidates = [first]
-
-            # This is fairly likely and requires an additional check with
-            # the latest time in the first interval.
-            elif second["sequence_number"] is None:
-                if starttime <= first["current_latest_endtime"]:
-                    candidates = [second]
-                else:
-                    candidates = [first]
-
-            # Neither are None. Just use the one with the higher sequence
-            # number. This probably does not happen. If it happens something
-            # else is a bit strange.
-            else:
-                if first["sequence_number"] > second["sequence_number"]:
-                    candidates = [first]
-                else:
-                    candidates = [second]
-        elif len(candidates) >= 2:
-            raise NotImplementedError(
-                "Please contact the developers. candidates: %s" %
-                str(candidates))
-
-        # Finally found the correct chunk
-        ret_val = candidates[0]
-
-        # Increment sequence number and make sure the current chunk is aware
-        # of it.
-        sequence_number[0] += 1
-        ret_val["sequence_number"] = sequence_number[0]
-
-        # Also write the time of the last chunk to it if necessary.
-        ce = ret_val["current_latest_endtime"]
-        if not ce or endtime > ce:
-            ret_val["current_latest_endtime"] = endtime
-
-        return ret_val["filename"]
-
     # Only the filename is not needed for the actual data request.
     bulk = [list(_i[:-1]) for _i in chunks]
     original_bulk_length = len(bulk)
@@ -219,45 +133,212 @@ def download_and_split_mseed_bulk(client, client_name, chunks, logger):
     # Save first to a temporary file, then cut the file into separate files.
     with NamedTemporaryFile() as tf:
         temp_filename = tf.name
-        open_files = {}
-
         client.get_waveforms_bulk(bulk, filename=temp_filename)
         # If that succeeds, split the old file into multiple new ones.
-        file_size = os.path.getsize(temp_filename)
-
-        with open(temp_filename, "rb") as fh:
-            try:
-                while True:
-                    if fh.tell() >= (file_size - 256):
-                        break
-                    info = get_record_information(fh)
-                    channel_id = (info["network"], info["station"],
-                                  info["location"], info["channel"])
-
-                    # Sometimes the services return something nobody wants...
-                    if channel_id not in filenames:
-                        fh.read(info["record_length"])
-                        continue
-                    # Get the best matching filename.
-                    filename = get_filename(
-                        starttime=info["starttime"], endtime=info["endtime"],
-                        c=filenames[channel_id])
-                    # Again sometimes there are time ranges nobody asked for...
-                    if filename is None:
-                        fh.read(info["record_length"])
-                        continue
-                    if filename not in open_files:
-                        open_files[filename] = open(filename, "wb")
-                    open_files[filename].write(fh.read(info["record_length"]))
-            finally:
-                for f in open_files.values():
-                    try:
-                        f.close()
-                    except Exception:
-                        pass
+        written_files = split_mseed_file(temp_filename, filenames,
+                                         client_name=client_name,
+                                         logger=logger)
     logger.info("Client '%s' - Successfully downloaded %i channels (of %i)" % (
-        client_name, len(open_files), original_bulk_length))
-    return sorted(open_files.keys())
+        client_name, len(written_files), original_bulk_length))
+    return written_files
+
+
+def split_mseed_file(filename, filenames, client_name, logger):
+    """
+    Splits a MiniSEED file at the record level into the files of the
+    requested time intervals.
+
+    The headers of all records are parsed at once into a record table and
+    the records of each channel are assigned to the intervals with binary
+    searches. Each output file is opened once and consecutive records are
+    written with a single call.
+
+    :param filename: The MiniSEED file to split.
+    :param filenames: A dictionary of channel ids (network, station,
+        location, channel), each with a list of (starttime, endtime,
+        filename) tuples of the requested time intervals.
+    :param client_name: The name of the client instance used for logging
+        purposes.
+    :param logger: An active logger instance.
+    :returns: The sorted list of written files.
+    """
+    if not os.path.getsize(filename):
+        return []
+    data = np.memmap(filename, dtype=np.uint8, mode="r")
+    table = _get_record_table(data)
+    parsed = int(table["offset"][-1] + table["record_length"][-1]) \
+        if len(table) else 0
+    if parsed < len(data):
+        logger.warning(
+            "Client '%s' - Skipping %i bytes of the downloaded data that are "
+            "no complete MiniSEED records." % (client_name,
+                                               len(data) - parsed))
+
+    # Group the records by channel.
+    ids, inverse = np.unique(table["id"], return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.searchsorted(inverse[order], np.arange(len(ids) + 1))
+    records_per_file = collections.defaultdict(list)
+    for i, raw_id in enumerate(ids):
+        raw_id = raw_id.ljust(12)
+        channel_id = tuple(_decode_header_field(name, raw_id[a:b].strip())
+                           for name, a, b in (("network", 10, 12),
+                                              ("station", 0, 5),
+                                              ("location", 5, 7),
+                                              ("channel", 7, 10)))
+        # Sometimes the services return something nobody wants...
+        if channel_id not in filenames:
+            continue
+        intervals = filenames[channel_id]
+        records = order[bounds[i]:bounds[i + 1]]
+        assignment = assign_records_to_intervals(
+            table["starttime"][records], table["endtime"][records],
+            np.array([_i[0].ns for _i in intervals], dtype=np.int64),
+            np.array([_i[1].ns for _i in intervals], dtype=np.int64))
+        # Again sometimes there are time ranges nobody asked for...
+        for j, interval in enumerate(intervals):
+            selected = records[assignment == j]
+            if len(selected):
+                records_per_file[interval[2]].append(selected)
+
+    for output_filename, records in records_per_file.items():
+        records = np.sort(np.concatenate(records))
+        starts = table["offset"][records]
+        ends = starts + table["record_length"][records]
+        # Write runs of consecutive records at once.
+        breaks = np.flatnonzero(starts[1:] != ends[:-1]) + 1
+        with open(output_filename, "wb") as fh:
+            for a, b in zip(starts[np.concatenate([[0], breaks])],
+                            ends[np.concatenate([breaks - 1, [-1]])]):
+                fh.write(data[a:b])
+    del data
+    return sorted(records_per_file.keys())
+
+
+def assign_records_to_intervals(starttimes, endtimes, interval_starts,
+                                interval_ends):
+    """
+    Assigns the records of a single channel to the requested time
+    intervals.
+
+    A record belongs to the interval containing its start or end time. This
+    assumes that a record cannot be larger than a single desired time
+    interval. This is probably always given except if somebody wants to
+    download files split into 1 second intervals...
+
+    Records overlapping two intervals are assigned with some heuristics
+    depending on the records assigned before them. The main complication
+    arises when the same record is downloaded twice as it overlaps into two
+    different requested time intervals.
+
+    :type starttimes: :class:`numpy.ndarray`
+    :param starttimes: The start times of the records in the order of the
+        file in nanoseconds.
+    :type endtimes: :class:`numpy.ndarray`
+    :param endtimes: The end times of the records in nanoseconds.
+    :type interval_starts: :class:`numpy.ndarray`
+    :param interval_starts: The start times of the intervals in nanoseconds.
+    :type interval_ends: :class:`numpy.ndarray`
+    :param interval_ends: The end times of the intervals in nanoseconds.
+    :returns: The index of the interval of each record, -1 for records
+        nobody asked for.
+    """
+    order = np.argsort(interval_starts, kind="stable")
+    s = interval_starts[order]
+    e = interval_ends[order]
+    if np.all(e[:-1] <= s[1:]):
+        # Without overlaps the intervals containing a time t are
+        # s[searchsorted(e, t):searchsorted(s, t, "right")].
+        a0 = np.searchsorted(e, starttimes)
+        a1 = np.searchsorted(s, starttimes, "right") - 1
+        b0 = np.searchsorted(e, endtimes)
+        b1 = np.searchsorted(s, endtimes, "right") - 1
+        count_a = np.maximum(a1 - a0 + 1, 0)
+        count_b = np.maximum(b1 - b0 + 1, 0)
+        count = np.where((count_a > 0) & (count_b > 0) & (b0 <= a1 + 1),
+                         b1 - a0 + 1, count_a + count_b)
+        first = np.where(count_a > 0, a0, b0)
+    else:
+        contains = \
+            ((s <= starttimes[:, None]) & (starttimes[:, None] <= e)) | \
+            ((s <= endtimes[:, None]) & (endtimes[:, None] <= e))
+        count = contains.sum(axis=1)
+        first = contains.argmax(axis=1)
+    result = np.where(count == 1, first, -1)
+
+    ambiguous = np.flatnonzero(count >= 2)
+    if len(ambiguous):
+        # Records assigned to each interval sorted by their position.
+        assigned = np.flatnonzero(result >= 0)
+        assigned = assigned[np.argsort(result[assigned], kind="stable")]
+        bounds = np.searchsorted(result[assigned], np.arange(len(s) + 1))
+        latest_endtimes = {}
+        # Last position and latest end time of the already resolved
+        # records.
+        resolved = {}
+
+        def get_state(k, position):
+            """
+            Returns the position of the last record assigned to interval k
+            before the given position and the latest end time of these
+            records.
+            """
+            positions = assigned[bounds[k]:bounds[k + 1]]
+            i = np.searchsorted(positions, position)
+            last, latest = resolved.get(k, (None, None))
+            if i:
+                if k not in latest_endtimes:
+                    latest_endtimes[k] = np.maximum.accumulate(
+                        endtimes[positions])
+                last = positions[i - 1] if last is None else \
+                    max(last, positions[i - 1])
+                latest = latest_endtimes[k][i - 1] if latest is None else \
+                    max(latest, latest_endtimes[k][i - 1])
+            return last, latest
+
+        for position in ambiguous:
+            starttime = starttimes[position]
+            endtime = endtimes[position]
+            candidates = np.flatnonzero(
+                ((s <= starttime) & (starttime <= e)) |
+                ((s <= endtime) & (endtime <= e)))
+            if len(candidates) > 2:
+                raise NotImplementedError(
+                    "Please contact the developers. candidates: %s" % str(
+                        [(obspy.UTCDateTime(ns=int(s[_i])),
+                          obspy.UTCDateTime(ns=int(e[_i])))
+                         for _i in candidates]))
+            first, second = candidates
+            # Make sure the assumptions about the type of overlap are
+            # correct.
+            if starttime > e[first] or endtime < s[second]:
+                raise NotImplementedError
+            first_last, first_latest = get_state(first, position)
+            second_last, _ = get_state(second, position)
+            # It must either be the last record of the first, or the first
+            # record of the second candidate.
+            if first_last is None and second_last is None:
+                k = second
+            # Unlikely to happen. Only if nothing but the very last record
+            # of the first interval was available and the second interval
+            # was first in the file.
+            elif first_last is None:
+                k = first
+            # This is fairly likely and requires an additional check with
+            # the latest time in the first interval.
+            elif second_last is None:
+                k = second if starttime <= first_latest else first
+            # Neither are None. Just use the one with the later record. This
+            # probably does not happen. If it happens something else is a
+            # bit strange.
+            else:
+                k = first if first_last > second_last else second
+            result[position] = k
+            last, latest = resolved.get(k, (None, None))
+            resolved[k] = (position, endtime if latest is None
+                           else max(latest, endtime))
+
+    return np.where(result >= 0, order[np.maximum(result, 0)], -1)
 
 
 class SphericalNearestNeighbour(object):
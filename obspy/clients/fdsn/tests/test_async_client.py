@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+The obspy.clients.fdsn.async_client test suite.
+
+:copyright:
+    The ObsPy Development Team (devs@obspy.org)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+import asyncio
+import gzip
+import io
+import os
+import time
+import unittest
+import warnings
+
+import numpy as np
+
+from obspy import UTCDateTime, read, read_events, read_inventory
+from obspy.clients.fdsn import AsyncClient, Client
+from obspy.clients.fdsn.header import (FDSNException, FDSNNoDataException,
+                                       FDSNRedirectException)
+from obspy.clients.fdsn.tests.test_client import _LocalHTTPServer
+
+
+class AsyncClientTestCase(unittest.TestCase):
+    """
+    Test cases for obspy.clients.fdsn.async_client.AsyncClient against a
+    local HTTP server.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.path = os.path.join(os.path.dirname(__file__), "data")
+        core_path = os.path.join(os.path.dirname(__file__), os.pardir,
+                                 os.pardir, os.pardir, "core", "tests",
+                                 "data")
+        with open(os.path.join(cls.path, "dataselect_example.mseed"),
+                  "rb") as fh:
+            cls.mseed = fh.read()
+        with open(os.path.join(core_path, "IU_ANMO_00_BHZ.xml"), "rb") as fh:
+            cls.stationxml = fh.read()
+        with open(os.path.join(core_path, "iris_events.xml"), "rb") as fh:
+            cls.quakeml = fh.read()
+        cls.wadls = {}
+        for service in ("dataselect", "station", "event"):
+            with open(os.path.join(cls.path, service + ".wadl"), "rb") as fh:
+                cls.wadls[service] = fh.read()
+
+    def _get_responses(self, **kwargs):
+        responses = {
+            "/fdsnws/%s/1/application.wadl" % service: [(200, {}, wadl)]
+            for service, wadl in self.wadls.items()}
+        for service in self.wadls:
+            responses["/fdsnws/%s/1/version" % service] = [
+                (200, {}, b"1.1.0")]
+        responses["/fdsnws/dataselect/1/query"] = [(200, {}, self.mseed)]
+        responses["/fdsnws/station/1/query"] = [(200, {}, self.stationxml)]
+        responses["/fdsnws/event/1/query"] = [(200, {}, self.quakeml)]
+        responses.update(kwargs)
+        return responses
+
+    def _run(self, client, *coroutines):
+        async def main():
+            try:
+                return await asyncio.gather(*coroutines)
+            finally:
+                await client.close()
+        return asyncio.run(main())
+
+    def test_shares_service_discovery(self):
+        """
+        Services are discovered just like for the synchronous client.
+        """
+        with _LocalHTTPServer(self._get_responses()) as server:
+            client = AsyncClient(server.url)
+            self.assertEqual(client.services,
+                             Client(server.url).services)
+            self.assertEqual(
+                sorted(client.services),
+                ["dataselect", "event", "station"])
+            self.assertTrue(str(client).startswith(
+                "Asynchronous FDSN Webservice Client"))
+
+    def test_concurrent_requests(self):
+        """
+        Many concurrent requests are limited per host and share persistent
+        connections.
+        """
+        t1 = UTCDateTime("2010-02-27T06:30:00")
+        with _LocalHTTPServer(self._get_responses(), delay=0.02) as server:
+            client = AsyncClient(server.url, max_connections_per_host=3)
+            # Service discovery happened with parallel synchronous requests.
+            connections = server.connections
+            server.max_active = 0
+            streams = self._run(client, *[
+                client.get_waveforms("IU", "ANMO", "00", "BHZ", t1, t1 + 10)
+                for _ in range(20)])
+            self.assertEqual(len(streams), 20)
+            expected = read(io.BytesIO(self.mseed)).trim(t1, t1 + 10)
+            for st in streams:
+                self.assertEqual(len(st), 1)
+                self.assertEqual(st[0].id, expected[0].id)
+                self.assertEqual(st[0].stats.starttime,
+                                 expected[0].stats.starttime)
+                np.testing.assert_array_equal(st[0].data, expected[0].data)
+                self.assertEqual(
+                    st[0].stats._fdsnws_dataselect_url,
+                    server.url + "/fdsnws/dataselect/1/query")
+            self.assertLessEqual(server.max_active, 3)
+            self.assertLessEqual(server.connections - connections, 3)
+            queries = [r for r in server.requests if "query" in r[1]]
+            self.assertEqual(len(queries), 20)
+            self.assertEqual(
+                queries[0][1],
+                "/fdsnws/dataselect/1/query?"
+                "starttime=2010-02-27T06%3A30%3A00.000000&"
+                "endtime=2010-02-27T06%3A30%3A10.000000&"
+                "network=IU&station=ANMO&location=00&channel=BHZ")
+
+    def test_get_stations_and_events(self):
+        """
+        Station and event requests, gzipped responses and writing to files.
+        """
+        responses = self._get_responses()
+        responses["/fdsnws/event/1/query"] = [
+            (200, {"Content-Encoding": "gzip"}, gzip.compress(self.quakeml))]
+        with _LocalHTTPServer(responses) as server:
+            client = AsyncClient(server.url)
+            buf = io.BytesIO()
+            inv, cat, _ = self._run(
+                client,
+                client.get_stations(network="IU", station="ANMO",
+                                    level="response"),
+                client.get_events(minmagnitude=6.5),
+                client.get_stations(network="IU", filename=buf))
+            self.assertEqual(
+                inv, read_inventory(io.BytesIO(self.stationxml)))
+            self.assertEqual(cat, read_events(io.BytesIO(self.quakeml)))
+            self.assertEqual(buf.getvalue(), self.stationxml)
+            self.assertIn(
+                ("GET", "/fdsnws/event/1/query?minmagnitude=6.5", None),
+                server.requests)
+
+    def test_bulk_requests(self):
+        """
+        Bulk requests are sent as POST requests.
+        """
+        t1 = UTCDateTime("2010-02-27T06:30:00")
+        bulk = [("IU", "ANMO", "00", "BHZ", t1, t1 + 10)]
+        with _LocalHTTPServer(self._get_responses()) as server:
+            client = AsyncClient(server.url)
+            st, inv = self._run(
+                client,
+                client.get_waveforms_bulk(bulk, quality="B"),
+                client.get_stations_bulk(bulk, level="channel"))
+            expected = read(io.BytesIO(self.mseed))
+            self.assertEqual(len(st), 1)
+            np.testing.assert_array_equal(st[0].data, expected[0].data)
+            self.assertEqual(
+                inv, read_inventory(io.BytesIO(self.stationxml)))
+            posts = sorted(r for r in server.requests if r[0] == "POST")
+            self.assertEqual(posts, [
+                ("POST", "/fdsnws/dataselect/1/query",
+                 b"quality=B\nIU ANMO 00 BHZ 2010-02-27T06:30:00.000000 "
+                 b"2010-02-27T06:30:10.000000"),
+                ("POST", "/fdsnws/station/1/query",
+                 b"level=channel\nIU ANMO 00 BHZ 2010-02-27T06:30:00.000000 "
+                 b"2010-02-27T06:30:10.000000")])
+
+    def test_attach_response(self):
+        """
+        Responses are fetched with concurrent station requests.
+        """
+        t1 = UTCDateTime("2010-02-27T06:30:00")
+        with _LocalHTTPServer(self._get_responses()) as server:
+            client = AsyncClient(server.url)
+            with warnings.catch_warnings(record=True):
+                warnings.simplefilter("always")
+                self._run(client, client.get_waveforms(
+                    "IU", "ANMO", "00", "BHZ", t1, t1 + 10,
+                    attach_response=True))
+            stations = [r[1] for r in server.requests
+                        if r[1].startswith("/fdsnws/station/1/query")]
+            self.assertEqual(len(stations), 1)
+            self.assertIn("level=response", stations[0])
+
+    def test_rate_limit_backoff(self):
+        """
+        HTTP 429 pauses all requests to the host for the time requested by
+        the server.
+        """
+        responses = self._get_responses()
+        responses["/fdsnws/event/1/query"] = [
+            (429, {"Retry-After": "0.3"}, b""), (200, {}, self.quakeml)]
+        with _LocalHTTPServer(responses) as server:
+            client = AsyncClient(server.url, backoff_factor=0)
+
+            async def delayed_station_request():
+                await asyncio.sleep(0.1)
+                inv = await client.get_stations(network="IU")
+                return time.time(), inv
+
+            start = time.time()
+            cat, (t_station, _) = self._run(
+                client, client.get_events(), delayed_station_request())
+            self.assertEqual(cat, read_events(io.BytesIO(self.quakeml)))
+            self.assertGreaterEqual(time.time() - start, 0.3)
+            # The station request had to wait for the backoff as well.
+            self.assertGreaterEqual(t_station - start, 0.3)
+            events = [r for r in server.requests
+                      if r[1].startswith("/fdsnws/event/1/query")]
+            self.assertEqual(len(events), 2)
+
+    def test_retries_exhausted(self):
+        """
+        Errors are raised after the last retry and HTTP errors are converted
+        to the usual exceptions.
+        """
+        responses = self._get_responses()
+        responses["/fdsnws/event/1/query"] = [(503, {}, b"busy")]
+        responses["/fdsnws/station/1/query"] = [(204, {}, b"")]
+        with _LocalHTTPServer(responses) as server:
+            client = AsyncClient(server.url, max_retries=2, backoff_factor=0)
+            with self.assertRaisesRegex(FDSNException,
+                                        "Service temporarily unavailable"):
+                self._run(client, client.get_events())
+            events = [r for r in server.requests
+                      if r[1].startswith("/fdsnws/event/1/query")]
+            self.assertEqual(len(events), 3)
+            with self.assertRaises(FDSNNoDataException):
+                self._run(client, client.get_stations(network="XX"))
+
+            # Unsupported parameters are detected before any request.
+            with self.assertRaises(TypeError):
+                self._run(client, client.get_events(spam="eggs"))
+
+    def test_redirects(self):
+        """
+        Redirects are followed (also for POST requests) unless credentials
+        are given.
+        """
+        responses = self._get_responses()
+        responses["/old"] = [(307, {"Location": "/fdsnws/station/1/query"},
+                              b"")]
+        with _LocalHTTPServer(responses) as server:
+            client = AsyncClient(server.url)
+            data = self._run(client, client._download_async(
+                server.url + "/old", data=b"level=station",
+                return_string=True))
+            self.assertEqual(data, [self.stationxml])
+            self.assertEqual(
+                server.requests[-1],
+                ("POST", "/fdsnws/station/1/query", b"level=station"))
+
+            client = AsyncClient(server.url, user="spam", password="eggs")
+            with self.assertRaises(FDSNRedirectException):
+                self._run(client, client._download_async(server.url + "/old"))
+
+
+def suite():
+    return unittest.makeSuite(AsyncClientTestCase, 'test')
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+The obspy.clients.fdsn.cache test suite.
+
+:copyright:
+    The ObsPy Development Team (devs@obspy.org)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+import asyncio
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import unittest
+
+from obspy import read_inventory
+from obspy.clients.fdsn import AsyncClient, Client
+from obspy.clients.fdsn.cache import ResponseCache
+from obspy.clients.fdsn.header import FDSNNoDataException
+from obspy.clients.fdsn.tests.test_client import _LocalHTTPServer
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+    """
+    Test cases for obspy.clients.fdsn.cache.ResponseCache.
+    """
+    @classmethod
+    def setUpClass(cls):
+        path = os.path.join(os.path.dirname(__file__), "data")
+        with open(os.path.join(path, "station.wadl"), "rb") as fh:
+            cls.station_wadl = fh.read()
+        with open(os.path.join(path, "event.wadl"), "rb") as fh:
+            cls.event_wadl = fh.read()
+        cls.stationxml_file = os.path.join(
+            path, os.pardir, os.pardir, os.pardir, os.pardir, "core",
+            "tests", "data", "IU_ANMO_00_BHZ.xml")
+        with open(cls.stationxml_file, "rb") as fh:
+            cls.stationxml = fh.read()
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, "cache", "fdsn.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _get_responses(self, station_headers={}):
+        return {
+            "/fdsnws/station/1/application.wadl": [
+                (200, {}, self.station_wadl)],
+            "/fdsnws/event/1/application.wadl": [(200, {}, self.event_wadl)],
+            "/fdsnws/station/1/query": [
+                (200, station_headers, self.stationxml)],
+            "/fdsnws/event/1/query": [(204, {}, b"")]}
+
+    def test_key(self):
+        """
+        Equivalent requests share the same key.
+        """
+        get_key = ResponseCache.get_key
+        url = "http://example.com/fdsnws/station/1/query"
+        self.assertEqual(get_key(url + "?network=IU&station=ANMO"),
+                         get_key(url + "?station=ANMO&network=IU"))
+        self.assertNotEqual(get_key(url + "?network=IU&station=ANMO"),
+                            get_key(url + "?network=IU&station=ANTO"))
+        self.assertEqual(get_key(url, data=b"level=channel\nIU A * * 1 2\n"),
+                         get_key(url, data="level=channel \n\nIU A * * 1 2"))
+        self.assertNotEqual(get_key(url, data=b"IU A * * 1 2"),
+                            get_key(url, data=b"IU B * * 1 2"))
+        self.assertNotEqual(get_key(url), get_key(url, user="spam"))
+
+    def test_store_ttl_and_eviction(self):
+        """
+        Entries expire after their time to live and the least recently used
+        entries are evicted if the cache gets too large.
+        """
+        cache = ResponseCache(self.filename, ttl=0.2, max_size=2100)
+        body = os.urandom(1000)
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", "http://a", body, etag='"1"')
+        entry = cache.get("a")
+        self.assertEqual(entry.body, body)
+        self.assertTrue(entry.fresh)
+        self.assertEqual(entry.get_revalidation_headers(),
+                         {"If-None-Match": '"1"'})
+        time.sleep(0.2)
+        self.assertFalse(cache.get("a").fresh)
+        cache.revalidate("a")
+        self.assertTrue(cache.get("a").fresh)
+
+        # Responses are stored compressed.
+        cache.put("b", "http://b", b"b" * 100000)
+        cache.get("a")
+        cache.put("c", "http://c", os.urandom(1000))
+        # "b" has been used least recently.
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a").body, body)
+        stats = cache.get_statistics()
+        self.assertEqual(stats["entries"], 2)
+        self.assertLessEqual(stats["size"], 2100)
+        self.assertEqual(
+            (stats["hits"], stats["misses"], stats["revalidated"]),
+            (4, 3, 1))
+
+        # The cache is persistent.
+        cache = ResponseCache(self.filename)
+        self.assertEqual(cache.get("a").body, body)
+        cache.clear()
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get_statistics()["entries"], 0)
+
+    def test_client_cache(self):
+        """
+        Station requests of the client are answered from the cache and
+        revalidated with the ETag of the response.
+        """
+        responses = self._get_responses(station_headers={"ETag": '"v1"'})
+        with _LocalHTTPServer(responses) as server:
+            client = Client(server.url, cache=self.filename)
+            self.assertIsInstance(client.cache, ResponseCache)
+            client.cache.ttl = 0.3
+            expected = read_inventory(self.stationxml_file)
+            for _ in range(3):
+                inv = client.get_stations(network="IU", station="ANMO")
+                self.assertEqual(inv, expected)
+            inv = client.get_stations(station="ANMO", network="IU")
+            self.assertEqual(inv, expected)
+            queries = [h for r, h in zip(server.requests,
+                                         server.request_headers)
+                       if "query" in r[1]]
+            self.assertEqual(len(queries), 1)
+            self.assertEqual(client.cache.get_statistics()["hits"], 3)
+
+            # Revalidation after the entry expired.
+            time.sleep(0.3)
+            inv = client.get_stations(network="IU", station="ANMO")
+            self.assertEqual(inv, expected)
+            queries = [h for r, h in zip(server.requests,
+                                         server.request_headers)
+                       if "query" in r[1]]
+            self.assertEqual(len(queries), 2)
+            self.assertEqual(queries[1]["If-None-Match"], '"v1"')
+            stats = client.cache.get_statistics()
+            self.assertEqual(
+                (stats["hits"], stats["misses"], stats["revalidated"]),
+                (3, 1, 1))
+
+            # Bulk requests and asynchronous clients share the cache.
+            bulk = "level=channel\nIU ANMO 00 BHZ * *"
+            client.get_stations_bulk(bulk)
+            client.get_stations_bulk(bulk + "\n")
+            async_client = AsyncClient(server.url, cache=client.cache)
+
+            async def main():
+                try:
+                    return await async_client.get_stations(
+                        network="IU", station="ANMO")
+                finally:
+                    await async_client.close()
+            self.assertEqual(asyncio.run(main()), expected)
+            stats = client.cache.get_statistics()
+            self.assertEqual(
+                (stats["hits"], stats["misses"], stats["revalidated"]),
+                (5, 2, 1))
+
+            # Errors are not cached, without cache the server is always
+            # contacted.
+            for _ in range(2):
+                with self.assertRaises(FDSNNoDataException):
+                    client.get_events()
+            self.assertEqual(client.cache.get_statistics()["entries"], 2)
+            client = Client(server.url)
+            self.assertIsNone(client.cache)
+            n_requests = len(server.requests)
+            client.get_stations(network="IU", station="ANMO")
+            self.assertEqual(len(server.requests), n_requests + 1)
+
+    def test_service_discovery_cache(self):
+        """
+        Discovered services are stored in the cache and reused by clients
+        in other processes until their time to live expires.
+        """
+        def wadl_requests(server):
+            return len([r for r in server.requests
+                        if r[1].endswith("application.wadl")])
+
+        # The class level cache of the current process.
+        process_cache = Client._Client__service_discovery_cache
+        with _LocalHTTPServer(self._get_responses()) as server:
+            client = Client(server.url, cache=self.filename)
+            self.assertEqual(wadl_requests(server), 3)
+            self.assertEqual(sorted(client.services), ["event", "station"])
+            services = client.services
+
+            # A new process.
+            process_cache.clear()
+            client = Client(server.url, cache=self.filename)
+            self.assertEqual(wadl_requests(server), 3)
+            self.assertEqual(client.services, services)
+            process_cache.clear()
+            # Different service versions are discovered separately.
+            client = Client(server.url, cache=self.filename,
+                            service_mappings={"event": None})
+            self.assertEqual(wadl_requests(server), 5)
+            self.assertEqual(sorted(client.services), ["station"])
+
+            # Expired services are discovered again.
+            process_cache.clear()
+            cache = ResponseCache(self.filename, ttl=0.1)
+            time.sleep(0.1)
+            client = Client(server.url, cache=cache)
+            self.assertEqual(wadl_requests(server), 8)
+            self.assertEqual(client.services, services)
+            cache.clear()
+            self.assertIsNone(cache.get_services(["http://a"]))
+
+    def test_services_stored_as_json(self):
+        """
+        Discovered services, including the sets of event catalogs and
+        contributors, are stored as JSON. Invalid data in the cache is
+        ignored and never unpickled.
+        """
+        def catalog_requests(server):
+            return len([r for r in server.requests
+                        if r[1].endswith("/catalogs")])
+
+        responses = self._get_responses()
+        responses["/fdsnws/event/1/catalogs"] = [(200, {}, (
+            b"<Catalogs><Catalog>NEIC PDE</Catalog><Catalog>ISC</Catalog>"
+            b"</Catalogs>"))]
+        responses["/fdsnws/event/1/contributors"] = [(200, {}, (
+            b"<Contributors><Contributor>ak</Contributor>"
+            b"<Contributor>us</Contributor></Contributors>"))]
+        process_cache = Client._Client__service_discovery_cache
+        process_cache.clear()
+        self.addCleanup(process_cache.clear)
+        with _LocalHTTPServer(responses) as server:
+            client = Client(server.url, cache=self.filename)
+            services = client.services
+            self.assertEqual(services["available_event_catalogs"],
+                             {"ISC", "NEIC PDE"})
+            self.assertEqual(services["available_event_contributors"],
+                             {"ak", "us"})
+            connection = client.cache._connection
+            stored = connection.execute(
+                "SELECT services FROM services").fetchone()[0]
+            stored_services = json.loads(stored)
+            self.assertEqual(stored_services["available_event_catalogs"],
+                             ["ISC", "NEIC PDE"])
+            self.assertEqual(stored_services["event"]["starttime"]["type"],
+                             "UTCDateTime")
+
+            # A new process.
+            process_cache.clear()
+            client = Client(server.url, cache=self.filename)
+            self.assertEqual(client.services, services)
+            self.assertEqual(catalog_requests(server), 1)
+
+            # Invalid data is discovered again.
+            for i, data in enumerate([
+                    pickle.dumps(services), "[]",
+                    stored.replace('"float"', '"object"'),
+                    stored.replace('"required"', '"spam"', 1),
+                    stored.replace('["ISC", ', '[1, ')]):
+                with connection:
+                    connection.execute("UPDATE services SET services = ?",
+                                       (data,))
+                process_cache.clear()
+                client = Client(server.url, cache=self.filename)
+                self.assertEqual(client.services, services)
+                self.assertEqual(catalog_requests(server), i + 2)
+
+
+def suite():
+    return unittest.makeSuite(ResponseCacheTestCase, 'test')
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
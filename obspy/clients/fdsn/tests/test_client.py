@@ -9,13 +9,17 @@ The obspy.clients.fdsn.client test suite.
     GNU Lesser General Public License, Version 3
     (https://www.gnu.org/copyleft/lesser.html)
 """
+import gzip
 import io
 import os
 import re
 import sys
+import threading
+import time
 import unittest
 import warnings
 from difflib import Differ
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest import mock
 
 import urllib.request as urllib_request
@@ -28,10 +32,12 @@ from obspy import UTCDateTime, read, read_inventory, Stream, Trace
 from obspy.core.util.base import NamedTemporaryFile
 from obspy.clients.fdsn import Client, RoutingClient
 from obspy.clients.fdsn.client import (build_url, parse_simple_xml,
-                                       get_bulk_string)
+                                       get_bulk_string, _NoReadTimeoutRetry)
 from obspy.clients.fdsn.header import (DEFAULT_USER_AGENT, URL_MAPPINGS,
                                        FDSNException, FDSNRedirectException,
-                                       FDSNNoDataException, DEFAULT_SERVICES)
+                                       FDSNNoDataException, DEFAULT_SERVICES,
+                                       FDSNServiceUnavailableException,
+                                       FDSNTooManyRequestsException)
 from obspy.core.inventory import Response
 from obspy.geodetics import locations2degrees
 
@@ -86,6 +92,85 @@ def normalize_version_number(string):
     return [l.strip() for l in repl.splitlines()]
 
 
+class _LocalHTTPServer(ThreadingHTTPServer):
+    """
+    Minimal keep-alive HTTP server in a background thread.
+
+    ``responses`` maps a path to a list of ``(code, headers, body)`` tuples
+    which are served one after the other (the last one is repeated). Served
+    requests (and their headers), opened connections and the maximum number
+    of concurrently handled requests are recorded. Each response is delayed
+    by ``delay`` seconds. Conditional requests matching the ``ETag`` header
+    of a response are answered with HTTP 304.
+    """
+    block_on_close = False
+
+    def __init__(self, responses, delay=0):
+        self.responses = responses
+        self.delay = delay
+        self.requests = []
+        self.request_headers = []
+        self.connections = 0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        ThreadingHTTPServer.__init__(
+            self, ("127.0.0.1", 0), _LocalHTTPHandler)
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%i" % self.server_port
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+class _LocalHTTPHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.server.connections += 1
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = self.rfile.read(length) if length else None
+        server = self.server
+        with server.lock:
+            server.requests.append((self.command, self.path, payload))
+            server.request_headers.append(self.headers)
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            responses = server.responses.get(
+                self.path.split("?")[0], [(404, {}, b"")])
+            code, headers, body = \
+                responses.pop(0) if len(responses) > 1 else responses[0]
+        if "ETag" in headers and \
+                self.headers.get("If-None-Match") == headers["ETag"]:
+            code, body = 304, b""
+        time.sleep(server.delay)
+        with server.lock:
+            server.active -= 1
+        self.send_response(code)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _respond
+
+    def log_message(self, *args):
+        pass
+
+
 class ClientTestCase(unittest.TestCase):
     """
     Test cases for obspy.clients.fdsn.client.Client.
@@ -276,7 +361,8 @@ class ClientTestCase(unittest.TestCase):
                                          filename=mock.Mock())
             self.assertEqual(p.call_count, 1)
             self.assertIn("location=--", p.call_args[0][0])
-            with mock.patch("obspy.clients.fdsn.Client._download") as p:
+            with mock.patch("obspy.clients.fdsn.Client._download",
+                            return_value=io.BytesIO()) as p:
                 self.client.get_waveforms(1, 2, loc, 4, 0, 0,
                                           filename=mock.Mock())
             self.assertEqual(p.call_count, 1)
@@ -1588,8 +1674,246 @@ class ClientTestCase(unittest.TestCase):
                                                'event_helpstring.txt'))
 
 
+class ClientConnectionPoolTestCase(unittest.TestCase):
+    """
+    Tests the pooled keep-alive connections of the client against a local
+    HTTP server.
+    """
+    def test_connections_are_reused(self):
+        """
+        Subsequent requests, also POST requests and requests from multiple
+        threads, reuse the persistent connections of the pool.
+        """
+        body = b"spam" * 1000
+        responses = {"/data": [(200, {}, body)]}
+        with _LocalHTTPServer(responses) as server:
+            client = Client(server.url, _discover_services=False,
+                            pool_size=2)
+            for _ in range(5):
+                self.assertEqual(
+                    client._download(server.url + "/data").read(), body)
+            self.assertEqual(
+                client._download(server.url + "/data",
+                                 data=b"eggs").read(), body)
+            self.assertEqual(server.connections, 1)
+            self.assertEqual(server.requests[-1],
+                             ("POST", "/data", b"eggs"))
+
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(
+                client._download(server.url + "/data").read()))
+                for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(results, [body] * 4)
+            self.assertLessEqual(server.connections, 4)
+
+    def test_gzip_response(self):
+        """
+        Gzip compressed responses are requested and decompressed.
+        """
+        body = b"".join(b"%i," % i for i in range(10000))
+        responses = {"/data": [(200, {"Content-Encoding": "gzip"},
+                                gzip.compress(body))]}
+        with _LocalHTTPServer(responses) as server:
+            client = Client(server.url, _discover_services=False)
+            self.assertEqual(
+                client._download(server.url + "/data",
+                                 return_string=True), body)
+            self.assertEqual(
+                client._download(server.url + "/data").read(), body)
+            # Fully read responses give the connection back to the pool.
+            self.assertEqual(server.connections, 1)
+
+            # Closing a partially read stream closes the response.
+            data = client._download(server.url + "/data", stream=True)
+            self.assertEqual(data.read(5), body[:5])
+            response = data.fileobj
+            data.close()
+            self.assertTrue(response.closed)
+
+    def test_retry_with_backoff(self):
+        """
+        Requests are retried if the server is busy, up to max_retries.
+        """
+        responses = {
+            "/data": [(503, {}, b"busy"), (429, {"Retry-After": "0"}, b""),
+                      (200, {}, b"spam")],
+            "/down": [(503, {}, b"busy")],
+            "/limited": [(429, {}, b"slow down")]}
+        with _LocalHTTPServer(responses) as server:
+            client = Client(server.url, _discover_services=False,
+                            max_retries=2, backoff_factor=0)
+            self.assertEqual(
+                client._download(server.url + "/data", data=b"eggs").read(),
+                b"spam")
+            self.assertEqual(len(server.requests), 3)
+            self.assertEqual(set(server.requests),
+                             set([("POST", "/data", b"eggs")]))
+
+            with self.assertRaisesRegex(FDSNException,
+                                        "Service temporarily unavailable"):
+                client._download(server.url + "/down")
+            self.assertEqual(len(server.requests), 6)
+
+            # Retries can be disabled.
+            client = Client(server.url, _discover_services=False,
+                            max_retries=0)
+            with self.assertRaises(FDSNServiceUnavailableException):
+                client._download(server.url + "/down")
+            self.assertEqual(len(server.requests), 7)
+            with self.assertRaisesRegex(FDSNTooManyRequestsException,
+                                        "rate limiting(.|\n)*slow down"):
+                client._download(server.url + "/limited")
+
+    def test_retry_after_is_capped(self):
+        """
+        A long ``Retry-After`` of the server does not block the request
+        longer than the maximum wait before a retry.
+        """
+        responses = {"/data": [(503, {"Retry-After": "3600"}, b"busy"),
+                               (200, {}, b"spam")]}
+        with _LocalHTTPServer(responses) as server, mock.patch.object(
+                _NoReadTimeoutRetry, "MAX_RETRY_AFTER", 0.2):
+            client = Client(server.url, _discover_services=False,
+                            backoff_factor=0)
+            start = time.time()
+            self.assertEqual(
+                client._download(server.url + "/data").read(), b"spam")
+            self.assertGreaterEqual(time.time() - start, 0.2)
+            self.assertLess(time.time() - start, 5)
+            self.assertEqual(len(server.requests), 2)
+
+    def test_redirect_and_errors(self):
+        """
+        Redirects and HTTP errors are still handled by the usual handlers.
+        """
+        responses = {
+            "/old": [(301, {"Location": "/new"}, b"")],
+            "/new": [(200, {}, b"spam")],
+            "/missing": [(204, {}, b"")],
+            "/invalid": [(400, {}, b"bad request")]}
+        with _LocalHTTPServer(responses) as server:
+            client = Client(server.url, _discover_services=False)
+            self.assertEqual(
+                client._download(server.url + "/old", data=b"eggs").read(),
+                b"spam")
+            self.assertEqual(server.requests[-1], ("POST", "/new", b"eggs"))
+            with self.assertRaises(FDSNNoDataException):
+                client._download(server.url + "/missing")
+            with self.assertRaisesRegex(FDSNException, "bad request"):
+                client._download(server.url + "/invalid")
+
+            client = Client(server.url, _discover_services=False,
+                            user="spam", password="eggs")
+            with self.assertRaisesRegex(FDSNException,
+                                        "not being redirected"):
+                client._download(server.url + "/old")
+
+
+class ClientStreamingTestCase(unittest.TestCase):
+    """
+    Tests decoding waveform data while it is being downloaded.
+    """
+    @classmethod
+    def setUpClass(cls):
+        path = os.path.dirname(__file__)
+        mseed_path = os.path.join(path, os.pardir, os.pardir, os.pardir,
+                                  "io", "mseed", "tests", "data")
+        filenames = [
+            os.path.join(path, "data", "dataselect_example.mseed"),
+            os.path.join(mseed_path, "two_channels.mseed"),
+            os.path.join(mseed_path,
+                         "BW.BGLD.__.EHE.D.2008.001.first_10_records")]
+        data = []
+        for filename in filenames:
+            with open(filename, "rb") as fh:
+                data.append(fh.read())
+        cls.mseed = b"".join(data)
+        cls.bulk = [("BW", "BGLD", "", "EHE", UTCDateTime(2007, 1, 1),
+                     UTCDateTime(2009, 1, 1))]
+
+    def _assert_traces_equal(self, traces, expected):
+        self.assertEqual(len(traces), len(expected))
+        for tr, tr_expected in zip(traces, expected):
+            self.assertEqual(tr.id, tr_expected.id)
+            self.assertEqual(tr.stats.starttime, tr_expected.stats.starttime)
+            self.assertEqual(tr.stats.mseed.number_of_records,
+                             tr_expected.stats.mseed.number_of_records)
+            np.testing.assert_array_equal(tr.data, tr_expected.data)
+
+    def test_streamed_waveforms(self):
+        """
+        Waveforms decoded in chunks are the same as decoded at once, also
+        with chunks not aligned with the record boundaries.
+        """
+        responses = {"/fdsnws/dataselect/1/query": [(200, {}, self.mseed)]}
+        expected = read(io.BytesIO(self.mseed))
+        with _LocalHTTPServer(responses) as server:
+            client = Client(server.url, _discover_services=False)
+            for chunk_size in (1000, 4096, 10 ** 7):
+                with mock.patch("obspy.clients.fdsn.client.MSEED_CHUNK_SIZE",
+                                chunk_size):
+                    st = client.get_waveforms_bulk(self.bulk)
+                self._assert_traces_equal(st, expected)
+                for tr in st:
+                    self.assertEqual(tr.stats.mseed.filesize,
+                                     len(self.mseed))
+                    self.assertEqual(
+                        tr.stats._fdsnws_dataselect_url,
+                        server.url + "/fdsnws/dataselect/1/query")
+
+            st = client.get_waveforms("BW", "BGLD", "", "EHE",
+                                      UTCDateTime(1970, 1, 1),
+                                      UTCDateTime(2100, 1, 1))
+            self._assert_traces_equal(st, expected)
+
+            # Writing to files.
+            with NamedTemporaryFile() as tf:
+                client.get_waveforms_bulk(self.bulk, filename=tf.name)
+                with open(tf.name, "rb") as fh:
+                    self.assertEqual(fh.read(), self.mseed)
+            buf = io.BytesIO()
+            client.get_waveforms_bulk(self.bulk, filename=buf)
+            self.assertEqual(buf.getvalue(), self.mseed)
+
+    def test_iter_waveforms_bulk(self):
+        """
+        Traces are yielded as soon as they have been received completely.
+        """
+        responses = {"/fdsnws/dataselect/1/query": [(200, {}, self.mseed)]}
+        expected = read(io.BytesIO(self.mseed))
+        with _LocalHTTPServer(responses) as server:
+            client = Client(server.url, _discover_services=False)
+            with mock.patch("obspy.clients.fdsn.client.MSEED_CHUNK_SIZE",
+                            4096):
+                traces = client.iter_waveforms_bulk(self.bulk, quality="B")
+                # Nothing is downloaded before the first trace is requested.
+                self.assertEqual(server.requests, [])
+                tr = next(traces)
+                self.assertEqual(tr.id, expected[0].id)
+                self.assertEqual(
+                    tr.stats._fdsnws_dataselect_url,
+                    server.url + "/fdsnws/dataselect/1/query")
+                traces = [tr] + list(traces)
+            self._assert_traces_equal(traces, expected)
+            self.assertEqual(server.requests, [
+                ("POST", "/fdsnws/dataselect/1/query",
+                 b"quality=B\nBW BGLD -- EHE 2007-01-01T00:00:00.000000 "
+                 b"2009-01-01T00:00:00.000000")])
+            # MiniSEED is requested without gzip compression.
+            self.assertNotIn(
+                "gzip", server.request_headers[0].get("Accept-Encoding", ""))
+
+
 def suite():
-    return unittest.makeSuite(ClientTestCase, 'test')
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(ClientTestCase, 'test'))
+    suite.addTest(unittest.makeSuite(ClientConnectionPoolTestCase, 'test'))
+    suite.addTest(unittest.makeSuite(ClientStreamingTestCase, 'test'))
+    return suite
 
 
 if __name__ == '__main__':
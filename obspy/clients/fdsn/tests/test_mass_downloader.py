@@ -11,11 +11,14 @@ The obspy.clients.fdsn.download_helpers test suite.
 """
 import collections
 import copy
+import functools
 import logging
 import os
 import shutil
 from socket import timeout as socket_timeout
 import tempfile
+import threading
+import time
 import unittest
 from unittest import mock
 
@@ -30,9 +33,15 @@ from obspy.clients.fdsn.mass_downloader.utils import (
     filter_channel_priority, get_stationxml_filename, get_mseed_filename,
     get_stationxml_contents, SphericalNearestNeighbour, safe_delete,
     download_stationxml, download_and_split_mseed_bulk,
-    _get_stationxml_contents_slow)
+    assign_records_to_intervals, _get_stationxml_contents_slow)
 from obspy.clients.fdsn.mass_downloader.download_helpers import (
     Channel, TimeInterval, Station, STATUS, ClientDownloadHelper)
+from obspy.clients.fdsn.mass_downloader.ledger import (DownloadLedger,
+                                                       get_checksum)
+from obspy.clients.fdsn.mass_downloader.scheduler import DownloadScheduler
+from obspy.clients.fdsn.tests.test_client import _LocalHTTPServer
+from obspy.clients.fdsn.header import (FDSNServiceUnavailableException,
+                                       FDSNTooManyRequestsException)
 
 
 class DomainTestCase(unittest.TestCase):
@@ -838,6 +847,44 @@ class DownloadHelpersUtilTestCase(unittest.TestCase):
         finally:
             shutil.rmtree(tmpdir)
 
+    def test_assign_records_to_intervals(self):
+        """
+        Tests the assignment of records to the requested time intervals.
+        """
+        def assign(records, intervals):
+            records = np.array(records, dtype=np.int64).reshape(-1, 2)
+            intervals = np.array(intervals, dtype=np.int64).reshape(-1, 2)
+            return assign_records_to_intervals(
+                records[:, 0], records[:, 1], intervals[:, 0],
+                intervals[:, 1]).tolist()
+
+        # Adjacent intervals in arbitrary order. Records outside of all
+        # intervals are not assigned. The record overlapping both intervals
+        # belongs to the first as it follows its records.
+        intervals = [10, 20, 0, 10]
+        self.assertEqual(
+            assign([-5, -1, 0, 4, 5, 8, 9, 11, 12, 15, 16, 20, 21, 25],
+                   intervals),
+            [-1, 1, 1, 1, 0, 0, -1])
+        # The same record starting before the end of the previous one
+        # (downloaded twice) belongs to the second interval.
+        self.assertEqual(assign([0, 4, 5, 9, 8, 11, 12, 15], intervals),
+                         [1, 1, 0, 0])
+        # Only the overlapping record of the first interval.
+        self.assertEqual(assign([8, 11, 12, 15], intervals), [0, 0])
+        self.assertEqual(assign([], intervals), [])
+
+        # Overlapping intervals.
+        intervals = [0, 100, 40, 160, 120, 220]
+        self.assertEqual(
+            assign([0, 30, 35, 45, 90, 110, 111, 119, 125, 150, 165, 200],
+                   intervals),
+            [0, 0, 0, 1, 1, 2])
+
+        # Records overlapping more than two intervals.
+        with self.assertRaises(NotImplementedError):
+            assign([10, 12], [0, 10, 10, 12, 12, 20])
+
     def test_stationxml_filename_helper(self):
         """
         Tests the get_stationxml_filename() function.
@@ -2033,6 +2080,41 @@ class ClientDownloadHelperTestCase(unittest.TestCase):
         self.assertEqual([("B", "B"), ("X", "X"), ("Y", "Y")],
                          sorted(rej.keys()))
 
+    @mock.patch("obspy.clients.fdsn.mass_downloader."
+                "download_helpers.ClientDownloadHelper._check_downloaded_data")
+    def test_download_mseed_throttling(self, patch_check_data):
+        """
+        Throttled requests reach the scheduler right away instead of being
+        retried by the client first.
+        """
+        patch_check_data.return_value = (0, 0)
+        with open(os.path.join(self.data, "bulk.mseed"), "rb") as fh:
+            mseed = fh.read()
+        responses = {"/fdsnws/dataselect/1/query": [
+            (429, {}, b"slow down"), (200, {}, mseed)]}
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        st = obspy.UTCDateTime(2015, 1, 1)
+        interval = TimeInterval(st, st + 1800)
+        interval.status = STATUS.NEEDS_DOWNLOADING
+        interval.filename = os.path.join(tempdir, "A.A..BHZ.mseed")
+        with _LocalHTTPServer(responses) as server:
+            self.client = Client(server.url, _discover_services=False)
+            self.client.services = {"dataselect": {}}
+            c = self._init_client()
+            c.stations = {("A", "A"): Station("A", "A", 0, 10, [
+                Channel(location="", channel="BHZ", intervals=[interval])])}
+            with mock.patch(
+                    "obspy.clients.fdsn.mass_downloader.download_helpers."
+                    "DownloadScheduler",
+                    functools.partial(DownloadScheduler, backoff=0.01)):
+                c.download_mseed()
+            self.assertEqual(len(server.requests), 2)
+        self.assertEqual(c.performance_report["throttled_requests"], 1)
+        self.assertEqual(c.performance_report["requests"], 2)
+        # The client itself still retries requests.
+        self.assertEqual(self.client._retries.total, 3)
+
     @mock.patch("obspy.clients.fdsn.mass_downloader."
                 "utils.download_and_split_mseed_bulk")
     @mock.patch("obspy.clients.fdsn.mass_downloader."
@@ -2791,6 +2873,319 @@ class DownloadHelperTestCase(unittest.TestCase):
                        mseed_storage="mseed", stationxml_storage="stationxml")
 
 
+class DownloadSchedulerTestCase(unittest.TestCase):
+    """
+    Test cases for the adaptive scheduling of the MiniSEED downloads.
+    """
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.logger = mock.MagicMock()
+        self.lock = threading.Lock()
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _get_items(self, count, size_in_mb=1.0):
+        t = obspy.UTCDateTime(2015, 1, 1)
+        return [(("XX", "A%i" % _i, "", "BHZ", t, t + 3600,
+                  os.path.join(self.tempdir, "A%i.mseed" % _i)), size_in_mb)
+                for _i in range(count)]
+
+    def _download(self, chunk, delay=0.01, errors=()):
+        """
+        Writes 1000 bytes per bulk line, raises the given errors first.
+        """
+        with self.lock:
+            self.calls.append(chunk)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            error = errors[len(self.calls) - 1] \
+                if len(self.calls) <= len(errors) else None
+        try:
+            time.sleep(delay)
+            if error is not None:
+                raise error
+            for line in chunk:
+                with open(line[-1], "wb") as fh:
+                    fh.write(b"0" * 1000)
+            return [_i[-1] for _i in chunk]
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def test_download_all_items(self):
+        """
+        All items are downloaded once with chunks getting smaller towards the
+        end so all threads have some work.
+        """
+        items = self._get_items(40)
+        scheduler = DownloadScheduler(
+            "A", items, self._download, self.logger, chunk_size_in_mb=8,
+            max_threads=3)
+        report = scheduler.run()
+        lines = [_i for chunk in self.calls for _i in chunk]
+        self.assertEqual(sorted(lines), sorted(_i[0] for _i in items))
+        self.assertLessEqual(self.max_active, 3)
+        self.assertEqual(len(self.calls[0]), 8)
+        self.assertEqual(len(self.calls[-1]), 1)
+        self.assertEqual(report["client"], "A")
+        self.assertEqual(report["requests"], len(self.calls))
+        self.assertEqual(report["bytes"], 40000)
+        self.assertEqual(
+            (report["failed_requests"], report["throttled_requests"]), (0, 0))
+        self.assertEqual(len(report["request_log"]), len(self.calls))
+        self.assertGreater(report["throughput"], 0)
+        self.assertGreater(report["connection_throughput"], 0)
+        self.assertLess(report["latency"], 0.5)
+
+        # At most max_chunk_length lines are requested at once.
+        self.calls = []
+        DownloadScheduler("A", items, self._download, self.logger,
+                          chunk_size_in_mb=100, max_threads=1,
+                          max_chunk_length=15).run()
+        self.assertEqual([len(_i) for _i in self.calls], [15, 15, 10])
+
+    def test_throttling(self):
+        """
+        Throttled chunks are requested again after pausing and with fewer
+        concurrent requests.
+        """
+        items = self._get_items(12)
+        errors = [FDSNTooManyRequestsException("slow down"),
+                  FDSNServiceUnavailableException("busy")]
+        scheduler = DownloadScheduler(
+            "A", items, lambda chunk: self._download(chunk, errors=errors),
+            self.logger, chunk_size_in_mb=2, max_threads=4, backoff=0.1)
+        start = time.time()
+        report = scheduler.run()
+        self.assertGreaterEqual(time.time() - start, 0.1)
+        lines = [_i for chunk in self.calls[2:] for _i in chunk]
+        self.assertEqual(sorted(lines), sorted(_i[0] for _i in items))
+        self.assertEqual(report["throttled_requests"], 2)
+        self.assertEqual(report["bytes"], 12000)
+        statuses = [_i["status"] for _i in report["request_log"]]
+        self.assertEqual(statuses[:2], ["throttled", "throttled"])
+        # Back to full concurrency after the successful requests.
+        self.assertEqual(report["concurrency"], 4)
+        self.assertEqual(self.logger.error.call_count, 0)
+
+        # Giving up after too many attempts.
+        self.calls = []
+        errors = [FDSNServiceUnavailableException("busy")] * 3
+        scheduler = DownloadScheduler(
+            "A", items[:1], lambda chunk: self._download(chunk, errors=errors),
+            self.logger, max_attempts=3, backoff=0.01)
+        report = scheduler.run()
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(report["throttled_requests"], 3)
+        self.assertEqual(report["concurrency"], 1)
+        self.assertEqual(self.logger.error.call_count, 1)
+
+        # Unexpected errors are raised.
+        self.calls = []
+        errors = [ValueError("spam")]
+        scheduler = DownloadScheduler(
+            "A", items, lambda chunk: self._download(chunk, errors=errors),
+            self.logger, chunk_size_in_mb=2, max_threads=1)
+        with self.assertRaises(ValueError):
+            scheduler.run()
+        self.assertEqual(len(self.calls), 1)
+
+    def test_chunk_size_adapts_to_throughput(self):
+        """
+        Chunks get smaller for slow data centers and failed requests do not
+        count towards the throughput.
+        """
+        items = self._get_items(30)
+        with mock.patch("obspy.clients.fdsn.mass_downloader.scheduler."
+                        "TARGET_REQUEST_DURATION", 0.05):
+            scheduler = DownloadScheduler(
+                "A", items,
+                lambda chunk: self._download(chunk, delay=0.02 * len(chunk)),
+                self.logger, chunk_size_in_mb=10, max_threads=1)
+            report = scheduler.run()
+        self.assertEqual(len(self.calls[0]), 10)
+        # About 2.5 lines per request are needed for the target duration.
+        self.assertLess(report["chunk_size_in_mb"], 5)
+        self.assertLess(max(len(_i) for _i in self.calls[1:]), 5)
+        self.assertAlmostEqual(
+            report["connection_throughput"], 1000 / 0.02, delta=20000)
+
+        failed = DownloadScheduler("A", items, lambda chunk: None,
+                                   self.logger).run()
+        self.assertEqual(failed["failed_requests"], failed["requests"])
+        self.assertEqual(failed["bytes"], 0)
+        self.assertIsNone(failed["connection_throughput"])
+        self.assertEqual(failed["chunk_size_in_mb"], 20)
+
+
+class DownloadLedgerTestCase(unittest.TestCase):
+    """
+    Test cases for the ledger of downloaded files.
+    """
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.data = os.path.join(os.path.dirname(__file__), "data")
+        self.ledger_file = os.path.join(self.tempdir, "ledger.sqlite")
+        self.mseed_storage = os.path.join(self.tempdir, "waveforms")
+        self.stationxml_storage = os.path.join(self.tempdir, "stations")
+        self.stationxml_file = os.path.join(self.stationxml_storage,
+                                            "AU.MEEK.xml")
+        self.t = obspy.UTCDateTime(2005, 1, 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _create_station(self):
+        intervals = [TimeInterval(self.t + _i * 60, self.t + (_i + 1) * 60)
+                     for _i in range(3)]
+        return Station("AU", "MEEK", 0, 0, [
+            Channel("", "SHE", copy.deepcopy(intervals)),
+            Channel("", "SHZ", copy.deepcopy(intervals))])
+
+    def _create_helper(self, ledger):
+        helper = ClientDownloadHelper(
+            client=mock.MagicMock(), client_name="A",
+            restrictions=Restrictions(
+                starttime=self.t, endtime=self.t + 180,
+                reject_channels_with_gaps=False, minimum_length=0.0),
+            domain=domain.GlobalDomain(), mseed_storage=self.mseed_storage,
+            stationxml_storage=self.stationxml_storage,
+            logger=mock.MagicMock(), ledger=ledger)
+        helper.stations = {("AU", "MEEK"): self._create_station()}
+        return helper
+
+    def _write_mseed(self, chunk):
+        for line in chunk:
+            tr = obspy.Trace(np.arange(60, dtype=np.int32), header={
+                "network": line[0], "station": line[1], "location": line[2],
+                "channel": line[3], "starttime": line[4]})
+            tr.write(line[6], format="MSEED")
+        return [_i[6] for _i in chunk]
+
+    def test_ledger(self):
+        """
+        Tests storing and querying the status of files.
+        """
+        ledger = DownloadLedger(self.ledger_file)
+        t = self.t
+        ledger.set_mseed_status([
+            ("a.mseed", "XX", "A", "", "BHZ", t, t + 10, "downloaded", "B",
+             10, "abc"),
+            ("b.mseed", "XX", "A", "", "BHZ", t + 10, t + 20, "exists", None,
+             None, None),
+            ("c.mseed", "XX", "A", "", "BHZ", t + 20, t + 30,
+             "download_failed", "B", None, None),
+            ("d.mseed", "XX", "B", "", "BHZ", t, t + 10, "downloaded", "B",
+             10, "def")])
+        self.assertEqual(ledger.get_existing_mseed_files("XX", "A"),
+                         {"a.mseed", "b.mseed"})
+        self.assertEqual(ledger.get_existing_mseed_files("XX", "C"), set())
+        records = ledger.get_mseed_records(station="A", status="downloaded")
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["starttime"], t)
+        self.assertEqual(
+            (records[0]["provider"], records[0]["size"],
+             records[0]["checksum"]), ("B", 10, "abc"))
+
+        contents = get_stationxml_contents(
+            os.path.join(self.data, "AU.MEEK.xml"))
+        self.assertIsNone(ledger.get_stationxml_contents("AU.MEEK.xml"))
+        ledger.set_stationxml_status("AU.MEEK.xml", "AU", "MEEK", "exists",
+                                     contents=contents)
+        self.assertEqual(
+            [_i[:6] for _i in ledger.get_stationxml_contents("AU.MEEK.xml")],
+            [_i[:6] for _i in contents])
+        ledger.set_stationxml_status("AU.MEEK.xml", "AU", "MEEK",
+                                     "download_rejected")
+        self.assertIsNone(ledger.get_stationxml_contents("AU.MEEK.xml"))
+
+        # The ledger is persistent.
+        ledger = DownloadLedger(self.ledger_file)
+        self.assertEqual(ledger.get_statistics(), {
+            "mseed": {"downloaded": 2, "exists": 1, "download_failed": 1},
+            "stationxml": {"download_rejected": 1}})
+
+    @mock.patch("obspy.clients.fdsn.mass_downloader."
+                "utils.download_and_split_mseed_bulk")
+    def test_resume_with_ledger(self, patch_download):
+        """
+        Downloads are recorded in the ledger and later runs look up existing
+        files in the ledger instead of the storage.
+        """
+        patch_download.side_effect = \
+            lambda client, client_name, chunk, logger: self._write_mseed(chunk)
+        ledger = DownloadLedger(self.ledger_file)
+        helper = self._create_helper(ledger)
+        # One file already exists.
+        station = helper.stations[("AU", "MEEK")]
+        existing = station.channels[0].intervals[0]
+        os.makedirs(self.mseed_storage)
+        self._write_mseed([("AU", "MEEK", "", "SHE", existing.start,
+                            existing.end, os.path.join(
+                                self.mseed_storage,
+                                "AU.MEEK..SHE__20050101T000000Z__"
+                                "20050101T000100Z.mseed"))])
+        helper.prepare_mseed_download()
+        self.assertEqual(existing.status, STATUS.EXISTS)
+        helper.download_mseed()
+        records = ledger.get_mseed_records(status="downloaded")
+        self.assertEqual(len(records), 5)
+        for record in records:
+            self.assertEqual(record["provider"], "A")
+            self.assertEqual(record["size"],
+                             os.path.getsize(record["filename"]))
+            self.assertEqual(record["checksum"],
+                             get_checksum(record["filename"]))
+        self.assertEqual(ledger.get_statistics()["mseed"],
+                         {"downloaded": 5, "exists": 1})
+
+        # Station information existing before the first run is parsed once
+        # and added to the ledger.
+        os.makedirs(self.stationxml_storage)
+        shutil.copy(os.path.join(self.data, "AU.MEEK.xml"),
+                    self.stationxml_file)
+        helper.prepare_stationxml_download()
+        self.assertEqual(ledger.get_statistics()["stationxml"],
+                         {"exists": 1})
+        # The file has no information about the SHZ channel.
+        self.assertEqual(station.stationxml_status, STATUS.NEEDS_DOWNLOADING)
+
+        # The next run does not need to check the storage.
+        helper = self._create_helper(ledger)
+        station = helper.stations[("AU", "MEEK")]
+        with mock.patch("os.path.exists") as p_exists, \
+                mock.patch("obspy.clients.fdsn.mass_downloader.utils."
+                           "get_stationxml_contents") as p_contents:
+            helper.prepare_mseed_download()
+            for channel in station.channels:
+                for interval in channel.intervals:
+                    interval.status = STATUS.EXISTS
+            helper.prepare_stationxml_download()
+        # Only the storage directory is checked, not the files.
+        self.assertEqual(p_exists.call_args_list,
+                         [mock.call(self.stationxml_storage)])
+        self.assertEqual(p_contents.call_count, 0)
+        self.assertEqual(station.stationxml_status, STATUS.NEEDS_DOWNLOADING)
+
+        # Deleted files are recorded.
+        for channel in station.channels:
+            for interval in channel.intervals:
+                interval.status = STATUS.DOWNLOADED
+        station.remove_files(logger=mock.MagicMock(), reason="Testing",
+                             ledger=ledger)
+        self.assertEqual(ledger.get_statistics()["mseed"],
+                         {"download_rejected": 6})
+        helper = self._create_helper(ledger)
+        helper.prepare_mseed_download()
+        for channel in helper.stations[("AU", "MEEK")].channels:
+            for interval in channel.intervals:
+                self.assertEqual(interval.status, STATUS.NEEDS_DOWNLOADING)
+
+
 def suite():
     testsuite = unittest.TestSuite()
     testsuite.addTest(unittest.makeSuite(DomainTestCase, 'test'))
@@ -2801,6 +3196,8 @@ def suite():
     testsuite.addTest(unittest.makeSuite(DownloadHelperTestCase, 'test'))
     testsuite.addTest(unittest.makeSuite(ClientDownloadHelperTestCase, 'test'))
     testsuite.addTest(unittest.makeSuite(RestrictionsTestCase, 'test'))
+    testsuite.addTest(unittest.makeSuite(DownloadSchedulerTestCase, 'test'))
+    testsuite.addTest(unittest.makeSuite(DownloadLedgerTestCase, 'test'))
     return testsuite
 
 
@@ -11,7 +11,11 @@ For simple requests of finite time windows see
 data streams see
 :class:`~obspy.clients.seedlink.easyseedlink.EasySeedLinkClient`, or for
 lower-level packet handling see
-:class:`~obspy.clients.seedlink.slclient.SLClient`.
+:class:`~obspy.clients.seedlink.slclient.SLClient`. Many streams of one or more
+servers can be received concurrently in an asyncio event loop with
+:class:`~obspy.clients.seedlink.async_client.AsyncClient`. High rates of
+packets can be decoded in bulk into per-stream ring buffers with
+:class:`~obspy.clients.seedlink.packetdecoder.PacketDecoder`.
 
 :copyright:
     The ObsPy Development Team (devs@obspy.org) & Anthony Lomax
@@ -29,6 +33,8 @@ mining".
 from .basic_client import Client  # NOQA
 from .slclient import SLClient  # NOQA
 from .easyseedlink import EasySeedLinkClient  # NOQA
+from .async_client import AsyncClient  # NOQA
+from .packetdecoder import PacketDecoder  # NOQA
 
 if __name__ == '__main__':
     import doctest
@@ -0,0 +1,518 @@
+# -*- coding: utf-8 -*-
+"""
+Asynchronous SeedLink client receiving many streams of multiple servers in a
+single event loop.
+
+:copyright:
+    The ObsPy Development Team (devs@obspy.org)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+import asyncio
+import fnmatch
+import inspect
+import io
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from obspy import UTCDateTime, read
+from .seedlinkexception import SeedLinkException
+from .slpacket import SLPacket
+
+
+logger = logging.getLogger('obspy.clients.seedlink')
+
+DEFAULT_PORT = 18000
+
+
+def _decode_records(data):
+    """
+    Decodes concatenated MiniSEED records into a stream. Runs in the worker
+    pool of the client, so it has to be a picklable module level function.
+    """
+    return read(io.BytesIO(data), format="MSEED")
+
+
+def _parse_server(server):
+    """
+    Returns host name and port of a SeedLink server given as ``host``,
+    ``host:port`` or ``seedlink://host:port``.
+    """
+    if '://' not in server and not server.startswith('//'):
+        server = '//' + server
+    parsed = urlparse(server, scheme='seedlink')
+    if parsed.scheme != 'seedlink':
+        msg = 'Unsupported scheme %s (expected "seedlink")' % parsed.scheme
+        raise ValueError(msg)
+    if not parsed.hostname:
+        raise ValueError('No host name provided')
+    return parsed.hostname, parsed.port or DEFAULT_PORT
+
+
+def _match_selector(selector, location, channel):
+    """
+    Checks if a SeedLink selector (``[LL]CCC[.T]`` with ``?`` as wildcard
+    and ``-`` for blank location codes) matches a location and channel code.
+    """
+    selector = selector.split(".")[0]
+    if len(selector) > 3:
+        location_pattern = selector[:-3].replace("-", " ")
+        channel_pattern = selector[-3:]
+    else:
+        location_pattern = "*"
+        channel_pattern = selector
+    location = location.ljust(2)
+    return fnmatch.fnmatchcase(location, location_pattern) and \
+        fnmatch.fnmatchcase(channel, channel_pattern)
+
+
+class _Selection(object):
+    """
+    A stream selection with its callback and the records waiting to be
+    decoded and delivered.
+    """
+    def __init__(self, network, station, selectors, callback):
+        self.network = network
+        self.station = station
+        self.selectors = selectors
+        self.callback = callback
+        self.records = []
+        self._timer = None
+        self._deliveries = None
+
+    def matches(self, network, station, location, channel):
+        if not fnmatch.fnmatchcase(network, self.network) or \
+                not fnmatch.fnmatchcase(station, self.station):
+            return False
+        if not self.selectors:
+            return True
+        positive = [_i for _i in self.selectors if not _i.startswith("!")]
+        negative = [_i[1:] for _i in self.selectors if _i.startswith("!")]
+        if positive and not any(_match_selector(_i, location, channel)
+                                for _i in positive):
+            return False
+        return not any(_match_selector(_i, location, channel)
+                       for _i in negative)
+
+    def start(self, loop, executor, batch_size, batch_interval):
+        """
+        Starts the task delivering the decoded batches to the callback.
+        """
+        self._loop = loop
+        self._executor = executor
+        self._batch_size = batch_size
+        self._batch_interval = batch_interval
+        self._deliveries = asyncio.Queue()
+        return loop.create_task(self._deliver())
+
+    def add(self, record):
+        self.records.append(record)
+        if len(self.records) >= self._batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = self._loop.call_later(self._batch_interval,
+                                                self.flush)
+
+    def flush(self):
+        """
+        Sends the buffered records to the worker pool for decoding.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self.records:
+            return
+        data = b"".join(self.records)
+        self.records = []
+        self._deliveries.put_nowait(self._loop.run_in_executor(
+            self._executor, _decode_records, data))
+
+    def close(self):
+        self.flush()
+        self._deliveries.put_nowait(None)
+
+    async def _deliver(self):
+        # Batches are delivered in order, while later batches may already be
+        # decoded concurrently.
+        while True:
+            future = await self._deliveries.get()
+            if future is None:
+                return
+            try:
+                st = await future
+            except Exception as e:
+                logger.error("Could not decode records of %s.%s: %s" % (
+                    self.network, self.station, e))
+                continue
+            result = self.callback(st)
+            if inspect.isawaitable(result):
+                await result
+
+
+class _Station(object):
+    """
+    A station negotiated with a server and the selections receiving its
+    data.
+    """
+    def __init__(self, network, station, starttime, endtime):
+        self.network = network
+        self.station = station
+        self.starttime = starttime
+        self.endtime = endtime
+        self.selections = []
+        # Sequence number of the last received packet.
+        self.seqnum = None
+
+    @property
+    def selectors(self):
+        """
+        The union of the selectors of all selections, an empty list if any
+        selection wants all streams of the station.
+        """
+        selectors = []
+        for selection in self.selections:
+            if not selection.selectors:
+                return []
+            selectors.extend(_i for _i in selection.selectors
+                             if _i not in selectors)
+        return selectors
+
+    def get_action(self):
+        """
+        Returns the DATA or TIME command requesting the data.
+        """
+        if self.endtime is None and self.seqnum is not None:
+            # Resume after the last received packet.
+            return b"DATA %06X" % ((self.seqnum + 1) % 0x1000000)
+        if self.starttime is not None:
+            command = "TIME " + self.starttime.format_seedlink()
+            if self.endtime is not None:
+                command += " " + self.endtime.format_seedlink()
+            return command.encode()
+        return b"DATA"
+
+
+class _Connection(object):
+    """
+    Connection to a single SeedLink server in multi-station mode.
+    """
+    def __init__(self, client, host, port):
+        self.client = client
+        self.host = host
+        self.port = port
+        self.stations = OrderedDict()
+        self._lookup = {}
+        self._writer = None
+
+    @property
+    def address(self):
+        return "%s:%i" % (self.host, self.port)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    async def run(self):
+        while True:
+            try:
+                await self._stream()
+                return
+            except (OSError, EOFError, asyncio.IncompleteReadError,
+                    asyncio.TimeoutError) as e:
+                if self.client._stopped:
+                    return
+                if self.client.reconnect_delay is None:
+                    raise
+                logger.warning(
+                    "Connection to %s lost (%s), reconnecting in %s s." % (
+                        self.address, e.__class__.__name__,
+                        self.client.reconnect_delay))
+            finally:
+                self.close()
+                self._writer = None
+            await asyncio.sleep(self.client.reconnect_delay)
+            if self.client._stopped:
+                return
+
+    async def _read(self, coroutine):
+        return await asyncio.wait_for(coroutine, self.client.timeout)
+
+    async def _command(self, reader, command):
+        logger.debug("%s: sending %s" % (self.address, command))
+        self._writer.write(command + b"\r")
+        return (await self._read(reader.readuntil(b"\r\n")))[:-2]
+
+    async def _negotiate(self, reader):
+        await self._command(reader, b"HELLO")
+        # Second line of the HELLO response.
+        await self._read(reader.readuntil(b"\r\n"))
+        accepted = 0
+        for station in self.stations.values():
+            response = await self._command(reader, b"STATION %s %s" % (
+                station.station.encode(), station.network.encode()))
+            if response != b"OK":
+                logger.error("%s: station %s.%s not accepted" % (
+                    self.address, station.network, station.station))
+                continue
+            for selector in station.selectors:
+                response = await self._command(
+                    reader, b"SELECT " + selector.encode())
+                if response != b"OK":
+                    logger.error("%s: selector %s of %s.%s not accepted" % (
+                        self.address, selector, station.network,
+                        station.station))
+            response = await self._command(reader, station.get_action())
+            if response != b"OK":
+                logger.error("%s: data request of %s.%s not accepted" % (
+                    self.address, station.network, station.station))
+                continue
+            accepted += 1
+        if not accepted:
+            raise SeedLinkException("no stations accepted by %s" %
+                                    self.address)
+        self._writer.write(b"END\r")
+
+    def _get_stations(self, network, station):
+        key = (network, station)
+        if key not in self._lookup:
+            self._lookup[key] = [
+                _i for _i in self.stations.values()
+                if fnmatch.fnmatchcase(network, _i.network) and
+                fnmatch.fnmatchcase(station, _i.station)]
+        return self._lookup[key]
+
+    async def _stream(self):
+        reader, self._writer = await self._read(
+            asyncio.open_connection(self.host, self.port))
+        await self._negotiate(reader)
+        info_length = len(SLPacket.INFOSIGNATURE)
+        packet_size = SLPacket.SLHEADSIZE + SLPacket.SLRECSIZE
+        while True:
+            try:
+                start = await self._read(reader.readexactly(3))
+            except asyncio.IncompleteReadError as e:
+                # Connection closed after the end of the data.
+                if self.client._stopped or not e.partial:
+                    raise
+                start = e.partial
+            if start == SLPacket.ENDSIGNATURE:
+                logger.info("%s: end of selected time windows" %
+                            self.address)
+                return
+            if start == SLPacket.ERRORSIGNATURE[:3]:
+                raise SeedLinkException("%s reported an error" %
+                                        self.address)
+            packet = start + await self._read(
+                reader.readexactly(packet_size - 3))
+            if packet[:info_length] == SLPacket.INFOSIGNATURE:
+                continue
+            if packet[:2] != SLPacket.SIGNATURE:
+                raise SeedLinkException("%s: invalid packet header %r" % (
+                    self.address, packet[:SLPacket.SLHEADSIZE]))
+            seqnum = int(packet[2:SLPacket.SLHEADSIZE], 16)
+            record = packet[SLPacket.SLHEADSIZE:]
+            network = record[18:20].decode().strip()
+            station = record[8:13].decode().strip()
+            location = record[13:15].decode().strip()
+            channel = record[15:18].decode().strip()
+            for sta in self._get_stations(network, station):
+                if sta.endtime is not None and sta.seqnum is not None and \
+                        seqnum <= sta.seqnum:
+                    # Already received before reconnecting.
+                    continue
+                sta.seqnum = seqnum
+                for selection in sta.selections:
+                    if selection.matches(network, station, location,
+                                         channel):
+                        selection.add(record)
+
+
+class AsyncClient(object):
+    """
+    Asynchronous SeedLink client receiving many streams of one or more
+    SeedLink servers in a single event loop.
+
+    Each server is connected once in multi-station mode, no matter how many
+    streams are selected. Received records are collected per selection and
+    decoded in batches in a worker pool, so the event loop only routes
+    packets. The decoded traces of each batch are passed as a
+    :class:`~obspy.core.stream.Stream` to the callback of the selection, in
+    the order they have been received. Callbacks can be coroutine functions
+    or normal functions. Lost connections are reestablished, resuming after
+    the last received packet of each station.
+
+    .. code-block:: python
+
+        import asyncio
+        from obspy.clients.seedlink import AsyncClient
+
+        async def handle_data(st):
+            print(st)
+
+        client = AsyncClient()
+        client.select_stream('geofon.gfz-potsdam.de', 'GE', 'STU', 'BH?',
+                             callback=handle_data)
+        client.select_stream('rtserve.iris.washington.edu:18000', 'IU',
+                             'ANMO', '00BHZ', callback=handle_data)
+        asyncio.run(client.run())
+
+    :type batch_size: int
+    :param batch_size: Maximum number of records decoded and delivered at
+        once for a selection.
+    :type batch_interval: float
+    :param batch_interval: Maximum time in seconds a received record waits
+        for further records of the same selection before it is decoded and
+        delivered.
+    :type decode_workers: int
+    :param decode_workers: Number of threads decoding the records.
+    :type executor: :class:`concurrent.futures.Executor`
+    :param executor: Executor decoding the records instead of a thread pool
+        with ``decode_workers`` threads, e.g. a
+        :class:`~concurrent.futures.ProcessPoolExecutor`. It is not shut
+        down by the client.
+    :type timeout: float
+    :param timeout: Time in seconds after which a connection without any
+        received data is considered lost. ``None`` waits forever.
+    :type reconnect_delay: float
+    :param reconnect_delay: Time in seconds to wait before reconnecting
+        after a lost connection. ``None`` raises the error instead.
+    """
+    def __init__(self, batch_size=20, batch_interval=1.0, decode_workers=4,
+                 executor=None, timeout=None, reconnect_delay=10.0):
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.decode_workers = decode_workers
+        self.executor = executor
+        self.timeout = timeout
+        self.reconnect_delay = reconnect_delay
+        self._connections = OrderedDict()
+        self._selections = []
+        self._stopped = False
+
+    def __str__(self):
+        return "AsyncClient(%i selection(s) of %i server(s))" % (
+            len(self._selections), len(self._connections))
+
+    def _repr_pretty_(self, p, cycle):
+        p.text(str(self))
+
+    def select_stream(self, server, network, station, selectors=None,
+                      callback=None, starttime=None, endtime=None):
+        """
+        Selects streams of a station to receive.
+
+        Can be called multiple times before :meth:`run`, with the same or
+        different servers and callbacks.
+
+        :type server: str
+        :param server: The SeedLink server as ``host`` or ``host:port``.
+        :type network: str
+        :param network: The network code. Can contain wildcards if
+            supported by the server.
+        :type station: str
+        :param station: The station code. Can contain wildcards if supported
+            by the server.
+        :type selectors: str or list of str
+        :param selectors: SeedLink selectors like ``BHZ``, ``00BH?`` or
+            ``BHZ.D``, either space separated or as a list. All streams of
+            the station are received if not given.
+        :type callback: callable
+        :param callback: Called with a :class:`~obspy.core.stream.Stream`
+            of each decoded batch of the selected streams. Defaults to
+            :meth:`on_data`.
+        :type starttime: :class:`~obspy.core.utcdatetime.UTCDateTime`
+        :param starttime: Request data from this time on instead of the
+            next available data.
+        :type endtime: :class:`~obspy.core.utcdatetime.UTCDateTime`
+        :param endtime: Request data up to this time only (requires
+            ``starttime``). The connection ends once the time windows of all
+            its stations are complete.
+        """
+        if endtime is not None and starttime is None:
+            raise ValueError("endtime requires a starttime")
+        if isinstance(selectors, str):
+            selectors = selectors.split()
+        starttime = UTCDateTime(starttime) if starttime is not None else None
+        endtime = UTCDateTime(endtime) if endtime is not None else None
+        host, port = _parse_server(server)
+        connection = self._connections.setdefault(
+            (host, port), _Connection(self, host, port))
+        key = (network, station)
+        if key not in connection.stations:
+            connection.stations[key] = _Station(network, station, starttime,
+                                                endtime)
+        sta = connection.stations[key]
+        if (sta.starttime, sta.endtime) != (starttime, endtime):
+            msg = ("All selections of station %s.%s of a server must "
+                   "request the same time window." % key)
+            raise ValueError(msg)
+        selection = _Selection(network, station, selectors or [],
+                               callback or self.on_data)
+        sta.selections.append(selection)
+        self._selections.append(selection)
+
+    async def run(self):
+        """
+        Receives the selected streams of all servers until :meth:`stop` is
+        called or the time windows of all connections are complete.
+        """
+        if not self._selections:
+            raise ValueError("No streams selected. Use select_stream() to "
+                             "select a stream.")
+        self._stopped = False
+        loop = asyncio.get_event_loop()
+        executor = self.executor or ThreadPoolExecutor(self.decode_workers)
+        deliveries = [_i.start(loop, executor, self.batch_size,
+                               self.batch_interval)
+                      for _i in self._selections]
+        connections = asyncio.gather(*[
+            _i.run() for _i in self._connections.values()])
+        try:
+            # Wait for all connections to end or a callback to fail.
+            await asyncio.wait([connections] + deliveries,
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if not connections.done():
+                connections.cancel()
+                try:
+                    await connections
+                except BaseException:
+                    pass
+            for selection in self._selections:
+                selection.close()
+            results = await asyncio.gather(*deliveries,
+                                           return_exceptions=True)
+            if self.executor is None:
+                executor.shutdown(wait=False)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        connections.result()
+
+    def stop(self):
+        """
+        Closes all connections. :meth:`run` returns after the remaining
+        records have been decoded and delivered.
+        """
+        self._stopped = True
+        for connection in self._connections.values():
+            connection.close()
+
+    def on_data(self, st):
+        """
+        Default callback for selections without a callback.
+
+        Override this in a subclass to handle the received data.
+
+        :type st: :class:`~obspy.core.stream.Stream`
+        :param st: The traces of a batch of received records.
+        """
+        pass
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(exclude_empty=True)
@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+"""
+Decoding of many SeedLink packets at once into per-stream ring buffers.
+
+:copyright:
+    The ObsPy Development Team (devs@obspy.org)
+:license:
+    GNU Lesser General Public License, Version 3
+    (https://www.gnu.org/copyleft/lesser.html)
+"""
+import ctypes as C  # NOQA
+import io
+import logging
+import sys
+
+import numpy as np
+
+from obspy import Stream, Trace, UTCDateTime, read
+from obspy.io.mseed.headers import ENCODINGS, clibmseed
+from obspy.io.mseed.util import (_decode_header_field, _get_record_table,
+                                 _parse_record_headers)
+from .slpacket import SLPacket
+
+
+logger = logging.getLogger('obspy.clients.seedlink')
+
+# Uncompressed encodings decoded directly with numpy.
+UNCOMPRESSED_ENCODINGS = {1: "i2", 3: "i4", 4: "f4", 5: "f8"}
+
+
+def _get_steim_decoder(name):
+    """
+    Returns a separate function pointer of a libmseed Steim decoding
+    function taking the output buffer as plain address, which avoids the
+    argument checks of the shared declaration for every record.
+    """
+    func = clibmseed.lib[name]
+    func.argtypes = [C.c_void_p, C.c_int, C.c_int, C.c_void_p, C.c_int,
+                     C.c_char_p, C.c_int]
+    func.restype = C.c_int
+    return func
+
+
+# Steim encodings decoded with libmseed.
+STEIM_ENCODINGS = {10: _get_steim_decoder("msr_decode_steim1"),
+                   11: _get_steim_decoder("msr_decode_steim2")}
+
+_BIG_ENDIAN_HOST = sys.byteorder == "big"
+
+
+class RingBuffer(object):
+    """
+    Preallocated buffer holding the latest samples of a stream.
+
+    The samples of a batch of records are always stored contiguously and a
+    batch not fitting at the end of the buffer starts again at its
+    beginning. A view of a batch of ``n`` samples therefore stays valid for
+    at least ``capacity - n - m`` further samples, with ``m`` the size of
+    the largest following batch, e.g. for ``capacity - 2 * n`` further
+    samples if all batches have the same size.
+
+    :type seed_id: str
+    :param seed_id: The SEED id of the stream.
+    :type sampling_rate: float
+    :param sampling_rate: The sampling rate of the stream.
+    :type dtype: :class:`numpy.dtype`
+    :param dtype: The sample type of the buffer.
+    :type capacity: int
+    :param capacity: The size of the buffer in samples.
+    """
+    def __init__(self, seed_id, sampling_rate, dtype, capacity):
+        self.id = seed_id
+        self.sampling_rate = sampling_rate
+        self.data = np.empty(capacity, dtype=dtype)
+        self.position = 0
+
+    def __str__(self):
+        return "RingBuffer(%s, %i samples of %s)" % (
+            self.id, len(self.data), self.data.dtype)
+
+    def _repr_pretty_(self, p, cycle):
+        p.text(str(self))
+
+    def reserve(self, npts):
+        """
+        Reserves space for ``npts`` contiguous samples and returns the index
+        of the first one, wrapping around at the end of the buffer.
+        """
+        if npts > len(self.data):
+            raise ValueError("%i samples do not fit in the buffer of %s" %
+                             (npts, self.id))
+        if self.position + npts > len(self.data):
+            self.position = 0
+        start = self.position
+        self.position += npts
+        return start
+
+
+class PacketDecoder(object):
+    """
+    Decodes SeedLink packets in bulk into preallocated per-stream ring
+    buffers.
+
+    Instead of building a :class:`~obspy.core.trace.Trace` for every 512
+    byte packet like :meth:`SLPacket.get_trace()
+    <obspy.clients.seedlink.slpacket.SLPacket.get_trace>`, the headers of
+    all packets of a buffer are parsed at once with numpy and the samples
+    are decoded straight into a :class:`RingBuffer` per stream:
+    uncompressed data with numpy, Steim compressed data with libmseed
+    without intermediate copies. Time contiguous records of a stream are
+    returned as a single segment, a tuple of the SEED id, the start time as
+    :class:`~obspy.core.utcdatetime.UTCDateTime` and a numpy view of the
+    samples in the ring buffer. Traces are only created on request with
+    :meth:`to_trace` or :meth:`get_stream`.
+
+    >>> from obspy.clients.seedlink.packetdecoder import PacketDecoder
+    >>> decoder = PacketDecoder(capacity=100000)
+    >>> segments = decoder.decode(packets)  # doctest: +SKIP
+    >>> for seed_id, starttime, data in segments:  # doctest: +SKIP
+    ...     print(seed_id, starttime, data.max())
+    >>> st = decoder.get_stream(segments)  # doctest: +SKIP
+
+    :type capacity: int
+    :param capacity: The size of the ring buffer of each stream in samples.
+        The views of the returned segments are only guaranteed to stay
+        valid for ``capacity`` minus the samples of the stream in the
+        current and the next batch further samples, see
+        :class:`RingBuffer`. If a batch holds more than ``capacity`` samples
+        of a stream, only its latest records fitting in the buffer are
+        decoded and the older ones are dropped with a warning.
+    """
+    def __init__(self, capacity=2 ** 16):
+        self.capacity = capacity
+        self.buffers = {}
+        self._ids = {}
+
+    def __str__(self):
+        return "PacketDecoder(%i stream(s), capacity %i)" % (
+            len(self.buffers), self.capacity)
+
+    def _repr_pretty_(self, p, cycle):
+        p.text(str(self))
+
+    def decode(self, data):
+        """
+        Decodes concatenated SeedLink packets (an 8 byte SeedLink header
+        followed by a 512 byte MiniSEED record each) and returns the
+        segments of decoded samples. INFO packets are skipped.
+
+        :type data: bytes, bytearray or :class:`numpy.ndarray`
+        :param data: The packets.
+        :rtype: list of tuples
+        """
+        data = np.frombuffer(data, dtype=np.uint8)
+        packet_size = SLPacket.SLHEADSIZE + SLPacket.SLRECSIZE
+        if len(data) % packet_size:
+            msg = "Data does not consist of complete SeedLink packets."
+            raise ValueError(msg)
+        packets = data.reshape(-1, packet_size)
+        signature = np.frombuffer(SLPacket.SIGNATURE, dtype=np.uint8)
+        if not (packets[:, :2] == signature).all():
+            raise ValueError("Invalid SeedLink packet signature.")
+        info = np.frombuffer(SLPacket.INFOSIGNATURE, dtype=np.uint8)
+        is_info = (packets[:, :len(info)] == info).all(axis=1)
+        offsets = np.flatnonzero(~is_info) * packet_size + \
+            SLPacket.SLHEADSIZE
+        return self._decode(data, _parse_record_headers(
+            data, offsets, SLPacket.SLRECSIZE))
+
+    def decode_records(self, data):
+        """
+        Decodes concatenated MiniSEED records and returns the segments of
+        decoded samples.
+
+        :type data: bytes, bytearray or :class:`numpy.ndarray`
+        :param data: The records.
+        :rtype: list of tuples
+        """
+        data = np.frombuffer(data, dtype=np.uint8)
+        return self._decode(data, _get_record_table(data))
+
+    def to_trace(self, segment, copy=True):
+        """
+        Creates a trace of a segment.
+
+        :type segment: tuple
+        :param segment: A segment returned by :meth:`decode`.
+        :type copy: bool
+        :param copy: Copy the samples. Otherwise the data of the trace is
+            the view into the ring buffer, which is overwritten later on.
+        """
+        seed_id, starttime, data = segment
+        network, station, location, channel = seed_id.split(".")
+        return Trace(data=data.copy() if copy else data, header={
+            "network": network, "station": station, "location": location,
+            "channel": channel, "starttime": starttime,
+            "sampling_rate": self.buffers[seed_id].sampling_rate})
+
+    def get_stream(self, segments, copy=True):
+        """
+        Creates a stream of segments.
+
+        :type segments: list of tuples
+        :param segments: Segments returned by :meth:`decode`.
+        :type copy: bool
+        :param copy: Copy the samples, see :meth:`to_trace`.
+        """
+        return Stream(traces=[self.to_trace(_i, copy=copy)
+                              for _i in segments])
+
+    def _get_id(self, raw_id):
+        if raw_id not in self._ids:
+            raw_id_ = raw_id.ljust(12)
+            self._ids[raw_id] = ".".join(
+                _decode_header_field(name, raw_id_[a:b].strip())
+                for name, a, b in (("network", 10, 12), ("station", 0, 5),
+                                   ("location", 5, 7), ("channel", 7, 10)))
+        return self._ids[raw_id]
+
+    def _get_buffer(self, seed_id, sampling_rate, encoding):
+        buf = self.buffers.get(seed_id)
+        if buf is None:
+            dtype = ENCODINGS[encoding][2] if encoding in ENCODINGS \
+                else np.int32
+            buf = RingBuffer(seed_id, sampling_rate, dtype, self.capacity)
+            self.buffers[seed_id] = buf
+        return buf
+
+    def _decode(self, data, table):
+        # Records without samples, e.g. ASCII log records.
+        table = table[(table["npts"] > 0) & (table["sampling_rate"] > 0) &
+                      (table["encoding"] != 0)]
+        # Records with corrupt headers, i.e. with the data section inside
+        # the fixed header or more uncompressed samples than fit in the
+        # record. libmseed checks the sample count of Steim compressed
+        # records itself.
+        size = table["record_length"] - table["data_offset"]
+        itemsize = np.zeros(len(table), dtype=np.int64)
+        for encoding, sample_type in UNCOMPRESSED_ENCODINGS.items():
+            itemsize[table["encoding"] == encoding] = \
+                np.dtype(sample_type).itemsize
+        valid = (table["data_offset"] >= 48) & (size > 0) & \
+            (table["npts"] * itemsize <= size)
+        if not valid.all():
+            logger.warning("Skipped %i record(s) with invalid headers." %
+                           (~valid).sum())
+            table = table[valid]
+        if not len(table):
+            return []
+        # Number the streams in the order of their first record and sort
+        # the records by stream, keeping the order they have been received.
+        ids, first, inverse = np.unique(table["id"], return_index=True,
+                                        return_inverse=True)
+        rank = np.empty(len(ids), dtype=np.int64)
+        rank[np.argsort(first, kind="stable")] = np.arange(len(ids))
+        ids = ids[np.argsort(first, kind="stable")]
+        order = np.argsort(rank[inverse], kind="stable")
+        records = table[order]
+        stream = rank[inverse][order]
+
+        # Only the latest samples of a stream fit in its ring buffer, older
+        # records are dropped.
+        npts = records["npts"]
+        remaining = np.cumsum(npts[::-1])[::-1]
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(stream))])
+        remaining -= np.concatenate([remaining[bounds[1:-1]], [0]])[stream]
+        keep = remaining <= self.capacity
+        if not keep.all():
+            logger.warning(
+                "Dropped %i record(s) with %i sample(s) of %i stream(s) not "
+                "fitting in the ring buffers." % (
+                    (~keep).sum(), npts[~keep].sum(),
+                    len(np.unique(stream[~keep]))))
+            records = records[keep]
+            if not len(records):
+                return []
+            kept, stream = np.unique(stream[keep], return_inverse=True)
+            ids = ids[kept]
+            npts = records["npts"]
+            bounds = np.concatenate([[0], np.cumsum(np.bincount(stream))])
+
+        # Position of the samples of each record relative to the first
+        # record of its stream.
+        offsets = np.cumsum(npts) - npts
+        offsets -= offsets[bounds[:-1]][stream]
+        totals = np.add.reduceat(npts, bounds[:-1])
+        buffers = []
+        starts = np.empty(len(totals), dtype=np.int64)
+        first_records = records[bounds[:-1]]
+        for i, (raw_id, sampling_rate, encoding, total) in enumerate(zip(
+                ids.tolist(), first_records["sampling_rate"].tolist(),
+                first_records["encoding"].tolist(), totals.tolist())):
+            buf = self._get_buffer(self._get_id(raw_id), sampling_rate,
+                                   encoding)
+            buffers.append(buf)
+            starts[i] = buf.reserve(total)
+        positions = starts[stream] + offsets
+
+        valid = np.ones(len(records), dtype=bool)
+        payload = records["offset"] + records["data_offset"]
+        with clibmseed.capture_messages():
+            for encoding in np.unique(records["encoding"]).tolist():
+                idx = np.flatnonzero(records["encoding"] == encoding)
+                if encoding in UNCOMPRESSED_ENCODINGS:
+                    self._decode_uncompressed(
+                        data, records[idx], payload[idx], positions[idx],
+                        stream[idx], buffers, UNCOMPRESSED_ENCODINGS[encoding])
+                elif encoding in STEIM_ENCODINGS:
+                    valid[idx] = self._decode_steim(
+                        data, records[idx], payload[idx], positions[idx],
+                        stream[idx], buffers, STEIM_ENCODINGS[encoding])
+                else:
+                    for j in idx.tolist():
+                        valid[j] = self._decode_other(
+                            data, records[j], positions[j],
+                            buffers[stream[j]])
+
+        # Split into segments at the start of each stream, gaps, changes of
+        # the sampling rate and records that could not be decoded.
+        sampling_rate = records["sampling_rate"]
+        starttime = records["starttime"]
+        delta = 1e9 / sampling_rate
+        split = ~valid
+        split[bounds[:-1]] = True
+        split[1:] |= ~valid[:-1] | \
+            (np.abs(starttime[1:] - starttime[:-1] - npts[:-1] *
+                    delta[:-1]) > 0.5 * delta[:-1]) | \
+            (sampling_rate[1:] != sampling_rate[:-1])
+        first = np.flatnonzero(split)
+        segments = []
+        for j, length in zip(first.tolist(),
+                             np.add.reduceat(npts, first).tolist()):
+            if not valid[j]:
+                continue
+            buf = buffers[stream[j]]
+            position = int(positions[j])
+            segments.append((
+                buf.id, UTCDateTime(ns=int(starttime[j])),
+                buf.data[position:position + length]))
+        return segments
+
+    def _decode_uncompressed(self, data, records, payload, positions, stream,
+                             buffers, sample_type):
+        """
+        Decodes uncompressed records, gathering the samples of all records
+        at once.
+        """
+        npts = records["npts"]
+        total = int(npts.sum())
+        record_index = np.repeat(np.arange(len(records)), npts)
+        within = np.arange(total) - np.repeat(np.cumsum(npts) - npts, npts)
+        samples = np.empty(total, dtype=sample_type)
+        big = records["byteorder"] != 0
+        for byteorder in np.unique(big):
+            mask = big[record_index] == byteorder
+            dtype = np.dtype((">" if byteorder else "<") + sample_type)
+            sources = payload[record_index[mask]] + \
+                within[mask] * dtype.itemsize
+            samples[mask] = data[sources[:, None] + np.arange(
+                dtype.itemsize)].view(dtype)[:, 0]
+        first = 0
+        for i, n, position in zip(stream.tolist(), npts.tolist(),
+                                  positions.tolist()):
+            buffers[i].data[position:position + n] = \
+                samples[first:first + n]
+            first += n
+
+    def _decode_steim(self, data, records, payload, positions, stream,
+                      buffers, function):
+        """
+        Decodes Steim compressed records with libmseed straight into the
+        ring buffers and returns which records could be decoded.
+        """
+        address = data.ctypes.data
+        # Buffers of other sample types get the samples via a scratch
+        # buffer.
+        scratch = np.empty(int(records["npts"].max()), dtype=np.int32)
+        targets = [_i.data.ctypes.data if _i.data.dtype == np.int32
+                   else None for _i in buffers]
+        swapflags = (records["byteorder"] != 0) != _BIG_ENDIAN_HOST
+        sizes = records["offset"] + records["record_length"] - payload
+        valid = []
+        for i, npts, source, size, position, swapflag in zip(
+                stream.tolist(), records["npts"].tolist(), payload.tolist(),
+                sizes.tolist(), positions.tolist(), swapflags.tolist()):
+            target = targets[i]
+            if target is None:
+                result = function(address + source, size, npts,
+                                  scratch.ctypes.data, npts, None, swapflag)
+                buffers[i].data[position:position + npts] = scratch[:npts]
+            else:
+                result = function(address + source, size, npts,
+                                  target + 4 * position, npts, None,
+                                  swapflag)
+            valid.append(result == npts)
+        if not all(valid):
+            logger.warning("Could not decode %i Steim compressed record(s)." %
+                           valid.count(False))
+        return valid
+
+    def _decode_other(self, data, record, position, buf):
+        """
+        Decodes a record of any other encoding with libmseed.
+        """
+        offset = int(record["offset"])
+        raw = data[offset:offset + int(record["record_length"])].tobytes()
+        try:
+            st = read(io.BytesIO(raw), format="MSEED")
+        except Exception as e:
+            logger.warning("Could not decode record of %s: %s" % (buf.id, e))
+            return False
+        npts = int(record["npts"])
+        buf.data[position:position + npts] = st[0].data[:npts]
+        return True
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(exclude_empty=True)
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+The obspy.clients.seedlink.async_client test suite.
+"""
+import asyncio
+import io
+import unittest
+
+import numpy as np
+
+from obspy import Trace, UTCDateTime
+from obspy.clients.seedlink import AsyncClient
+from obspy.clients.seedlink.async_client import (_match_selector,
+                                                 _parse_server, _Selection)
+
+
+def _get_records(seed_id, starttime, npts):
+    """
+    Returns the 512 byte MiniSEED records of a trace with increasing
+    samples.
+    """
+    network, station, location, channel = seed_id.split(".")
+    tr = Trace(data=np.arange(npts, dtype=np.int32), header={
+        "network": network, "station": station, "location": location,
+        "channel": channel, "starttime": starttime, "sampling_rate": 10.0})
+    buf = io.BytesIO()
+    tr.write(buf, format="MSEED", reclen=512, encoding="INT32")
+    data = buf.getvalue()
+    return [data[_i:_i + 512] for _i in range(0, len(data), 512)]
+
+
+class _FakeSeedLinkServer(object):
+    """
+    Minimal SeedLink server in the event loop of the test.
+
+    :param packets: Dictionary of (network, station) and a list of the
+        (sequence number, record) tuples of the station.
+    :param close_after: Close the first connection after sending this many
+        packets.
+    """
+    def __init__(self, packets, close_after=None):
+        self.packets = packets
+        self.close_after = close_after
+        # The commands of each connection.
+        self.commands = []
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1",
+                                                  0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.address = "127.0.0.1:%i" % port
+
+    def close(self):
+        self._server.close()
+
+    async def _handle(self, reader, writer):
+        commands = []
+        self.commands.append(commands)
+        requests = []
+        station = None
+        while True:
+            command = (await reader.readuntil(b"\r")).strip().decode()
+            commands.append(command)
+            if command == "HELLO":
+                writer.write(b"SeedLink v3.1 (fake server)\r\nObsPy\r\n")
+            elif command.startswith("STATION"):
+                sta, net = command.split()[1:]
+                station = (net, sta)
+                writer.write(b"OK\r\n" if station in self.packets
+                             else b"ERROR\r\n")
+            elif command.startswith("SELECT"):
+                writer.write(b"OK\r\n")
+            elif command.startswith(("DATA", "TIME")):
+                requests.append((station, command.split()))
+                writer.write(b"OK\r\n")
+            elif command == "END":
+                break
+        packets = []
+        for station, request in requests:
+            first = 0
+            if request[0] == "DATA" and len(request) > 1:
+                first = int(request[1], 16)
+            packets.extend(_i for _i in self.packets[station]
+                           if _i[0] >= first)
+        packets.sort(key=lambda x: x[0])
+        for i, (seqnum, record) in enumerate(packets):
+            if len(self.commands) == 1 and i == self.close_after:
+                writer.close()
+                return
+            writer.write(b"SLINFO  " + b" " * 512)
+            writer.write(b"SL%06X" % seqnum + record)
+        if all(len(_i[1]) == 3 for _i in requests):
+            # All time windows are complete.
+            writer.write(b"END")
+            await writer.drain()
+        else:
+            await reader.read()
+        writer.close()
+
+
+class AsyncClientTestCase(unittest.TestCase):
+    def setUp(self):
+        self.t = UTCDateTime(2020, 1, 1)
+        self.records = {
+            _i: _get_records(_i, self.t, 560) for _i in (
+                "GE.STU..BHZ", "GE.STU..BHN", "GE.WLF..BHZ",
+                "IU.ANMO.00.BHZ", "IU.ANMO.10.BHZ")}
+        # Interleaved records as sent by a server.
+        self.packets = {}
+        for i in range(5):
+            for seed_id, records in sorted(self.records.items()):
+                key = tuple(seed_id.split(".")[:2])
+                self.packets.setdefault(key, []).append(
+                    (100 + i * 10 + len(self.packets[key]), records[i]))
+
+    def test_parse_server(self):
+        self.assertEqual(_parse_server("geofon.gfz-potsdam.de"),
+                         ("geofon.gfz-potsdam.de", 18000))
+        self.assertEqual(_parse_server("localhost:18001"),
+                         ("localhost", 18001))
+        self.assertEqual(_parse_server("seedlink://localhost:18001"),
+                         ("localhost", 18001))
+        self.assertRaises(ValueError, _parse_server, "http://localhost")
+
+    def test_selectors(self):
+        """
+        Received records are routed to the selections by the SeedLink
+        selectors.
+        """
+        self.assertTrue(_match_selector("BHZ", "", "BHZ"))
+        self.assertTrue(_match_selector("BHZ", "00", "BHZ"))
+        self.assertTrue(_match_selector("BH?.D", "00", "BHN"))
+        self.assertTrue(_match_selector("00BHZ", "00", "BHZ"))
+        self.assertFalse(_match_selector("00BHZ", "10", "BHZ"))
+        self.assertTrue(_match_selector("?0BHZ", "10", "BHZ"))
+        self.assertTrue(_match_selector("--BHZ", "", "BHZ"))
+        self.assertFalse(_match_selector("--BHZ", "00", "BHZ"))
+        self.assertTrue(_match_selector("??BHZ", "", "BHZ"))
+        self.assertFalse(_match_selector("BHZ", "", "HHZ"))
+
+        selection = _Selection("G?", "*", ["BH?", "!BHE"], None)
+        self.assertTrue(selection.matches("GE", "STU", "", "BHZ"))
+        self.assertFalse(selection.matches("GE", "STU", "", "BHE"))
+        self.assertFalse(selection.matches("GE", "STU", "", "HHZ"))
+        self.assertFalse(selection.matches("IU", "ANMO", "00", "BHZ"))
+        selection = _Selection("GE", "STU", ["!BHE"], None)
+        self.assertTrue(selection.matches("GE", "STU", "", "HHZ"))
+        self.assertFalse(selection.matches("GE", "STU", "", "BHE"))
+        selection = _Selection("GE", "STU", [], None)
+        self.assertTrue(selection.matches("GE", "STU", "", "BHE"))
+
+    def test_multiple_servers(self):
+        """
+        Streams of multiple servers are received over a single connection
+        per server and delivered to the callbacks of their selections.
+        """
+        received = {}
+
+        def callback(name):
+            def _callback(st):
+                received.setdefault(name, []).append(st)
+            return _callback
+
+        async def async_callback(st):
+            await asyncio.sleep(0)
+            received.setdefault("ANMO", []).append(st)
+
+        async def main():
+            server_a = _FakeSeedLinkServer({
+                _i: self.packets[_i] for _i in [("GE", "STU"),
+                                                ("GE", "WLF")]})
+            server_b = _FakeSeedLinkServer({
+                ("IU", "ANMO"): self.packets[("IU", "ANMO")]})
+            await server_a.start()
+            await server_b.start()
+            client = AsyncClient(batch_size=2, reconnect_delay=None)
+            window = dict(starttime=self.t, endtime=self.t + 60)
+            client.select_stream(server_a.address, "GE", "STU", "BHZ",
+                                 callback=callback("STU.BHZ"), **window)
+            client.select_stream(server_a.address, "GE", "STU", ["BHN"],
+                                 callback=callback("STU.BHN"), **window)
+            client.select_stream(server_a.address, "GE", "WLF",
+                                 callback=callback("WLF"), **window)
+            client.select_stream(server_b.address, "IU", "ANMO", "00BHZ",
+                                 callback=async_callback, **window)
+            try:
+                await client.run()
+            finally:
+                server_a.close()
+                server_b.close()
+            return server_a, server_b
+
+        server_a, server_b = asyncio.run(main())
+        self.assertEqual(len(server_a.commands), 1)
+        self.assertEqual(len(server_b.commands), 1)
+        time_command = "TIME 2020,1,1,0,0,0 2020,1,1,0,1,0"
+        self.assertEqual(server_a.commands[0], [
+            "HELLO", "STATION STU GE", "SELECT BHZ", "SELECT BHN",
+            time_command, "STATION WLF GE", time_command, "END"])
+        self.assertEqual(server_b.commands[0], [
+            "HELLO", "STATION ANMO IU", "SELECT 00BHZ", time_command,
+            "END"])
+
+        expected = {"STU.BHZ": "GE.STU..BHZ", "STU.BHN": "GE.STU..BHN",
+                    "WLF": "GE.WLF..BHZ", "ANMO": "IU.ANMO.00.BHZ"}
+        self.assertEqual(sorted(received), sorted(expected))
+        for name, seed_id in expected.items():
+            # Batches of two records in the order they have been received.
+            self.assertEqual(len(received[name]), 3)
+            traces = [tr for st in received[name] for tr in st]
+            self.assertEqual(set(tr.id for tr in traces), {seed_id})
+            np.testing.assert_array_equal(
+                np.concatenate([tr.data for tr in traces]), np.arange(560))
+            self.assertEqual(traces[0].stats.starttime, self.t)
+
+    def test_reconnect(self):
+        """
+        Lost connections are reestablished and resumed after the last
+        received packet.
+        """
+        traces = []
+
+        async def main():
+            server = _FakeSeedLinkServer(
+                {("GE", "STU"): self.packets[("GE", "STU")]}, close_after=3)
+            await server.start()
+            client = AsyncClient(batch_size=1, reconnect_delay=0.05)
+
+            def callback(st):
+                traces.extend(st)
+                if sum(len(tr) for tr in traces) == 1120:
+                    client.stop()
+            client.select_stream(server.address, "GE", "STU",
+                                 callback=callback)
+            try:
+                await asyncio.wait_for(client.run(), 10)
+            finally:
+                server.close()
+            return server
+
+        server = asyncio.run(main())
+        self.assertEqual(len(server.commands), 2)
+        self.assertEqual(server.commands[0],
+                         ["HELLO", "STATION STU GE", "DATA", "END"])
+        seqnum = self.packets[("GE", "STU")][2][0] + 1
+        self.assertEqual(server.commands[1], [
+            "HELLO", "STATION STU GE", "DATA %06X" % seqnum, "END"])
+        self.assertEqual(len(traces), 10)
+        for seed_id in ("GE.STU..BHN", "GE.STU..BHZ"):
+            data = [tr.data for tr in traces if tr.id == seed_id]
+            np.testing.assert_array_equal(np.concatenate(data),
+                                          np.arange(560))
+
+    def test_no_stations_accepted(self):
+        async def main():
+            server = _FakeSeedLinkServer({})
+            await server.start()
+            client = AsyncClient(reconnect_delay=None)
+            client.select_stream(server.address, "GE", "STU")
+            try:
+                await client.run()
+            finally:
+                server.close()
+
+        with self.assertRaises(Exception) as e:
+            asyncio.run(main())
+        self.assertIn("no stations accepted", str(e.exception))
+        client = AsyncClient()
+        with self.assertRaises(ValueError):
+            client.select_stream("localhost", "GE", "STU",
+                                 endtime=self.t)
+        client.select_stream("localhost", "GE", "STU", "BHZ")
+        with self.assertRaises(ValueError):
+            client.select_stream("localhost", "GE", "STU", "BHN",
+                                 starttime=self.t)
+
+
+def suite():
+    return unittest.makeSuite(AsyncClientTestCase, 'test')
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+The obspy.clients.seedlink.packetdecoder test suite.
+"""
+import io
+import struct
+import unittest
+
+import numpy as np
+
+from obspy import Trace, UTCDateTime, read
+from obspy.clients.seedlink.packetdecoder import PacketDecoder
+from obspy.clients.seedlink.slpacket import SLPacket
+
+
+def _get_records(data, starttime, encoding, byteorder=">", station="ABC"):
+    tr = Trace(data=data, header={
+        "network": "XX", "station": station, "location": "00",
+        "channel": "HHZ", "starttime": starttime, "sampling_rate": 100.0})
+    buf = io.BytesIO()
+    tr.write(buf, format="MSEED", reclen=512, encoding=encoding,
+             byteorder=byteorder)
+    data = buf.getvalue()
+    return [data[_i:_i + 512] for _i in range(0, len(data), 512)]
+
+
+def _get_packets(records):
+    return b"".join(b"SL%06X" % i + record
+                    for i, record in enumerate(records))
+
+
+class PacketDecoderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.t = UTCDateTime(2020, 1, 1, 0, 0, 0, 5000)
+        np.random.seed(123)
+
+    def test_encodings(self):
+        """
+        Interleaved packets of streams with different encodings and byte
+        orders are decoded into one segment per stream.
+        """
+        expected = {}
+        records = []
+        for i, (encoding, byteorder, dtype) in enumerate((
+                ("STEIM2", ">", np.int32), ("STEIM1", "<", np.int32),
+                ("INT32", "<", np.int32), ("INT16", ">", np.int16),
+                ("FLOAT32", "<", np.float32), ("FLOAT64", ">", np.float64))):
+            data = (np.random.randn(3000) * 1000).astype(dtype)
+            station = "S%i" % i
+            expected["XX.%s.00.HHZ" % station] = data
+            records.append(_get_records(data, self.t, encoding, byteorder,
+                                        station))
+        # Interleave the records and add an INFO packet.
+        interleaved = []
+        for i in range(max(len(_i) for _i in records)):
+            interleaved.extend(_i[i] for _i in records if i < len(_i))
+        packets = _get_packets(interleaved)
+        info = b"SLINFO  " + interleaved[0]
+        packets = packets[:520 * 3] + info + packets[520 * 3:]
+
+        decoder = PacketDecoder(capacity=10000)
+        segments = decoder.decode(packets)
+        self.assertEqual([_i[0] for _i in segments], sorted(expected))
+        for seed_id, starttime, data in segments:
+            self.assertEqual(starttime, self.t)
+            self.assertEqual(data.dtype, expected[seed_id].dtype)
+            np.testing.assert_array_equal(data, expected[seed_id])
+            # A view of the ring buffer.
+            self.assertTrue(np.shares_memory(
+                data, decoder.buffers[seed_id].data))
+
+        # Same as the traces of the packets.
+        st = decoder.get_stream(segments)
+        for i, record in enumerate(interleaved[:6]):
+            tr = SLPacket(b"SL000000" + record, 0).get_trace()
+            self.assertEqual(st[i].id, tr.id)
+            self.assertEqual(st[i].stats.starttime, tr.stats.starttime)
+            self.assertEqual(st[i].stats.sampling_rate,
+                             tr.stats.sampling_rate)
+            np.testing.assert_array_equal(st[i].data[:tr.stats.npts],
+                                          tr.data)
+        self.assertFalse(np.shares_memory(
+            st[0].data, decoder.buffers[st[0].id].data))
+        tr = decoder.to_trace(segments[0], copy=False)
+        self.assertTrue(np.shares_memory(
+            tr.data, decoder.buffers[tr.id].data))
+
+        # The same via MiniSEED records.
+        segments = PacketDecoder().decode_records(b"".join(interleaved))
+        self.assertEqual(len(segments), 6)
+        for seed_id, starttime, data in segments:
+            np.testing.assert_array_equal(data, expected[seed_id])
+
+    def test_gaps_and_ring_buffer(self):
+        """
+        Segments are split at gaps and the ring buffers wrap around.
+        """
+        # Samples 3000 to 3999 are missing.
+        data = np.arange(7000, dtype=np.int32)
+        records = _get_records(data[:3000], self.t, "STEIM2") + \
+            _get_records(data[4000:], self.t + 40.0, "STEIM2")
+        expected = {"XX.ABC.00.HHZ": data}
+        decoder = PacketDecoder(capacity=7000)
+        segments = decoder.decode(_get_packets(records))
+        self.assertEqual(len(segments), 2)
+        self.assertEqual(segments[0][1], self.t)
+        self.assertEqual(segments[1][1], self.t + 40.0)
+        np.testing.assert_array_equal(segments[0][2], data[:3000])
+        np.testing.assert_array_equal(segments[1][2], data[4000:])
+        buf = decoder.buffers["XX.ABC.00.HHZ"]
+        self.assertEqual(buf.position, 6000)
+
+        # The next batch wraps around and overwrites the first samples.
+        segments_2 = decoder.decode(_get_packets(records[:2]))
+        npts = len(segments_2[0][2])
+        self.assertEqual(buf.position, npts)
+        self.assertTrue(np.shares_memory(segments_2[0][2], buf.data[:npts]))
+        np.testing.assert_array_equal(segments_2[0][2], data[:npts])
+        np.testing.assert_array_equal(segments[1][2], data[4000:])
+
+        # Batches larger than the buffer only return the latest records
+        # fitting in it.
+        npts = [read(io.BytesIO(_i))[0].stats.npts for _i in records]
+        latest = max(_i for _i in range(len(npts) + 1)
+                     if sum(npts[len(npts) - _i:]) <= 2000)
+        decoder = PacketDecoder(capacity=2000)
+        with self.assertLogs("obspy.clients.seedlink", "WARNING"):
+            segments = decoder.decode(_get_packets(records))
+        self.assertEqual(len(segments), 1)
+        self._assert_segments(segments, expected)
+        self.assertEqual(len(segments[0][2]), sum(npts[-latest:]))
+        self.assertEqual(segments[0][2][-1], 6999)
+
+    def test_batch_larger_than_buffer(self):
+        """
+        All returned segments hold the correct samples if a batch has more
+        samples of the streams than fit in their ring buffers.
+        """
+        expected = {}
+        records = []
+        for i, (encoding, dtype) in enumerate((
+                ("STEIM1", np.int32), ("STEIM2", np.int32),
+                ("INT16", np.int16), ("INT32", np.int32),
+                ("FLOAT32", np.float32), ("FLOAT64", np.float64))):
+            for byteorder in "<>":
+                data = (np.random.randn(3000) * 1000).astype(dtype)
+                station = "S%i%s" % (i, "L" if byteorder == "<" else "B")
+                expected["XX.%s.00.HHZ" % station] = data
+                records.append(_get_records(data, self.t, encoding,
+                                            byteorder, station))
+        interleaved = []
+        for i in range(max(len(_i) for _i in records)):
+            interleaved.extend(_i[i] for _i in records if i < len(_i))
+
+        decoder = PacketDecoder(capacity=1000)
+        with self.assertLogs("obspy.clients.seedlink", "WARNING"):
+            segments = decoder.decode(_get_packets(interleaved))
+        self.assertEqual(sorted(_i[0] for _i in segments), sorted(expected))
+        self._assert_segments(segments, expected)
+        for seed_id, _, data in segments:
+            self.assertLessEqual(len(data), 1000)
+            self.assertEqual(data[-1], expected[seed_id][-1])
+
+        # The next batch wraps around.
+        segments = decoder.decode(_get_packets(
+            [record for _i in records for record in _i[-2:]]))
+        self.assertEqual(len(segments), 12)
+        self._assert_segments(segments, expected)
+
+    def _assert_segments(self, segments, expected):
+        """
+        Checks the samples of all segments against the source data starting
+        at ``self.t``.
+        """
+        for seed_id, starttime, data in segments:
+            first = int(round((starttime - self.t) * 100))
+            np.testing.assert_array_equal(
+                data, expected[seed_id][first:first + len(data)])
+
+    def test_invalid_data(self):
+        decoder = PacketDecoder()
+        self.assertEqual(decoder.decode(b""), [])
+        records = _get_records(np.arange(100, dtype=np.int32), self.t,
+                               "STEIM2")
+        packets = _get_packets(records)
+        self.assertRaises(ValueError, decoder.decode, packets[:-1])
+        self.assertRaises(ValueError, decoder.decode, b"XX" + packets[2:])
+        # ASCII records are skipped.
+        log = _get_records(np.frombuffer(b"log message" * 10, dtype="|S1"),
+                           self.t, "ASCII")
+        segments = decoder.decode(_get_packets(log + records))
+        self.assertEqual(len(segments), 1)
+        np.testing.assert_array_equal(segments[0][2], np.arange(100))
+
+    def test_invalid_headers(self):
+        """
+        Records with more samples in the header than fit in the record or
+        with the data section inside the fixed header are skipped.
+        """
+        data = np.arange(1000, dtype=np.int32)
+        records = _get_records(data, self.t, "INT32")
+        npts = [read(io.BytesIO(_i))[0].stats.npts for _i in records]
+        too_many = bytearray(records[1])
+        too_many[30:32] = struct.pack(">H", 200)
+        no_offset = bytearray(records[3])
+        no_offset[44:46] = struct.pack(">H", 20)
+        packets = _get_packets(records[:1] + [bytes(too_many)] +
+                               records[2:3] + [bytes(no_offset)] + records[4:])
+        decoder = PacketDecoder()
+        with self.assertLogs("obspy.clients.seedlink", "WARNING") as cm:
+            segments = decoder.decode(packets)
+        self.assertIn("Skipped 2 record(s) with invalid headers",
+                      cm.output[0])
+        # The valid records are split at the skipped ones.
+        bounds = np.cumsum([0] + npts)
+        self.assertEqual(len(segments), 3)
+        for (_, starttime, data_), (a, b) in zip(
+                segments, [(0, 1), (2, 3), (4, len(records))]):
+            self.assertEqual(starttime, self.t + bounds[a] / 100.0)
+            np.testing.assert_array_equal(data_, data[bounds[a]:bounds[b]])
+
+
+def suite():
+    return unittest.makeSuite(PacketDecoderTestCase, 'test')
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
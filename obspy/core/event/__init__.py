@@ -23,7 +23,7 @@ from .base import (
     Comment, CompositeTime, ConfidenceEllipsoid, CreationInfo, DataUsed,
     QuantityError, TimeWindow, WaveformStreamID)
 from obspy.core.event.resourceid import ResourceIdentifier
-from .catalog import Catalog, read_events
+from .catalog import Catalog, CatalogColumns, iter_events, read_events
 from .event import Event, EventDescription
 from .magnitude import (
     Amplitude, Magnitude, StationMagnitude, StationMagnitudeContribution)
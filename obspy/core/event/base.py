@@ -30,6 +30,44 @@ from obspy.core.utcdatetime import UTCDateTime
 from obspy.core.util import AttribDict
 
 
+# types which do not need to be copied when deep copying event objects
+_IMMUTABLE_TYPES = frozenset([type(None), bool, int, float, complex, str,
+                              bytes])
+
+
+def _deepcopy(value, memodict):
+    """
+    Deep copy attribute values of event type objects.
+
+    Shortcuts the generic :func:`copy.deepcopy` machinery for the value types
+    which make up the bulk of event objects and falls back to it for
+    everything else.
+    """
+    cls = type(value)
+    if cls in _IMMUTABLE_TYPES:
+        return value
+    try:
+        return memodict[id(value)]
+    except KeyError:
+        pass
+    if cls is list:
+        result = []
+        memodict[id(value)] = result
+        result.extend([_deepcopy(_i, memodict) for _i in value])
+        return result
+    if cls is UTCDateTime or cls is QuantityError:
+        # plain attribute dicts of immutable values
+        result = cls.__new__(cls)
+        memodict[id(value)] = result
+        result.__dict__.update(value.__dict__)
+        return result
+    copier = getattr(cls, "__deepcopy__", None)
+    if copier is not None:
+        # event types and resource identifiers
+        return copier(value, memodict)
+    return copy.deepcopy(value, memodict)
+
+
 class QuantityError(AttribDict):
     """
     Uncertainty information for a physical quantity.
@@ -309,6 +347,20 @@ def _event_type_class_factory(class_name, class_attributes=[],
         def copy(self):
             return copy.deepcopy(self)
 
+        def __deepcopy__(self, memodict=None):
+            """
+            Copies the attribute dictionary directly, the values have
+            already been validated when set on the original object.
+            """
+            memodict = {} if memodict is None else memodict
+            cls = self.__class__
+            result = cls.__new__(cls)
+            memodict[id(self)] = result
+            result.__dict__.update([
+                (key, _deepcopy(value, memodict))
+                for key, value in self.__dict__.items()])
+            return result
+
         def __repr__(self):
             return self.__str__(force_one_line=True)
 
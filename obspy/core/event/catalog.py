@@ -17,14 +17,18 @@ This class hierarchy is closely modelled after the de-facto standard format
     GNU Lesser General Public License, Version 3
     (http://www.gnu.org/copyleft/lesser.html)
 """
+import bz2
 import copy
+import gzip
+import io
 import warnings
 
 import numpy as np
 
 from obspy.core.utcdatetime import UTCDateTime
 from obspy.core.util import _read_from_plugin
-from obspy.core.util.base import ENTRY_POINTS, _generic_reader
+from obspy.core.util.base import (ENTRY_POINTS, _generic_iterator,
+                                  _generic_reader)
 from obspy.core.util.decorator import map_example_filename, uncompress_file
 from obspy.core.util.misc import buffered_load_entry_point
 from obspy.imaging.cm import obspy_sequential
@@ -320,83 +324,38 @@ class Catalog(object):
         2012-04-04T14:21:42.300000Z | +41.818,  +79.689 | 4.4 mb | manual
         2012-04-04T14:08:46.000000Z | +38.017,  +37.736 | 3.0 ML | manual
         """
-        # Helper functions. Only first argument might be None. Avoid
-        # unorderable types by checking first shortcut on positive is None
-        # also for the greater stuff (is confusing but correct)
-        def _is_smaller(value_1, value_2):
-            if value_1 is None or value_1 < value_2:
-                return True
-            return False
-
-        def _is_smaller_or_equal(value_1, value_2):
-            if value_1 is None or value_1 <= value_2:
-                return True
-            return False
+        return self.to_columns().filter(*args, **kwargs)
 
-        def _is_greater(value_1, value_2):
-            if value_1 is None or value_1 <= value_2:
-                return False
-            return True
+    def to_columns(self, preferred=False):
+        """
+        Returns a columnar view of the Catalog.
 
-        def _is_greater_or_equal(value_1, value_2):
-            if value_1 is None or value_1 < value_2:
-                return False
-            return True
+        The origin and magnitude parameters of all events are extracted once
+        into numpy arrays, which can then be used for fast, vectorized
+        filtering, sorting and selection of the events. See
+        :class:`~obspy.core.event.catalog.CatalogColumns` for details.
 
-        # Map the function to the operators.
-        operator_map = {"<": _is_smaller,
-                        "<=": _is_smaller_or_equal,
-                        ">": _is_greater,
-                        ">=": _is_greater_or_equal}
+        :type preferred: bool
+        :param preferred: If ``True``, use the preferred origin and
+            magnitude of each event (falling back to the first one if no
+            preferred one is set), otherwise use the first origin and
+            magnitude like :meth:`filter`.
+        :rtype: :class:`~obspy.core.event.catalog.CatalogColumns`
 
-        try:
-            inverse = kwargs["inverse"]
-        except KeyError:
-            inverse = False
+        .. rubric:: Example
 
-        events = list(self.events)
-        for arg in args:
-            try:
-                key, operator, value = arg.split(" ", 2)
-            except ValueError:
-                msg = "%s is not a valid filter rule." % arg
-                raise ValueError(msg)
-            if key == "magnitude":
-                temp_events = []
-                for event in events:
-                    if (event.magnitudes and event.magnitudes[0].mag and
-                        operator_map[operator](
-                            event.magnitudes[0].mag,
-                            float(value))):
-                        temp_events.append(event)
-                events = temp_events
-            elif key in ("longitude", "latitude", "depth", "time"):
-                temp_events = []
-                for event in events:
-                    if (event.origins and key in event.origins[0] and
-                        operator_map[operator](
-                            event.origins[0].get(key),
-                            UTCDateTime(value) if key == 'time' else
-                            float(value))):
-                        temp_events.append(event)
-                events = temp_events
-            elif key in ('standard_error', 'azimuthal_gap',
-                         'used_station_count', 'used_phase_count'):
-                temp_events = []
-                for event in events:
-                    if (event.origins and event.origins[0].quality and
-                        key in event.origins[0].quality and
-                        operator_map[operator](
-                            event.origins[0].quality.get(key),
-                            float(value))):
-                        temp_events.append(event)
-                events = temp_events
-            else:
-                msg = "%s is not a valid filter key" % key
-                raise ValueError(msg)
-        if inverse:
-            events = [ev for ev in self.events if ev not in events]
-        return Catalog(events=events)
+        >>> from obspy.core.event import read_events
+        >>> cat = read_events()
+        >>> columns = cat.to_columns()
+        >>> print(columns.magnitude)
+        [4.4 4.3 3.0]
+        >>> print(columns.sort("magnitude"))  # doctest: +NORMALIZE_WHITESPACE
+        3 Event(s) in Catalog:
+        2012-04-04T14:08:46.000000Z | +38.017,  +37.736 | 3.0 ML | manual
+        2012-04-04T14:18:37.000000Z | +39.342,  +41.044 | 4.3 ML | manual
+        2012-04-04T14:21:42.300000Z | +41.818,  +79.689 | 4.4 mb | manual
+        """
+        return CatalogColumns(self, preferred=preferred)
 
     def copy(self):
         """
@@ -764,8 +723,254 @@ class Catalog(object):
         return fig
 
 
+class CatalogColumns(object):
+    """
+    Columnar snapshot of the origin and magnitude parameters of the events in
+    a :class:`~obspy.core.event.Catalog`.
+
+    All columns are numpy masked arrays with one entry per event, missing
+    values are masked. Filtering, sorting and selection are vectorized and
+    return new :class:`~obspy.core.event.Catalog` objects with references to
+    the original events. The columns are extracted once at initialization,
+    so the view can be reused for any number of queries but does not reflect
+    later modifications of the catalog or its events.
+
+    Available columns are ``time`` (POSIX timestamp in seconds),
+    ``latitude``, ``longitude``, ``depth``, ``magnitude``,
+    ``magnitude_type``, ``resource_id``, ``standard_error``,
+    ``azimuthal_gap``, ``used_station_count`` and ``used_phase_count``.
+
+    :type catalog: :class:`~obspy.core.event.Catalog` or list of
+        :class:`~obspy.core.event.event.Event`
+    :param catalog: Events to create the view for.
+    :type preferred: bool
+    :param preferred: If ``True``, use the preferred origin and magnitude of
+        each event (falling back to the first one if no preferred one is
+        set), otherwise use the first origin and magnitude.
+    """
+    _origin_keys = ("latitude", "longitude", "depth")
+    _quality_keys = ("standard_error", "azimuthal_gap", "used_station_count",
+                     "used_phase_count")
+    # Operators with the corresponding numpy function and whether events
+    # with unset values match. Same semantics as in Catalog.filter().
+    _operators = {"<": (np.less, True),
+                  "<=": (np.less_equal, True),
+                  ">": (np.greater, False),
+                  ">=": (np.greater_equal, False)}
+
+    def __init__(self, catalog, preferred=False):
+        if isinstance(catalog, Catalog):
+            catalog = catalog.events
+        self.events = list(catalog)
+        n = len(self.events)
+        self._has_origin = np.zeros(n, dtype=np.bool_)
+        self._has_quality = np.zeros(n, dtype=np.bool_)
+        self._has_magnitude = np.zeros(n, dtype=np.bool_)
+        self._time_ns = np.zeros(n, dtype=np.int64)
+        self._has_time = np.zeros(n, dtype=np.bool_)
+        values = dict((key, np.empty(n, dtype=np.float64))
+                      for key in self._origin_keys + self._quality_keys +
+                      ("magnitude", ))
+        for value in values.values():
+            value.fill(np.nan)
+        magnitude_types = []
+        resource_ids = []
+
+        for i, event in enumerate(self.events):
+            resource_ids.append(str(event.resource_id))
+            origin = preferred and event.preferred_origin() or \
+                (event.origins[0] if event.origins else None)
+            magnitude = preferred and event.preferred_magnitude() or \
+                (event.magnitudes[0] if event.magnitudes else None)
+            if origin is not None:
+                self._has_origin[i] = True
+                if origin.time is not None:
+                    self._time_ns[i] = origin.time._ns
+                    self._has_time[i] = True
+                for key in self._origin_keys:
+                    if origin.get(key) is not None:
+                        values[key][i] = origin.get(key)
+                if origin.quality:
+                    self._has_quality[i] = True
+                    for key in self._quality_keys:
+                        if origin.quality.get(key) is not None:
+                            values[key][i] = origin.quality.get(key)
+            if magnitude is not None:
+                self._has_magnitude[i] = True
+                if magnitude.mag is not None:
+                    values["magnitude"][i] = magnitude.mag
+                magnitude_types.append(magnitude.magnitude_type)
+            else:
+                magnitude_types.append(None)
+
+        self._values = values
+        for key, value in values.items():
+            setattr(self, key, np.ma.masked_invalid(value, copy=False))
+        self.time = np.ma.masked_array(self._time_ns / 1e9,
+                                       mask=~self._has_time)
+        self.magnitude_type = np.ma.masked_array(
+            [_i or "" for _i in magnitude_types], dtype=str,
+            mask=[_i is None for _i in magnitude_types])
+        self.resource_id = np.array(resource_ids, dtype=str)
+
+    def __len__(self):
+        """
+        Returns the number of events in the view.
+        """
+        return len(self.events)
+
+    def _rule_mask(self, rule):
+        """
+        Returns the boolean array of events matching a single filter rule.
+        """
+        try:
+            key, operator, value = rule.split(" ", 2)
+            func, unset_matches = self._operators[operator]
+        except (ValueError, KeyError):
+            msg = "%s is not a valid filter rule." % rule
+            raise ValueError(msg)
+
+        if key == "time":
+            value = UTCDateTime(value)
+            # compare with the rounding of UTCDateTime comparisons
+            ndigits = value.precision - 9
+            values = _round_ns(self._time_ns, ndigits)
+            value = _round_ns(np.array([value._ns], dtype=np.int64),
+                              ndigits)[0]
+            return self._has_origin & np.where(
+                self._has_time, func(values, value), unset_matches)
+
+        if key == "magnitude":
+            # events without a magnitude value (or zero magnitude) never
+            # match
+            values = self._values[key]
+            with np.errstate(invalid="ignore"):
+                return (values != 0) & func(values, float(value))
+        elif key in self._origin_keys:
+            present = self._has_origin
+        elif key in self._quality_keys:
+            present = self._has_quality
+        else:
+            msg = "%s is not a valid filter key" % key
+            raise ValueError(msg)
+        values = self._values[key]
+        with np.errstate(invalid="ignore"):
+            return present & np.where(np.isnan(values), unset_matches,
+                                      func(values, float(value)))
+
+    def get_mask(self, *args, **kwargs):
+        """
+        Returns a boolean array marking the events that match the specified
+        filter rules.
+
+        Takes the same filter rules as
+        :meth:`~obspy.core.event.Catalog.filter`.
+
+        :rtype: :class:`numpy.ndarray`
+        """
+        inverse = kwargs.get("inverse", False)
+        mask = np.ones(len(self), dtype=np.bool_)
+        for arg in args:
+            mask &= self._rule_mask(arg)
+        if inverse:
+            mask = ~mask
+        return mask
+
+    def filter(self, *args, **kwargs):
+        """
+        Returns a new Catalog object only containing Events which match the
+        specified filter rules.
+
+        Takes the same filter rules and has the same semantics as
+        :meth:`~obspy.core.event.Catalog.filter`.
+
+        :rtype: :class:`~obspy.core.event.Catalog`
+        """
+        return self.select(self.get_mask(*args, **kwargs))
+
+    def select(self, index):
+        """
+        Returns a new Catalog object with the selected events.
+
+        :type index: :class:`numpy.ndarray`
+        :param index: Boolean mask or integer indices of the events to
+            select, e.g. computed from the columns of the view.
+        :rtype: :class:`~obspy.core.event.Catalog`
+        """
+        index = np.asarray(index)
+        if index.dtype == np.bool_:
+            index = np.flatnonzero(index)
+        return Catalog(events=[self.events[_i] for _i in index])
+
+    def argsort(self, keys=("time",), reverse=False):
+        """
+        Returns the indices that sort the events by the given columns.
+
+        The sort is stable and events with missing values are sorted to the
+        end.
+
+        :type keys: str or sequence of str
+        :param keys: Column name(s) to sort by, the first one being the
+            primary sort key.
+        :type reverse: bool
+        :param reverse: Sort in descending instead of ascending order.
+        :rtype: :class:`numpy.ndarray`
+        """
+        if isinstance(keys, str):
+            keys = [keys]
+        sort_keys = []
+        for key in keys:
+            if key not in ("time", "magnitude_type", "resource_id") + \
+                    self._origin_keys + self._quality_keys + ("magnitude", ):
+                msg = "%s is not a valid sort key" % key
+                raise ValueError(msg)
+            if key == "time":
+                values = np.ma.masked_array(self._time_ns,
+                                            mask=~self._has_time)
+            else:
+                values = np.ma.asarray(getattr(self, key))
+            missing = np.ma.getmaskarray(values)
+            rank = np.unique(values.data, return_inverse=True)[1]
+            if reverse:
+                rank = -rank
+            sort_keys.append((missing, rank))
+        # np.lexsort uses the last key as the primary key
+        lexsort_keys = []
+        for missing, rank in reversed(sort_keys):
+            lexsort_keys.extend([rank, missing])
+        if not lexsort_keys:
+            return np.arange(len(self))
+        return np.lexsort(lexsort_keys)
+
+    def sort(self, keys=("time",), reverse=False):
+        """
+        Returns a new Catalog object with the events sorted by the given
+        columns.
+
+        See :meth:`argsort` for the parameters.
+
+        :rtype: :class:`~obspy.core.event.Catalog`
+        """
+        return self.select(self.argsort(keys=keys, reverse=reverse))
+
+
+def _round_ns(values, ndigits):
+    """
+    Rounds integer nanoseconds to ``ndigits`` like Python's :func:`round`
+    does for integers (round half to even).
+    """
+    if ndigits >= 0:
+        return values
+    factor = 10 ** -ndigits
+    quotient, remainder = np.divmod(values, factor)
+    round_up = (2 * remainder > factor) | \
+        ((2 * remainder == factor) & (quotient % 2 == 1))
+    return (quotient + round_up) * factor
+
+
 @map_example_filename("pathname_or_url")
-def read_events(pathname_or_url=None, format=None, **kwargs):
+def read_events(pathname_or_url=None, format=None, iterate=False,
+                **kwargs):
     """
     Read event files into an ObsPy Catalog object.
 
@@ -781,6 +986,10 @@ def read_events(pathname_or_url=None, format=None, **kwargs):
     :type format: str
     :param format: Format of the file to read (e.g. ``"QUAKEML"``). See the
         `Supported Formats`_ section below for a list of supported formats.
+    :type iterate: bool
+    :param iterate: If ``True``, return a generator yielding the events one
+        by one instead of a :class:`~obspy.core.event.Catalog`. See
+        :func:`~obspy.core.event.iter_events` for details.
     :rtype: :class:`~obspy.core.event.Catalog`
     :return: An ObsPy :class:`~obspy.core.event.Catalog` object.
 
@@ -800,6 +1009,8 @@ def read_events(pathname_or_url=None, format=None, **kwargs):
     :class:`~obspy.core.event.Catalog` object can be used to export the data to
     the file system.
     """
+    if iterate:
+        return iter_events(pathname_or_url, format=format, **kwargs)
     if pathname_or_url is None:
         # if no pathname or URL specified, return example catalog
         return _create_example_catalog()
@@ -807,6 +1018,84 @@ def read_events(pathname_or_url=None, format=None, **kwargs):
         return _generic_reader(pathname_or_url, _read, format=format, **kwargs)
 
 
+@map_example_filename("pathname_or_url")
+def iter_events(pathname_or_url=None, format=None, **kwargs):
+    """
+    Iterate over the events of one or multiple event files.
+
+    Accepts the same input as :func:`~obspy.core.event.read_events` but
+    yields the :class:`~obspy.core.event.Event` objects one by one. QuakeML
+    files (also gzip or bzip2 compressed ones) are parsed incrementally and
+    already processed parts of the document are discarded, so arbitrarily
+    large files can be processed with constant memory usage. All other formats are read completely by
+    their respective plugin before their events are yielded.
+
+    :type pathname_or_url: str or file-like object
+    :param pathname_or_url: String containing a file name or a URL or a open
+        file-like object. Wildcards are allowed for a file name. If this
+        attribute is omitted, the events of the example
+        :class:`~obspy.core.event.Catalog` object will be returned.
+    :type format: str
+    :param format: Format of the file to read (e.g. ``"QUAKEML"``).
+    :rtype: generator of :class:`~obspy.core.event.Event`
+
+    .. rubric:: Example
+
+    >>> from obspy.core.event import iter_events
+    >>> for event in iter_events("/path/to/neries_events.xml"):
+    ...     print(event.resource_id)
+    quakeml:eu.emsc/event/20120404_0000041
+    quakeml:eu.emsc/event/20120404_0000038
+    quakeml:eu.emsc/event/20120404_0000039
+    """
+    if pathname_or_url is None:
+        # if no pathname or URL specified, use example catalog
+        for event in _create_example_catalog():
+            yield event
+        return
+    if isinstance(pathname_or_url, bytes) and \
+            pathname_or_url.strip().startswith(b'<'):
+        # XML string
+        pathname_or_url = io.BytesIO(pathname_or_url)
+    for events in _generic_iterator(pathname_or_url, _iter, format=format,
+                                    **kwargs):
+        for event in events:
+            yield event
+
+
+def _iter(filename, format=None, **kwargs):
+    """
+    Iterates over the events of a single event file.
+
+    QuakeML files are streamed, also if they are gzip or bzip2 compressed.
+    All other formats are read by :func:`_read`.
+    """
+    from obspy.io.quakeml.core import _has_quakeml_root, _iter_quakeml
+    source = filename
+    if isinstance(filename, str) and kwargs.get('check_compression', True):
+        with open(filename, 'rb') as fh:
+            magic = fh.read(3)
+        if magic[:2] == b'\x1f\x8b':
+            source = gzip.open(filename, 'rb')
+        elif magic == b'BZh':
+            source = bz2.open(filename, 'rb')
+    try:
+        if format is None:
+            is_quakeml = _has_quakeml_root(source)
+        else:
+            is_quakeml = format.upper() == "QUAKEML"
+        if is_quakeml:
+            for event in _iter_quakeml(source):
+                event._format = "QUAKEML"
+                yield event
+            return
+    finally:
+        if source is not filename:
+            source.close()
+    for event in _read(filename, format=format, **kwargs):
+        yield event
+
+
 @uncompress_file
 def _read(filename, format=None, **kwargs):
     """
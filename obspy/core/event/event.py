@@ -17,7 +17,6 @@ This class hierarchy is closely modelled after the de-facto standard format
     GNU Lesser General Public License, Version 3
     (http://www.gnu.org/copyleft/lesser.html)
 """
-import copy
 
 from obspy.core.event.header import (
     EventType, EventTypeCertainty, EventDescriptionType)
@@ -281,12 +280,7 @@ class Event(__Event):
         reset resource_id's object_id after deep copy to allow the
         object specific behavior of get_referred_object
         """
-        memodict = memodict or {}
-        cls = self.__class__
-        result = cls.__new__(cls)
-        memodict[id(self)] = result
-        for k, v in self.__dict__.items():
-            setattr(result, k, copy.deepcopy(v, memodict))
+        result = super(Event, self).__deepcopy__(memodict)
         result.scope_resource_ids()
         return result
 
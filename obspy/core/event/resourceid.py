@@ -9,6 +9,7 @@ This module defines the ResourceIdentifier class and associated code.
     GNU Lesser General Public License, Version 3
     (http://www.gnu.org/copyleft/lesser.html)
 """
+import itertools
 import re
 import warnings
 from contextlib import contextmanager
@@ -281,6 +282,13 @@ class ResourceIdentifier(object):
     # with by resource_id if they are not found via normal means.
     _get_object_hook = []
 
+    # Number of the current scoped registry (0 for the global registry) and
+    # the numbers of the scoped registries that have not been left yet.
+    # Resource ids bound inside a scoped registry remember its number.
+    _registry_scope = 0
+    _open_registry_scopes = set()
+    _registry_scope_counter = itertools.count(1)
+
     # Set default _ResourceKey attributes and object_id.
     _parent_key = _ResourceKeyDescriptor('_parent_key')
     _resource_key = _ResourceKeyDescriptor('_resource_key')
@@ -317,6 +325,15 @@ class ResourceIdentifier(object):
         try:
             out = ResourceIdentifier._id_object_map[self._object_key]
         except KeyError:
+            scope = self.__dict__.get("_registry_scope")
+            if scope and scope not in ResourceIdentifier._open_registry_scopes:
+                # Bound inside a scoped registry that has been discarded,
+                # objects of other registries are never resolved.
+                msg = ("The object with identity of: %d  and id of %s was "
+                       "bound in a scoped registry that no longer exists"
+                       ) % (self._object_id, self.id)
+                warnings.warn(msg, UserWarning)
+                return None
             out = self._get_similar_referred_object()
         if out is not None:
             return out
@@ -429,32 +446,52 @@ class ResourceIdentifier(object):
         # if there is None, get the last referred_object assigned the same
         # resource_id code.
         id_order = ResourceIdentifier._id_order
-        old = ResourceIdentifier._id_object_map.get(self._object_key, None)
-        if old is None:  # Look for last object with same resource id.
-            try:
-                old_obj_id_key = id_order[self._resource_key][-1]
-                old = ResourceIdentifier._id_object_map[old_obj_id_key]
-            except (KeyError, IndexError):
-                pass
-        if warn and old is not None and old != referred_object:
-            msg = ('Warning, binding object to resource ID %s which '
-                   'is not equal to the last object bound to this '
-                   'resource_id') % self.id
-            warnings.warn(msg, UserWarning)
+        if warn:
+            old = ResourceIdentifier._id_object_map.get(self._object_key,
+                                                        None)
+            if old is None:  # Look for last object with same resource id.
+                try:
+                    old_obj_id_key = id_order[self._resource_key][-1]
+                    old = ResourceIdentifier._id_object_map[old_obj_id_key]
+                except (KeyError, IndexError):
+                    pass
+            if old is not None and old != referred_object:
+                msg = ('Warning, binding object to resource ID %s which '
+                       'is not equal to the last object bound to this '
+                       'resource_id') % self.id
+                warnings.warn(msg, UserWarning)
         # Set the object id to the new object, and update parent scoping tree.
         self._object_id = id(referred_object)
-        if parent is not None or self._parent_key is not None:
-            if parent is not None:
-                self._parent_key = parent
+        if ResourceIdentifier._registry_scope:
+            self._registry_scope = ResourceIdentifier._registry_scope
+        else:
+            self.__dict__.pop("_registry_scope", None)
+        object_key = self._object_key
+        resource_key = self._resource_key
+        if parent is not None:
+            self._parent_key = parent
+        parent_key = self._parent_key
+        if parent_key is not None:
             id_tree = ResourceIdentifier._parent_id_tree
-            if self._parent_key not in id_tree:
-                id_tree[self._parent_key] = WeakKeyDictionary()
-            id_tree[self._parent_key][self._resource_key] = self._object_key
+            try:
+                scope = id_tree[parent_key]
+            except KeyError:
+                scope = id_tree[parent_key] = WeakKeyDictionary()
+            scope[resource_key] = object_key
         # Set the new id in id map and append referred_object to id_order.
-        ResourceIdentifier._id_object_map[self._object_key] = referred_object
-        if self._resource_key not in id_order:
-            id_order[self._resource_key] = []
-        id_order[self._resource_key].append(self._object_key)
+        id_object_map = ResourceIdentifier._id_object_map
+        id_object_map[object_key] = referred_object
+        try:
+            rid_list = id_order[resource_key]
+        except KeyError:
+            id_order[resource_key] = [object_key]
+        else:
+            # Drop entries of objects that no longer exist and a previous
+            # entry of the same object, otherwise the list grows with every
+            # binding as long as any object with this resource id is alive.
+            rid_list[:] = [_i for _i in rid_list
+                           if _i != object_key and _i in id_object_map]
+            rid_list.append(object_key)
 
     @deprecated()
     def convert_id_to_quakeml_uri(self, authority_id="local"):
@@ -578,6 +615,8 @@ class ResourceIdentifier(object):
         Make sure the resource_key follows the singleton pattern.
         """
         self.__dict__ = state
+        # The scoped registries of other processes do not exist here.
+        self.__dict__.pop("_registry_scope", None)
         self._parent_key = None
         self._resource_key = _ResourceKey.get_resource_key(self.id)
 
@@ -755,7 +794,77 @@ class ResourceIdentifier(object):
         cls._parent_id_tree = state_dict['parent_id_tree']
         cls._id_order = state_dict['id_order']
         cls._id_object_map = state_dict['id_object_map']
-        cls._get_referred_object_hook = state_dict['get_object_hook']
+        cls._get_object_hook = state_dict['get_object_hook']
+        cls._registry_scope = state_dict['registry_scope']
+
+    @classmethod
+    def get_registry_size(cls):
+        """
+        Returns the number of entries in the class level registry used to
+        resolve referred objects.
+
+        Useful to monitor the memory used by resource identifiers in long
+        running processes.
+
+        :rtype: dict
+        :return: Dictionary with the number of referred ``"objects"``, of
+            distinct ``"resource_ids"`` with at least one bound object, of
+            entries in the per resource id binding history
+            (``"id_order_entries"``), of ``"parent_scopes"`` and of objects
+            registered in parent scopes (``"scoped_objects"``).
+
+        .. rubric:: Example
+
+        >>> from obspy.core.event import Event
+        >>> with ResourceIdentifier.scoped_registry():
+        ...     event = Event(resource_id="smi:local/event/1")
+        ...     sizes = ResourceIdentifier.get_registry_size()
+        >>> print(sizes["objects"], sizes["resource_ids"])
+        1 1
+        """
+        # copy the weak dictionaries to avoid problems with entries getting
+        # garbage collected while iterating
+        id_order = list(cls._id_order.values())
+        parent_id_tree = list(cls._parent_id_tree.values())
+        return dict(
+            objects=len(cls._id_object_map),
+            resource_ids=len(id_order),
+            id_order_entries=sum(len(_i) for _i in id_order),
+            parent_scopes=len(parent_id_tree),
+            scoped_objects=sum(len(_i) for _i in parent_id_tree))
+
+    @classmethod
+    @contextmanager
+    def scoped_registry(cls):
+        """
+        Context manager providing an empty registry for resolving referred
+        objects.
+
+        Resource identifiers bound inside the context are only registered in
+        the temporary registry, which is discarded as a whole when the
+        context is left. Objects from outside the context can not be
+        resolved by resource identifiers created inside it and vice versa:
+        after the context is left, resource identifiers bound inside it
+        resolve to ``None`` (with a warning) unless they are bound again.
+        Registered get object hooks stay active inside the context.
+
+        This gives resource identifiers used e.g. for processing one catalog
+        at a time in a long running process an explicit lifetime.
+
+        .. rubric:: Example
+
+        >>> from obspy.core.event import Event
+        >>> event = Event(resource_id="smi:local/event/1")
+        >>> with ResourceIdentifier.scoped_registry():
+        ...     print(ResourceIdentifier("smi:local/event/1")())
+        None
+        >>> print(ResourceIdentifier("smi:local/event/1")() is event)
+        True
+        """
+        hooks = list(cls._get_object_hook)
+        with cls._debug_class_state() as state:
+            state["get_object_hook"].extend(hooks)
+            yield
 
     @classmethod
     @contextmanager
@@ -773,6 +882,7 @@ class ResourceIdentifier(object):
             id_order=cls._id_order,
             id_object_map=cls._id_object_map,
             get_object_hook=cls._get_object_hook,
+            registry_scope=cls._registry_scope,
         )
         # init new class state
         new_state = dict(
@@ -780,12 +890,17 @@ class ResourceIdentifier(object):
             id_order=WeakKeyDictionary(),
             id_object_map=WeakValueDictionary(),
             get_object_hook=[],
+            registry_scope=next(cls._registry_scope_counter),
         )
         # bind new state and return dict
+        cls._open_registry_scopes.add(new_state["registry_scope"])
         cls._bind_class_state(new_state)
-        yield new_state
-        # reset prior state
-        cls._bind_class_state(old_state)
+        try:
+            yield new_state
+        finally:
+            # reset prior state
+            cls._bind_class_state(old_state)
+            cls._open_registry_scopes.discard(new_state["registry_scope"])
 
 
 if __name__ == '__main__':
@@ -13,6 +13,7 @@ import copy
 import ctypes as C  # NOQA
 from collections import defaultdict
 from copy import deepcopy
+import functools
 import itertools
 from math import pi
 import warnings
@@ -32,6 +33,75 @@ from obspy.core.util.obspy_types import (ComplexWithUncertainties,
 from .util import Angle, Frequency
 
 
+# Mapping of unit strings to the unit types used by evalresp.
+_EVALRESP_UNITS_MAPPING = {
+    "M": "DIS",
+    "NM": "DIS",
+    "CM": "DIS",
+    "MM": "DIS",
+    "M/S": "VEL",
+    "M/SEC": "VEL",
+    "NM/S": "VEL",
+    "NM/SEC": "VEL",
+    "CM/S": "VEL",
+    "CM/SEC": "VEL",
+    "MM/S": "VEL",
+    "MM/SEC": "VEL",
+    "M/S**2": "ACC",
+    "M/(S**2)": "ACC",
+    "M/SEC**2": "ACC",
+    "M/(SEC**2)": "ACC",
+    "M/S/S": "ACC",
+    "NM/S**2": "ACC",
+    "NM/(S**2)": "ACC",
+    "NM/SEC**2": "ACC",
+    "NM/(SEC**2)": "ACC",
+    "CM/S**2": "ACC",
+    "CM/(S**2)": "ACC",
+    "CM/SEC**2": "ACC",
+    "CM/(SEC**2)": "ACC",
+    "MM/S**2": "ACC",
+    "MM/(S**2)": "ACC",
+    "MM/SEC**2": "ACC",
+    "MM/(SEC**2)": "ACC",
+    # Evalresp internally treats strain as displacement.
+    "M/M": "DIS",
+    "M**3/M**3": "DIS",
+    "V": "VOLTS",
+    "VOLT": "VOLTS",
+    "VOLTS": "VOLTS",
+    # This is weird, but evalresp appears to do the same.
+    "V/M": "VOLTS",
+    "COUNT": "COUNTS",
+    "COUNTS": "COUNTS",
+    "T": "TESLA",
+    "PA": "PRESSURE",
+    "PASCAL": "PRESSURE",
+    "PASCALS": "PRESSURE",
+    "MBAR": "PRESSURE"}
+
+
+def _get_evalresp_unit_type(key):
+    """
+    Helper function returning the evalresp unit type for a unit string.
+
+    Unknown units are assumed to be displacement, just like evalresp does.
+    """
+    try:
+        key = key.upper()
+    except Exception:
+        pass
+    if key not in _EVALRESP_UNITS_MAPPING:
+        if key is not None:
+            msg = ("The unit '%s' is not known to ObsPy. It will be "
+                   "assumed to be displacement for the calculations. "
+                   "This mostly does the right thing but please "
+                   "proceed with caution.") % key
+            warnings.warn(msg)
+        return "DIS"
+    return _EVALRESP_UNITS_MAPPING[key]
+
+
 class ResponseStage(ComparingObject):
     """
     From the StationXML Definition:
@@ -1078,6 +1148,116 @@ class Response(ComparingObject):
         overall_sensitivity = abs(response_at_frequency)
         return frequency, overall_sensitivity
 
+    def _get_stages_for_response_calculation(self, start_stage=None,
+                                             end_stage=None):
+        """
+        Returns the stages used to calculate the response, sorted by their
+        stage sequence number.
+
+        Stages outside the optionally requested stage range are omitted.
+        Missing units of stage 1 are guessed from the overall sensitivity or
+        stage 2 on a copy of the stage.
+
+        :type start_stage: int, optional
+        :param start_stage: Stage sequence number of first stage that will be
+            used (disregarding all earlier stages).
+        :type end_stage: int, optional
+        :param end_stage: Stage sequence number of last stage that will be
+            used (disregarding all later stages).
+        :rtype: list of :class:`ResponseStage`
+        """
+        all_stages = defaultdict(list)
+
+        for stage in self.response_stages:
+            # optionally select only stages as requested by user
+            if start_stage is not None:
+                if stage.stage_sequence_number < start_stage:
+                    continue
+            if end_stage is not None:
+                if stage.stage_sequence_number > end_stage:
+                    continue
+            all_stages[stage.stage_sequence_number].append(stage)
+
+        stage_lengths = set(map(len, all_stages.values()))
+        if len(stage_lengths) != 1 or stage_lengths.pop() != 1:
+            msg = "Each stage can only appear once."
+            raise ValueError(msg)
+
+        stage_list = sorted(all_stages.keys())
+
+        # Attempt to fix some potentially faulty responses here.
+        if 1 in all_stages and all_stages[1] and (
+                not all_stages[1][0].input_units or
+                not all_stages[1][0].output_units):
+            # Make a copy to not modify the original
+            all_stages[1][0] = copy.deepcopy(all_stages[1][0])
+            # Some stages 1 are just the sensitivity and as thus don't store
+            # input and output units in for example StationXML. In these cases
+            # try to guess it from the overall sensitivity or stage 2.
+            if not all_stages[1][0].input_units:
+                if self.instrument_sensitivity.input_units:
+                    all_stages[1][0].input_units = \
+                        self.instrument_sensitivity.input_units
+                    msg = "Set the input units of stage 1 to the overall " \
+                        "input units."
+                    warnings.warn(msg)
+            if not all_stages[1][0].output_units:
+                if max(all_stages.keys()) == 1 and \
+                        self.instrument_sensitivity.output_units:
+                    all_stages[1][0].output_units = \
+                        self.instrument_sensitivity.output_units
+                    msg = "Set the output units of stage 1 to the overall " \
+                        "output units."
+                    warnings.warn(msg)
+                if 2 in all_stages and all_stages[2] and \
+                        all_stages[2][0].input_units:
+                    all_stages[1][0].output_units = \
+                        all_stages[2][0].input_units
+                    msg = "Set the output units of stage 1 to the input " \
+                        "units of stage 2."
+                    warnings.warn(msg)
+
+        return [all_stages[_i][0] for _i in stage_list]
+
+    def _add_unit_decimation(self, blockette):
+        """
+        Set the "unit decimation" values of poles and zeros stages in case
+        they are not set.
+
+        Evalresp requires FIR and IIR blockettes to have decimation values.
+        The original stage is never modified, a copy is returned if any
+        values have to be set.
+        """
+        # Only set it if there is a stage gain - otherwise evalresp
+        # complains again.
+        if isinstance(blockette, PolesZerosResponseStage) and \
+                blockette.stage_gain and \
+                None in set([
+                    blockette.decimation_correction,
+                    blockette.decimation_delay,
+                    blockette.decimation_factor,
+                    blockette.decimation_input_sample_rate,
+                    blockette.decimation_offset]):
+            # Don't modify the original object.
+            blockette = copy.deepcopy(blockette)
+            blockette.decimation_correction = 0.0
+            blockette.decimation_delay = 0.0
+            blockette.decimation_factor = 1
+            blockette.decimation_offset = 0
+            sr = self.get_sampling_rates()
+            if sr and blockette.stage_sequence_number in sr and \
+                    sr[blockette.stage_sequence_number][
+                        "input_sampling_rate"]:
+                blockette.decimation_input_sample_rate = \
+                    self.get_sampling_rates()[
+                        blockette.stage_sequence_number][
+                        "input_sampling_rate"]
+            # This branch get's large called for responses that only have a
+            # a single stage.
+            else:
+                blockette.decimation_input_sample_rate = 1.0
+        return blockette
+
     def _call_eval_resp_for_frequencies(
             self, frequencies, output="VEL", start_stage=None,
             end_stage=None, hide_sensitivity_mismatch_warning=False):
@@ -1135,61 +1315,7 @@ class Response(ComparingObject):
                 key = key.upper()
             except Exception:
                 pass
-            units_mapping = {
-                "M": ew.ENUM_UNITS["DIS"],
-                "NM": ew.ENUM_UNITS["DIS"],
-                "CM": ew.ENUM_UNITS["DIS"],
-                "MM": ew.ENUM_UNITS["DIS"],
-                "M/S": ew.ENUM_UNITS["VEL"],
-                "M/SEC": ew.ENUM_UNITS["VEL"],
-                "NM/S": ew.ENUM_UNITS["VEL"],
-                "NM/SEC": ew.ENUM_UNITS["VEL"],
-                "CM/S": ew.ENUM_UNITS["VEL"],
-                "CM/SEC": ew.ENUM_UNITS["VEL"],
-                "MM/S": ew.ENUM_UNITS["VEL"],
-                "MM/SEC": ew.ENUM_UNITS["VEL"],
-                "M/S**2": ew.ENUM_UNITS["ACC"],
-                "M/(S**2)": ew.ENUM_UNITS["ACC"],
-                "M/SEC**2": ew.ENUM_UNITS["ACC"],
-                "M/(SEC**2)": ew.ENUM_UNITS["ACC"],
-                "M/S/S": ew.ENUM_UNITS["ACC"],
-                "NM/S**2": ew.ENUM_UNITS["ACC"],
-                "NM/(S**2)": ew.ENUM_UNITS["ACC"],
-                "NM/SEC**2": ew.ENUM_UNITS["ACC"],
-                "NM/(SEC**2)": ew.ENUM_UNITS["ACC"],
-                "CM/S**2": ew.ENUM_UNITS["ACC"],
-                "CM/(S**2)": ew.ENUM_UNITS["ACC"],
-                "CM/SEC**2": ew.ENUM_UNITS["ACC"],
-                "CM/(SEC**2)": ew.ENUM_UNITS["ACC"],
-                "MM/S**2": ew.ENUM_UNITS["ACC"],
-                "MM/(S**2)": ew.ENUM_UNITS["ACC"],
-                "MM/SEC**2": ew.ENUM_UNITS["ACC"],
-                "MM/(SEC**2)": ew.ENUM_UNITS["ACC"],
-                # Evalresp internally treats strain as displacement.
-                "M/M": ew.ENUM_UNITS["DIS"],
-                "M**3/M**3": ew.ENUM_UNITS["DIS"],
-                "V": ew.ENUM_UNITS["VOLTS"],
-                "VOLT": ew.ENUM_UNITS["VOLTS"],
-                "VOLTS": ew.ENUM_UNITS["VOLTS"],
-                # This is weird, but evalresp appears to do the same.
-                "V/M": ew.ENUM_UNITS["VOLTS"],
-                "COUNT": ew.ENUM_UNITS["COUNTS"],
-                "COUNTS": ew.ENUM_UNITS["COUNTS"],
-                "T": ew.ENUM_UNITS["TESLA"],
-                "PA": ew.ENUM_UNITS["PRESSURE"],
-                "PASCAL": ew.ENUM_UNITS["PRESSURE"],
-                "PASCALS": ew.ENUM_UNITS["PRESSURE"],
-                "MBAR": ew.ENUM_UNITS["PRESSURE"]}
-            if key not in units_mapping:
-                if key is not None:
-                    msg = ("The unit '%s' is not known to ObsPy. It will be "
-                           "assumed to be displacement for the calculations. "
-                           "This mostly does the right thing but please "
-                           "proceed with caution.") % key
-                    warnings.warn(msg)
-                value = ew.ENUM_UNITS["DIS"]
-            else:
-                value = units_mapping[key]
+            value = ew.ENUM_UNITS[_get_evalresp_unit_type(key)]
 
             # Scale factor with the same logic as evalresp.
             if key in ["CM/S**2", "CM/S", "CM/SEC", "CM"]:
@@ -1201,67 +1327,15 @@ class Response(ComparingObject):
 
             return value
 
-        all_stages = defaultdict(list)
-
-        for stage in self.response_stages:
-            # optionally select only stages as requested by user
-            if start_stage is not None:
-                if stage.stage_sequence_number < start_stage:
-                    continue
-            if end_stage is not None:
-                if stage.stage_sequence_number > end_stage:
-                    continue
-            all_stages[stage.stage_sequence_number].append(stage)
-
-        stage_lengths = set(map(len, all_stages.values()))
-        if len(stage_lengths) != 1 or stage_lengths.pop() != 1:
-            msg = "Each stage can only appear once."
-            raise ValueError(msg)
-
-        stage_list = sorted(all_stages.keys())
-
         stage_objects = []
 
-        # Attempt to fix some potentially faulty responses here.
-        if 1 in all_stages and all_stages[1] and (
-                not all_stages[1][0].input_units or
-                not all_stages[1][0].output_units):
-            # Make a copy to not modify the original
-            all_stages[1][0] = copy.deepcopy(all_stages[1][0])
-            # Some stages 1 are just the sensitivity and as thus don't store
-            # input and output units in for example StationXML. In these cases
-            # try to guess it from the overall sensitivity or stage 2.
-            if not all_stages[1][0].input_units:
-                if self.instrument_sensitivity.input_units:
-                    all_stages[1][0].input_units = \
-                        self.instrument_sensitivity.input_units
-                    msg = "Set the input units of stage 1 to the overall " \
-                        "input units."
-                    warnings.warn(msg)
-            if not all_stages[1][0].output_units:
-                if max(all_stages.keys()) == 1 and \
-                        self.instrument_sensitivity.output_units:
-                    all_stages[1][0].output_units = \
-                        self.instrument_sensitivity.output_units
-                    msg = "Set the output units of stage 1 to the overall " \
-                        "output units."
-                    warnings.warn(msg)
-                if 2 in all_stages and all_stages[2] and \
-                        all_stages[2][0].input_units:
-                    all_stages[1][0].output_units = \
-                        all_stages[2][0].input_units
-                    msg = "Set the output units of stage 1 to the input " \
-                        "units of stage 2."
-                    warnings.warn(msg)
-
-        for stage_number in stage_list:
+        for blockette in self._get_stages_for_response_calculation(
+                start_stage=start_stage, end_stage=end_stage):
             st = ew.Stage()
-            st.sequence_no = stage_number
+            st.sequence_no = blockette.stage_sequence_number
 
             stage_blkts = []
 
-            blockette = all_stages[stage_number][0]
-
             # Write the input and output units.
             st.input_units = get_unit_mapping(blockette.input_units)
             st.output_units = get_unit_mapping(blockette.output_units)
@@ -1347,48 +1421,8 @@ class Response(ComparingObject):
                 blkt = ew.Blkt()
                 blkt.type = ew.ENUM_FILT_TYPES["LIST"]
 
-                # Get values as numpy arrays.
-                f = np.array([float(_i.frequency)
-                              for _i in blockette.response_list_elements],
-                             dtype=np.float64)
-                amp = np.array([float(_i.amplitude)
-                                for _i in blockette.response_list_elements],
-                               dtype=np.float64)
-                phase = np.array([
-                    float(_i.phase)
-                    for _i in blockette.response_list_elements],
-                    dtype=np.float64)
-
-                # Sanity check.
-                min_f = frequencies[frequencies > 0].min()
-                max_f = frequencies.max()
-
-                min_f_avail = min(f)
-                max_f_avail = max(f)
-
-                # Allow interpolation for at most two samples.
-                _d = np.abs(np.diff(f))
-                _d = _d[_d > 0].min() * 2
-                min_f_avail -= _d
-                max_f_avail += _d
-
-                if min_f < min_f_avail or max_f > max_f_avail:
-                    msg = (
-                        "Cannot calculate the response as it contains a "
-                        "response list stage with frequencies only from "
-                        "%.4f - %.4f Hz. You are requesting a response from "
-                        "%.4f - %.4f Hz.")
-                    raise ValueError(msg % (min_f_avail, max_f_avail, min_f,
-                                            max_f))
-
-                amp = scipy.interpolate.InterpolatedUnivariateSpline(
-                    f, amp, k=3)(frequencies)
-                phase = scipy.interpolate.InterpolatedUnivariateSpline(
-                    f, phase, k=3)(frequencies)
-
-                # Set static offset to zero.
-                amp[amp == 0] = 0
-                phase[phase == 0] = 0
+                amp, phase = _interpolate_response_list_stage(
+                    blockette, frequencies)
 
                 rl = blkt.blkt_info.list
                 rl.nresp = len(frequencies)
@@ -1446,37 +1480,8 @@ class Response(ComparingObject):
                 stage_blkts.append(blkt)
 
             # Evalresp requires FIR and IIR blockettes to have decimation
-            # values. Set the "unit decimation" values in case they are not
-            # set.
-            #
-            # Only set it if there is a stage gain - otherwise evalresp
-            # complains again.
-            if isinstance(blockette, PolesZerosResponseStage) and \
-                    blockette.stage_gain and \
-                    None in set([
-                        blockette.decimation_correction,
-                        blockette.decimation_delay,
-                        blockette.decimation_factor,
-                        blockette.decimation_input_sample_rate,
-                        blockette.decimation_offset]):
-                # Don't modify the original object.
-                blockette = copy.deepcopy(blockette)
-                blockette.decimation_correction = 0.0
-                blockette.decimation_delay = 0.0
-                blockette.decimation_factor = 1
-                blockette.decimation_offset = 0
-                sr = self.get_sampling_rates()
-                if sr and blockette.stage_sequence_number in sr and \
-                        sr[blockette.stage_sequence_number][
-                            "input_sampling_rate"]:
-                    blockette.decimation_input_sample_rate = \
-                        self.get_sampling_rates()[
-                            blockette.stage_sequence_number][
-                            "input_sampling_rate"]
-                # This branch get's large called for responses that only have a
-                # a single stage.
-                else:
-                    blockette.decimation_input_sample_rate = 1.0
+            # values.
+            blockette = self._add_unit_decimation(blockette)
 
             # Parse the decimation if is given.
             decimation_values = set([
@@ -1597,8 +1602,271 @@ class Response(ComparingObject):
 
         return output, chan
 
+    def _call_numpy_resp_for_frequencies(
+            self, frequencies, output="VEL", start_stage=None,
+            end_stage=None, hide_sensitivity_mismatch_warning=False):
+        """
+        Returns frequency response for given frequencies using numpy.
+
+        Vectorized reimplementation of the calculations evalresp performs in
+        :meth:`_call_eval_resp_for_frequencies` following the same
+        conventions, e.g. the renormalization of stage gains given at a
+        frequency other than the sensitivity frequency, the normalization and
+        symmetry detection of FIR filters and the time shift correction of
+        asymmetric FIR filters. It does not rely on any global state and is
+        thus safe to use from multiple threads.
+
+        :type frequencies: list of float
+        :param frequencies: Discrete frequencies to calculate response for.
+        :type output: str
+        :param output: Output units. One of:
+
+            ``"DISP"``
+                displacement, output unit is meters
+            ``"VEL"``
+                velocity, output unit is meters/second
+            ``"ACC"``
+                acceleration, output unit is meters/second**2
+
+        :type start_stage: int, optional
+        :param start_stage: Stage sequence number of first stage that will be
+            used (disregarding all earlier stages).
+        :type end_stage: int, optional
+        :param end_stage: Stage sequence number of last stage that will be
+            used (disregarding all later stages).
+        :type hide_sensitivity_mismatch_warning: bool
+        :param hide_sensitivity_mismatch_warning: Hide the warning that
+            computed and reported sensitivities don't match.
+        :rtype: :class:`numpy.ndarray`
+        :returns: frequency response at requested frequencies
+        """
+        if not self.response_stages:
+            msg = ("Can not calculate the response of a response with no "
+                   "response stages.")
+            raise ObsPyException(msg)
+
+        out_units = output.upper()
+        if out_units not in ("DISP", "VEL", "ACC"):
+            msg = ("requested output is '%s' but must be one of 'DISP', 'VEL' "
+                   "or 'ACC'") % output
+            raise ValueError(msg)
+
+        frequencies = np.atleast_1d(np.asarray(frequencies, dtype=np.float64))
+        stages = self._get_stages_for_response_calculation(
+            start_stage=start_stage, end_stage=end_stage)
+
+        response = np.ones(len(frequencies), dtype=np.complex128)
+        input_units = None
+        previous_output_units = None
+        # First pass: Check the stages and assemble their filters.
+        stage_filters = []
+
+        for blockette in stages:
+            stage_input_units = _get_evalresp_unit_type(blockette.input_units)
+            stage_output_units = _get_evalresp_unit_type(
+                blockette.output_units)
+            if input_units is None:
+                input_units = stage_input_units
+
+            blockette = self._add_unit_decimation(blockette)
+            decimation_values = set([
+                blockette.decimation_correction,
+                blockette.decimation_delay, blockette.decimation_factor,
+                blockette.decimation_input_sample_rate,
+                blockette.decimation_offset])
+            if None in decimation_values:
+                if len(decimation_values) != 1:
+                    msg = ("If a decimation is given, all values must "
+                           "be specified.")
+                    raise ValueError(msg)
+                sampling_interval = None
+            # Evalresp does the same!
+            elif blockette.decimation_input_sample_rate == 0:
+                sampling_interval = 0.0
+            else:
+                sampling_interval = \
+                    1.0 / blockette.decimation_input_sample_rate
+
+            # The filter type of the stage, the function evaluating the
+            # unnormalized filter response (if the stage has any effect on
+            # it) and its normalization factor.
+            filter_type = None
+            transfer_function = None
+            normalization = 1.0
+            normalization_frequency = None
+            delay = 0.0
+
+            if isinstance(blockette, PolesZerosResponseStage):
+                zeros = np.array(blockette.zeros, dtype=np.complex128)
+                poles = np.array(blockette.poles, dtype=np.complex128)
+                normalization = float(blockette.normalization_factor)
+                normalization_frequency = \
+                    float(blockette.normalization_frequency)
+                pz_type = blockette.pz_transfer_function_type
+                if pz_type == "DIGITAL (Z-TRANSFORM)":
+                    filter_type = "IIR_PZ"
+                    if len(zeros) or len(poles):
+                        transfer_function = functools.partial(
+                            _digital_pz_response, zeros, poles,
+                            sampling_interval)
+                else:
+                    filter_type = "PZ"
+                    transfer_function = functools.partial(
+                        _analog_pz_response, zeros, poles,
+                        pz_type == "LAPLACE (RADIANS/SECOND)")
+            elif isinstance(blockette, (CoefficientsTypeResponseStage,
+                                        FIRResponseStage)):
+                if isinstance(blockette, FIRResponseStage):
+                    coefficients = np.array(
+                        [float(_i) for _i in blockette.coefficients],
+                        dtype=np.float64)
+                    symmetry = blockette.symmetry
+                    denominator = []
+                else:
+                    coefficients = np.array(
+                        [float(_i) for _i in blockette.numerator],
+                        dtype=np.float64)
+                    symmetry = "NONE"
+                    denominator = blockette.denominator
+                    if len(denominator) == 0 and \
+                            blockette.cf_transfer_function_type.lower() \
+                            != "digital":
+                        msg = ("When no denominators are given it must "
+                               "be a digital FIR filter.")
+                        raise ValueError(msg)
+
+                # FIR
+                if len(denominator) == 0:
+                    filter_type = "FIR"
+                    if symmetry == "NONE":
+                        coefficients, symmetry = \
+                            _get_fir_symmetry(coefficients)
+                    if len(coefficients):
+                        transfer_function = functools.partial(
+                            _fir_response, coefficients, symmetry,
+                            sampling_interval)
+                        # Symmetric filters are evaluated with zero phase,
+                        # asymmetric ones are corrected for the delay
+                        # already applied to the data.
+                        if symmetry == "NONE" and \
+                                sampling_interval is not None:
+                            delay = blockette.decimation_correction
+                # IIR
+                else:
+                    filter_type = "IIR"
+                    denominator = np.array(
+                        [float(_i) for _i in denominator], dtype=np.float64)
+                    transfer_function = functools.partial(
+                        _digital_coefficients_response, coefficients,
+                        denominator, sampling_interval)
+            elif isinstance(blockette, ResponseListResponseStage):
+                filter_type = "LIST"
+                amp, phase = _interpolate_response_list_stage(
+                    blockette, frequencies)
+                response *= amp * np.exp(1j * np.deg2rad(phase))
+            elif isinstance(blockette, PolynomialResponseStage):
+                msg = ("PolynomialResponseStage not yet implemented. "
+                       "Please contact the developers.")
+                raise NotImplementedError(msg)
+            else:
+                # Otherwise it could be a gain only stage.
+                if blockette.stage_gain is None or \
+                        blockette.stage_gain_frequency is None:
+                    msg = "Type: %s." % str(type(blockette))
+                    raise NotImplementedError(msg)
+                if sampling_interval is not None:
+                    msg = ("Decimation given for stage %i which has no "
+                           "associated filter." %
+                           blockette.stage_sequence_number)
+                    raise ValueError(msg)
+
+            if filter_type in ("IIR_PZ", "FIR", "IIR") and \
+                    sampling_interval is None:
+                msg = ("Required decimation for IIR or FIR filter in stage "
+                       "%i missing." % blockette.stage_sequence_number)
+                raise ValueError(msg)
+
+            # Units checking is skipped for gain only stages.
+            if filter_type is not None:
+                if previous_output_units is not None and \
+                        previous_output_units != stage_input_units:
+                    msg = ("Units mismatch between stage %i and the "
+                           "previous stage." %
+                           blockette.stage_sequence_number)
+                    raise ValueError(msg)
+                previous_output_units = stage_output_units
+
+            stage_filters.append((blockette, filter_type, transfer_function,
+                                  normalization, normalization_frequency,
+                                  delay))
+
+        sensitivity = self.instrument_sensitivity.value
+        # Evalresp uses a sensitivity frequency of zero if none is given.
+        sensitivity_frequency = self.instrument_sensitivity.frequency \
+            if self.instrument_sensitivity.frequency else 0.0
+        if not sensitivity:
+            msg = "Zero overall sensitivity."
+            raise ValueError(msg)
+
+        # Second pass: Normalize the stages and evaluate their responses.
+        calculated_sensitivity = 1.0
+        for blockette, filter_type, transfer_function, normalization, \
+                normalization_frequency, delay in stage_filters:
+            if blockette.stage_gain is not None and \
+                    blockette.stage_gain_frequency is not None:
+                gain = float(blockette.stage_gain)
+                gain_frequency = float(blockette.stage_gain_frequency)
+            # A single stage without gain uses the overall sensitivity.
+            elif len(stages) == 1:
+                gain = float(sensitivity)
+                gain_frequency = float(sensitivity_frequency)
+            else:
+                gain = None
+
+            if gain is not None:
+                if gain == 0.0:
+                    msg = ("Zero stage gain in stage %i." %
+                           blockette.stage_sequence_number)
+                    raise ValueError(msg)
+                # Stage gains given at a different frequency than the overall
+                # sensitivity are recalculated at the sensitivity frequency.
+                # This also replaces the normalization factor.
+                if transfer_function is not None and (
+                        gain_frequency != sensitivity_frequency or (
+                            normalization_frequency is not None and
+                            normalization_frequency !=
+                            sensitivity_frequency)):
+                    df, of = transfer_function(
+                        np.array([gain_frequency, sensitivity_frequency]))
+                    if filter_type == "PZ" and (df == 0 or of == 0):
+                        msg = ("Gain or sensitivity frequency found in "
+                               "bandpass of analog filter of stage %i." %
+                               blockette.stage_sequence_number)
+                        raise ValueError(msg)
+                    with np.errstate(divide="ignore"):
+                        gain = gain / np.abs(df) * np.abs(of)
+                        normalization = 1.0 / np.abs(of)
+                calculated_sensitivity *= gain
+
+            if transfer_function is not None:
+                response *= normalization * transfer_function(frequencies)
+            if delay:
+                response *= np.exp(1j * 2.0 * pi * frequencies * delay)
+
+        if not hide_sensitivity_mismatch_warning and \
+                abs((sensitivity - calculated_sensitivity) /
+                    sensitivity) >= 0.05:
+            msg = ("Computed and reported sensitivities differ by more than "
+                   "5 percent.")
+            warnings.warn(msg)
+
+        response *= calculated_sensitivity
+        return _convert_response_units(response, frequencies, input_units,
+                                       out_units)
+
     def get_evalresp_response_for_frequencies(
-            self, frequencies, output="VEL", start_stage=None, end_stage=None):
+            self, frequencies, output="VEL", start_stage=None, end_stage=None,
+            backend="evalresp"):
         """
         Returns frequency response for given frequencies using evalresp.
 
@@ -1620,16 +1888,36 @@ class Response(ComparingObject):
         :type end_stage: int, optional
         :param end_stage: Stage sequence number of last stage that will be
             used (disregarding all later stages).
+        :type backend: str
+        :param backend: Implementation used to calculate the response. One
+            of:
+
+            ``"evalresp"``
+                the evalresp C library (default)
+            ``"numpy"``
+                a vectorized pure numpy implementation following evalresp's
+                conventions. It does not use any global state and can thus
+                be used concurrently from multiple threads.
         :rtype: :class:`numpy.ndarray`
         :returns: frequency response at requested frequencies
         """
-        output, chan = self._call_eval_resp_for_frequencies(
-            frequencies, output=output, start_stage=start_stage,
-            end_stage=end_stage)
+        if backend == "evalresp":
+            output, chan = self._call_eval_resp_for_frequencies(
+                frequencies, output=output, start_stage=start_stage,
+                end_stage=end_stage)
+        elif backend == "numpy":
+            output = self._call_numpy_resp_for_frequencies(
+                frequencies, output=output, start_stage=start_stage,
+                end_stage=end_stage)
+        else:
+            msg = ("requested backend is '%s' but must be one of 'evalresp' "
+                   "or 'numpy'") % backend
+            raise ValueError(msg)
         return output
 
     def get_evalresp_response(self, t_samp, nfft, output="VEL",
-                              start_stage=None, end_stage=None):
+                              start_stage=None, end_stage=None,
+                              backend="evalresp"):
         """
         Returns frequency response and corresponding frequencies using
         evalresp.
@@ -1654,6 +1942,9 @@ class Response(ComparingObject):
         :type end_stage: int, optional
         :param end_stage: Stage sequence number of last stage that will be
             used (disregarding all later stages).
+        :type backend: str
+        :param backend: Implementation used to calculate the response, see
+            :meth:`get_evalresp_response_for_frequencies`.
         :rtype: tuple of two arrays
         :returns: frequency response and corresponding frequencies
         """
@@ -1667,7 +1958,8 @@ class Response(ComparingObject):
             freqs = np.linspace(0, fy, int(nfft // 2) + 1).astype(np.float64)
 
         response = self.get_evalresp_response_for_frequencies(
-            freqs, output=output, start_stage=start_stage, end_stage=end_stage)
+            freqs, output=output, start_stage=start_stage, end_stage=end_stage,
+            backend=backend)
         return response, freqs
 
     def __str__(self):
@@ -2210,6 +2502,196 @@ class CoefficientWithUncertainties(FloatWithUncertainties):
         self._number = value
 
 
+def _analog_pz_response(zeros, poles, radians, frequencies):
+    """
+    Helper function evaluating an analog poles and zeros transfer function
+    without normalization factor.
+
+    :type radians: bool
+    :param radians: ``True`` for a Laplace transform in radians/second,
+        ``False`` for one in Hertz.
+    """
+    omega = 1j * frequencies
+    if radians:
+        omega *= 2.0 * pi
+    numerator = np.ones(len(frequencies), dtype=np.complex128)
+    for zero in zeros:
+        numerator *= omega - zero
+    denominator = np.ones(len(frequencies), dtype=np.complex128)
+    for pole in poles:
+        denominator *= omega - pole
+    # Same as evalresp: Do not divide where the denominator vanishes.
+    response = numerator * denominator.conj()
+    mod_squared = denominator.real ** 2 + denominator.imag ** 2
+    nonzero = mod_squared != 0
+    response[nonzero] /= mod_squared[nonzero]
+    return response
+
+
+def _digital_pz_response(zeros, poles, sampling_interval, frequencies):
+    """
+    Helper function evaluating a digital (Z-transform) poles and zeros
+    transfer function without normalization factor.
+    """
+    z = np.exp(1j * 2.0 * pi * frequencies * sampling_interval)
+    response = np.ones(len(frequencies), dtype=np.complex128)
+    for zero in zeros:
+        response *= z - zero
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for pole in poles:
+            response /= z - pole
+    return response
+
+
+def _fir_response(coefficients, symmetry, sampling_interval, frequencies):
+    """
+    Helper function evaluating a FIR filter.
+
+    Symmetric filters only store the first half of their coefficients and
+    are evaluated with zero phase, just like evalresp does.
+    """
+    wt = 2.0 * pi * frequencies * sampling_interval
+    poly = np.polynomial.polynomial.polyval
+    if symmetry == "ODD":
+        # Last coefficient is the center of the filter.
+        c = 2.0 * coefficients[::-1]
+        c[0] /= 2.0
+        return poly(np.exp(1j * wt), c).real.astype(np.complex128)
+    elif symmetry == "EVEN":
+        c = 2.0 * coefficients[::-1]
+        return (np.exp(0.5j * wt) * poly(np.exp(1j * wt), c)).real.astype(
+            np.complex128)
+    return poly(np.exp(-1j * wt), coefficients)
+
+
+def _digital_coefficients_response(numerator, denominator, sampling_interval,
+                                   frequencies):
+    """
+    Helper function evaluating a digital IIR filter given by its numerator
+    and denominator coefficients.
+    """
+    z = np.exp(-1j * 2.0 * pi * frequencies * sampling_interval)
+    poly = np.polynomial.polynomial.polyval
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return poly(z, numerator) / poly(z, denominator)
+
+
+def _get_fir_symmetry(coefficients):
+    """
+    Helper function normalizing FIR coefficients to unity gain at zero
+    frequency and detecting their symmetry, just like evalresp does.
+
+    :rtype: tuple of :class:`numpy.ndarray` and str
+    :returns: The (for symmetric filters: first half of the) coefficients
+        and the symmetry, one of ``"NONE"``, ``"ODD"`` or ``"EVEN"``.
+    """
+    total = coefficients.sum()
+    if len(coefficients) and (total < 0.98 or total > 1.02):
+        coefficients = coefficients / total
+    nc = len(coefficients)
+    if nc % 2 == 0:
+        n0 = nc // 2
+        if np.all(coefficients[n0:] == coefficients[:n0][::-1]):
+            return coefficients[:n0], "EVEN"
+    else:
+        n0 = (nc - 1) // 2
+        if np.all(coefficients[n0 + 1:] == coefficients[:n0][::-1]):
+            return coefficients[:n0 + 1], "ODD"
+    return coefficients, "NONE"
+
+
+def _convert_response_units(response, frequencies, input_units, output):
+    """
+    Helper function converting a response from the evalresp input unit type
+    of its first stage to the requested output units.
+
+    Mirrors evalresp's behavior, i.e. unit types other than displacement
+    and acceleration are treated like velocity.
+    """
+    w = 2.0 * pi * frequencies
+    zero = w == 0
+
+    def differentiate(data):
+        return data * (1j * w)
+
+    def integrate(data):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            data = data * (-1j / w)
+        data[zero] = 0.0
+        return data
+
+    if input_units == "DIS":
+        if output == "DISP":
+            return response
+        response = integrate(response)
+    elif input_units == "ACC":
+        if output == "ACC":
+            return response
+        response = differentiate(response)
+
+    if output == "DISP":
+        response = differentiate(response)
+    elif output == "ACC":
+        response = integrate(response)
+    return response
+
+
+def _interpolate_response_list_stage(blockette, frequencies):
+    """
+    Helper function interpolating the amplitudes and phases of a response
+    list stage to the requested frequencies.
+
+    :type blockette: :class:`ResponseListResponseStage`
+    :type frequencies: :class:`numpy.ndarray`
+    :rtype: tuple of two :class:`numpy.ndarray`
+    :returns: Interpolated amplitudes and phases (in degrees).
+    """
+    # Get values as numpy arrays.
+    f = np.array([float(_i.frequency)
+                  for _i in blockette.response_list_elements],
+                 dtype=np.float64)
+    amp = np.array([float(_i.amplitude)
+                    for _i in blockette.response_list_elements],
+                   dtype=np.float64)
+    phase = np.array([
+        float(_i.phase)
+        for _i in blockette.response_list_elements],
+        dtype=np.float64)
+
+    # Sanity check.
+    min_f = frequencies[frequencies > 0].min()
+    max_f = frequencies.max()
+
+    min_f_avail = min(f)
+    max_f_avail = max(f)
+
+    # Allow interpolation for at most two samples.
+    _d = np.abs(np.diff(f))
+    _d = _d[_d > 0].min() * 2
+    min_f_avail -= _d
+    max_f_avail += _d
+
+    if min_f < min_f_avail or max_f > max_f_avail:
+        msg = (
+            "Cannot calculate the response as it contains a "
+            "response list stage with frequencies only from "
+            "%.4f - %.4f Hz. You are requesting a response from "
+            "%.4f - %.4f Hz.")
+        raise ValueError(msg % (min_f_avail, max_f_avail, min_f,
+                                max_f))
+
+    amp = scipy.interpolate.InterpolatedUnivariateSpline(
+        f, amp, k=3)(frequencies)
+    phase = scipy.interpolate.InterpolatedUnivariateSpline(
+        f, phase, k=3)(frequencies)
+
+    # Set static offset to zero.
+    amp[amp == 0] = 0
+    phase[phase == 0] = 0
+
+    return amp, phase
+
+
 def _adjust_bode_plot_figure(fig, plot_degrees=False, grid=True, show=True):
     """
     Helper function to do final adjustments to Bode plot figure.
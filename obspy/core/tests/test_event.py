@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import copy
 import io
 import os
 import pickle
@@ -10,8 +11,9 @@ import numpy as np
 
 from obspy import UTCDateTime, read_events
 from obspy.core.event import (Catalog, Comment, CreationInfo, Event,
-                              FocalMechanism, Magnitude, Origin, Pick,
-                              ResourceIdentifier, WaveformStreamID)
+                              FocalMechanism, Magnitude, Origin,
+                              OriginQuality, Pick, ResourceIdentifier,
+                              WaveformStreamID)
 from obspy.core.event.source import farfield
 from obspy.core.util import (
     BASEMAP_VERSION, CARTOPY_VERSION, PROJ4_VERSION, MATPLOTLIB_VERSION)
@@ -135,6 +137,37 @@ class EventTestCase(unittest.TestCase):
             ev.plot(kind=[['global'], ['ortho', 'beachball'],
                           ['p_sphere', 's_sphere']], outfile=ic.name)
 
+    def test_deepcopy_and_pickle(self):
+        """
+        Copied and unpickled events are independent of the original and
+        their resource ids refer to objects of the new event.
+        """
+        event = read_events("/path/to/CMTSOLUTION", format="CMTSOLUTION")[0]
+        origin = event.origins[0]
+        origin.latitude_errors.uncertainty = 0.5
+        for new in (event.copy(), copy.deepcopy(event),
+                    pickle.loads(pickle.dumps(event, protocol=2)),
+                    pickle.loads(pickle.dumps(event, protocol=4))):
+            self.assertEqual(new, event)
+            new_origin = new.origins[0]
+            self.assertIsNot(new_origin, origin)
+            self.assertIsNot(new.origins, event.origins)
+            self.assertIsNot(new_origin.time, origin.time)
+            self.assertIsNot(new_origin.latitude_errors,
+                             origin.latitude_errors)
+            self.assertIs(new.resource_id.get_referred_object(), new)
+            self.assertIs(new.preferred_origin(), new_origin)
+            self.assertIs(new.preferred_focal_mechanism(),
+                          new.focal_mechanisms[0])
+            # modifications do not affect the original
+            new_origin.latitude_errors.uncertainty = 1.0
+            new_origin.time += 10
+            new.origins.append(Origin())
+            self.assertEqual(origin.latitude_errors.uncertainty, 0.5)
+            self.assertNotEqual(new_origin.time, origin.time)
+            self.assertEqual(len(event.origins), 2)
+        self.assertIs(event.preferred_origin(), origin)
+
     def test_farfield_2xn_input(self):
         """
         Tests to compute P/S wave farfield radiation pattern using (theta,phi)
@@ -472,6 +505,93 @@ class CatalogTestCase(unittest.TestCase):
             self.assertTrue(all(event in cat_smaller
                                 for event in cat_bigger_inverse))
 
+    def test_filter_edge_cases(self):
+        """
+        Events with missing origins, magnitudes or values are filtered like
+        in the original per event implementation.
+        """
+        events = [
+            Event(),
+            Event(origins=[Origin()], magnitudes=[Magnitude()]),
+            Event(origins=[Origin(time=UTCDateTime(10), latitude=5.0,
+                                  quality=OriginQuality(azimuthal_gap=20))],
+                  magnitudes=[Magnitude(mag=0.0)]),
+            Event(origins=[Origin(time=UTCDateTime(20), latitude=-5.0,
+                                  depth=1e3)],
+                  magnitudes=[Magnitude(mag=3.0)]),
+            Event(origins=[Origin(time=UTCDateTime(15), latitude=0.0,
+                                  quality=OriginQuality(azimuthal_gap=0))],
+                  magnitudes=[Magnitude(mag=-1.0)])]
+        cat = Catalog(events)
+        rules = {
+            "magnitude < 1": [4],
+            "magnitude >= -1": [3, 4],
+            "latitude < 0": [1, 3],
+            "latitude >= 0": [2, 4],
+            "depth <= 1000": [1, 2, 3, 4],
+            "depth > 10": [3],
+            "azimuthal_gap < 10": [4],
+            "azimuthal_gap > 10": [2],
+            "time < 1970-01-01T00:00:15": [1, 2],
+            "time >= 1970-01-01T00:00:15": [3, 4]}
+        for rule, expected in rules.items():
+            self.assertEqual(cat.filter(rule).events,
+                             [events[_i] for _i in expected], msg=rule)
+            self.assertEqual(
+                cat.filter(rule, inverse=True).events,
+                [ev for _i, ev in enumerate(events) if _i not in expected])
+        self.assertEqual(cat.filter("latitude < 1", "depth > 10").events,
+                         [events[3]])
+        self.assertRaises(ValueError, cat.filter, "latitude=1")
+        self.assertRaises(ValueError, cat.filter, "latitude == 1")
+        self.assertRaises(ValueError, cat.filter, "distance < 1")
+
+    def test_catalog_columns(self):
+        """
+        Tests columnar view of catalog.
+        """
+        cat = read_events()
+        cat.append(Event())
+        columns = cat.to_columns()
+        self.assertEqual(len(columns), 4)
+        np.testing.assert_allclose(columns.latitude[:3],
+                                   [41.818, 39.342, 38.017])
+        self.assertTrue(columns.latitude.mask[3])
+        self.assertEqual(columns.time[1], UTCDateTime(
+            "2012-04-04T14:18:37").timestamp)
+        self.assertEqual(list(columns.magnitude_type[:3]),
+                         ["mb", "ML", "ML"])
+        self.assertEqual(list(columns.resource_id),
+                         [str(ev.resource_id) for ev in cat])
+        # sorting, missing values go to the end
+        self.assertEqual(columns.argsort("time").tolist(), [2, 1, 0, 3])
+        self.assertEqual(
+            columns.argsort("time", reverse=True).tolist(), [0, 1, 2, 3])
+        self.assertEqual(
+            columns.argsort(["magnitude_type", "depth"]).tolist(),
+            [2, 1, 0, 3])
+        self.assertEqual(
+            columns.argsort(["magnitude_type", "depth"],
+                            reverse=True).tolist(),
+            [0, 1, 2, 3])
+        self.assertEqual(columns.sort("magnitude").events,
+                         [cat[2], cat[1], cat[0], cat[3]])
+        self.assertRaises(ValueError, columns.argsort, "distance")
+        # selection with computed masks
+        mask = columns.latitude > 39
+        self.assertEqual(columns.select(mask.filled(False)).events,
+                         cat.events[:2])
+        self.assertEqual(columns.select([3, 0]).events, [cat[3], cat[0]])
+        self.assertEqual(columns.get_mask("magnitude > 4").tolist(),
+                         [True, True, False, False])
+        # preferred origins
+        event = cat[0]
+        origin = Origin(latitude=-10.0)
+        event.origins.append(origin)
+        event.preferred_origin_id = origin.resource_id
+        self.assertEqual(cat.to_columns().latitude[0], 41.818)
+        self.assertEqual(cat.to_columns(preferred=True).latitude[0], -10.0)
+
     def test_catalog_resource_id(self):
         """
         See #662
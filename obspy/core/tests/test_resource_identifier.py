@@ -656,6 +656,94 @@ class ResourceIdentifierTestCase(unittest.TestCase):
             # needs to call get_object_hook to find it
             self.assertIs(rid1.get_referred_object(), new_obj1)
 
+    def test_binding_history_is_bounded(self):
+        """
+        Repeatedly reading the same events while one copy is kept alive
+        must not grow the class level registry.
+        """
+        cat = read_events()
+        sizes = []
+        for _ in range(5):
+            read_events()
+            gc.collect()
+            sizes.append(ResourceIdentifier.get_registry_size())
+        self.assertEqual(sizes[0], sizes[-1])
+        # all entries are released with the last catalog
+        del cat
+        gc.collect()
+        size = ResourceIdentifier.get_registry_size()
+        self.assertEqual(size["objects"], 0)
+        self.assertEqual(size["resource_ids"], 0)
+        self.assertEqual(size["parent_scopes"], 0)
+
+    def test_get_registry_size(self):
+        """
+        Tests the registry size instrumentation.
+        """
+        size = ResourceIdentifier.get_registry_size()
+        self.assertEqual(size, dict(objects=0, resource_ids=0,
+                                    id_order_entries=0, parent_scopes=0,
+                                    scoped_objects=0))
+        obj_1 = UTCDateTime(0)
+        obj_2 = UTCDateTime(1)
+        parent = event.Event()
+        rid = ResourceIdentifier("smi:local/test", referred_object=obj_1)
+        rid.set_referred_object(obj_1)
+        ResourceIdentifier("smi:local/test", referred_object=obj_2,
+                           parent=parent)
+        size = ResourceIdentifier.get_registry_size()
+        # the event itself is bound to its resource id in its own scope,
+        # binding the same object twice only adds one entry
+        self.assertEqual(size, dict(objects=3, resource_ids=2,
+                                    id_order_entries=3, parent_scopes=1,
+                                    scoped_objects=2))
+
+    def test_scoped_registry(self):
+        """
+        Tests that objects bound in a scoped registry are only resolvable
+        inside of it and that the outer registry is restored.
+        """
+        obj_1 = UTCDateTime(0)
+        rid_1 = ResourceIdentifier("smi:local/test", referred_object=obj_1)
+        hook_obj = UTCDateTime(2)
+
+        def _get_object_hook(arg):
+            if str(arg) == "smi:local/hook":
+                return hook_obj
+
+        ResourceIdentifier.register_get_object_hook(_get_object_hook)
+        try:
+            with ResourceIdentifier.scoped_registry():
+                self.assertEqual(
+                    ResourceIdentifier.get_registry_size()["objects"], 0)
+                self.assertIsNone(
+                    ResourceIdentifier("smi:local/test").get_referred_object())
+                obj_2 = UTCDateTime(1)
+                rid_2 = ResourceIdentifier("smi:local/test",
+                                           referred_object=obj_2)
+                # hooks are still used
+                self.assertIs(ResourceIdentifier("smi:local/hook")(),
+                              hook_obj)
+        finally:
+            ResourceIdentifier.remove_get_object_hook(_get_object_hook)
+        self.assertIs(ResourceIdentifier("smi:local/test")(), obj_1)
+        self.assertIs(rid_1.get_referred_object(), obj_1)
+        # ids bound inside the scope do not resolve objects of the outer
+        # registry, unless they are bound again
+        with WarningsCapture() as w:
+            self.assertIsNone(rid_2.get_referred_object())
+        self.assertEqual(len(w), 1)
+        self.assertIn("scoped registry that no longer exists",
+                      str(w[0].message))
+        self.assertEqual(ResourceIdentifier.get_registry_size()["objects"], 1)
+        # state is restored on exceptions as well
+        with self.assertRaises(ValueError):
+            with ResourceIdentifier.scoped_registry():
+                raise ValueError()
+        self.assertIs(ResourceIdentifier("smi:local/test")(), obj_1)
+        rid_2.set_referred_object(obj_2, warn=False)
+        self.assertIs(rid_2.get_referred_object(), obj_2)
+
     def test_mutative_methods_deprecation(self):
         """
         Because Resource ids are hashable they should be immutable. Make
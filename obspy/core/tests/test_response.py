@@ -10,10 +10,12 @@ Test suite for the response handling.
     (https://www.gnu.org/copyleft/lesser.html)
 """
 import inspect
+import itertools
 import os
 import unittest
 import warnings
 from math import pi
+from multiprocessing.pool import ThreadPool
 
 import numpy as np
 import scipy.interpolate
@@ -556,6 +558,69 @@ class ResponseTestCase(unittest.TestCase):
             resp.instrument_sensitivity.frequency,
             1.0)
 
+    def test_numpy_backend_vs_evalresp(self):
+        """
+        The numpy backend must reproduce the evalresp results for all
+        bundled test responses and stage selections.
+        """
+        filenames = ["IRIS_single_channel_with_response.xml", "XM.05.xml",
+                     "AU.MEEK.xml", "IU_ANMO_BH.xml", "DK.BSD..BHZ.xml",
+                     "IM_I53H1_BDF.xml", "IM_IL31__BHZ.xml",
+                     "IU_ULN_00_LH1.xml", "stationxml_IU.ANTO.30.LDO.xml",
+                     "RESP.XX.NS306..SHZ.GS13.1.2180"]
+        for filename in filenames:
+            inv = read_inventory(os.path.join(self.data_dir, filename))
+            for response in [cha.response for net in inv for sta in net
+                             for cha in sta if cha.response]:
+                if not response.response_stages:
+                    continue
+                stages = [None] + [s.stage_sequence_number
+                                   for s in response.response_stages]
+                for unit, start_stage, end_stage in itertools.product(
+                        ["DISP", "VEL", "ACC"], stages, stages):
+                    kwargs = dict(t_samp=0.05, nfft=1024, output=unit,
+                                  start_stage=start_stage,
+                                  end_stage=end_stage)
+                    with warnings.catch_warnings(record=True), \
+                            CatchOutput():
+                        warnings.simplefilter("always")
+                        try:
+                            expected, _ = response.get_evalresp_response(
+                                **kwargs)
+                        except ValueError:
+                            with self.assertRaises(ValueError):
+                                response.get_evalresp_response(
+                                    backend="numpy", **kwargs)
+                            continue
+                        got, _ = response.get_evalresp_response(
+                            backend="numpy", **kwargs)
+                    np.testing.assert_allclose(
+                        got, expected, rtol=1E-7,
+                        atol=1E-12 * np.abs(expected).max())
+
+    def test_numpy_backend_in_threads(self):
+        """
+        The numpy backend does not rely on global state so it can be used
+        from many threads at once.
+        """
+        inv = read_inventory()
+        responses = [cha.response for net in inv for sta in net
+                     for cha in sta] * 5
+        freqs = np.linspace(0.0, 20.0, 1001)
+        expected = [r.get_evalresp_response_for_frequencies(freqs)
+                    for r in responses]
+        with ThreadPool(4) as pool:
+            got = pool.map(
+                lambda r: r.get_evalresp_response_for_frequencies(
+                    freqs, backend="numpy"), responses)
+        for g, e in zip(got, expected):
+            np.testing.assert_allclose(g, e, rtol=1E-7)
+
+    def test_invalid_backend(self):
+        resp = read_inventory()[0][0][0].response
+        with self.assertRaises(ValueError):
+            resp.get_evalresp_response_for_frequencies([1.0], backend="abc")
+
 
 def suite():
     return unittest.makeSuite(ResponseTestCase, 'test')
@@ -6,10 +6,11 @@ import unittest
 import warnings
 from unittest import mock
 
-from obspy import UTCDateTime, read
+from obspy import UTCDateTime, read, read_events
 from obspy.core.event import ResourceIdentifier as ResId
 from obspy.core.util.misc import CatchOutput, get_window_times, \
-    _ENTRY_POINT_CACHE, _yield_obj_parent_attr
+    _ENTRY_POINT_CACHE, _yield_obj_parent_attr, \
+    _yield_resource_id_parent_attr
 from obspy.core.util.testing import WarningsCapture
 
 
@@ -286,6 +287,37 @@ class UtilMiscTestCase(unittest.TestCase):
             self.assertEqual(attr, 'right')
             self.assertIsInstance(obj, ResId)
 
+    def test_yield_resource_id_parent_attr(self):
+        """
+        The specialized resource id search yields the same resource ids in
+        the same order as the generic one.
+        """
+        def _recursive(obj, parent=None, attr=None, ids=None):
+            ids = set() if ids is None else ids
+            if (id(obj), id(parent)) in ids:
+                return
+            ids.add((id(obj), id(parent)))
+            if isinstance(obj, ResId):
+                yield (id(obj), id(parent), attr)
+            elif isinstance(obj, (list, tuple)):
+                for val in obj:
+                    for out in _recursive(val, obj, attr, ids):
+                        yield out
+            elif hasattr(obj, '__dict__'):
+                for item, val in obj.__dict__.items():
+                    for out in _recursive(val, obj, item, ids):
+                        yield out
+
+        cat = read_events()
+        cat[0].extra = {"nested": {"value": [ResId("7")],
+                                   "namespace": "ns"}}
+        for obj in [cat, cat[0], [cat[1], (cat[2], )]]:
+            expected = list(_recursive(obj))
+            got = [(id(_i[0]), id(_i[1]), _i[2]) for _i in
+                   _yield_resource_id_parent_attr(obj)]
+            self.assertEqual(got, expected)
+        self.assertEqual(len(got), 26)
+
     def test_warning_capture(self):
         """
         Tests for the WarningsCapture class in obspy.core.util.testing
@@ -119,6 +119,16 @@ class AttribDict(compatibility.collections_abc.MutableMapping):
     __setattr__ = __setitem__
     __delattr__ = __delitem__
 
+    def __setstate__(self, state):
+        """
+        Restores the state when unpickling or copying.
+
+        Defined explicitly as otherwise each lookup of the method by pickle
+        and copy goes through the comparatively slow failing
+        :meth:`__getattr__`.
+        """
+        self.__dict__.update(state)
+
     def copy(self):
         return copy.deepcopy(self)
 
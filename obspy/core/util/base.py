@@ -646,6 +646,25 @@ def download_to_file(url, filename_or_buffer, chunk_size=1024):
 
 def _generic_reader(pathname_or_url=None, callback_func=None,
                     **kwargs):
+    generic = None
+    for result in _generic_iterator(pathname_or_url, callback_func,
+                                    **kwargs):
+        if generic is None:
+            generic = result
+        else:
+            generic.extend(result)
+    return generic
+
+
+def _generic_iterator(pathname_or_url=None, callback_func=None,
+                      **kwargs):
+    """
+    Yields the results of ``callback_func`` for a file-like object, a XML
+    string, a URL or each file matching a file name pattern.
+
+    Temporary files only exist until the next result is requested, so lazy
+    results (e.g. generators) can be consumed in the meantime.
+    """
     if not isinstance(pathname_or_url, str):
         # not a string - we assume a file-like object
         try:
@@ -657,20 +676,20 @@ def _generic_reader(pathname_or_url=None, callback_func=None,
             pathname_or_url.seek(0)
             with NamedTemporaryFile() as fh:
                 fh.write(pathname_or_url.read())
-                generic = callback_func(fh.name, **kwargs)
-        return generic
+                yield callback_func(fh.name, **kwargs)
+        else:
+            yield generic
     elif isinstance(pathname_or_url, bytes) and \
             pathname_or_url.strip().startswith(b'<'):
         # XML string
-        return callback_func(io.BytesIO(pathname_or_url), **kwargs)
+        yield callback_func(io.BytesIO(pathname_or_url), **kwargs)
     elif "://" in pathname_or_url[:10]:
         # URL
         # extract extension if any
         suffix = os.path.basename(pathname_or_url).partition('.')[2] or '.tmp'
         with NamedTemporaryFile(suffix=sanitize_filename(suffix)) as fh:
             download_to_file(url=pathname_or_url, filename_or_buffer=fh)
-            generic = callback_func(fh.name, **kwargs)
-        return generic
+            yield callback_func(fh.name, **kwargs)
     else:
         pathname = pathname_or_url
         # File name(s)
@@ -682,11 +701,8 @@ def _generic_reader(pathname_or_url=None, callback_func=None,
             elif not glob.has_magic(pathname) and not os.path.isfile(pathname):
                 raise IOError(2, "No such file or directory", pathname)
 
-        generic = callback_func(pathnames[0], **kwargs)
-        if len(pathnames) > 1:
-            for filename in pathnames[1:]:
-                generic.extend(callback_func(filename, **kwargs))
-        return generic
+        for filename in pathnames:
+            yield callback_func(filename, **kwargs)
 
 
 class CatchAndAssertWarnings(warnings.catch_warnings):
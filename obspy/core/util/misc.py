@@ -710,31 +710,36 @@ def _yield_resource_id_parent_attr(obj):
     being sought in order to improve efficiency.
     """
     from obspy.core.event import ResourceIdentifier
+    from obspy.core.event.base import QuantityError
+    from obspy.core.utcdatetime import UTCDateTime
 
+    # types which can not contain any resource identifiers
+    leaf_types = frozenset([type(None), bool, int, float, str, UTCDateTime,
+                            QuantityError])
     ids = set()  # id cache to avoid circular references
-
-    def func(obj, parent=None, attr=None):
-        if obj is None or not (hasattr(obj, '__dict__') or
-                               isinstance(obj, (list, tuple))):
-            return  # stop iteration
+    # Use an explicit stack instead of recursive generators, objects are
+    # visited depth first in the same order as by _yield_obj_parent_attr.
+    stack = [(obj, None, None)]
+    while stack:
+        obj, parent, attr = stack.pop()
         id_tuple = (id(obj), id(parent))
-        if id_tuple not in ids:
+        if id_tuple in ids:
+            continue
+        # Yield object, parent, and attr if desired conditions are met
+        if isinstance(obj, ResourceIdentifier):
             ids.add(id_tuple)
-            # Yield object, parent, and attr if desired conditions are met
-            if isinstance(obj, ResourceIdentifier):
-                yield (obj, parent, attr)
-            # Iterate through basic built-in types.
-            elif isinstance(obj, (list, tuple)):
-                for val in obj:
-                    for out in func(val, obj, attr):
-                        yield out
-            # Iterate through non built-in object attributes.
-            elif hasattr(obj, '__dict__'):
-                for item, val in obj.__dict__.items():
-                    for out in func(val, obj, item):
-                        yield out
-
-    return func(obj)
+            yield (obj, parent, attr)
+        # Iterate through basic built-in types.
+        elif isinstance(obj, (list, tuple)):
+            ids.add(id_tuple)
+            stack.extend([(val, obj, attr) for val in reversed(obj)
+                          if type(val) not in leaf_types])
+        # Iterate through non built-in object attributes.
+        elif hasattr(obj, '__dict__'):
+            ids.add(id_tuple)
+            stack.extend([(val, obj, item) for item, val in
+                          reversed(list(obj.__dict__.items()))
+                          if type(val) not in leaf_types])
 
 
 def _seed_id_map(
@@ -2,6 +2,7 @@
 """
 Defines the libmseed structures and blockettes.
 """
+import contextlib
 import ctypes as C  # NOQA
 import warnings
 
@@ -786,46 +787,58 @@ class _LibmseedWrapper(object):
         self.lib = lib
         self.verbose = True
 
+    @contextlib.contextmanager
+    def capture_messages(self):
+        """
+        Hooks up libmseed's logging facilities to Python callbacks for the
+        duration of the context and yields the lists of collected error and
+        warning messages.
+
+        Allows calling many functions of :attr:`lib` directly without the
+        overhead of the per call setup.
+        """
+        # Collect exceptions. They cannot be raised in the callback as
+        # they could never be caught then. They are collected and raised
+        # later on.
+        _errs = []
+        _warns = []
+
+        def log_error_or_warning(msg):
+            msg = msg.decode()
+            if msg.startswith("ERROR: "):
+                msg = msg[7:].strip()
+                _errs.append(msg)
+            if msg.startswith("INFO: "):
+                msg = msg[6:].strip()
+                _warns.append(msg)
+
+        diag_print = \
+            C.CFUNCTYPE(None, C.c_char_p)(log_error_or_warning)
+
+        def log_message(msg):
+            if self.verbose:
+                print(msg[6:].strip())
+        log_print = C.CFUNCTYPE(None, C.c_char_p)(log_message)
+
+        # Hookup libmseed's logging facilities to it's Python callbacks.
+        self.lib.setupLogging(diag_print, log_print)
+        yield _errs, _warns
+
     def __getattr__(self, item):
         func = getattr(self.lib, item)
 
         def _wrapper(*args):
-            # Collect exceptions. They cannot be raised in the callback as
-            # they could never be caught then. They are collected and raised
-            # later on.
-            _errs = []
-            _warns = []
-
-            def log_error_or_warning(msg):
-                msg = msg.decode()
-                if msg.startswith("ERROR: "):
-                    msg = msg[7:].strip()
-                    _errs.append(msg)
-                if msg.startswith("INFO: "):
-                    msg = msg[6:].strip()
-                    _warns.append(msg)
-
-            diag_print = \
-                C.CFUNCTYPE(None, C.c_char_p)(log_error_or_warning)
-
-            def log_message(msg):
-                if self.verbose:
-                    print(msg[6:].strip())
-            log_print = C.CFUNCTYPE(None, C.c_char_p)(log_message)
-
-            # Hookup libmseed's logging facilities to it's Python callbacks.
-            self.lib.setupLogging(diag_print, log_print)
-
-            try:
-                return func(*args)
-            finally:
-                for _w in _warns:
-                    warnings.warn(_w, InternalMSEEDWarning)
-                if _errs:
-                    msg = ("Encountered %i error(s) during a call to "
-                           "%s():\n%s" % (
-                               len(_errs), item, "\n".join(_errs)))
-                    raise InternalMSEEDError(msg)
+            with self.capture_messages() as (_errs, _warns):
+                try:
+                    return func(*args)
+                finally:
+                    for _w in _warns:
+                        warnings.warn(_w, InternalMSEEDWarning)
+                    if _errs:
+                        msg = ("Encountered %i error(s) during a call to "
+                               "%s():\n%s" % (
+                                   len(_errs), item, "\n".join(_errs)))
+                        raise InternalMSEEDError(msg)
         return _wrapper
 
 
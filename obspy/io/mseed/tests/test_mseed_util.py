@@ -1334,6 +1334,89 @@ class MSEEDUtilTestCase(unittest.TestCase):
         self.assertEqual(
             str(e.exception), "No MiniSEED data record found in file.")
 
+    def test_get_complete_records_size(self):
+        """
+        Tests finding the end of the last complete record in a buffer.
+        """
+        filename = os.path.join(self.path, 'data',
+                                'BW.BGLD.__.EHE.D.2008.001.first_10_records')
+        with open(filename, 'rb') as fh:
+            data = fh.read()
+        self.assertEqual(len(data), 5120)
+        self.assertEqual(util._get_record_length(data), (512, 48))
+        for size, expected in ((0, 0), (20, 0), (511, 0), (512, 512),
+                               (513, 512), (4000, 3584), (5120, 5120)):
+            self.assertEqual(
+                util._get_complete_records_size(data[:size]), expected)
+
+        # Different record lengths and byte orders.
+        records = []
+        for reclen, byteorder in ((512, '>'), (4096, '<'), (256, '>')):
+            tr = Trace(np.arange(2000, dtype=np.int32))
+            with io.BytesIO() as buf:
+                tr.write(buf, format='MSEED', reclen=reclen,
+                         byteorder=byteorder, encoding='INT32')
+                records.append(buf.getvalue())
+        data = b''.join(records)
+        self.assertEqual(util._get_complete_records_size(data), len(data))
+        self.assertEqual(
+            util._get_complete_records_size(data[:-1]), len(data) - 256)
+        self.assertEqual(
+            util._get_complete_records_size(data[:len(records[0]) + 100]),
+            len(records[0]))
+
+        # Records without blockette 1000 and no MiniSEED at all.
+        filename = os.path.join(self.path, 'data', 'fullseed.mseed')
+        with open(filename, 'rb') as fh:
+            self.assertIsNone(util._get_complete_records_size(fh.read()))
+        self.assertIsNone(util._get_complete_records_size(b'x' * 1000))
+
+    def test_get_record_table(self):
+        """
+        Tests parsing the headers of all records of a buffer at once.
+        """
+        # Different record lengths, byte orders, sampling rates and
+        # microseconds in blockette 1001.
+        records = []
+        for reclen, byteorder, delta, start in (
+                (512, '>', 0.01, UTCDateTime(2005, 3, 1, 12, 0, 0.123456)),
+                (4096, '<', 2.0, UTCDateTime(1999, 12, 31, 23, 59, 59)),
+                (256, '>', 1.0 / 3.0, UTCDateTime(2012, 2, 29))):
+            tr = Trace(np.arange(3000, dtype=np.int32), header={
+                'network': 'XX', 'station': 'ABC', 'location': '00',
+                'channel': 'BHZ', 'delta': delta, 'starttime': start})
+            with io.BytesIO() as buf:
+                tr.write(buf, format='MSEED', reclen=reclen,
+                         byteorder=byteorder, encoding='INT32')
+                records.append(buf.getvalue())
+        # Blockette 1001 and time corrections.
+        for filename in ('timingquality.mseed',
+                         'one_record_already_applied_time_correction.mseed'):
+            with open(os.path.join(self.path, 'data', filename), 'rb') as fh:
+                records.append(fh.read())
+        data = b''.join(records)
+
+        table = util._get_record_table(data + b'x' * 100)
+        self.assertEqual(
+            table['offset'][-1] + table['record_length'][-1], len(data))
+        with io.BytesIO(data) as buf:
+            for row in table:
+                info = util.get_record_information(buf, int(row['offset']))
+                self.assertEqual(row['record_length'], info['record_length'])
+                self.assertEqual(row['starttime'], info['starttime'].ns)
+                self.assertEqual(row['endtime'], info['endtime'].ns)
+                self.assertEqual(row['npts'], info['npts'])
+                self.assertAlmostEqual(row['sampling_rate'],
+                                       info['samp_rate'], places=5)
+                self.assertEqual(row['encoding'], info['encoding'])
+                self.assertEqual(row['byteorder'], info['byteorder'] == '>')
+                self.assertTrue(
+                    48 <= row['data_offset'] < row['record_length'])
+                self.assertEqual(
+                    row['id'].ljust(12)[7:10].decode(), info['channel'])
+        self.assertEqual(len(util._get_record_table(b'')), 0)
+        self.assertEqual(len(util._get_record_table(b'x' * 1000)), 0)
+
 
 def suite():
     return unittest.makeSuite(MSEEDUtilTestCase, 'test')
@@ -1735,6 +1735,267 @@ def get_timing_and_data_quality(file_or_file_object):
     return ret_val
 
 
+def _get_record_length(data, offset=0):
+    """
+    Returns the record length of the MiniSEED record starting at ``offset``
+    in ``data`` as given in its blockette 1000 and the offset of the
+    blockette 1000 relative to the start of the record.
+
+    :type data: :class:`numpy.ndarray` of dtype uint8
+    :param data: Buffer containing one or more MiniSEED records.
+    :returns: ``(record_length, blockette_offset)``, ``(0, 0)`` if ``data``
+        ends before the blockette 1000 and ``(None, None)`` if the record
+        length can not be determined (e.g. no valid MiniSEED data record or
+        no blockette 1000).
+    """
+    size = len(data) - offset
+    if size < 48:
+        return 0, 0
+    if bytes(data[offset + 6:offset + 7]) not in (b'D', b'R', b'Q', b'M'):
+        return None, None
+    # Use the year and the day of year to figure out the byte order.
+    header = bytes(data[offset + 20:offset + 24])
+    year, julday = unpack('>HH', header)
+    endian = '>' if 1900 <= year <= 2500 and 1 <= julday <= 366 else '<'
+    blockette_offset = unpack(
+        endian + 'H', bytes(data[offset + 46:offset + 48]))[0]
+    while blockette_offset:
+        if blockette_offset < 48:
+            return None, None
+        if blockette_offset + 7 > size:
+            return 0, 0
+        blockette_type, next_offset = unpack(
+            endian + 'HH',
+            bytes(data[offset + blockette_offset:
+                       offset + blockette_offset + 4]))
+        if blockette_type == 1000:
+            exponent = int(data[offset + blockette_offset + 6])
+            if not 7 <= exponent <= 20:
+                return None, None
+            return 2 ** exponent, blockette_offset
+        if next_offset <= blockette_offset:
+            break
+        blockette_offset = next_offset
+    return None, None
+
+
+def _iter_record_runs(data):
+    """
+    Yields the runs of consecutive MiniSEED data records at the start of a
+    buffer as tuples of the offset of the first record, the record length
+    and the number of complete records.
+
+    Runs of records with the same length and header layout as their first
+    record are found at once, so the cost is mostly independent of the
+    number of records. Stops at the first incomplete record. If the length
+    of a record can not be determined, ``(offset, None, 0)`` is yielded
+    last.
+
+    :type data: :class:`numpy.ndarray` of dtype uint8
+    :param data: Buffer starting with a MiniSEED data record.
+    """
+    size = len(data)
+    position = 0
+    while position < size:
+        record_length, blockette_offset = _get_record_length(data, position)
+        if record_length is None:
+            yield position, None, 0
+            return
+        if not record_length or position + record_length > size:
+            return
+        count = (size - position) // record_length
+        records = data[position:position + count * record_length].reshape(
+            count, record_length)
+        first = records[0]
+        # The quality indicator and the position and content of the
+        # blockette 1000 up to the record length exponent must be the same.
+        columns = [6, 46, 47] + list(
+            range(blockette_offset, blockette_offset + 7))
+        same = (records[:, columns] == first[columns]).all(axis=1)
+        if not same.all():
+            count = int(np.argmin(same))
+        yield position, record_length, count
+        position += record_length * count
+
+
+def _get_complete_records_size(data):
+    """
+    Returns the size of the complete MiniSEED data records at the start of
+    a buffer, e.g. to cut data received in arbitrary chunks at record
+    boundaries.
+
+    :type data: bytes, bytearray or :class:`numpy.ndarray`
+    :param data: Buffer starting with a MiniSEED data record.
+    :returns: The size in bytes or ``None`` if the length of one of the
+        records can not be determined.
+    """
+    position = 0
+    for position, record_length, count in _iter_record_runs(
+            np.frombuffer(data, dtype=np.uint8)):
+        if record_length is None:
+            return None
+        position += record_length * count
+    return position
+
+
+# Record table returned by _get_record_table(). The id is the raw station,
+# location, channel and network code of the fixed header, times are in
+# nanoseconds since 1970-01-01 like UTCDateTime.ns. Encoding and byte order
+# (1 for big endian) of the data are the ones of the blockette 1000, -1 if
+# the record has none.
+RECORD_TABLE_DTYPE = np.dtype([
+    ("offset", np.int64), ("record_length", np.int64), ("id", "S12"),
+    ("starttime", np.int64), ("endtime", np.int64), ("npts", np.int64),
+    ("sampling_rate", np.float64), ("encoding", np.int16),
+    ("byteorder", np.int16), ("data_offset", np.int64)])
+
+
+def _get_record_table(data):
+    """
+    Returns the position, id, start and end time of all complete MiniSEED
+    data records at the start of a buffer as a structured array of dtype
+    ``RECORD_TABLE_DTYPE``.
+
+    The headers of all records are parsed at once with numpy, start and
+    end times are determined the same way as by
+    :func:`get_record_information` (including time corrections and
+    blockettes 100, 500 and 1001). Parsing stops at the first incomplete
+    record or record of unknown length (e.g. without a blockette 1000).
+
+    :type data: bytes, bytearray or :class:`numpy.ndarray`
+    :param data: Buffer starting with a MiniSEED data record, e.g. a
+        :class:`numpy.memmap` of a file.
+    """
+    data = np.frombuffer(data, dtype=np.uint8)
+    offsets = [np.empty(0, dtype=np.int64)]
+    lengths = [np.empty(0, dtype=np.int64)]
+    for position, record_length, count in _iter_record_runs(data):
+        if record_length is None:
+            break
+        offsets.append(np.arange(count, dtype=np.int64) * record_length +
+                       position)
+        lengths.append(np.full(count, record_length, dtype=np.int64))
+    return _parse_record_headers(data, np.concatenate(offsets),
+                                 np.concatenate(lengths))
+
+
+def _parse_record_headers(data, offsets, record_lengths):
+    """
+    Parses the headers of MiniSEED data records at the given positions of a
+    buffer at once and returns them as a structured array of dtype
+    ``RECORD_TABLE_DTYPE``, see :func:`_get_record_table`.
+
+    :type data: :class:`numpy.ndarray` of dtype uint8
+    :param data: Buffer containing the records.
+    :type offsets: :class:`numpy.ndarray` of dtype int64
+    :param offsets: The positions of complete records in ``data``.
+    :type record_lengths: :class:`numpy.ndarray` of dtype int64 or int
+    :param record_lengths: The lengths of the records.
+    """
+    table = np.empty(len(offsets), dtype=RECORD_TABLE_DTYPE)
+    if not len(table):
+        return table
+    table["offset"] = offsets
+    table["record_length"] = record_lengths
+    header = data[offsets[:, None] + np.arange(48)]
+    table["id"] = np.ascontiguousarray(header[:, 8:20]).view("S12")[:, 0]
+
+    # Use the year and the day of year to figure out the byte order.
+    big_endian = (
+        (header[:, 20].astype(np.int64) * 256 + header[:, 21] >= 1900) &
+        (header[:, 20].astype(np.int64) * 256 + header[:, 21] <= 2500) &
+        (header[:, 22].astype(np.int64) * 256 + header[:, 23] >= 1) &
+        (header[:, 22].astype(np.int64) * 256 + header[:, 23] <= 366))
+
+    def _unpack(values, size, signed=False, big=big_endian):
+        """
+        Unpacks unsigned (or signed) integers of ``size`` bytes from the
+        columns of ``values``.
+        """
+        values = values.astype(np.int64)
+        be = np.zeros(len(values), dtype=np.int64)
+        le = np.zeros(len(values), dtype=np.int64)
+        for i in range(size):
+            be = be * 256 + values[:, i]
+            le = le * 256 + values[:, size - 1 - i]
+        result = np.where(big, be, le)
+        if signed:
+            limit = 2 ** (8 * size - 1)
+            result = np.where(result >= limit, result - 2 * limit, result)
+        return result
+
+    year = _unpack(header[:, 20:22], 2)
+    julday = _unpack(header[:, 22:24], 2)
+    days = (year - 1970).astype("datetime64[Y]").astype(
+        "datetime64[D]").astype(np.int64) + julday - 1
+    starttime = (days * 86400 + header[:, 24].astype(np.int64) * 3600 +
+                 header[:, 25].astype(np.int64) * 60 + header[:, 26]) * \
+        10 ** 9 + _unpack(header[:, 28:30], 2) * 10 ** 5
+    npts = _unpack(header[:, 30:32], 2)
+    factor = _unpack(header[:, 32:34], 2, signed=True).astype(np.float64)
+    multiplier = _unpack(header[:, 34:36], 2, signed=True).astype(np.float64)
+    # Apply the time correction if it has not been applied yet (bit 1 of
+    # the activity flags).
+    time_correction = _unpack(header[:, 40:44], 4, signed=True)
+    starttime += np.where(header[:, 36] & 2, 0, time_correction) * 10 ** 5
+
+    # Traverse the blockettes of all records at once, one blockette per
+    # iteration.
+    samp_rate = np.zeros(len(table), dtype=np.float64)
+    table["encoding"] = -1
+    table["byteorder"] = -1
+    blockette_offset = _unpack(header[:, 46:48], 2)
+    while True:
+        idx = np.flatnonzero(
+            (blockette_offset >= 48) &
+            (blockette_offset + 8 <= table["record_length"]))
+        if not len(idx):
+            break
+        position = offsets[idx] + blockette_offset[idx]
+        blockette = data[position[:, None] + np.arange(8)]
+        big = big_endian[idx]
+        blockette_type = _unpack(blockette[:, 0:2], 2, big=big)
+        next_offset = _unpack(blockette[:, 2:4], 2, big=big)
+        # Microseconds of blockettes 1001 and 500.
+        for b_type, column in ((1001, 5), (500, 18)):
+            mask = blockette_type == b_type
+            if b_type == 500:
+                mask &= blockette_offset[idx] + 19 <= \
+                    table["record_length"][idx]
+            if mask.any():
+                mu_sec = data[position[mask] + column].view(np.int8)
+                starttime[idx[mask]] += mu_sec.astype(np.int64) * 1000
+        mask = blockette_type == 1000
+        table["encoding"][idx[mask]] = blockette[mask, 4]
+        table["byteorder"][idx[mask]] = blockette[mask, 5]
+        mask = blockette_type == 100
+        if mask.any():
+            rate = _unpack(blockette[mask, 4:8], 4, big=big[mask])
+            samp_rate[idx[mask]] = rate.astype(np.uint32).view(np.float32)
+        # Stop at invalid offsets.
+        next_offset[next_offset <= blockette_offset[idx]] = 0
+        blockette_offset = np.zeros_like(blockette_offset)
+        blockette_offset[idx] = next_offset
+
+    # If the sample rate is not set via blockette 100 calculate it
+    # according to the SEED manual.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        nominal = np.select(
+            [(factor > 0) & (multiplier > 0), (factor > 0) & (multiplier < 0),
+             (factor < 0) & (multiplier > 0), (factor < 0) & (multiplier < 0)],
+            [factor * multiplier, -factor / multiplier,
+             -multiplier / factor, 1.0 / (factor * multiplier)], 0.0)
+        samp_rate = np.where(samp_rate != 0, samp_rate, nominal)
+        # The end time is the time of the last sample.
+        duration = np.where(samp_rate != 0, (npts - 1) / samp_rate, 0.0)
+    table["starttime"] = starttime
+    table["endtime"] = starttime + np.round(duration * 1e9).astype(np.int64)
+    table["npts"] = npts
+    table["sampling_rate"] = samp_rate
+    table["data_offset"] = _unpack(header[:, 44:46], 2)
+    return table
+
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod(exclude_empty=True)
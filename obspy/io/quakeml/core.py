@@ -160,6 +160,55 @@ class Unpickler(object):
         self.xml_doc = etree.parse(io.BytesIO(string))
         return self._deserialize()
 
+    def iter_load(self, file):
+        """
+        Iterates over the events of a QuakeML file, one event at a time.
+
+        In contrast to :meth:`load` the document is parsed incrementally and
+        all processed elements are discarded, so memory usage does not grow
+        with the number of events in the file. Attributes of the event
+        parameters themselves (e.g. their description or comments) are not
+        read. The root element of the partially parsed document is available
+        as :attr:`xml_root` while iterating.
+
+        :type file: str or file-like object
+        :param file: File name or open file-like object to read.
+        :rtype: generator of :class:`~obspy.core.event.Event`
+        """
+        depth = 0
+        for action, element in etree.iterparse(file, events=("start",
+                                                             "end")):
+            if action == "start":
+                depth += 1
+                if depth == 1:
+                    match = re.match(QUAKEML_ROOTTAG_REGEX, element.tag)
+                    if match is None:
+                        raise Exception(
+                            "Not a QuakeML compatible file or string")
+                    self.xml_doc = element
+                    root_namespace, quakeml_version = match.groups()
+                    self._quakeml_namespaces = [
+                        root_namespace,
+                        NS_QUAKEML_BED_PATTERN.format(
+                            version=quakeml_version)]
+                continue
+            depth -= 1
+            # Only direct children of the event parameters are processed.
+            if depth != 2:
+                continue
+            parent = element.getparent()
+            event = None
+            if etree.QName(element).localname == "event" and \
+                    etree.QName(parent).localname == "eventParameters":
+                event = self._event(element)
+            # Discard the processed element and all of its preceding
+            # siblings.
+            element.clear()
+            while element.getprevious() is not None:
+                del parent[0]
+            if event is not None:
+                yield event
+
     def _xpath2obj(self, xpath, element=None, convert_to=str, namespace=None):
         q = self._xpath(xpath, element=element, namespace=namespace)
         if not q:
@@ -894,6 +943,93 @@ class Unpickler(object):
         self._extra(element, obj)
         return obj
 
+    def _event(self, event_el):
+        """
+        Converts an etree.Element into an Event object.
+
+        :type event_el: etree.Element
+        :rtype: :class:`~obspy.core.event.Event` or None
+        :returns: The event or ``None`` if the event type is not compliant
+            with the QuakeML standard and the event is thus ignored.
+        """
+        # create new Event object
+        event = Event(force_resource_id=False)
+        # optional event attributes
+        event.preferred_origin_id = \
+            self._xpath2obj('preferredOriginID', event_el)
+        event.preferred_magnitude_id = \
+            self._xpath2obj('preferredMagnitudeID', event_el)
+        event.preferred_focal_mechanism_id = \
+            self._xpath2obj('preferredFocalMechanismID', event_el)
+        event_type = self._xpath2obj('type', event_el)
+        # Change for QuakeML 1.2RC4. 'null' is no longer acceptable as an
+        # event type. Will be replaced with 'not reported'.
+        if event_type == "null":
+            event_type = "not reported"
+        # USGS event types contain '_' which is not compliant with
+        # the QuakeML standard
+        if isinstance(event_type, str):
+            event_type = event_type.replace("_", " ")
+        try:
+            event.event_type = event_type
+        except ValueError:
+            msg = "Event type '%s' does not comply " % event_type
+            msg += "with QuakeML standard -- event will be ignored."
+            warnings.warn(msg, UserWarning)
+            return None
+        self._set_enum('typeCertainty', event_el,
+                       event, 'event_type_certainty')
+        event.creation_info = self._creation_info(event_el)
+        event.event_descriptions = self._event_description(event_el)
+        event.comments = self._comments(event_el)
+        # origins
+        event.origins = []
+        for origin_el in self._xpath('origin', event_el):
+            # Have to be created before the origin is created to avoid a
+            # rare issue where a warning is read when the same event is
+            # read twice - the warnings does not occur if two referred
+            # to objects compare equal - for this the arrivals have to
+            # be bound to the event before the resource id is assigned.
+            arrivals = []
+            for arrival_el in self._xpath('arrival', origin_el):
+                arrival = self._arrival(arrival_el)
+                arrivals.append(arrival)
+
+            origin = self._origin(origin_el, arrivals=arrivals)
+
+            # append origin with arrivals
+            event.origins.append(origin)
+        # magnitudes
+        event.magnitudes = []
+        for magnitude_el in self._xpath('magnitude', event_el):
+            magnitude = self._magnitude(magnitude_el)
+            event.magnitudes.append(magnitude)
+        # station magnitudes
+        event.station_magnitudes = []
+        for magnitude_el in self._xpath('stationMagnitude', event_el):
+            magnitude = self._station_magnitude(magnitude_el)
+            event.station_magnitudes.append(magnitude)
+        # picks
+        event.picks = []
+        for pick_el in self._xpath('pick', event_el):
+            pick = self._pick(pick_el)
+            event.picks.append(pick)
+        # amplitudes
+        event.amplitudes = []
+        for el in self._xpath('amplitude', event_el):
+            amp = self._amplitude(el)
+            event.amplitudes.append(amp)
+        # focal mechanisms
+        event.focal_mechanisms = []
+        for fm_el in self._xpath('focalMechanism', event_el):
+            fm = self._focal_mechanism(fm_el)
+            event.focal_mechanisms.append(fm)
+        event.resource_id = event_el.get('publicID')
+        self._extra(event_el, event)
+        # bind event scoped resource IDs to this event
+        event.scope_resource_ids()
+        return event
+
     def _deserialize(self):
         # check node "quakeml/eventParameters" for global namespace
         try:
@@ -916,84 +1052,9 @@ class Unpickler(object):
         catalog.creation_info = self._creation_info(catalog_el)
         # loop over all events
         for event_el in self._xpath('event', catalog_el):
-            # create new Event object
-            event = Event(force_resource_id=False)
-            # optional event attributes
-            event.preferred_origin_id = \
-                self._xpath2obj('preferredOriginID', event_el)
-            event.preferred_magnitude_id = \
-                self._xpath2obj('preferredMagnitudeID', event_el)
-            event.preferred_focal_mechanism_id = \
-                self._xpath2obj('preferredFocalMechanismID', event_el)
-            event_type = self._xpath2obj('type', event_el)
-            # Change for QuakeML 1.2RC4. 'null' is no longer acceptable as an
-            # event type. Will be replaced with 'not reported'.
-            if event_type == "null":
-                event_type = "not reported"
-            # USGS event types contain '_' which is not compliant with
-            # the QuakeML standard
-            if isinstance(event_type, str):
-                event_type = event_type.replace("_", " ")
-            try:
-                event.event_type = event_type
-            except ValueError:
-                msg = "Event type '%s' does not comply " % event_type
-                msg += "with QuakeML standard -- event will be ignored."
-                warnings.warn(msg, UserWarning)
-                continue
-            self._set_enum('typeCertainty', event_el,
-                           event, 'event_type_certainty')
-            event.creation_info = self._creation_info(event_el)
-            event.event_descriptions = self._event_description(event_el)
-            event.comments = self._comments(event_el)
-            # origins
-            event.origins = []
-            for origin_el in self._xpath('origin', event_el):
-                # Have to be created before the origin is created to avoid a
-                # rare issue where a warning is read when the same event is
-                # read twice - the warnings does not occur if two referred
-                # to objects compare equal - for this the arrivals have to
-                # be bound to the event before the resource id is assigned.
-                arrivals = []
-                for arrival_el in self._xpath('arrival', origin_el):
-                    arrival = self._arrival(arrival_el)
-                    arrivals.append(arrival)
-
-                origin = self._origin(origin_el, arrivals=arrivals)
-
-                # append origin with arrivals
-                event.origins.append(origin)
-            # magnitudes
-            event.magnitudes = []
-            for magnitude_el in self._xpath('magnitude', event_el):
-                magnitude = self._magnitude(magnitude_el)
-                event.magnitudes.append(magnitude)
-            # station magnitudes
-            event.station_magnitudes = []
-            for magnitude_el in self._xpath('stationMagnitude', event_el):
-                magnitude = self._station_magnitude(magnitude_el)
-                event.station_magnitudes.append(magnitude)
-            # picks
-            event.picks = []
-            for pick_el in self._xpath('pick', event_el):
-                pick = self._pick(pick_el)
-                event.picks.append(pick)
-            # amplitudes
-            event.amplitudes = []
-            for el in self._xpath('amplitude', event_el):
-                amp = self._amplitude(el)
-                event.amplitudes.append(amp)
-            # focal mechanisms
-            event.focal_mechanisms = []
-            for fm_el in self._xpath('focalMechanism', event_el):
-                fm = self._focal_mechanism(fm_el)
-                event.focal_mechanisms.append(fm)
-            # finally append newly created event to catalog
-            event.resource_id = event_el.get('publicID')
-            self._extra(event_el, event)
-            # bind event scoped resource IDs to this event
-            event.scope_resource_ids()
-            catalog.append(event)
+            event = self._event(event_el)
+            if event is not None:
+                catalog.append(event)
 
         catalog.resource_id = catalog_el.get('publicID')
         self._extra(catalog_el, catalog)
@@ -1822,6 +1883,55 @@ def _read_quakeml(filename):
     return Unpickler().load(filename)
 
 
+def _iter_quakeml(filename):
+    """
+    Iterates over the events of a QuakeML file without reading the whole
+    file into memory.
+
+    .. warning::
+        This function should NOT be called directly, it is used by the ObsPy
+        :func:`~obspy.core.event.iter_events` function, call this instead.
+
+    :type filename: str or file-like object
+    :param filename: QuakeML file to be read.
+    :rtype: generator of :class:`~obspy.core.event.Event`
+
+    .. rubric:: Example
+
+    >>> from obspy.core.event import iter_events
+    >>> for event in iter_events('/path/to/quakeml.xml'):  # doctest: +SKIP
+    ...     print(event.resource_id)
+    """
+    return Unpickler().iter_load(filename)
+
+
+def _has_quakeml_root(source):
+    """
+    Checks whether the root element of a XML document is a QuakeML root
+    element.
+
+    Only the first element of the document is parsed, in contrast to
+    :func:`_is_quakeml` which parses the whole document.
+
+    :type source: str or file-like object
+    :param source: File name or open file-like object to check.
+    :rtype: bool
+    """
+    if hasattr(source, "tell") and hasattr(source, "seek"):
+        position = source.tell()
+    else:
+        position = None
+    try:
+        for _, element in etree.iterparse(source, events=("start",)):
+            return re.match(QUAKEML_ROOTTAG_REGEX, element.tag) is not None
+    except Exception:
+        pass
+    finally:
+        if position is not None:
+            source.seek(position, 0)
+    return False
+
+
 def _write_quakeml(catalog, filename, validate=False, nsmap=None,
                    **kwargs):  # @UnusedVariable
     """
@@ -1,21 +1,28 @@
 # -*- coding: utf-8 -*-
+import bz2
+import gc
+import gzip
 import io
 import math
 import os
 import unittest
 import warnings
+import weakref
+from unittest import mock
 
 from lxml import etree
 
 from obspy.core.event import (Catalog, Event, FocalMechanism, Magnitude,
                               MomentTensor, Origin, Pick, ResourceIdentifier,
                               Tensor, WaveformStreamID, read_events,
-                              EventDescription)
+                              EventDescription, iter_events)
 from obspy.core.utcdatetime import UTCDateTime
 from obspy.core.util import AttribDict
 from obspy.core.util.base import NamedTemporaryFile
+from obspy.core.util.misc import TemporaryWorkingDirectory
 from obspy.core.util.testing import compare_xml_strings
-from obspy.io.quakeml.core import Pickler, _read_quakeml, _write_quakeml
+from obspy.io.quakeml.core import (Pickler, Unpickler, _read_quakeml,
+                                   _write_quakeml)
 
 
 # lxml < 2.3 seems not to ship with RelaxNG schema parser and namespace support
@@ -1198,6 +1205,96 @@ class QuakeMLTestCase(unittest.TestCase):
         self.assertIn(('custom1', custom1), cat2.extra.items())
         self.assertIn(('custom2', custom2), cat2.extra.items())
 
+    def test_iter_events(self):
+        """
+        Streaming QuakeML reading yields the same events as reading the
+        whole file.
+        """
+        for filename in ("neries_events.xml", "iris_events.xml",
+                         "qml-example-1.2-RC3.xml"):
+            filename = os.path.join(self.path, filename)
+            cat = read_events(filename)
+            events = list(iter_events(filename))
+            self.assertEqual(len(events), len(cat))
+            for event, expected in zip(events, cat):
+                self.assertEqual(event, expected)
+                self.assertEqual(event._format, "QUAKEML")
+            # same for file-like objects, bytes and ``iterate=True``
+            with open(filename, "rb") as fh:
+                self.assertEqual(list(iter_events(fh)), events)
+            with open(filename, "rb") as fh:
+                data = fh.read()
+            self.assertEqual(list(iter_events(data)), events)
+            self.assertEqual(
+                list(read_events(filename, format="QUAKEML", iterate=True)),
+                events)
+
+    def test_iter_events_non_quakeml(self):
+        """
+        Formats other than QuakeML fall back to reading the full file and
+        a non QuakeML file with explicit format raises.
+        """
+        filename = os.path.join(self.path, "..", "..", "..", "ndk", "tests",
+                                "data", "C200604092050A.ndk")
+        events = list(iter_events(filename))
+        self.assertEqual(events, read_events(filename).events)
+        self.assertEqual(events[0]._format, "NDK")
+        with self.assertRaises(Exception):
+            list(iter_events(filename, format="QUAKEML"))
+
+    def test_iter_events_compressed(self):
+        """
+        Compressed QuakeML files are streamed as well.
+        """
+        filename = os.path.join(self.path, "neries_events.xml")
+        with open(filename, "rb") as fh:
+            data = fh.read()
+        expected = list(iter_events(filename))
+        with TemporaryWorkingDirectory():
+            with gzip.open("events.xml.gz", "wb") as fh:
+                fh.write(data)
+            with bz2.open("events.xml.bz2", "wb") as fh:
+                fh.write(data)
+            # the whole file is never read by a plugin
+            with mock.patch("obspy.core.event.catalog._read") as p:
+                for name in ("events.xml.gz", "events.xml.bz2"):
+                    self.assertEqual(list(iter_events(name)), expected)
+                    self.assertEqual(
+                        list(iter_events(name, format="QUAKEML")), expected)
+                self.assertEqual(p.call_count, 0)
+            self.assertEqual(list(iter_events("events.xml.*")),
+                             expected * 2)
+
+    def test_iter_events_discards_parsed_elements(self):
+        """
+        Processed elements are removed from the tree while iterating and the
+        yielded events are not kept alive by the parser.
+        """
+        with open(os.path.join(self.path, "neries_events.xml"), "rb") as fh:
+            data = fh.read()
+        # a document with many events
+        first = data.index(b"<event ")
+        last = data.rindex(b"</event>") + len(b"</event>")
+        events = b"".join(
+            data[first:last].replace(b'publicID="', b'publicID="%i' % _i)
+            for _i in range(100))
+        data = data[:first] + events + data[last:]
+        total = len(list(etree.fromstring(data).iter()))
+
+        unpickler = Unpickler()
+        sizes = []
+        refs = []
+        for event in unpickler.iter_load(io.BytesIO(data)):
+            sizes.append(len(list(unpickler.xml_root.iter())))
+            refs.append(weakref.ref(event))
+        del event
+        gc.collect()
+        self.assertEqual(len(refs), 300)
+        self.assertTrue(all(_i() is None for _i in refs))
+        # at most the parsed ahead part of the document is in the tree
+        self.assertLess(max(sizes), total / 2)
+        self.assertLessEqual(len(list(unpickler.xml_root.iter())), 3)
+
 
 def suite():
     return unittest.makeSuite(QuakeMLTestCase, 'test')
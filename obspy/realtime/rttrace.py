@@ -30,6 +30,8 @@ REALTIME_PROCESS_FUNCTIONS = {
     'tauc': (signal.tauc, 2),
     'mwpintegral': (signal.mwpintegral, 1),
     'kurtosis': (signal.kurtosis, 3),
+    'recstalta': (signal.recstalta, 1),
+    'trigger_onset': (signal.trigger_onset, 1),
 }
 
 
@@ -24,6 +24,7 @@ import math
 import sys
 
 import numpy as np
+from scipy.signal import lfilter
 
 from obspy.core.trace import Trace, UTCDateTime
 from obspy.realtime.rtmemory import RtMemory
@@ -631,3 +632,204 @@ def kurtosis(trace, win=3.0, rtmemory_list=None):
     rtmemory_k4_bar.input[0] = k4_bar_last
 
     return kappa4
+
+
+def recstalta(trace, nsta, nlta, rtmemory_list=None):
+    """
+    Apply recursive STA/LTA on data.
+
+    Continues the short and long time averages of previously appended
+    traces, the concatenated output is the same as the result of
+    :func:`~obspy.signal.trigger.recursive_sta_lta` for the whole data.
+
+    :type trace: :class:`~obspy.core.trace.Trace`
+    :param trace: :class:`~obspy.core.trace.Trace` object to append to this
+        RtTrace
+    :type nsta: int
+    :param nsta: Length of short time average window in samples
+    :type nlta: int
+    :param nlta: Length of long time average window in samples
+    :type rtmemory_list: list of :class:`~obspy.realtime.rtmemory.RtMemory`,
+        optional
+    :param rtmemory_list: Persistent memory used by this process for specified
+        trace
+    :rtype: NumPy :class:`numpy.ndarray`
+    :return: Processed trace data from appended Trace object
+    """
+    if not isinstance(trace, Trace):
+        msg = "Trace parameter must be an obspy.core.trace.Trace object."
+        raise ValueError(msg)
+
+    if not rtmemory_list:
+        rtmemory_list = [RtMemory()]
+
+    sample = trace.data
+    if np.size(sample) < 1:
+        return sample
+
+    rtmemory = rtmemory_list[0]
+
+    # output memory holds sta, lta and the number of processed samples
+    if not rtmemory.initialized:
+        rtmemory.initialize(np.float64, 0, 3, 0, 0)
+
+    sta_last, lta_last, count = rtmemory.output
+    csta = 1. / nsta
+    clta = 1. / nlta
+    squared = np.require(sample, np.float64) ** 2
+    if count == 0:
+        # first sample is not used by the recursion
+        squared = squared[1:]
+    # recursions sta_i = csta * x_i ** 2 + (1 - csta) * sta_i-1
+    sta = lfilter([csta], [1, -(1 - csta)], squared,
+                  zi=[(1 - csta) * sta_last])[0]
+    lta = lfilter([clta], [1, -(1 - clta)], squared,
+                  zi=[(1 - clta) * lta_last])[0]
+    charfct = np.zeros(np.size(sample), np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        charfct[np.size(sample) - np.size(sta):] = sta / lta
+    # mute characteristic function for the first nlta samples
+    charfct[:max(int(nlta - count), 0)] = 0.
+
+    if np.size(sta) > 0:
+        rtmemory.output[0] = sta[-1]
+        rtmemory.output[1] = lta[-1]
+    rtmemory.output[2] = count + np.size(sample)
+
+    return charfct
+
+
+# memory object indices for storing the trigger state
+_TRIGGERED = 0
+_ON_INDEX = 1
+_LAST_VALUE = 2
+
+
+def trigger_onset(trace, thres1, thres2, triggers, max_len=9e99,
+                  max_len_delete=False, rtmemory_list=None):
+    """
+    Detect trigger on and off times in a characteristic function.
+
+    The trigger state is kept between the appended traces, so that triggers
+    spanning several traces are detected. Finished triggers are appended as
+    ``[on_time, off_time]`` lists of
+    :class:`~obspy.core.utcdatetime.UTCDateTime` objects to the given
+    ``triggers`` list. The conventions are the same as in
+    :func:`~obspy.signal.trigger.trigger_onset`, but a trigger is only
+    reported after it has been switched off (or after ``max_len`` samples).
+    The data is returned unchanged.
+
+    :type trace: :class:`~obspy.core.trace.Trace`
+    :param trace: :class:`~obspy.core.trace.Trace` object to append to this
+        RtTrace, e.g. the output of the recursive STA/LTA
+        (:func:`~obspy.realtime.signal.recstalta`).
+    :type thres1: float
+    :param thres1: Value above which trigger (of characteristic function)
+        is activated (higher threshold)
+    :type thres2: float
+    :param thres2: Value below which trigger (of characteristic function)
+        is deactivated (lower threshold)
+    :type triggers: list
+    :param triggers: List to which detected triggers are appended.
+    :type max_len: int
+    :param max_len: Maximum length of triggered event in samples. A new
+        event will be triggered as soon as the signal reaches again above
+        thres1.
+    :type max_len_delete: bool
+    :param max_len_delete: Do not report events longer than max_len.
+    :type rtmemory_list: list of :class:`~obspy.realtime.rtmemory.RtMemory`,
+        optional
+    :param rtmemory_list: Persistent memory used by this process for specified
+        trace
+    :rtype: NumPy :class:`numpy.ndarray`
+    :return: Unchanged trace data from appended Trace object
+
+    .. rubric:: Example
+
+    >>> from obspy import read
+    >>> from obspy.realtime import RtTrace
+    >>> rt = RtTrace()
+    >>> rt.register_rt_process('recstalta', nsta=50, nlta=400)
+    1
+    >>> triggers = []
+    >>> rt.register_rt_process('trigger_onset', thres1=3, thres2=0.5,
+    ...                        triggers=triggers)
+    2
+    >>> tr = read()[0]
+    >>> tr.data = tr.data.astype(np.float64)
+    >>> for packet in tr / 10:
+    ...     _ = rt.append(packet)
+    >>> print(triggers)  # doctest: +NORMALIZE_WHITESPACE
+    [[UTCDateTime(2009, 8, 24, 0, 20, 8, 10000),
+      UTCDateTime(2009, 8, 24, 0, 20, 12, 750000)]]
+    """
+    if not isinstance(trace, Trace):
+        msg = "Trace parameter must be an obspy.core.trace.Trace object."
+        raise ValueError(msg)
+
+    if not rtmemory_list:
+        rtmemory_list = [RtMemory()]
+
+    sample = trace.data
+    npts = np.size(sample)
+    if npts < 1:
+        return sample
+
+    rtmemory = rtmemory_list[0]
+
+    # output memory holds the trigger state (0: off, 1: on, 2: on but longer
+    # than max_len and deleted), the index of the trigger on time relative
+    # to the start of the trace and the last value of the previous trace
+    if not rtmemory.initialized:
+        rtmemory.initialize(np.float64, 0, 3, 0, 0)
+        rtmemory.output[_LAST_VALUE] = -np.inf
+
+    state = rtmemory.output
+    starttime = trace.stats.starttime
+    delta = trace.stats.delta
+    # samples starting a run above thres1 are possible trigger on times
+    above1 = sample > thres1
+    starts = above1.copy()
+    starts[1:] &= ~above1[:-1]
+    starts[0] &= not state[_LAST_VALUE] > thres1
+    starts = np.flatnonzero(starts)
+    # the first sample below or equal to thres2 switches the trigger off
+    below2 = np.flatnonzero(sample <= thres2)
+
+    i = 0
+    on = state[_ON_INDEX]
+    while i < npts:
+        if state[_TRIGGERED] == 0:
+            k = np.searchsorted(starts, i)
+            if k == len(starts):
+                break
+            i = on = starts[k]
+            state[_TRIGGERED] = 1
+        k = np.searchsorted(below2, i)
+        off = below2[k] - 1 if k < len(below2) else None
+        if state[_TRIGGERED] == 1 and (off is None or off - on > max_len):
+            if on + max_len + 1 >= npts:
+                # trigger is still on and not too long yet
+                break
+            # trigger is longer than max_len
+            if max_len_delete:
+                state[_TRIGGERED] = 2
+                i = int(on + max_len + 1)
+                continue
+            triggers.append([starttime + on * delta,
+                             starttime + (on + max_len) * delta])
+            state[_TRIGGERED] = 0
+            i = int(on + max_len + 1)
+            continue
+        if off is None:
+            break
+        if state[_TRIGGERED] == 1:
+            triggers.append([starttime + on * delta,
+                             starttime + off * delta])
+        state[_TRIGGERED] = 0
+        i = off + 1
+
+    state[_ON_INDEX] = on - npts
+    state[_LAST_VALUE] = sample[-1]
+
+    return sample
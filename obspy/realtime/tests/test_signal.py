@@ -7,9 +7,10 @@ import unittest
 
 import numpy as np
 
-from obspy import read
+from obspy import Trace, read
 from obspy.core.stream import Stream
 from obspy.realtime import RtTrace, signal
+from obspy.signal.trigger import recursive_sta_lta, trigger_onset
 
 
 # some debug flags
@@ -245,6 +246,60 @@ class RealTimeSignalTestCase(unittest.TestCase):
         np.testing.assert_almost_equal(trace.data[1:],
                                        self.filt_trace_data[1:])
 
+    def test_recstalta(self):
+        """
+        Testing recstalta function.
+        """
+        trace = self.orig_trace.copy()
+        options = {'nsta': 5, 'nlta': 50}
+        # filtering manual
+        self.filt_trace_data = recursive_sta_lta(trace.data, **options)
+        # filtering real time
+        process_list = [('recstalta', options)]
+        self._run_rt_process(process_list)
+        # check results
+        np.testing.assert_almost_equal(self.filt_trace_data,
+                                       self.rt_trace.data)
+        # very small packets
+        rt_trace = RtTrace()
+        rt_trace.register_rt_process('recstalta', **options)
+        t0 = trace.stats.starttime
+        for i in range(0, 200, 3):
+            rt_trace.append(trace.slice(t0 + i * trace.stats.delta,
+                                        t0 + (i + 2) * trace.stats.delta))
+        np.testing.assert_almost_equal(self.filt_trace_data[:201],
+                                       rt_trace.data)
+
+    def test_trigger_onset(self):
+        """
+        Testing trigger_onset function against
+        obspy.signal.trigger.trigger_onset.
+        """
+        np.random.seed(123)
+        i = np.arange(5000)
+        cft = (2.5 + 1.5 * np.sin(i / 50.) * np.sin(i / 700.) +
+               np.random.normal(0, 0.3, 5000))
+        cft[-1] = 0
+        trace = Trace(cft)
+        t0 = trace.stats.starttime
+        kwargs_list = [{}, {'max_len': 30},
+                       {'max_len': 30, 'max_len_delete': True}]
+        for kwargs in kwargs_list:
+            expected = trigger_onset(cft, 3, 2, **kwargs)
+            self.assertGreater(len(expected), 2)
+            for packet_length in (5, 37, 5000):
+                triggers = []
+                rt_trace = RtTrace()
+                rt_trace.register_rt_process('trigger_onset', thres1=3,
+                                             thres2=2, triggers=triggers,
+                                             **kwargs)
+                for i in range(0, 5000, packet_length):
+                    rt_trace.append(trace.slice(t0 + i,
+                                                t0 + i + packet_length - 1))
+                np.testing.assert_array_equal(rt_trace.data, cft)
+                got = [[on - t0, off - t0] for on, off in triggers]
+                np.testing.assert_array_equal(got, expected)
+
     def _run_rt_process(self, process_list, max_length=None):
         """
         Helper function to create a RtTrace, register all given process
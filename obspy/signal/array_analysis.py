@@ -330,30 +330,6 @@ def array_rotation_strain(subarray, ts1, ts2, ts3, vp, vs, array_coords,
         msg = 'Condition number is %s' % condition_number
         warnings.warn(msg)
 
-    # set up storage for vectors that will contain time series
-    ts_wmag = np.empty(nt)
-    ts_w1 = np.empty(nt)
-    ts_w2 = np.empty(nt)
-    ts_w3 = np.empty(nt)
-    ts_tilt = np.empty(nt)
-    ts_dh = np.empty(nt)
-    ts_sh = np.empty(nt)
-    ts_s = np.empty(nt)
-    ts_pred = np.empty((nt, 3 * _n))
-    ts_misfit = np.empty((nt, 3 * _n))
-    ts_m = np.empty(nt)
-    ts_data = np.empty((nt, 3 * _n))
-    ts_ptilde = np.empty((nt, 6))
-    for array in (ts_wmag, ts_w1, ts_w2, ts_w3, ts_tilt, ts_dh, ts_sh, ts_s,
-                  ts_pred, ts_misfit, ts_m, ts_data, ts_ptilde):
-        array.fill(np.NaN)
-    ts_e = np.empty((nt, 3, 3))
-    ts_e.fill(np.NaN)
-
-    # other matrices
-    udif = np.empty((3, _n))
-    udif.fill(np.NaN)
-
     # ---------------------------------------------------------------
     # here we define 4x6 be and 3x6 bw matrices.  these map the solution
     # ptilde to strain or to rotation.  These matrices will be used
@@ -443,111 +419,78 @@ def array_rotation_strain(subarray, ts1, ts2, ts3, vp, vs, array_coords,
     sigmaw1 = np.sqrt(cp[5, 5])
     sigmaw2 = np.sqrt(cp[2, 2])
     sigmat = max(sigmaw1, sigmaw2) * np.sqrt(2 - np.pi / 2)
+    #
+    # SOLVE FOR ALL DATA POINTS IN TIME SERIES AT ONCE========================
+    #
+    # data vectors are differences of stn i displ from stn 1 displ, stacked
+    # row-wise for all time samples: ts_data[itime] is
+    # (u1 u2 u3 of stn 2, u1 u2 u3 of stn 3, ...) minus stn 1, dim nt x 3N
+    udif = np.empty((nt, _n, 3))
+    for j, ts in enumerate((ts1, ts2, ts3)):
+        udif[:, :, j] = ts[:, subarray[1:]] - ts[:, subarray[:1]]
+    ts_data = udif.reshape((nt, 3 * _n))
+    # sum the lengths of the displ difference vectors
+    sumlen = np.sqrt((udif ** 2).sum(axis=2)).sum(axis=1)
+    #
+    # form solution, the generalized inverse g is applied to all time samples
+    # ptilde is (u1,1 u1,2 u1,3 u2,1 u2,2 u2,3).T
+    ts_ptilde = np.dot(ts_data, g.T)
+    #
+    # calculate predicted data
+    ts_pred = np.dot(ts_ptilde, _a.T)  # 9/8/92.I.3(9) and 8/26/92.I.3.T bottom
+    #
+    # calculate  residuals (misfits concatenated for all stations)
+    ts_misfit = ts_pred - ts_data
+    #
+    # Calculate ts_m, misfit ratio.
+    # calculate summed length of misfits (residual displacements)
+    misfit_sumsq = (ts_misfit ** 2).reshape((nt, _n, 3)).sum(axis=2)
+    ts_m = np.sqrt(misfit_sumsq).sum(axis=1) / sumlen
+    #
+    # ---------------------------------------------------------------
+    # populate the displacement gradient matrices _u
+    # uij_vector is (u1,1 u1,2 u1,3 u2,1 u2,2 u2,3 u3,1 u3,2 u3,3).T
+    # The following implements the free surface boundary condition
+    _u = np.empty((nt, 9))
+    _u[:, :6] = ts_ptilde
+    _u[:, 6] = -ts_ptilde[:, 2]
+    _u[:, 7] = -ts_ptilde[:, 5]
+    _u[:, 8] = -eta * (ts_ptilde[:, 0] + ts_ptilde[:, 4])
+    _u = _u.reshape((nt, 3, 3))
+    #
+    # calculate strain tensors
+    # Fung eqn 5.1 p 97 gives dui = (eij-wij)*dxj
+    ts_e = .5 * (_u + _u.transpose(0, 2, 1))
+
+    # Three components of the rotation vector omega (=w here)
+    ts_w1 = -ts_ptilde[:, 5]
+    ts_w2 = ts_ptilde[:, 2].copy()
+    ts_w3 = .5 * (ts_ptilde[:, 3] - ts_ptilde[:, 1])  # torsion in radians
+
+    # amount of total rotation is length of rotation vector
+    ts_wmag = np.sqrt(ts_w1 ** 2 + ts_w2 ** 2 + ts_w3 ** 2)
+    # 7/21/06.ii.6(19), amount of tilt in radians
+    ts_tilt = np.sqrt(ts_w1 ** 2 + ts_w2 ** 2)
 
+    # ---------------------------------------------------------------
+    #
+    # Here I calculate horizontal quantities only
+    # ts_dh is horizontal dilatation (+ --> expansion).
     #
-    # BEGIN LOOP OVER DATA POINTS IN TIME SERIES==============================
+    ts_dh = ts_e[:, 0, 0] + ts_e[:, 1, 1]
     #
-    for itime in range(nt):
-        #
-        # data vector is differences of stn i displ from stn 1 displ
-        # sum the lengths of the displ difference vectors
-        sumlen = 0
-        for i in range(_n):
-            udif[0, i] = ts1[itime, subarray[i + 1]] - ts1[itime, subarray[0]]
-            udif[1, i] = ts2[itime, subarray[i + 1]] - ts2[itime, subarray[0]]
-            udif[2, i] = ts3[itime, subarray[i + 1]] - ts3[itime, subarray[0]]
-            sumlen = sumlen + np.sqrt(np.sum(udif[:, i].T ** 2))
-
-        data = udif.T.reshape(udif.size)
-        #
-        # form solution
-        # ptilde is (u1,1 u1,2 u1,3 u2,1 u2,2 u2,3).T
-        ptilde = np.dot(g, data)
-        #
-        # place in uij_vector the full 9 elements of the displacement gradients
-        # uij_vector is (u1,1 u1,2 u1,3 u2,1 u2,2 u2,3 u3,1 u3,2 u3,3).T
-        # The following implements the free surface boundary condition
-        u31 = -ptilde[2]
-        u32 = -ptilde[5]
-        u33 = -eta * (ptilde[0] + ptilde[4])
-        uij_vector = np.r_[ptilde, u31, u32, u33]
-        #
-        # calculate predicted data
-        pred = np.dot(_a, ptilde)  # 9/8/92.I.3(9) and 8/26/92.I.3.T bottom
-        #
-        # calculate  residuals (misfits concatenated for all stations)
-        misfit = pred - data
-
-        # Calculate ts_m, misfit ratio.
-        # calculate summed length of misfits (residual displacements)
-        misfit_sq = misfit ** 2
-        misfit_sq = np.reshape(misfit_sq, (_n, 3)).T
-        misfit_sumsq = np.empty(_n)
-        misfit_sumsq.fill(np.NaN)
-        for i in range(_n):
-            misfit_sumsq[i] = misfit_sq[:, i].sum()
-        misfit_len = np.sum(np.sqrt(misfit_sumsq))
-        ts_m[itime] = misfit_len / sumlen
-        #
-        ts_data[itime, 0:3 * _n] = data.T
-        ts_pred[itime, 0:3 * _n] = pred.T
-        ts_misfit[itime, 0:3 * _n] = misfit.T
-        ts_ptilde[itime, :] = ptilde.T
-        #
-        # ---------------------------------------------------------------
-        # populate the displacement gradient matrix _u
-        _u = np.zeros(9)
-        _u[:] = uij_vector
-        _u = _u.reshape((3, 3))
-        #
-        # calculate strain tensors
-        # Fung eqn 5.1 p 97 gives dui = (eij-wij)*dxj
-        e = .5 * (_u + _u.T)
-        ts_e[itime] = e
-
-        # Three components of the rotation vector omega (=w here)
-        w = np.empty(3)
-        w.fill(np.NaN)
-        w[0] = -ptilde[5]
-        w[1] = ptilde[2]
-        w[2] = .5 * (ptilde[3] - ptilde[1])
-
-        # amount of total rotation is length of rotation vector
-        ts_wmag[itime] = np.sqrt(np.sum(w ** 2))
-        #
-        # Calculate tilt and torsion
-        ts_w1[itime] = w[0]
-        ts_w2[itime] = w[1]
-        ts_w3[itime] = w[2]  # torsion in radians
-        ts_tilt[itime] = np.sqrt(w[0] ** 2 + w[1] ** 2)
-        # 7/21/06.ii.6(19), amount of tilt in radians
-
-        # ---------------------------------------------------------------
-        #
-        # Here I calculate horizontal quantities only
-        # ts_dh is horizontal dilatation (+ --> expansion).
-        # Total dilatation, ts_dd, will be calculated outside the time
-        # step loop.
-        #
-        ts_dh[itime] = e[0, 0] + e[1, 1]
-        #
-        # find maximum shear strain in horizontal plane, and find its azimuth
-        eh = np.r_[np.c_[e[0, 0], e[0, 1]], np.c_[e[1, 0], e[1, 1]]]
-        # 7/21/06.ii.2(4)
-        gammah = eh - np.trace(eh) * np.eye(2) / 2.
-        # 9/14/92.ii.4, 7/21/06.ii.2(5)
-
-        # eigvecs are principal axes, eigvals are principal strains
-        [eigvals, _eigvecs] = np.linalg.eig(gammah)
-        # max shear strain, from Fung (1965, p71, eqn (8)
-        ts_sh[itime] = .5 * (max(eigvals) - min(eigvals))
-
-        # calculate max of total shear strain, not just horizontal strain
-        # eigvecs are principal axes, eigvals are principal strains
-        [eigvalt, _eigvect] = np.linalg.eig(e)
-        # max shear strain, from Fung (1965, p71, eqn (8)
-        ts_s[itime] = .5 * (max(eigvalt) - min(eigvalt))
-        #
+    # find maximum shear strain in horizontal plane. The shear part gammah
+    # of the symmetric 2x2 horizontal strain eh (7/21/06.ii.2(4), 9/14/92.ii.4,
+    # 7/21/06.ii.2(5)) has eigenvalues +/- sqrt(gammah11 ** 2 + eh12 ** 2),
+    # max shear strain, from Fung (1965, p71, eqn (8)
+    ts_sh = np.sqrt((.5 * (ts_e[:, 0, 0] - ts_e[:, 1, 1])) ** 2 +
+                    ts_e[:, 0, 1] ** 2)
+
+    # calculate max of total shear strain, not just horizontal strain
+    # eigvals are principal strains (e is symmetric)
+    eigvalt = np.linalg.eigvalsh(ts_e)
+    # max shear strain, from Fung (1965, p71, eqn (8)
+    ts_s = .5 * (eigvalt[:, -1] - eigvalt[:, 0])
 
     # =========================================================================
     #
@@ -818,20 +761,17 @@ def array_transff_freqslowness(coords, slim, sstep, fmin, fmax, fstep,
     nsy = int(np.ceil((symax + sstep / 10. - symin) / sstep))
     nf = int(np.ceil((fmax + fstep / 10. - fmin) / fstep))
 
-    transff = np.empty((nsx, nsy))
-    buff = np.zeros(nf)
-
-    for i, sx in enumerate(np.arange(sxmin, sxmax + sstep / 10., sstep)):
-        for j, sy in enumerate(np.arange(symin, symax + sstep / 10., sstep)):
-            for k, f in enumerate(np.arange(fmin, fmax + fstep / 10., fstep)):
-                _sum = 0j
-                for l in np.arange(len(coords)):
-                    _sum += np.exp(
-                        complex(0., (coords[l, 0] * sx + coords[l, 1] * sy) *
-                                2 * np.pi * f))
-                buff[k] = abs(_sum) ** 2
-            transff[i, j] = cumtrapz(buff, dx=fstep)[-1]
-
+    sx = np.arange(sxmin, sxmax + sstep / 10., sstep)[:nsx]
+    sy = np.arange(symin, symax + sstep / 10., sstep)[:nsy]
+    freqs = np.arange(fmin, fmax + fstep / 10., fstep)[:nf]
+    # time shifts of the stations with shape (nsx, nsy, nstat)
+    shifts = (coords[:, 0] * sx[:, np.newaxis, np.newaxis] +
+              coords[:, 1] * sy[np.newaxis, :, np.newaxis])
+    buff = np.empty((nsx, nsy, nf))
+    for k, f in enumerate(freqs):
+        buff[:, :, k] = np.abs(
+            np.exp(1j * 2 * np.pi * f * shifts).sum(axis=-1)) ** 2
+    transff = cumtrapz(buff, dx=fstep, axis=-1)[:, :, -1]
     transff /= transff.max()
     return transff
 
@@ -845,6 +785,34 @@ def dump(pow_map, apow_map, i):
     np.savez('apow_map_%d.npz' % i, apow_map)
 
 
+def _beamform(ft, steer, method):
+    """
+    Beam power for all windows, frequencies and slowness grid points.
+
+    :param ft: Spectra with shape (nstat, nwin, nf)
+    :param steer: Steering vectors with shape (nf, ngrid, nstat)
+    :param method: the method to use 0 == bf, 1 == capon
+    :return: Power with shape (nwin, nf, ngrid)
+    """
+    nstat, nwin, nf = ft.shape
+    if method == 1:
+        # P(f) = 1/(e.H R(f)^-1 e)
+        pow_ = np.empty((nwin, nf, steer.shape[1]))
+        for w in range(nwin):
+            # cross spectral matrices with shape (nf, nstat, nstat)
+            _r = np.einsum('in,jn->nij', ft[:, w, :], ft[:, w, :].conj())
+            _r /= np.abs(_r.sum(axis=0))
+            _r = np.linalg.pinv(_r, rcond=1e-6)
+            ehre = np.einsum('ngi,ngi->ng', steer.conj(),
+                             np.matmul(_r, steer.transpose(0, 2, 1))
+                             .transpose(0, 2, 1))
+            pow_[w] = 1. / np.abs(ehre)
+        return pow_
+    # P(f) = e.H R(f) e with R(f) = x(f) x(f).H equals |e.H x(f)|**2
+    beam = np.matmul(steer.conj(), ft.transpose(2, 0, 1))
+    return np.transpose(beam.real ** 2 + beam.imag ** 2, (2, 0, 1))
+
+
 def array_processing(stream, win_len, win_frac, sll_x, slm_x, sll_y, slm_y,
                      sl_s, semb_thres, vel_thres, frqlow, frqhigh, stime,
                      etime, prewhiten, verbose=False, coordsys='lonlat',
@@ -948,72 +916,70 @@ def array_processing(stream, win_len, win_frac, sll_x, slm_x, sll_y, slm_y,
     steer = np.empty((nf, grdpts_x, grdpts_y, nstat), dtype=np.complex128)
     clibsignal.calcSteer(nstat, grdpts_x, grdpts_y, nf, nlow,
                          deltaf, time_shift_table, steer)
-    _r = np.empty((nf, nstat, nstat), dtype=np.complex128)
-    ft = np.empty((nstat, nf), dtype=np.complex128)
-    newstart = stime
-    # 0.22 matches 0.2 of historical C bbfk.c
-    tap = cosine_taper(nsamp, p=0.22)
+    # steering vectors with shape (nf, grdpts_x * grdpts_y, nstat)
+    steer = steer.reshape(nf, grdpts_x * grdpts_y, nstat)
+    # window offsets and start times
+    offsets = []
+    starts = []
     offset = 0
-    relpow_map = np.empty((grdpts_x, grdpts_y), dtype=np.float64)
-    abspow_map = np.empty((grdpts_x, grdpts_y), dtype=np.float64)
+    newstart = stime
     while eotr:
-        try:
-            for i, tr in enumerate(stream):
-                dat = tr.data[spoint[i] + offset:
-                              spoint[i] + offset + nsamp]
-                dat = (dat - dat.mean()) * tap
-                ft[i, :] = np.fft.rfft(dat, nfft)[nlow:nlow + nf]
-        except IndexError:
-            break
-        ft = np.ascontiguousarray(ft, np.complex128)
-        relpow_map.fill(0.)
-        abspow_map.fill(0.)
-        # computing the covariances of the signal at different receivers
-        dpow = 0.
-        for i in range(nstat):
-            for j in range(i, nstat):
-                _r[:, i, j] = ft[i, :] * ft[j, :].conj()
-                if method == 1:
-                    _r[:, i, j] /= np.abs(_r[:, i, j].sum())
-                if i != j:
-                    _r[:, j, i] = _r[:, i, j].conjugate()
-                else:
-                    dpow += np.abs(_r[:, i, j].sum())
-        dpow *= nstat
-        if method == 1:
-            # P(f) = 1/(e.H R(f)^-1 e)
-            for n in range(nf):
-                _r[n, :, :] = np.linalg.pinv(_r[n, :, :], rcond=1e-6)
-
-        errcode = clibsignal.generalizedBeamformer(
-            relpow_map, abspow_map, steer, _r, nstat, prewhiten,
-            grdpts_x, grdpts_y, nf, dpow, method)
-        if errcode != 0:
-            msg = 'generalizedBeamforming exited with error %d'
-            raise Exception(msg % errcode)
-        ix, iy = np.unravel_index(relpow_map.argmax(), relpow_map.shape)
-        relpow, abspow = relpow_map[ix, iy], abspow_map[ix, iy]
-        if store is not None:
-            store(relpow_map, abspow_map, offset)
-        # here we compute baz, slow
-        slow_x = sll_x + ix * sl_s
-        slow_y = sll_y + iy * sl_s
-
-        slow = np.sqrt(slow_x ** 2 + slow_y ** 2)
-        if slow < 1e-8:
-            slow = 1e-8
-        azimut = 180 * math.atan2(slow_x, slow_y) / math.pi
-        baz = azimut % -360 + 180
-        if relpow > semb_thres and 1. / slow > vel_thres:
-            res.append(np.array([newstart.timestamp, relpow, abspow, baz,
-                                 slow]))
-            if verbose:
-                print(newstart, (newstart + (nsamp / fs)), res[-1][1:])
+        offsets.append(offset)
+        starts.append(newstart)
         if (newstart + (nsamp + nstep) / fs) > etime:
             eotr = False
         offset += nstep
-
         newstart += nstep / fs
+    # 0.22 matches 0.2 of historical C bbfk.c
+    tap = cosine_taper(nsamp, p=0.22)
+    # process windows in blocks to limit memory usage
+    block_size = max(1, int(2 ** 22 // (nf * grdpts_x * grdpts_y)))
+    # windows have to be completely covered by data
+    max_offset = min(len(tr.data) - spoint[i]
+                     for i, tr in enumerate(stream)) - nsamp
+    offsets = [o for o in offsets if o <= max_offset]
+    for k in range(0, len(offsets), block_size):
+        block = np.array(offsets[k:k + block_size])
+        indices = block[:, np.newaxis] + np.arange(nsamp)
+        dat = np.array([tr.data[spoint[i] + indices]
+                        for i, tr in enumerate(stream)], dtype=np.float64)
+        # spectra with shape (nstat, nwin, nf)
+        dat = (dat - dat.mean(axis=-1)[:, :, np.newaxis]) * tap
+        ft = np.fft.rfft(dat, nfft)[:, :, nlow:nlow + nf]
+        pow_ = _beamform(ft, steer, method)
+        # power with shape (nwin, nf, grdpts_x * grdpts_y)
+        abspow_maps = pow_.sum(axis=1)
+        if prewhiten == 1:
+            inv_fac = 1. / (pow_.max(axis=2) * nf * nstat)
+            relpow_maps = np.einsum('wng,wn->wg', pow_, inv_fac)
+        elif method == 1:
+            relpow_maps = abspow_maps
+        else:
+            # computing the power of the signal at the receivers
+            dpow = nstat * np.sum(np.abs(ft) ** 2, axis=(0, 2))
+            relpow_maps = abspow_maps / dpow[:, np.newaxis]
+        for j in range(len(block)):
+            relpow_map = relpow_maps[j].reshape(grdpts_x, grdpts_y)
+            abspow_map = abspow_maps[j].reshape(grdpts_x, grdpts_y)
+            ix, iy = np.unravel_index(relpow_map.argmax(), relpow_map.shape)
+            relpow, abspow = relpow_map[ix, iy], abspow_map[ix, iy]
+            if store is not None:
+                store(relpow_map, abspow_map, block[j])
+            # here we compute baz, slow
+            slow_x = sll_x + ix * sl_s
+            slow_y = sll_y + iy * sl_s
+
+            slow = np.sqrt(slow_x ** 2 + slow_y ** 2)
+            if slow < 1e-8:
+                slow = 1e-8
+            azimut = 180 * math.atan2(slow_x, slow_y) / math.pi
+            baz = azimut % -360 + 180
+            if relpow > semb_thres and 1. / slow > vel_thres:
+                newstart = starts[k + j]
+                res.append(np.array([newstart.timestamp, relpow, abspow, baz,
+                                     slow]))
+                if verbose:
+                    print(newstart, (newstart + (nsamp / fs)), res[-1][1:])
     res = np.array(res)
     if timestamp == 'julsec':
         pass
@@ -20,10 +20,18 @@ from bisect import bisect_left
 from copy import copy
 import ctypes as C  # NOQA
 from distutils.version import LooseVersion
+from multiprocessing.pool import ThreadPool
+import threading
 import warnings
 
 import numpy as np
 import scipy
+from scipy.fftpack import next_fast_len
+try:
+    # scipy.fft releases the GIL
+    from scipy.fft import irfft, rfft
+except ImportError:  # scipy < 1.4
+    from numpy.fft import irfft, rfft
 
 from obspy import Stream, Trace
 from obspy.core.util.misc import MatplotlibBackend
@@ -517,6 +525,184 @@ def xcorr_max(fct, abs_max=True):
     return index - mid, float(fct[index])
 
 
+_PAIRS_DTYPE = np.dtype([('index1', np.int64), ('index2', np.int64),
+                         ('lag', np.float64), ('coefficient', np.float64),
+                         ('quality', np.float64)])
+
+# state of worker processes in correlate_pairs
+_pairs_state = {}
+
+
+def _neighborhood_pairs(num, neighborhood):
+    """
+    Return all index pairs ``(i, j)`` with ``0 < j - i <= neighborhood``.
+    """
+    pairs = [np.column_stack((np.arange(num - d), np.arange(d, num)))
+             for d in range(1, min(neighborhood, num - 1) + 1)]
+    if len(pairs) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.concatenate(pairs)
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
+def _init_pairs_worker(spectra, norms, nfft, shift, abs_max):
+    _pairs_state.update(spectra=spectra, norms=norms, nfft=nfft,
+                        shift=shift, abs_max=abs_max)
+
+
+def _correlate_pairs_worker(pairs):
+    return _correlate_pairs_chunk(pairs, **_pairs_state)
+
+
+def _correlate_pairs_chunk(pairs, spectra, norms, nfft, shift, abs_max):
+    """
+    Correlate a chunk of pairs using the precomputed spectra.
+    """
+    i, j = pairs[:, 0], pairs[:, 1]
+    cc = irfft(spectra[i] * np.conj(spectra[j]), nfft, axis=-1)
+    # lags -shift, ..., shift
+    cc = np.concatenate((cc[:, nfft - shift:], cc[:, :shift + 1]), axis=1)
+    if norms is not None:
+        norm = norms[i] * norms[j]
+        zero = norm <= np.finfo(float).eps
+        norm[zero] = 1
+        cc /= norm[:, np.newaxis]
+        cc[zero] = 0
+    rows = np.arange(len(pairs))
+    index = np.argmax(np.abs(cc) if abs_max else cc, axis=1)
+    # interpolate the maximum with a parabola through three samples
+    sign = np.where(cc[rows, index] < 0, -1., 1.) if abs_max else 1.
+    inner = (index > 0) & (index < 2 * shift)
+    left = cc[rows, np.clip(index - 1, 0, None)] * sign
+    center = cc[rows, index] * sign
+    right = cc[rows, np.clip(index + 1, None, 2 * shift)] * sign
+    curvature = left - 2 * center + right
+    inner &= curvature < 0
+    offset = np.zeros(len(pairs))
+    offset[inner] = 0.5 * (left - right)[inner] / curvature[inner]
+    peak = center - 0.25 * (left - right) * offset
+    # quality: distance of the maximum to the largest secondary maximum
+    cc = cc * (sign[:, np.newaxis] if abs_max else sign)
+    padded = np.pad(cc, ((0, 0), (1, 1)), mode='constant',
+                    constant_values=-np.inf)
+    is_max = ((padded[:, 1:-1] > padded[:, :-2]) &
+              (padded[:, 1:-1] >= padded[:, 2:]))
+    is_max[rows, index] = False
+    secondary = np.max(np.where(is_max, cc, 0), axis=1)
+    quality = np.clip(peak - np.clip(secondary, 0, None), 0, None)
+    quality[(index == 0) | (index == 2 * shift)] = 0
+    result = np.empty(len(pairs), dtype=_PAIRS_DTYPE)
+    result['index1'] = i
+    result['index2'] = j
+    result['lag'] = index - shift + offset
+    result['coefficient'] = peak * sign
+    result['quality'] = quality
+    return result
+
+
+def correlate_pairs(windows, shift, pairs=None, neighborhood=None,
+                    demean=True, normalize='naive', abs_max=False,
+                    processes=1, chunksize=1000):
+    """
+    Cross-correlate many pairs of equal-length waveform windows at once.
+
+    The spectrum of each window is calculated only once and reused for all
+    pairs it is part of. The lags of the cross-correlation maxima are
+    refined to subsample precision by parabolic interpolation.
+    This function is suitable to calculate differential times for a large
+    number of event pairs, e.g. for double-difference relocation.
+    For a single pair the results are equal to the results of
+    :func:`~obspy.signal.cross_correlation.correlate` and
+    :func:`~obspy.signal.cross_correlation.xcorr_max` (up to interpolation).
+
+    :param windows: 2-dimensional array with one window per row or a list
+        of equal-length arrays or traces, e.g. the data cut around the
+        P picks of many events at one station.
+    :param int shift: Maximal shift in samples.
+    :param pairs: Array-like of shape ``(N, 2)`` with the indices of the
+        window pairs to correlate.
+    :param int neighborhood: If ``pairs`` is not given, correlate all pairs
+        of windows whose indices differ by at most ``neighborhood``
+        (e.g. windows sorted by event time or location).
+        By default all pairs are correlated.
+    :param bool demean: Demean data beforehand.
+    :param normalize: One of ``'naive'`` or ``None``, see
+        :func:`~obspy.signal.cross_correlation.correlate`.
+    :param bool abs_max: Determines if the absolute maximum should be used.
+    :param int processes: Number of processes used for the calculation.
+    :param int chunksize: Number of pairs processed at once.
+
+    :return: Structured numpy array with one entry per pair and fields
+        ``index1``, ``index2`` (indices of the windows),
+        ``lag`` (interpolated lag of the maximum in samples as returned by
+        :func:`~obspy.signal.cross_correlation.xcorr_max`),
+        ``coefficient`` (interpolated value of the maximum) and
+        ``quality`` (difference between the maximum and the largest other
+        local maximum of the cross-correlation function, it is zero if the
+        maximum lies at the maximal shift).
+
+    .. rubric:: Example
+
+    >>> from obspy import read
+    >>> tr = read()[0]
+    >>> windows = [tr.data[450:550], tr.data[452:552], tr.data[447:547]]
+    >>> result = correlate_pairs(windows, 5)
+    >>> print(result[['index1', 'index2']])
+    [(0, 1) (0, 2) (1, 2)]
+    >>> print(np.round(result['lag'], 2))
+    [ 2. -3. -5.]
+    >>> print(np.round(result['coefficient'], 3))
+    [ 0.999  0.996  0.994]
+    """
+    if normalize is False:
+        normalize = None
+    if normalize is True:
+        normalize = 'naive'
+    if normalize not in (None, 'naive'):
+        raise ValueError("normalize has to be one of (None, 'naive'))")
+    if isinstance(windows, np.ndarray):
+        windows = np.array(windows, dtype=np.float64)
+    else:
+        windows = [w.data if isinstance(w, Trace) else w for w in windows]
+        if len({len(w) for w in windows}) > 1:
+            raise ValueError('Windows have different length')
+        windows = np.array(windows, dtype=np.float64)
+    if windows.ndim != 2:
+        raise ValueError('Windows have to be a 2-dimensional array')
+    num, npts = windows.shape
+    if pairs is None:
+        if neighborhood is None:
+            neighborhood = num - 1
+        pairs = _neighborhood_pairs(num, neighborhood)
+    else:
+        pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    if demean:
+        windows -= np.mean(windows, axis=1)[:, np.newaxis]
+    norms = None
+    if normalize == 'naive':
+        norms = np.sum(windows ** 2, axis=1) ** 0.5
+    nfft = next_fast_len(npts + shift)
+    spectra = rfft(windows, nfft, axis=1)
+    del windows
+    chunks = [pairs[k:k + chunksize] for k in range(0, len(pairs), chunksize)]
+    if len(chunks) == 0:
+        return np.empty(0, dtype=_PAIRS_DTYPE)
+    if processes > 1:
+        from multiprocessing import Pool
+        pool = Pool(processes, initializer=_init_pairs_worker,
+                    initargs=(spectra, norms, nfft, shift, abs_max))
+        try:
+            results = pool.map(_correlate_pairs_worker, chunks)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_correlate_pairs_chunk(chunk, spectra, norms, nfft, shift,
+                                          abs_max)
+                   for chunk in chunks]
+    return np.concatenate(results)
+
+
 def xcorr_pick_correction(pick1, trace1, pick2, trace2, t_before, t_after,
                           cc_maxlag, filter=None, filter_options={},
                           plot=False, filename=None):
@@ -846,12 +1032,16 @@ def templates_max_similarity(st, time, streams_templates):
         return 0
 
 
-def _prep_streams_correlate(stream, template, template_time=None):
+def _prep_streams_correlate(stream, template, template_time=None,
+                            return_originals=False):
     """
     Prepare stream and template for cross-correlation.
 
     Select traces in stream and template with the same seed id and trim
-    stream to correct start and end times.
+    stream to correct start and end times. If ``return_originals`` is set,
+    a list of tuples with the untrimmed data trace and the index of the
+    first sample used from it is returned as third value for each trace in
+    the prepared stream.
     """
     if len({tr.stats.sampling_rate for tr in stream + template}) > 1:
         raise ValueError('Traces have different sampling rate')
@@ -882,10 +1072,17 @@ def _prep_streams_correlate(stream, template, template_time=None):
              for trt in template]
     trim1 = [t - min(trim1) for t in trim1]
     trim2 = [t - max(trim2) for t in trim2]
+    originals = []
     for i, tr in enumerate(stream):
+        tr_orig = tr
         tr = tr.slice(starttime + trim1[i], endtime + trim2[i])
+        offset = (tr.stats.starttime - tr_orig.stats.starttime) * \
+            tr.stats.sampling_rate
+        originals.append((tr_orig, int(round(offset))))
         tr.stats.starttime = starttime + template_offset
         stream.traces[i] = tr
+    if return_originals:
+        return stream, template, originals
     return stream, template
 
 
@@ -897,6 +1094,13 @@ def _correlate_prepared_stream_template(stream, template, **kwargs):
     """
     for tr, trt in zip(stream, template):
         tr.data = correlate_template(tr, trt, mode='valid', **kwargs)
+    return _equalize_lengths(stream)
+
+
+def _equalize_lengths(stream):
+    """
+    Cut cross-correlations in stream to the same length.
+    """
     # make sure xcorrs have the same length, can differ by one sample
     lens = {len(tr) for tr in stream}
     if len(lens) > 1:
@@ -955,6 +1159,98 @@ def correlate_stream_template(stream, template, template_time=None, **kwargs):
     return _correlate_prepared_stream_template(stream, template, **kwargs)
 
 
+class _StreamCorrelator(object):
+    """
+    Cross-correlate one data stream with many template streams.
+
+    Calculates the same fully normalized cross-correlations as
+    :func:`correlate_stream_template` with ``normalize='full'``. The spectrum
+    of each data trace and the rolling window energies used for
+    normalization are calculated only once and are reused for all templates.
+    The correlation of a template with a trimmed data trace is a slice of
+    the correlation with the whole data trace, because the normalization
+    does not depend on data outside of the correlated windows.
+
+    The methods can be called from several threads at the same time.
+
+    :param stream: Stream with data traces.
+    :param demean: Demean template and data windows, see
+        :func:`correlate_template`.
+    """
+    def __init__(self, stream, demean=True):
+        self.stream = stream
+        self.demean = demean
+        self._spectra = {}
+        self._energies = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, cache, key, func, *args):
+        with self._lock:
+            try:
+                return cache[key]
+            except KeyError:
+                value = cache[key] = func(*args)
+                return value
+
+    @staticmethod
+    def _spectrum(data):
+        nfft = next_fast_len(len(data))
+        return nfft, rfft(data, nfft)
+
+    def _energy(self, data, lent):
+        # rolling sums over all windows of length lent
+        data = _pad_zeros(data, 1, 0)
+        energy = _window_sum(data ** 2, lent)
+        if self.demean:
+            energy -= _window_sum(data, lent) ** 2 / lent
+        return energy
+
+    def correlate_trace(self, tr, trt, offset, num):
+        """
+        Cross-correlate part of a data trace with a template trace.
+
+        :param tr: Original data trace.
+        :param trt: Template trace.
+        :param offset: Index of the first sample of the data used.
+        :param num: Number of correlation values to return.
+        """
+        data = np.require(tr.data, dtype=np.float64)
+        template = np.require(trt.data, dtype=np.float64)
+        lent = len(template)
+        if self.demean:
+            template = template - np.mean(template)
+        nfft, spec = self._cached(self._spectra, id(tr), self._spectrum,
+                                  data)
+        energy = self._cached(self._energies, (id(tr), lent), self._energy,
+                              data, lent)
+        cc = irfft(spec * np.conj(rfft(template, nfft)), nfft)
+        cc = cc[offset:offset + num]
+        norm = energy[offset:offset + num] * np.sum(template ** 2)
+        np.sqrt(norm, out=norm)
+        mask = norm <= np.finfo(float).eps
+        cc[~mask] /= norm[~mask]
+        cc[mask] = 0
+        return cc
+
+    def correlate(self, template, template_time=None):
+        """
+        Calculate cross-correlation of traces in stream with traces in
+        template.
+
+        Same as :func:`correlate_stream_template` with
+        ``normalize='full'``.
+        """
+        stream, template, originals = _prep_streams_correlate(
+            self.stream, template, template_time=template_time,
+            return_originals=True)
+        for tr, trt, (tr_orig, offset) in zip(stream, template, originals):
+            num = len(tr) - len(trt) + 1
+            if num < 1:
+                raise ValueError('Data must not be shorter than template.')
+            tr.data = self.correlate_trace(tr_orig, trt, offset, num)
+        return _equalize_lengths(stream)
+
+
 def _calc_mean(stream):
     """
     Return trace with mean of traces in stream.
@@ -1043,6 +1339,30 @@ def _insert_amplitude_ratio(detections, stream, template, template_time=None,
     return detections
 
 
+def _remove_close_detections(detections, distance):
+    """
+    Discard detections closer than distance to a detection with higher
+    similarity.
+
+    Returns the remaining detections sorted chronologically.
+    """
+    # accepted detection times and their nanoseconds, sorted by time
+    times = []
+    times_ns = []
+    remaining = []
+    for detection in sorted(detections, key=lambda d: -d['similarity']):
+        time = detection['time']
+        # only the closest accepted detections before and after need to be
+        # checked
+        index = bisect_left(times_ns, time._ns)
+        neighbors = times[max(index - 1, 0):index + 1]
+        if all(abs(time - t) > distance for t in neighbors):
+            times.insert(index, time)
+            times_ns.insert(index, time._ns)
+            remaining.append(detection)
+    return sorted(remaining, key=lambda d: d['time'])
+
+
 def _get_item(list_, index):
     if isinstance(list_, str):
         return list_
@@ -1100,7 +1420,7 @@ def correlation_detector(stream, templates, heights, distance,
                          template_times=None, template_magnitudes=None,
                          template_names=None,
                          similarity_func=_calc_mean, details=None,
-                         plot=None, **kwargs):
+                         plot=None, threads=1, **kwargs):
     """
     Detector based on the cross-correlation of waveforms.
 
@@ -1145,6 +1465,8 @@ def correlation_detector(stream, templates, heights, distance,
         with the detections. If a stream is passed as argument, the traces
         in the stream will be plotted together with the similarity traces and
         detections.
+    :param threads: Number of threads used to cross-correlate templates in
+        parallel. Templates are processed in blocks of this size.
     :param kwargs: Suitable kwargs are passed to
         :func:`~obspy.signal.cross_correlation.correlate_template` function.
         All other kwargs are passed to :func:`~scipy.signal.find_peaks`.
@@ -1172,22 +1494,63 @@ def correlation_detector(stream, templates, heights, distance,
 
     A more advanced :ref:`tutorial <correlation-detector-tutorial>`
     is available.
+
+    .. note::
+        For the default full normalization the spectra of the data traces
+        and the normalization terms are calculated only once and are reused
+        for all templates.
     """
     if isinstance(templates, Stream):
         templates = [templates]
     cckeys = ('normalize', 'demean', 'method')
     cckwargs = {k: v for k, v in kwargs.items() if k in cckeys}
     pfkwargs = {k: v for k, v in kwargs.items() if k not in cckeys}
-    possible_detections = []
-    similarities = []
-    for template_id, template in enumerate(templates):
+    if (cckwargs.get('normalize', 'full') == 'full' and
+            cckwargs.get('method', 'auto') in ('auto', 'fft')):
+        correlator = _StreamCorrelator(stream,
+                                       demean=cckwargs.get('demean', True))
+
+        def _correlate(template, template_time):
+            return correlator.correlate(template, template_time=template_time)
+    else:
+        def _correlate(template, template_time):
+            return correlate_stream_template(stream, template,
+                                             template_time=template_time,
+                                             **cckwargs)
+
+    def _correlate_or_error(template_id):
         template_time = _get_item(template_times, template_id)
         try:
-            ccs = correlate_stream_template(stream, template,
-                                            template_time=template_time,
-                                            **cckwargs)
+            return _correlate(templates[template_id], template_time)
         except ValueError as ex:
-            msg = '{} -> do not use template {}'.format(ex, template_id)
+            return ex
+
+    def _iter_ccs():
+        # correlate templates in blocks, so that at most one block of
+        # cross-correlations is held in memory
+        if threads > 1:
+            pool = ThreadPool(threads)
+            map_ = pool.map
+        else:
+            map_ = map
+        try:
+            for i in range(0, len(templates), max(threads, 1)):
+                ids = range(i, min(i + max(threads, 1), len(templates)))
+                for template_id, ccs in zip(
+                        ids, map_(_correlate_or_error, ids)):
+                    yield template_id, ccs
+        finally:
+            if threads > 1:
+                pool.close()
+                pool.join()
+
+    possible_detections = []
+    similarities = []
+    for template_id, ccs in _iter_ccs():
+        template = templates[template_id]
+        template_time = _get_item(template_times, template_id)
+        if isinstance(ccs, ValueError):
+            msg = '{} -> do not use template {}'.format(ccs, template_id)
             warnings.warn(msg)
             similarities.append(None)
             continue
@@ -1216,19 +1579,122 @@ def correlation_detector(stream, templates, heights, distance,
     if len(templates) == 1:
         detections = possible_detections
     else:
-        detections = []
-        times = []
-        for pd in sorted(possible_detections, key=lambda d: -d['similarity']):
-            if all(abs(pd['time'] - t) > distance for t in times):
-                times.append(pd['time'])
-                detections.append(pd)
-        detections = sorted(detections, key=lambda d: d['time'])
+        detections = _remove_close_detections(possible_detections, distance)
     if plot is not None:
         _plot_detections(detections, similarities, stream=plot,
                          heights=heights, template_names=template_names)
     return detections, similarities
 
 
+def iter_correlation_detections(chunks, templates, heights, distance,
+                                template_times=None, **kwargs):
+    """
+    Detector based on the cross-correlation of waveforms for data in chunks.
+
+    Streaming variant of
+    :func:`~obspy.signal.cross_correlation.correlation_detector` for long
+    continuous data which does not fit into memory. The data is consumed
+    chunk by chunk from an iterable of streams (e.g. successive days of an
+    archive or the windows of :meth:`~obspy.core.stream.Stream.slide`).
+    Chunks may overlap or be contiguous. The end of the previous chunk is
+    kept between iterations, so that events at the chunk boundaries are
+    neither lost nor reported twice. Detections are yielded chronologically
+    as soon as they can not be affected by data of later chunks anymore.
+
+    If a chunk does not continue the data of the previous chunk (i.e. there
+    is a gap), detection restarts at the beginning of the new chunk.
+
+    :param chunks: Iterable of streams with data traces.
+    :param templates: List of streams with template traces or a single
+        template stream.
+    :param heights: Similarity values to trigger a detection,
+        one for each template. This argument can also be a single value.
+    :param distance: The distance in seconds between two detections.
+    :param template_times: UTCDateTimes associated with template event
+        (e.g. origin times,
+        default are the start times of the template streams).
+        This argument can also be a single value.
+    :param kwargs: All other kwargs are passed to
+        :func:`~obspy.signal.cross_correlation.correlation_detector`
+        (except `plot`).
+
+    :return: Generator yielding the detections, see
+        :func:`~obspy.signal.cross_correlation.correlation_detector`.
+
+    .. rubric:: Example
+
+    >>> from obspy import read, UTCDateTime
+    >>> data = read().filter('highpass', freq=5)
+    >>> pick = UTCDateTime('2009-08-24T00:20:07.73')
+    >>> template = data.slice(pick, pick + 10)
+    >>> chunks = data.slide(window_length=15, step=10)
+    >>> for detection in iter_correlation_detections(chunks, template,
+    ...                                              0.5, 10):
+    ...     print(detection)  # doctest: +SKIP
+    {'time': UTCDateTime(2009, 8, 24, 0, 20, 7, 730000),
+     'similarity': 0.99999999999999944,
+     'template_id': 0}
+    """
+    if isinstance(templates, Stream):
+        templates = [templates]
+    if kwargs.get('plot') is not None:
+        raise ValueError('Plotting is not supported for chunked detection')
+    distance_ = distance or 0
+    # length of data which is sufficient to correlate with any template
+    keep = max(max(tr.stats.endtime for tr in template) -
+               min(tr.stats.starttime for tr in template)
+               for template in templates)
+    keep += 2 * distance_
+    tail = None
+    # detections before this time were already yielded
+    emitted_until = None
+    # detections of the last processed window which were not yielded yet
+    pending = []
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        if tail is None:
+            window = chunk.copy()
+        else:
+            window = (tail + chunk).merge(method=1)
+            if any(isinstance(tr.data, np.ma.MaskedArray) for tr in window):
+                # gap between chunks, start over with the new chunk
+                for detection in pending:
+                    yield detection
+                pending = []
+                emitted_until = None
+                window = chunk.copy()
+        detections, similarities = correlation_detector(
+            window, templates, heights, distance,
+            template_times=template_times, **kwargs)
+        similarities = [sim for sim in similarities if sim is not None]
+        starttime = max(tr.stats.starttime for tr in window)
+        endtime = min(tr.stats.endtime for tr in window)
+        if len(similarities) == 0:
+            # not enough data yet
+            tail = window.slice(endtime - keep)
+            continue
+        delta = similarities[0].stats.delta
+        # detections up to this time are unaffected by subsequent data
+        finished_until = (min(sim.stats.endtime for sim in similarities) -
+                          distance_ - delta)
+        if emitted_until is not None:
+            detections = [d for d in detections
+                          if d['time'] >= emitted_until]
+            finished_until = max(finished_until, emitted_until)
+        for detection in detections:
+            if detection['time'] < finished_until:
+                yield detection
+        pending = [d for d in detections if d['time'] >= finished_until]
+        emitted_until = finished_until
+        # keep enough data to reevaluate the not yet finished detections
+        # together with their predecessors
+        lead = max(sim.stats.starttime - starttime for sim in similarities)
+        tail = window.slice(finished_until - distance_ - lead - 3 * delta)
+    for detection in pending:
+        yield detection
+
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod(exclude_empty=True)
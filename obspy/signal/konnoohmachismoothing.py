@@ -21,6 +21,7 @@ Functions to smooth spectra with the so called Konno & Ohmachi method.
 import warnings
 
 import numpy as np
+from scipy import sparse
 
 
 def konno_ohmachi_smoothing_window(frequencies, center_frequency,
@@ -130,31 +131,130 @@ def calculate_smoothing_matrix(frequencies, bandwidth=40.0, normalize=False):
     return sm_matrix
 
 
-def apply_smoothing_matrix(spectra, smoothing_matrix, count=1):
+def calculate_sparse_smoothing_matrix(frequencies, bandwidth=40.0,
+                                      normalize=False,
+                                      center_frequencies=None,
+                                      threshold=1e-4):
+    """
+    Calculates a sparse len(frequencies) x len(center_frequencies) matrix
+    with the Konno & Ohmachi window truncated where it is negligible.
+
+    Column ``i`` of the matrix holds the smoothing window around
+    ``center_frequencies[i]``. The window is only evaluated for frequencies
+    where its envelope ``(bandwidth * log_10(f/f_c)) ** -4`` is not smaller
+    than ``threshold``, all other entries are treated as zero. As opposed to
+    :func:`~obspy.signal.konnoohmachismoothing.calculate_smoothing_matrix`
+    this keeps memory usage manageable for long spectra, especially if the
+    smoothed spectra are only needed at a limited set of (e.g.
+    logarithmically spaced) center frequencies.
+
+    The matrix can be used with
+    :func:`~obspy.signal.konnoohmachismoothing.apply_smoothing_matrix`.
+
+    :type frequencies: :class:`numpy.ndarray` (float32 or float64)
+    :param frequencies:
+        The input frequencies, sorted in increasing order.
+    :type bandwidth: float
+    :param bandwidth:
+        Determines the width of the smoothing peak. Lower values result in a
+        broader peak. Must be greater than 0. Defaults to 40.
+    :type normalize: bool, optional
+    :param normalize:
+        The Konno-Ohmachi smoothing window is normalized on a logarithmic
+        scale. Set this parameter to True to normalize the (truncated) window
+        on a normal scale. Default to False.
+    :type center_frequencies: :class:`numpy.ndarray`, optional
+    :param center_frequencies:
+        Center frequencies at which the smoothed spectra are evaluated.
+        Defaults to ``frequencies``.
+    :type threshold: float or None, optional
+    :param threshold:
+        Truncate the smoothing window where its envelope drops below this
+        value. ``None`` disables the truncation. Defaults to ``1e-4``.
+    :rtype: :class:`scipy.sparse.csc_matrix`
+    """
+    if frequencies.dtype not in (np.float32, np.float64):
+        msg = '`frequencies` needs to have a dtype of float32/64.'
+        raise ValueError(msg)
+    if center_frequencies is None:
+        center_frequencies = frequencies
+    center_frequencies = np.asarray(center_frequencies)
+    if threshold:
+        if np.any(np.diff(frequencies) < 0):
+            msg = '`frequencies` need to be sorted in increasing order.'
+            raise ValueError(msg)
+        # Frequency ratio where the envelope of the window equals the
+        # threshold.
+        ratio = 10.0 ** (threshold ** -0.25 / bandwidth)
+        start = np.searchsorted(frequencies, center_frequencies / ratio,
+                                side='left')
+        end = np.searchsorted(frequencies, center_frequencies * ratio,
+                              side='right')
+    else:
+        start = np.zeros(len(center_frequencies), dtype=np.int64)
+        end = np.empty(len(center_frequencies), dtype=np.int64)
+        end.fill(len(frequencies))
+    indptr = np.zeros(len(center_frequencies) + 1, dtype=np.int64)
+    np.cumsum(end - start, out=indptr[1:])
+    indices = np.empty(indptr[-1], dtype=np.int64)
+    data = np.empty(indptr[-1], dtype=frequencies.dtype)
+    for _i, (freq, _s, _e) in enumerate(zip(center_frequencies, start, end)):
+        indices[indptr[_i]:indptr[_i + 1]] = np.arange(_s, _e)
+        data[indptr[_i]:indptr[_i + 1]] = konno_ohmachi_smoothing_window(
+            frequencies[_s:_e], freq, bandwidth, normalize=normalize)
+    return sparse.csc_matrix(
+        (data, indices, indptr),
+        shape=(len(frequencies), len(center_frequencies)))
+
+
+def apply_smoothing_matrix(spectra, smoothing_matrix, count=1,
+                           chunk_size=None):
     """
     Smooths a matrix containing one spectra per row with the Konno-Ohmachi
     smoothing window, using a smoothing matrix pre-computed through the
-    :func:`~obspy.signal.konnoohmachismoothing.calculate_smoothing_matrix`
-    function.
+    :func:`~obspy.signal.konnoohmachismoothing.calculate_smoothing_matrix` or
+    :func:`calculate_sparse_smoothing_matrix` function.
     This function is useful if one needs to smooth the same type of spectrum
     (same shape) through different function calls.
 
     All spectra need to have frequency bins corresponding to the same
     frequencies.
+
+    :type chunk_size: int, optional
+    :param chunk_size:
+        Smooth at most this many spectra at once to limit the size of
+        temporary arrays. By default all spectra are smoothed at once.
     """
     if spectra.dtype not in (np.float32, np.float64):
         msg = '`spectra` needs to have a dtype of float32/64.'
         raise ValueError(msg)
-    new_spec = np.dot(spectra, smoothing_matrix)
-    # Eventually apply more than once.
-    for _i in range(count - 1):
-        new_spec = np.dot(new_spec, smoothing_matrix)
-    return new_spec
+    if count > 1 and smoothing_matrix.shape[0] != smoothing_matrix.shape[1]:
+        msg = 'The smoothing can only be applied more than once if the ' + \
+              'center frequencies are the input frequencies.'
+        raise ValueError(msg)
+    if sparse.issparse(smoothing_matrix):
+        def _dot(spec):
+            return smoothing_matrix.T.dot(spec.T).T
+    else:
+        def _dot(spec):
+            return np.dot(spec, smoothing_matrix)
+    for _i in range(count):
+        if spectra.ndim == 1 or not chunk_size or \
+                chunk_size >= len(spectra):
+            spectra = _dot(spectra)
+            continue
+        new_spec = np.empty((len(spectra), smoothing_matrix.shape[1]),
+                            dtype=np.result_type(spectra, smoothing_matrix))
+        for _j in range(0, len(spectra), chunk_size):
+            new_spec[_j:_j + chunk_size] = _dot(spectra[_j:_j + chunk_size])
+        spectra = new_spec
+    return spectra
 
 
 def konno_ohmachi_smoothing(spectra, frequencies, bandwidth=40, count=1,
                             enforce_no_matrix=False, max_memory_usage=512,
-                            normalize=False):
+                            normalize=False, center_frequencies=None,
+                            threshold=None):
     """
     Smooths a matrix containing one spectra per row with the Konno-Ohmachi
     smoothing window.
@@ -196,6 +296,19 @@ def konno_ohmachi_smoothing(spectra, frequencies, bandwidth=40, count=1,
         The Konno-Ohmachi smoothing window is normalized on a logarithmic
         scale. Set this parameter to True to normalize it on a normal scale.
         Default to False.
+    :type center_frequencies: :class:`numpy.ndarray`, optional
+    :param center_frequencies:
+        Only evaluate the smoothed spectra at these center frequencies (e.g.
+        a logarithmically spaced subset) instead of at every input
+        frequency. Can not be combined with ``count`` larger than one.
+    :type threshold: float, optional
+    :param threshold:
+        If given, the smoothing window is truncated where its envelope drops
+        below this value (e.g. ``1e-4``) and a sparse smoothing matrix (see
+        :func:`calculate_sparse_smoothing_matrix`) is applied chunk-wise to
+        the spectra.
+        Requires sorted frequencies. This is the recommended way to smooth
+        long spectra.
     """
     if spectra.dtype not in (np.float32, np.float64):
         msg = '`spectra` needs to have a dtype of float32/64.'
@@ -215,8 +328,20 @@ def konno_ohmachi_smoothing(spectra, frequencies, bandwidth=40, count=1,
         size = 4.0
     elif frequencies.dtype == np.float64:
         size = 8.0
-    # Calculate the approximate usage needs for the smoothing matrix algorithm.
     length = len(frequencies)
+    # Sparse smoothing matrix, applied chunk-wise to limit the memory usage.
+    if center_frequencies is not None or threshold is not None:
+        if center_frequencies is not None:
+            center_frequencies = np.require(center_frequencies,
+                                            frequencies.dtype)
+        smoothing_matrix = calculate_sparse_smoothing_matrix(
+            frequencies, bandwidth, normalize=normalize,
+            center_frequencies=center_frequencies, threshold=threshold)
+        chunk_size = int(max_memory_usage * 1048576.0 / size /
+                         (length + smoothing_matrix.shape[1]))
+        return apply_smoothing_matrix(spectra, smoothing_matrix, count=count,
+                                      chunk_size=max(chunk_size, 1))
+    # Calculate the approximate usage needs for the smoothing matrix algorithm.
     approx_mem_usage = (length * length + 2 * len(spectra) + length) * \
         size / 1048576.0
     # If smaller than the allowed maximum memory consumption build a smoothing
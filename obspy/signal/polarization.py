@@ -13,9 +13,10 @@ import warnings
 
 import numpy as np
 import scipy.odr
+from numpy.lib.stride_tricks import as_strided
 from scipy import signal
-from scipy.optimize import fminbound
 
+from obspy.core.utcdatetime import UTCDateTime
 from obspy.signal.invsim import cosine_taper
 
 
@@ -121,6 +122,89 @@ def eigval(datax, datay, dataz, fk, normf=1.0):
     return leigenv1, leigenv2, leigenv3, rect, plan, dleigenv, drect, dplan
 
 
+def _fold_angles(azimuth, incidence):
+    """
+    Map azimuth and incidence angles (in degrees) of a polarization direction
+    to azimuths in [0, 180] and incidences in [0, 90].
+    """
+    azimuth = np.where(azimuth < 0.0, azimuth + 360.0, azimuth)
+    incidence = np.where(incidence < 0.0, incidence + 180.0, incidence)
+    flip = incidence > 90.0
+    incidence = np.where(flip, 180.0 - incidence, incidence)
+    azimuth = np.where(flip & (azimuth > 180.0), azimuth - 180.0,
+                       np.where(flip, azimuth + 180.0, azimuth))
+    azimuth = np.where(azimuth > 180.0, azimuth - 180.0, azimuth)
+    return azimuth, incidence
+
+
+def _covariance(x, mask=None):
+    """
+    Covariance matrices of many windows of three component data at once.
+
+    :param x: Data of shape (number of windows, 3, number of samples).
+    :param mask: Boolean array of shape (number of windows, number of
+        samples), only samples where mask is ``True`` are used.
+    :returns: Covariance matrices of shape (number of windows, 3, 3).
+    """
+    if mask is None:
+        x = x - x.mean(axis=-1)[..., np.newaxis]
+        count = x.shape[-1]
+    else:
+        mask = mask[:, np.newaxis, :]
+        count = mask.sum(axis=-1)[..., np.newaxis]
+        x = np.where(mask, x - (x * mask).sum(axis=-1)[..., np.newaxis] /
+                     count, 0)
+    return np.matmul(x, x.conj().transpose(0, 2, 1)) / (count - 1)
+
+
+def _eig_descending(covmat):
+    """
+    Eigenvalues (descending) and corresponding eigenvectors (columns) of many
+    hermitian positive semi-definite matrices.
+    """
+    eigenval, eigvec = np.linalg.eigh(covmat)
+    # round-off can lead to tiny negative values for singular matrices
+    eigenval = np.clip(eigenval[:, ::-1], 0, None)
+    return eigenval, eigvec[:, :, ::-1]
+
+
+def _windows(data, starts, length):
+    """
+    Copy windows of given length starting at sample indices ``starts`` out of
+    a one dimensional array into an array of shape (len(starts), length).
+    """
+    view = as_strided(data, shape=(len(data) - length + 1, length),
+                      strides=(data.strides[0], data.strides[0]))
+    return view[starts]
+
+
+def _flinn_windows(z, n, e, noise_thres=0):
+    """
+    Batched version of :func:`flinn` for many windows of ZNE data, each
+    given as array of shape (number of windows, number of samples).
+
+    :returns: arrays of azimuth, incidence, rectilinearity, and planarity
+    """
+    mask = (z ** 2 + n ** 2 + e ** 2) > noise_thres
+    x = np.empty((z.shape[0], 3, z.shape[1]), dtype=np.float64)
+    # East
+    x[:, 0, :] = e
+    # North
+    x[:, 1, :] = n
+    # Z
+    x[:, 2, :] = z
+    eigenval, eigvec = _eig_descending(_covariance(x, mask))
+    # Rectilinearity defined after Montalbetti & Kanasewich, 1970
+    rect = 1.0 - np.sqrt(eigenval[:, 1] / eigenval[:, 0])
+    # Planarity defined after [Jurkevics1988]_
+    plan = 1.0 - (2.0 * eigenval[:, 2] / (eigenval[:, 1] + eigenval[:, 0]))
+    azimuth = np.degrees(np.arctan2(eigvec[:, 0, 0], eigvec[:, 1, 0]))
+    eve = np.sqrt(eigvec[:, 0, 0] ** 2 + eigvec[:, 1, 0] ** 2)
+    incidence = np.degrees(np.arctan2(eve, eigvec[:, 2, 0]))
+    azimuth, incidence = _fold_angles(azimuth, incidence)
+    return azimuth, incidence, rect, plan
+
+
 def flinn(stream, noise_thres=0):
     """
     Computes the azimuth, incidence, rectilinearity and planarity after the
@@ -134,39 +218,10 @@ def flinn(stream, noise_thres=0):
     :type noise_thres: float
     :returns:  azimuth, incidence, rectilinearity, and planarity
     """
-    mask = (stream[0][:] ** 2 + stream[1][:] ** 2 + stream[2][:] ** 2
-            ) > noise_thres
-    x = np.zeros((3, mask.sum()), dtype=np.float64)
-    # East
-    x[0, :] = stream[2][mask]
-    # North
-    x[1, :] = stream[1][mask]
-    # Z
-    x[2, :] = stream[0][mask]
-
-    covmat = np.cov(x)
-    eigvec, eigenval, v = np.linalg.svd(covmat)
-    # Rectilinearity defined after Montalbetti & Kanasewich, 1970
-    rect = 1.0 - np.sqrt(eigenval[1] / eigenval[0])
-    # Planarity defined after [Jurkevics1988]_
-    plan = 1.0 - (2.0 * eigenval[2] / (eigenval[1] + eigenval[0]))
-    azimuth = math.degrees(math.atan2(eigvec[0][0], eigvec[1][0]))
-    eve = np.sqrt(eigvec[0][0] ** 2 + eigvec[1][0] ** 2)
-    incidence = math.degrees(math.atan2(eve, eigvec[2][0]))
-    if azimuth < 0.0:
-        azimuth = 360.0 + azimuth
-    if incidence < 0.0:
-        incidence += 180.0
-    if incidence > 90.0:
-        incidence = 180.0 - incidence
-        if azimuth > 180.0:
-            azimuth -= 180.0
-        else:
-            azimuth += 180.0
-    if azimuth > 180.0:
-        azimuth -= 180.0
-
-    return azimuth, incidence, rect, plan
+    z, n, e = (np.atleast_2d(np.asarray(tr, dtype=np.float64))
+               for tr in stream[:3])
+    return tuple(float(value[0])
+                 for value in _flinn_windows(z, n, e, noise_thres))
 
 
 def instantaneous_frequency(data, sampling_rate):
@@ -234,86 +289,85 @@ def vidale_adapt(stream, noise_thres, fs, flow, fhigh, spoint, stime, etime,
     na = signal.hilbert(n)
     ei = instantaneous_frequency(e, fs)
     ea = signal.hilbert(e)
-    res = []
-
-    offset = int(3 * fs / flow)
-    covmat = np.zeros([3, 3], dtype=np.complex128)
-    while True:
-        if adaptive:
-            adapt = int(3.0 * w * fs / (zi[offset] + ni[offset] + ei[offset]))
-            # in order to account for errors in the inst freq estimation
-            if adapt > int(3.0 * fs / flow):
-                adapt = int(3.0 * fs / flow)
-            elif adapt < int(3.0 * fs / fhigh):
-                adapt = int(3.0 * fs / fhigh)
-            # XXX: was adapt /= 2
-            adapt //= 2
-            adapt = (2 * adapt) + 1
-        else:
-            adapt = max(int(3. * fs / (fhigh - flow)), int(3. * fs / flow))
-        newstart = stime + offset / fs
-        if (newstart + (adapt / 2) / fs) > etime:
-            break
-
-        zx = za[int(spoint[2] + offset - adapt / 2):
-                int(spoint[2] + offset + adapt / 2)]
-        nx = na[int(spoint[1] + offset - adapt / 2):
-                int(spoint[1] + offset + adapt / 2)]
-        ex = ea[int(spoint[0] + offset - adapt / 2):
-                int(spoint[0] + offset + adapt / 2)]
-        zx -= zx.mean()
-        nx -= nx.mean()
-        ex -= ex.mean()
-
-        mask = (stream[0][:] ** 2 + stream[1][:] ** 2 + stream[2][:] ** 2) > \
-            noise_thres
-        xx = np.zeros((3, mask.sum()), dtype=np.complex128)
-        # East
-        xx[0, :] = ea
-        # North
-        xx[1, :] = na
-        # Z
-        xx[2, :] = za
-
-        covmat = np.cov(xx)
-        eigvec, eigenval, v = np.linalg.svd(covmat)
-
-        # very similar to function flinn, possible could be unified
-        def fun(x):
-            return 1. - math.sqrt(
-                ((eigvec[0][0] * (math.cos(x) + math.sin(x) * 1j)).real) ** 2 +
-                ((eigvec[1][0] * (math.cos(x) + math.sin(x) * 1j)).real) ** 2 +
-                ((eigvec[2][0] * (math.cos(x) + math.sin(x) * 1j)).real) ** 2)
-
-        final = fminbound(fun, 0.0, math.pi, full_output=True)
-        x = 1. - final[1]
-        ellip = math.sqrt(1.0 - x ** 2) / x
-        # rectilinearity defined after Montalbetti & Kanasewich, 1970
-        rect = 1. - np.sqrt(eigenval[1] / eigenval[0])
-        # planarity defined after [Jurkevics1988]_
-        plan = 1. - (2.0 * eigenval[2] / (eigenval[1] + eigenval[0]))
-
-        azimuth = 180 * math.atan2(eigvec[0][0].real, eigvec[1][0].real) / \
-            math.pi
-        eve = np.sqrt(eigvec[0][0].real ** 2 + eigvec[1][0].real ** 2)
-
-        incidence = 180 * math.atan2(eve, eigvec[2][0].real) / math.pi
-        if azimuth < 0.0:
-            azimuth = 360.0 + azimuth
-        if incidence < 0.0:
-            incidence += 180.0
-        if incidence > 90.0:
-            incidence = 180.0 - incidence
-            if azimuth > 180.0:
-                azimuth -= 180.0
-            else:
-                azimuth += 180.0
-        if azimuth > 180.0:
-            azimuth -= 180.0
-        res.append((newstart.timestamp, azimuth, incidence, rect, plan, ellip))
-        offset += 1
 
-    return res
+    # window lengths and start times of all windows, one window per sample
+    offset = np.arange(int(3 * fs / flow), len(z))
+    if adaptive:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            adapt = 3.0 * w * fs / (zi[offset] + ni[offset] + ei[offset])
+        # in order to account for errors in the inst freq estimation
+        adapt = np.clip(np.nan_to_num(adapt), int(3.0 * fs / fhigh),
+                        int(3.0 * fs / flow)).astype(np.int64)
+        # XXX: was adapt /= 2
+        adapt //= 2
+        adapt = (2 * adapt) + 1
+    else:
+        adapt = np.empty(len(offset), dtype=np.int64)
+        adapt.fill(max(int(3. * fs / (fhigh - flow)), int(3. * fs / flow)))
+    newstart = stime._ns + np.round(offset / fs * 1e9).astype(np.int64)
+    stop = (newstart + np.round(adapt / 2. / fs * 1e9).astype(np.int64) >
+            etime._ns).nonzero()[0]
+    if len(stop):
+        offset = offset[:stop[0]]
+        adapt = adapt[:stop[0]]
+        newstart = newstart[:stop[0]]
+    # sample ranges of the windows for East, North and Z, stop at the first
+    # window not fully covered by data
+    lengths = (offset + adapt / 2.).astype(np.int64) - \
+        (offset - adapt / 2.).astype(np.int64)
+    starts = np.array([(spoint[i] + offset - adapt / 2.).astype(np.int64)
+                       for i in (0, 1, 2)])
+    stop = ((starts < 0) | (starts + lengths > len(z))).any(axis=0)
+    stop = stop.nonzero()[0]
+    if len(stop):
+        newstart = newstart[:stop[0]]
+        starts = starts[:, :stop[0]]
+        lengths = lengths[:stop[0]]
+    if len(newstart) == 0:
+        return []
+
+    data = [ea, na, za]
+    noise_mask = (z ** 2 + n ** 2 + e ** 2) > noise_thres
+    covmat = np.empty((len(newstart), 3, 3), dtype=np.complex128)
+    # windows of equal length are processed together, in blocks to limit
+    # the memory usage
+    for length in np.unique(lengths):
+        idx = (lengths == length).nonzero()[0]
+        step = max(2 ** 20 // length, 1)
+        for k in range(0, len(idx), step):
+            block = idx[k:k + step]
+            xx = np.empty((len(block), 3, length), dtype=np.complex128)
+            for i in range(3):
+                xx[:, i, :] = _windows(data[i], starts[i, block], length)
+            mask = _windows(noise_mask, starts[2, block], length)
+            covmat[block] = _covariance(xx, mask)
+    eigenval, eigvec = _eig_descending(covmat)
+    v = eigvec[:, :, 0]
+
+    # Rotate the complex eigenvector of the largest eigenvalue in the complex
+    # plane to maximize the length of its real part (this replaces the
+    # numerical search for the rotation angle). The real part of
+    # v * exp(1j * x) has a squared length of
+    # c + a * cos(2x) - b * sin(2x).
+    a = 0.5 * ((v.real ** 2).sum(axis=1) - (v.imag ** 2).sum(axis=1))
+    b = (v.real * v.imag).sum(axis=1)
+    c = 0.5 * (np.abs(v) ** 2).sum(axis=1)
+    x = np.sqrt(c + np.sqrt(a ** 2 + b ** 2))
+    v = (v * np.exp(0.5j * np.arctan2(-b, a))[:, np.newaxis]).real
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ellip = np.sqrt(np.clip(1.0 - x ** 2, 0, None)) / x
+    # rectilinearity defined after Montalbetti & Kanasewich, 1970
+    rect = 1. - np.sqrt(eigenval[:, 1] / eigenval[:, 0])
+    # planarity defined after [Jurkevics1988]_
+    plan = 1. - (2.0 * eigenval[:, 2] / (eigenval[:, 1] + eigenval[:, 0]))
+
+    azimuth = np.degrees(np.arctan2(v[:, 0], v[:, 1]))
+    eve = np.sqrt(v[:, 0] ** 2 + v[:, 1] ** 2)
+    incidence = np.degrees(np.arctan2(eve, v[:, 2]))
+    azimuth, incidence = _fold_angles(azimuth, incidence)
+    return list(zip((newstart / 1e9).tolist(), azimuth.tolist(),
+                    incidence.tolist(), rect.tolist(), plan.tolist(),
+                    ellip.tolist()))
 
 
 def particle_motion_odr(stream, noise_thres=0):
@@ -328,17 +382,11 @@ def particle_motion_odr(stream, noise_thres=0):
     :type noise_thres: float
     :returns: azimuth, incidence, error of azimuth, error of incidence
     """
-    z = []
-    n = []
-    e = []
-    comp, npts = np.shape(stream)
-
-    for i in range(0, npts):
-        if (stream[0][i] ** 2 + stream[1][i] ** 2 + stream[2][i] ** 2) \
-                > noise_thres:
-            z.append(stream[0][i])
-            n.append(stream[1][i])
-            e.append(stream[2][i])
+    z, n, e = (np.asarray(tr) for tr in stream[:3])
+    mask = (z ** 2 + n ** 2 + e ** 2) > noise_thres
+    z = z[mask]
+    n = n[mask]
+    e = e[mask]
 
     def fit_func(beta, x):
         # XXX: Eventually this is correct: return beta[0] * x + beta[1]
@@ -351,9 +399,6 @@ def particle_motion_odr(stream, noise_thres=0):
     az_slope = out.beta[0]
     az_error = out.sd_beta[0]
 
-    n = np.asarray(n)
-    e = np.asarray(e)
-    z = np.asarray(z)
     r = np.sqrt(n ** 2 + e ** 2)
 
     data = scipy.odr.Data(r, abs(z))
@@ -438,7 +483,7 @@ def _get_s_point(stream, stime, etime):
 
 def polarization_analysis(stream, win_len, win_frac, frqlow, frqhigh, stime,
                           etime, verbose=False, method="pm", var_noise=0.0,
-                          adaptive=True):
+                          adaptive=True, processes=1):
     """
     Method carrying out polarization analysis with the [Flinn1965b]_,
     [Jurkevics1988]_, ParticleMotion, or [Vidale1986]_ algorithm.
@@ -467,6 +512,10 @@ def polarization_analysis(stream, win_len, win_frac, frqlow, frqhigh, stime,
         ``True``). If set to ``False``, the window will be estimated as
         ``3 * max(1/(fhigh-flow), 1/flow)``.
     :type adaptive: bool
+    :param processes: Number of processes used to compute the orthogonal
+        regressions of method ``"pm"`` in parallel. The other methods are
+        computed for all windows at once.
+    :type processes: int
     :rtype: dict
     :returns: Dictionary with keys ``"timestamp"`` (POSIX timestamp, can be
         used to initialize :class:`~obspy.core.utcdatetime.UTCDateTime`
@@ -510,45 +559,72 @@ def polarization_analysis(stream, win_len, win_frac, frqlow, frqhigh, stime,
     else:
         nsamp = int(win_len * fs)
         nstep = int(nsamp * win_frac)
-        newstart = stime
+        if nstep < 1:
+            msg = "Window step must be at least one sample"
+            raise ValueError(msg)
         tap = cosine_taper(nsamp, p=0.22)
-        offset = 0
-        while (newstart + (nsamp + nstep) / fs) < etime:
-            try:
-                for i, tr in enumerate(stream):
-                    dat = tr.data[spoint[i] + offset:
-                                  spoint[i] + offset + nsamp]
-                    dat = (dat - dat.mean()) * tap
-                    if tr.stats.channel[-1].upper() == "Z":
-                        z = dat.copy()
-                    elif tr.stats.channel[-1].upper() == "N":
-                        n = dat.copy()
-                    elif tr.stats.channel[-1].upper() == "E":
-                        e = dat.copy()
+        # start times of all windows
+        nwin = (etime._ns - stime._ns - int(round((nsamp + nstep) / fs * 1e9))
+                ) // int(round(float(nstep) / fs * 1e9))
+        newstart = stime._ns + np.arange(max(nwin + 1, 0), dtype=np.int64) * \
+            int(round(float(nstep) / fs * 1e9))
+        newstart = newstart[newstart + int(round((nsamp + nstep) / fs * 1e9))
+                            < etime._ns]
+        # only use windows fully covered by data
+        nwin = len(newstart)
+        for i, tr in enumerate(stream):
+            nwin = min(nwin, max((len(tr.data) - spoint[i] - nsamp) // nstep +
+                                 1, 0))
+        newstart = newstart[:nwin]
+        components = {}
+        for i, tr in enumerate(stream):
+            component = tr.stats.channel[-1].upper()
+            if component not in "ZNE":
+                msg = "Unexpected channel code '%s'" % tr.stats.channel
+                raise ValueError(msg)
+            components[component] = (tr.data, spoint[i])
+        if nwin and len(components) != 3:
+            msg = "Stream needs to contain Z, N and E components"
+            raise ValueError(msg)
+        # we plot against the centre of the sliding window
+        timestamps = newstart / 1e9 + float(nstep) / fs
+
+        # process the windows in blocks to limit the memory usage
+        step = max(2 ** 20 // nsamp, 1)
+        pool = None
+        if method.lower() == "pm" and processes > 1 and nwin > 1:
+            from multiprocessing import Pool
+            pool = Pool(processes)
+        try:
+            for k in range(0, nwin, step):
+                z, n, e = [
+                    _windows(components[c][0],
+                             components[c][1] +
+                             np.arange(k, min(k + step, nwin)) * nstep,
+                             nsamp) for c in "ZNE"]
+                z, n, e = [(dat - dat.mean(axis=1)[:, np.newaxis]) * tap
+                           for dat in (z, n, e)]
+                if method.lower() == "pm":
+                    args = [([z[j], n[j], e[j]], var_noise)
+                            for j in range(len(z))]
+                    if pool is not None:
+                        values = pool.starmap(particle_motion_odr, args)
                     else:
-                        msg = "Unexpected channel code '%s'" % tr.stats.channel
-                        raise ValueError(msg)
-
-                data = [z, n, e]
-            except IndexError:
-                break
-
-            # we plot against the centre of the sliding window
-            if method.lower() == "pm":
-                azimuth, incidence, error_az, error_inc = \
-                    particle_motion_odr(data, var_noise)
-                res.append(np.array([newstart.timestamp + float(nstep) / fs,
-                           azimuth, incidence, error_az, error_inc]))
-            if method.lower() == "flinn":
-                azimuth, incidence, reclin, plan = flinn(data, var_noise)
-                res.append(np.array([newstart.timestamp + float(nstep) / fs,
-                                    azimuth, incidence, reclin, plan]))
-
-            if verbose:
-                print(newstart, newstart + nsamp / fs, res[-1][1:])
-            offset += nstep
-
-            newstart += float(nstep) / fs
+                        values = [particle_motion_odr(*arg) for arg in args]
+                    values = np.array(values).reshape((len(z), 4)).T
+                else:
+                    values = _flinn_windows(z, n, e, var_noise)
+                block = np.column_stack(
+                    (timestamps[k:k + len(z)],) + tuple(values))
+                if verbose:
+                    for _ns, row in zip(newstart[k:k + len(z)], block):
+                        _start = UTCDateTime(ns=int(_ns))
+                        print(_start, _start + nsamp / fs, row[1:])
+                res.extend(block)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
 
     res = np.array(res)
 
@@ -14,9 +14,9 @@ from obspy.core.util.libnames import _load_cdll
 from obspy.core.util.testing import ImageComparison
 from obspy.signal.cross_correlation import (
     correlate, correlate_template, correlate_stream_template,
-    correlation_detector,
+    correlation_detector, iter_correlation_detections, correlate_pairs,
     xcorr_pick_correction, xcorr_3c, xcorr_max,
-    xcorr, _xcorr_padzeros, _xcorr_slice, _find_peaks)
+    xcorr, _xcorr_padzeros, _xcorr_slice, _find_peaks, _StreamCorrelator)
 from obspy.signal.trigger import coincidence_trigger
 
 
@@ -649,6 +649,135 @@ class CrossCorrelationTestCase(unittest.TestCase):
         self.assertIsInstance(sims[0], Trace)
         self.assertIs(sims[1], None)
 
+    def test_stream_correlator(self):
+        """
+        Correlating many templates with cached data spectra gives the same
+        results as correlating each template separately.
+        """
+        stream = read().filter('highpass', freq=5)
+        stream[1].trim(stream[1].stats.starttime + 1.23, None)
+        stream[2].data = stream[2].data.astype(np.int32)
+        t0 = stream[0].stats.starttime
+        templates = [stream.slice(t0 + 5, t0 + 10),
+                     stream.slice(t0 + 7.01, t0 + 9),
+                     stream[:2].slice(t0 + 12, t0 + 17)]
+        templates[0][1].stats.starttime += 0.5
+        templates[1][2].trim(None, templates[1][2].stats.endtime - 0.5)
+        for demean in (True, False):
+            correlator = _StreamCorrelator(stream, demean=demean)
+            for i, template in enumerate(templates):
+                template_time = None if i == 0 else t0
+                expected = correlate_stream_template(
+                    stream, template, template_time=template_time,
+                    demean=demean)
+                got = correlator.correlate(template,
+                                           template_time=template_time)
+                self.assertEqual(len(got), len(expected))
+                for tr1, tr2 in zip(got, expected):
+                    self.assertEqual(tr1.stats, tr2.stats)
+                    np.testing.assert_allclose(tr1.data, tr2.data,
+                                               atol=1e-8)
+        # results of the detector do not depend on the used path
+        kwargs = dict(template_times=[None, t0, t0])
+        detections, sims = correlation_detector(stream, templates, 0.3, 1,
+                                                **kwargs)
+        self.assertGreater(len(detections), 3)
+        for other_kwargs in (dict(threads=2), dict(threads=3),
+                             dict(method='direct')):
+            other_kwargs.update(kwargs)
+            detections2, sims2 = correlation_detector(
+                stream, templates, 0.3, 1, **other_kwargs)
+            self.assertEqual(len(detections2), len(detections))
+            for d1, d2 in zip(detections, detections2):
+                self.assertEqual(d1['time'], d2['time'])
+                self.assertEqual(d1['template_id'], d2['template_id'])
+                self.assertAlmostEqual(d1['similarity'], d2['similarity'])
+            for sim1, sim2 in zip(sims, sims2):
+                np.testing.assert_allclose(sim1.data, sim2.data, atol=1e-8)
+
+    def test_iter_correlation_detections(self):
+        """
+        Detections in chunked data are the same as for the whole data,
+        independent of chunk lengths and overlaps.
+        """
+        stream = read().filter('highpass', freq=5)
+        np.random.seed(42)
+        for tr in stream:
+            tr.data = np.concatenate(
+                [tr.data + np.random.normal(0, 30, len(tr))
+                 for _ in range(4)])
+        t0 = stream[0].stats.starttime
+        templates = [stream.slice(t0 + 4.5, t0 + 10),
+                     stream.slice(t0 + 36, t0 + 42)]
+        kwargs = dict(template_times=[None, t0 + 35])
+        expected, _ = correlation_detector(stream, templates, 0.12, 1,
+                                           **kwargs)
+        self.assertGreater(len(expected), 10)
+        chunkings = [
+            stream.slide(20, 15),
+            stream.slide(13, 7),
+            [stream.slice(t0 + i * 7, t0 + (i + 1) * 7 - 0.01)
+             for i in range(18)]]
+        for chunks in chunkings:
+            detections = list(iter_correlation_detections(
+                chunks, templates, 0.12, 1, **kwargs))
+            self.assertEqual(len(detections), len(expected))
+            for d1, d2 in zip(detections, expected):
+                self.assertEqual(d1['time'], d2['time'])
+                self.assertEqual(d1['template_id'], d2['template_id'])
+                self.assertAlmostEqual(d1['similarity'], d2['similarity'])
+        # detection restarts after a gap between chunks
+        chunks = [stream.slice(t0, t0 + 30), stream.slice(t0 + 31, t0 + 70)]
+        detections = list(iter_correlation_detections(
+            chunks, templates[0], 0.5, 1))
+        expected = [d for chunk in chunks
+                    for d in correlation_detector(chunk, templates[0],
+                                                  0.5, 1)[0]]
+        self.assertEqual([d['time'] for d in detections],
+                         [d['time'] for d in expected])
+
+    def test_correlate_pairs(self):
+        """
+        Batch correlation of window pairs gives the same maxima as
+        correlating each pair separately.
+        """
+        np.random.seed(42)
+        windows = np.random.normal(size=(20, 200))
+        windows[5] = 0
+        shift = 20
+        for abs_max in (False, True):
+            result = correlate_pairs(windows, shift, neighborhood=3,
+                                     abs_max=abs_max)
+            self.assertEqual(len(result), 19 + 18 + 17)
+            self.assertTrue(np.all(result['index1'] < result['index2']))
+            self.assertTrue(np.all(result['index2'] - result['index1'] <= 3))
+            for res in result:
+                cc = correlate(windows[res['index1']],
+                               windows[res['index2']], shift)
+                lag, value = xcorr_max(cc, abs_max=abs_max)
+                self.assertLessEqual(abs(res['lag'] - lag), 0.5)
+                self.assertGreaterEqual(abs(res['coefficient']),
+                                        abs(value) - 1e-10)
+                self.assertLess(abs(res['coefficient'] - value), 0.1)
+                self.assertGreaterEqual(res['quality'], 0)
+            result2 = correlate_pairs(windows, shift, neighborhood=3,
+                                      abs_max=abs_max, processes=2,
+                                      chunksize=7)
+            np.testing.assert_array_equal(result, result2)
+        # shifted copies of a signal
+        data = read()[0].data
+        windows = [data[450 + i:550 + i] for i in (0, 2, -3)]
+        result = correlate_pairs(windows, 10, pairs=[(0, 1), (2, 1)])
+        np.testing.assert_allclose(result['lag'], [2, 5], atol=0.05)
+        np.testing.assert_allclose(result['coefficient'], 1, atol=0.01)
+        self.assertTrue(np.all(result['quality'] > 0.5))
+        # maximum at maximal shift
+        result = correlate_pairs(windows, 4, pairs=[(2, 1)])
+        self.assertEqual(result['lag'][0], 4)
+        self.assertEqual(result['quality'][0], 0)
+        with self.assertRaises(ValueError):
+            correlate_pairs([data[:10], data[:11]], 2)
+
 
 def suite():
     return unittest.makeSuite(CrossCorrelationTestCase, 'test')
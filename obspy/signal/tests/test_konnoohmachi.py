@@ -8,10 +8,10 @@ import warnings
 
 import numpy as np
 
-from obspy.signal.konnoohmachismoothing import (calculate_smoothing_matrix,
-                                                apply_smoothing_matrix,
-                                                konno_ohmachi_smoothing_window,
-                                                konno_ohmachi_smoothing)
+from obspy.signal.konnoohmachismoothing import (
+    calculate_smoothing_matrix, calculate_sparse_smoothing_matrix,
+    apply_smoothing_matrix, konno_ohmachi_smoothing_window,
+    konno_ohmachi_smoothing)
 
 
 class KonnoOhmachiTestCase(unittest.TestCase):
@@ -145,6 +145,48 @@ class KonnoOhmachiTestCase(unittest.TestCase):
         # Input dtype should be output dtype.
         self.assertEqual(smoothed_4.dtype, np.float64)
 
+    def test_sparse_smoothing_matrix(self):
+        """
+        Tests the truncated sparse smoothing matrix and its application.
+        """
+        np.random.seed(1111)
+        frequencies = np.fft.rfftfreq(2000, 0.01)
+        spectra = np.random.ranf((5, len(frequencies))) * 50
+        # Without truncation it is the same as the dense matrix.
+        matrix = calculate_sparse_smoothing_matrix(frequencies, 20.0,
+                                                   threshold=None)
+        np.testing.assert_allclose(
+            matrix.toarray(), calculate_smoothing_matrix(frequencies, 20.0))
+        # The truncated matrix is much sparser but yields nearly the same
+        # result, also when applied chunk-wise.
+        matrix = calculate_sparse_smoothing_matrix(frequencies)
+        self.assertLess(matrix.nnz, 0.5 * len(frequencies) ** 2)
+        self.assertEqual(matrix.dtype, np.float64)
+        smoothed_1 = konno_ohmachi_smoothing(spectra, frequencies)
+        smoothed_2 = apply_smoothing_matrix(spectra, matrix, chunk_size=2)
+        np.testing.assert_allclose(smoothed_1, smoothed_2,
+                                   atol=1e-4 * smoothed_1.max())
+        smoothed_3 = konno_ohmachi_smoothing(spectra, frequencies,
+                                             threshold=1e-4, count=2)
+        np.testing.assert_allclose(
+            apply_smoothing_matrix(smoothed_1, matrix), smoothed_3,
+            atol=1e-4 * smoothed_3.max())
+        # Only evaluate at some center frequencies.
+        center_frequencies = np.logspace(-1.0, 1.5, 20)
+        smoothed_4 = konno_ohmachi_smoothing(
+            spectra[0], frequencies, normalize=True,
+            center_frequencies=center_frequencies)
+        expected = [(konno_ohmachi_smoothing_window(
+            frequencies, freq, normalize=True) * spectra[0]).sum()
+            for freq in center_frequencies]
+        np.testing.assert_allclose(smoothed_4, expected)
+        self.assertRaises(ValueError, konno_ohmachi_smoothing, spectra,
+                          frequencies, count=2,
+                          center_frequencies=center_frequencies)
+        # Unsorted frequencies can not be truncated.
+        self.assertRaises(ValueError, calculate_sparse_smoothing_matrix,
+                          frequencies[::-1])
+
 
 def suite():
     return unittest.makeSuite(KonnoOhmachiTestCase, 'test')
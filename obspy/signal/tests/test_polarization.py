@@ -189,15 +189,67 @@ class PolarizationTestCase(unittest.TestCase):
         self.assertAlmostEqual(out["incidence"][0], 65.905157447889309)
         self.assertAlmostEqual(out["rectilinearity"][0], 1.000000)
         self.assertAlmostEqual(out["planarity"][0], 1.000000)
-        self.assertAlmostEqual(out["ellipticity"][0], 3.8195545129768958e-06)
-        for key in ["azimuth", "incidence", "rectilinearity", "planarity",
-                    "ellipticity"]:
+        # linear particle motion
+        self.assertAlmostEqual(out["ellipticity"][0], 0.0)
+        for key in ["azimuth", "incidence", "rectilinearity", "planarity"]:
             got = out[key]
             self.assertTrue(np.allclose(got / got[0], np.ones_like(got),
                                         rtol=1e-4))
+        self.assertTrue(np.allclose(out["ellipticity"], 0.0, atol=1e-6))
         self.assertTrue(np.allclose(out["timestamp"] - out["timestamp"][0],
                                     np.arange(0, 97.85, 0.05), rtol=1e-5))
 
+    def test_polarization_vidale_windows(self):
+        """
+        The polarization of each window only depends on the data in the
+        window: a linearly polarized signal followed by an elliptically
+        polarized signal in the horizontal plane.
+        """
+        st = _create_test_data()
+        npts = st[0].stats.npts
+        x = np.arange(npts) / st[0].stats.sampling_rate * 2. * np.pi
+        second = np.arange(npts) >= npts // 2
+        st.select(component="Z")[0].data[second] = 0.
+        st.select(component="N")[0].data[second] = np.cos(x[second])
+        st.select(component="E")[0].data[second] = 0.5 * np.sin(x[second])
+        t = st[0].stats.starttime
+        e = st[0].stats.endtime
+
+        out = polarization.polarization_analysis(
+            st, win_len=10.0, win_frac=0.1, frqlow=1.0, frqhigh=5.0,
+            verbose=False, stime=t, etime=e, method="vidale", var_noise=0.0)
+
+        first = out["timestamp"] < (t + 40).timestamp
+        second = ((out["timestamp"] > (t + 60).timestamp) &
+                  (out["timestamp"] < (e - 20).timestamp))
+        np.testing.assert_allclose(out["azimuth"][first], 26.565, atol=0.01)
+        np.testing.assert_allclose(out["incidence"][first], 65.905,
+                                   atol=0.01)
+        np.testing.assert_allclose(out["ellipticity"][first], 0.0,
+                                   atol=1e-3)
+        # major axis north, horizontal, minor axis half as long
+        azimuth = out["azimuth"][second]
+        np.testing.assert_allclose(np.minimum(azimuth, 180.0 - azimuth), 0.0,
+                                   atol=0.5)
+        np.testing.assert_allclose(out["incidence"][second], 90.0, atol=0.5)
+        np.testing.assert_allclose(out["ellipticity"][second], 0.5,
+                                   rtol=1e-2)
+
+    def test_polarization_pm_processes(self):
+        st = _create_test_data()
+        st.select(component="E")[0].data += np.random.RandomState(0).randn(
+            st[0].stats.npts)
+        t = st[0].stats.starttime
+        e = st[0].stats.endtime
+        kwargs = dict(win_len=10.0, win_frac=0.1, frqlow=1.0, frqhigh=5.0,
+                      stime=t, etime=e, method="pm", var_noise=0.0)
+        out_1 = polarization.polarization_analysis(st, **kwargs)
+        out_2 = polarization.polarization_analysis(st, processes=2,
+                                                   **kwargs)
+        self.assertEqual(sorted(out_1), sorted(out_2))
+        for key in out_1:
+            np.testing.assert_array_equal(out_1[key], out_2[key])
+
 
 def suite():
     return unittest.makeSuite(PolarizationTestCase, 'test')
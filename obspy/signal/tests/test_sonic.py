@@ -18,7 +18,7 @@ class SonicTestCase(unittest.TestCase):
     Test fk analysis, main function is sonic() in array_analysis.py
     """
 
-    def array_processing(self, prewhiten, method):
+    def array_processing(self, prewhiten, method, **kwargs):
         np.random.seed(2348)
 
         geometry = np.array([[0.0, 0.0, 0.0],
@@ -84,8 +84,8 @@ class SonicTestCase(unittest.TestCase):
 
         args = (st, win_len, step_frac, sll_x, slm_x, sll_y, slm_y, sl_s,
                 semb_thres, vel_thres, frqlow, frqhigh, stime, etime)
-        kwargs = dict(prewhiten=prewhiten, coordsys='xy', verbose=False,
-                      method=method)
+        kwargs.update(dict(prewhiten=prewhiten, coordsys='xy', verbose=False,
+                           method=method))
         out = array_processing(*args, **kwargs)
         if False:  # 1 for debugging
             print('\n', out[:, 1:])
@@ -145,6 +145,31 @@ class SonicTestCase(unittest.TestCase):
         # XXX relative tolerance should be lower!
         self.assertTrue(np.allclose(ref, out[:, 1:], rtol=4e-5))
 
+    def test_array_processing_store(self):
+        """
+        Power maps passed to store function are consistent with the output.
+        """
+        for method in (0, 1):
+            for prewhiten in (0, 1):
+                maps = []
+
+                def store(relpow_map, abspow_map, offset):
+                    maps.append((relpow_map.copy(), abspow_map.copy(),
+                                 offset))
+
+                out = self.array_processing(prewhiten=prewhiten,
+                                            method=method, store=store)
+                self.assertEqual(len(maps), len(out))
+                self.assertEqual([m[2] for m in maps],
+                                 [0, 40, 80, 120, 160, 200])
+                for (relpow_map, abspow_map, _), row in zip(maps, out):
+                    self.assertEqual(relpow_map.shape, (61, 61))
+                    self.assertEqual(relpow_map.max(), row[1])
+                    ix, iy = np.unravel_index(relpow_map.argmax(),
+                                              relpow_map.shape)
+                    self.assertEqual(abspow_map[ix, iy], row[2])
+                    self.assertTrue(np.all(abspow_map > 0))
+
     def test_get_spoint(self):
         stime = UTCDateTime(1970, 1, 1, 0, 0)
         etime = UTCDateTime(1970, 1, 1, 0, 0) + 10
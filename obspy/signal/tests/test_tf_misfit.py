@@ -5,14 +5,16 @@ The tf_misfit test suite.
 """
 import os
 import unittest
+from unittest import mock
 
 import numpy as np
 from scipy.signal import hilbert
 import matplotlib.pyplot as plt
 
 from obspy.core.util.testing import ImageComparison
-from obspy.signal.tf_misfit import (eg, em, feg, fem, fpg, fpm, pg, pm, teg,
-                                    tem, tfeg, tfem, tfpg, tfpm, tpg, tpm)
+from obspy.signal.tf_misfit import (all_misfits, cwt, eg, em, feg, fem, fpg,
+                                    fpm, pg, pm, teg, tem, tfeg, tfem, tfpg,
+                                    tfpm, tpg, tpm)
 from obspy.signal.tf_misfit import plot_tfr, plot_tf_misfits, plot_tf_gofs
 
 
@@ -235,6 +237,57 @@ class TfTestCase(unittest.TestCase):
         self.assertTrue(np.allclose(_eg, 10., rtol=tol))
         self.assertTrue(np.allclose(_pg, 10., rtol=tol))
 
+    def test_all_misfits(self):
+        """
+        Tests that all misfits from shared transforms match the individual
+        misfit functions, also for multicomponent data.
+        """
+        t = self.t
+        st1 = np.array([self.s1p, self.s1a(t), self.s1(t)])
+        st2 = np.array([self.s1(t)] * 3)
+        kwargs = dict(dt=self.dt, fmin=self.fmin, fmax=self.fmax, nf=self.nf)
+        funcs = dict(tfem=tfem, tfpm=tfpm, tem=tem, tpm=tpm, fem=fem,
+                     fpm=fpm, em=em, pm=pm, tfeg=tfeg, tfpg=tfpg, teg=teg,
+                     tpg=tpg, feg=feg, fpg=fpg, eg=eg, pg=pg)
+        for norm in ('global', 'local'):
+            for st2_isref in (True, False):
+                for s1, s2 in ((st1, st2), (st1[0], st2[0])):
+                    misfits = all_misfits(s1, s2, norm=norm,
+                                          st2_isref=st2_isref, **kwargs)
+                    self.assertEqual(sorted(misfits), sorted(funcs))
+                    for name, func in funcs.items():
+                        expected = func(s1, s2, norm=norm,
+                                        st2_isref=st2_isref, **kwargs)
+                        self.assertEqual(np.shape(misfits[name]),
+                                         np.shape(expected))
+                        np.testing.assert_allclose(misfits[name], expected)
+        self.assertRaises(ValueError, all_misfits, st1, st2, norm='other')
+        # batched transform is the same as transforming each component
+        w = cwt(st1, self.dt, self.w0, self.fmin, self.fmax, self.nf)
+        self.assertEqual(w.shape, (3, self.nf, self.npts))
+        for w_i, st in zip(w, st1):
+            np.testing.assert_allclose(
+                w_i, cwt(st, self.dt, self.w0, self.fmin, self.fmax,
+                         self.nf))
+
+    def test_cwt_blocks(self):
+        """
+        Large wavelet banks are not cached and applied in blocks of
+        frequencies with the same result.
+        """
+        st = np.array([self.s1p, self.s1(self.t)])
+        args = (self.dt, self.w0, self.fmin, self.fmax, self.nf)
+        expected = cwt(st, *args)
+        block_size = 16 * 1024 * 3
+        with mock.patch("obspy.signal.tf_misfit.MAX_CACHED_BANK_SIZE", 0), \
+                mock.patch("obspy.signal.tf_misfit.MAX_BLOCK_SIZE",
+                           block_size), \
+                mock.patch("obspy.signal.tf_misfit._cached_wavelet_bank") \
+                as cached_bank:
+            np.testing.assert_allclose(cwt(st, *args), expected)
+            np.testing.assert_allclose(cwt(st[1], *args), expected[1])
+        self.assertEqual(cached_bank.call_count, 0)
+
 
 class TfPlotTestCase(unittest.TestCase):
     """
@@ -541,6 +541,34 @@ class TriggerTestCase(unittest.TestCase):
         ref = np.array([0.38012302, 0.37704431, 0.47674533, 0.67992292])
         self.assertTrue(np.allclose(ref, c2[99:103]))
 
+    def test_coincidence_trigger_threads(self):
+        """
+        Coincidence trigger gives the same results with threads and does not
+        modify the input stream.
+        """
+        st = Stream()
+        files = ["BW.UH1._.SHZ.D.2010.147.cut.slist.gz",
+                 "BW.UH2._.SHZ.D.2010.147.cut.slist.gz",
+                 "BW.UH3._.SHZ.D.2010.147.cut.slist.gz",
+                 "BW.UH4._.EHZ.D.2010.147.cut.slist.gz"]
+        for filename in files:
+            filename = os.path.join(self.path, filename)
+            st += read(filename)
+        st.filter('bandpass', freqmin=10, freqmax=20)
+        st_orig = st.copy()
+        kwargs = dict(sta=0.5, lta=10, details=True)
+        res = coincidence_trigger("recstalta", 3.5, 1, st, 3, **kwargs)
+        self.assertEqual(st, st_orig)
+        self.assertEqual(len(res), 3)
+        res2 = coincidence_trigger("recstalta", 3.5, 1, st, 3, threads=3,
+                                   **kwargs)
+        self.assertEqual(res, res2)
+        # precomputed characteristic functions
+        for tr in st:
+            tr.trigger("recstalta", sta=0.5, lta=10)
+        res3 = coincidence_trigger(None, 3.5, 1, st, 3, details=True)
+        self.assertEqual(res, res3)
+
 
 def suite():
     return unittest.makeSuite(TriggerTestCase, 'test')
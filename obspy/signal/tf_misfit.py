@@ -18,19 +18,83 @@ Various Time Frequency Misfit Functions based on [Kristekova2006]_ and
     GNU Lesser General Public License, Version 3
     (https://www.gnu.org/copyleft/lesser.html)
 """
+from functools import lru_cache
+
 import numpy as np
 
 from obspy.imaging.cm import obspy_sequential, obspy_divergent
 from obspy.signal import util
 
 
+# Wavelet banks of all frequencies up to this size in bytes are cached.
+MAX_CACHED_BANK_SIZE = 32 * 1024 ** 2
+
+# Maximum size in bytes of the wavelet spectra applied to a signal at once.
+MAX_BLOCK_SIZE = 16 * 1024 ** 2
+
+
+def _wavelet_bank(npts, dt, w0, fmin, fmax, nf, wl, start=0, stop=None):
+    """
+    Frequency domain wavelets used by :func:`cwt`.
+
+    :return: tuple of FFT length, index of the first sample of the transform
+        in the inverse FFT and array of shape (stop - start, nfft) with the
+        wavelet spectra of the frequencies ``start`` to ``stop`` scaled by
+        the time step.
+    """
+    npts = npts * 2
+    tmax = (npts - 1) * dt
+    t = np.linspace(0., tmax, npts)
+    f = np.logspace(np.log10(fmin), np.log10(fmax), nf)[start:stop]
+
+    if wl == 'morlet':
+
+        def psi(t):
+            return np.pi ** (-.25) * np.exp(1j * w0 * t) * \
+                np.exp(-t ** 2 / 2.)
+
+        def scale(f):
+            return w0 / (2 * np.pi * f)
+    else:
+        raise ValueError('wavelet type "' + wl + '" not defined!')
+
+    nfft = util.next_pow_2(npts) * 2
+    a = scale(f)[:, np.newaxis]
+
+    # Ignore underflows.
+    with np.errstate(under="ignore"):
+        # time shift necessary, because wavelet is defined around t = 0
+        psih = psi(-1 * (t - t[-1] / 2.) / a).conjugate() / np.abs(a) ** .5
+        bank = np.fft.fft(psih, n=nfft, axis=-1) * (t[1] - t[0])
+    tminin = int(t[-1] / 2. / (t[1] - t[0]))
+    return nfft, tminin, bank
+
+
+@lru_cache(maxsize=8)
+def _cached_wavelet_bank(npts, dt, w0, fmin, fmax, nf, wl):
+    """
+    Cached wavelet bank of all frequencies, see :func:`_wavelet_bank`.
+
+    Only used for banks up to ``MAX_CACHED_BANK_SIZE``, so that repeated
+    transformations of short signals with the same length (e.g. all misfit
+    functions in this module) only need one FFT of the signal and one
+    inverse FFT per frequency.
+    """
+    nfft, tminin, bank = _wavelet_bank(npts, dt, w0, fmin, fmax, nf, wl)
+    bank.flags.writeable = False
+    return nfft, tminin, bank
+
+
 def cwt(st, dt, w0, fmin, fmax, nf=100, wl='morlet'):
     """
     Continuous Wavelet Transformation in the Frequency Domain.
 
     .. seealso:: [Kristekova2006]_, eq. (4)
 
-    :param st: time dependent signal.
+    :param st: time dependent signal. Several signals of the same length
+        (e.g. multiple components or stations) can be transformed at once by
+        passing an array of shape (number of signals, number of time
+        samples).
     :param dt: time step between two samples in st (in seconds)
     :param w0: parameter for the wavelet, tradeoff between time and frequency
         resolution
@@ -41,41 +105,199 @@ def cwt(st, dt, w0, fmin, fmax, nf=100, wl='morlet'):
     :param wl: wavelet to use, for now only 'morlet' is implemented
 
     :return: time frequency representation of st, type numpy.ndarray of complex
-        values, shape = (nf, len(st)).
+        values, shape = (nf, len(st)) or (number of signals, nf, number of
+        time samples) for multiple signals.
     """
-    npts = len(st) * 2
-    tmax = (npts - 1) * dt
-    t = np.linspace(0., tmax, npts)
-    f = np.logspace(np.log10(fmin), np.log10(fmax), nf)
+    st = np.asarray(st)
+    npts = st.shape[-1]
+    args = (npts, float(dt), float(w0), float(fmin), float(fmax), int(nf),
+            wl)
+    nfft = util.next_pow_2(2 * npts) * 2
+    bank = None
+    if nf * nfft * 16 <= MAX_CACHED_BANK_SIZE:
+        nfft, tminin, bank = _cached_wavelet_bank(*args)
+    sf = np.fft.fft(st, n=nfft, axis=-1)
+
+    cwt = np.empty(st.shape[:-1] + (nf, npts), dtype=np.complex128)
+    # Apply the wavelets in blocks of frequencies and signal by signal to
+    # limit the size of the temporary arrays.
+    block = max(1, MAX_BLOCK_SIZE // (nfft * 16))
+    for start in range(0, nf, block):
+        stop = min(start + block, nf)
+        if bank is not None:
+            bank_block = bank[start:stop]
+        else:
+            nfft, tminin, bank_block = _wavelet_bank(*args, start=start,
+                                                     stop=stop)
+        for idx in np.ndindex(*st.shape[:-1]):
+            cwt[idx + (slice(start, stop),)] = np.fft.ifft(
+                bank_block * sf[idx], axis=-1)[:, tminin:tminin + npts]
+    return cwt
 
-    cwt = np.zeros((npts // 2, nf), dtype=np.complex)
 
-    if wl == 'morlet':
+def _cwt_pair(st1, st2, dt, w0, fmin, fmax, nf):
+    """
+    Transform two signals for the misfit functions.
 
-        def psi(t):
-            return np.pi ** (-.25) * np.exp(1j * w0 * t) * \
-                np.exp(-t ** 2 / 2.)
+    :return: the transforms of st1 and st2, each with shape (number of
+        components, nf, number of time samples).
+    """
+    st1 = np.asarray(st1)
+    st2 = np.asarray(st2)
+    w = cwt(np.array([np.atleast_2d(st1), np.atleast_2d(st2)]), dt, w0,
+            fmin, fmax, nf)
+    return w[0], w[1]
 
-        def scale(f):
-            return w0 / (2 * np.pi * f)
+
+def _reference_amplitude(w_1, w_2, st2_isref):
+    if st2_isref:
+        return np.abs(w_2)
+    if np.abs(w_1).max() > np.abs(w_2).max():
+        return np.abs(w_1)
+    return np.abs(w_2)
+
+
+def _check_norm(norm):
+    if norm not in ('global', 'local'):
+        raise ValueError('norm "' + norm + '" not defined!')
+
+
+def _tfem(w_1, w_2, norm, st2_isref):
+    ar = _reference_amplitude(w_1, w_2, st2_isref)
+    _tfem = (np.abs(w_1) - np.abs(w_2))
+    if norm == 'global':
+        return _tfem / np.max(ar)
+    return _tfem / ar
+
+
+def _tfpm(w_1, w_2, norm, st2_isref):
+    _ar = _reference_amplitude(w_1, w_2, st2_isref)
+    _tfpm = np.angle(w_1 / w_2) / np.pi
+    if norm == 'global':
+        return _ar * _tfpm / np.max(_ar)
+    return _tfpm
+
+
+def _tem(w_1, w_2, norm, st2_isref):
+    _ar = _reference_amplitude(w_1, w_2, st2_isref)
+    _tem = np.sum((np.abs(w_1) - np.abs(w_2)), axis=1)
+    if norm == 'global':
+        return _tem / np.max(np.sum(_ar, axis=1))
+    return _tem / np.sum(_ar, axis=1)
+
+
+def _tpm(w_1, w_2, norm, st2_isref):
+    if st2_isref:
+        _ar = np.abs(w_2)
     else:
-        raise ValueError('wavelet type "' + wl + '" not defined!')
+        if np.abs(w_1).max() > np.abs(w_2).max():
+            _ar = np.abs(w_2)
+        else:
+            _ar = np.abs(w_1)
+    _tpm = np.angle(w_1 / w_2) / np.pi
+    _tpm = np.sum(_ar * _tpm, axis=1)
+    if norm == 'global':
+        return _tpm / np.max(np.sum(_ar, axis=1))
+    return _tpm / np.sum(_ar, axis=1)
 
-    nfft = util.next_pow_2(npts) * 2
-    sf = np.fft.fft(st, n=nfft)
 
-    # Ignore underflows.
-    with np.errstate(under="ignore"):
-        for n, _f in enumerate(f):
-            a = scale(_f)
-            # time shift necessary, because wavelet is defined around t = 0
-            psih = psi(-1 * (t - t[-1] / 2.) / a).conjugate() / np.abs(a) ** .5
-            psihf = np.fft.fft(psih, n=nfft)
-            tminin = int(t[-1] / 2. / (t[1] - t[0]))
-            cwt[:, n] = np.fft.ifft(psihf * sf)[tminin:tminin + npts // 2] * \
-                (t[1] - t[0])
+def _fem(w_1, w_2, norm, st2_isref):
+    _ar = _reference_amplitude(w_1, w_2, st2_isref)
+    _tem = np.abs(w_1) - np.abs(w_2)
+    _tem = np.sum(_tem, axis=2)
+    if norm == 'global':
+        return _tem / np.max(np.sum(_ar, axis=2))
+    return _tem / np.sum(_ar, axis=2)
+
+
+def _fpm(w_1, w_2, norm, st2_isref):
+    _ar = _reference_amplitude(w_1, w_2, st2_isref)
+    _tpm = np.angle(w_1 / w_2) / np.pi
+    _tpm = np.sum(_ar * _tpm, axis=2)
+    if norm == 'global':
+        return _tpm / np.max(np.sum(_ar, axis=2))
+    return _tpm / np.sum(_ar, axis=2)
+
+
+def _em(w_1, w_2, norm, st2_isref):
+    _ar = _reference_amplitude(w_1, w_2, st2_isref)
+    _em = (np.sum(np.sum((np.abs(w_1) - np.abs(w_2)) ** 2, axis=2),
+                  axis=1)) ** .5
+    if norm == 'global':
+        return _em / ((np.sum(np.sum(_ar ** 2, axis=2), axis=1)) ** .5).max()
+    return _em / (np.sum(np.sum(_ar ** 2, axis=2), axis=1)) ** .5
+
+
+def _pm(w_1, w_2, norm, st2_isref):
+    _ar = _reference_amplitude(w_1, w_2, st2_isref)
+    _pm = np.angle(w_1 / w_2) / np.pi
+    _pm = (np.sum(np.sum((_ar * _pm) ** 2, axis=2), axis=1)) ** .5
+    if norm == 'global':
+        return _pm / ((np.sum(np.sum(_ar ** 2, axis=2), axis=1)) ** .5).max()
+    return _pm / (np.sum(np.sum(_ar ** 2, axis=2), axis=1)) ** .5
 
-    return cwt.T
+
+_MISFITS = {'tfem': _tfem, 'tfpm': _tfpm, 'tem': _tem, 'tpm': _tpm,
+            'fem': _fem, 'fpm': _fpm, 'em': _em, 'pm': _pm}
+
+
+def _misfit(name, st1, st2, dt, fmin, fmax, nf, w0, norm, st2_isref):
+    _check_norm(norm)
+    w_1, w_2 = _cwt_pair(st1, st2, dt, w0, fmin, fmax, nf)
+    misfit = _MISFITS[name](w_1, w_2, norm, st2_isref)
+    if len(np.shape(st1)) == 1:
+        return misfit[0]
+    return misfit
+
+
+def all_misfits(st1, st2, dt=0.01, fmin=1., fmax=10., nf=100, w0=6,
+                norm='global', st2_isref=True, a=10., k=1.):
+    """
+    All time frequency misfits and goodness-of-fit criteria at once.
+
+    Both signals are transformed only once and the wavelet transforms are
+    shared by all misfit and goodness-of-fit criteria, which is considerably
+    faster than calling the individual functions (e.g. :func:`tfem`,
+    :func:`pm` or :func:`eg`) one after the other.
+
+    :param st1: signal 1 of two signals to compare, type numpy.ndarray with
+        shape (number of components, number of time samples) or (number of
+        timesamples, ) for single component data
+    :param st2: signal 2 of two signals to compare, type and shape as st1
+    :param dt: time step between two samples in st1 and st2
+    :param fmin: minimal frequency to be analyzed
+    :param fmax: maximal frequency to be analyzed
+    :param nf: number of frequencies (will be chosen with logarithmic spacing)
+    :param w0: parameter for the wavelet, tradeoff between time and frequency
+        resolution
+    :param norm: 'global' or 'local' normalization of the misfit
+    :type st2_isref: bool
+    :param st2_isref: True if st2 is a reference signal, False if none is a
+        reference
+    :param a: Maximum value of Goodness-of-Fit for perfect agreement
+    :param k: sensitivity of Goodness-of-Fit to the misfit
+
+    :return: dictionary with the results of all misfit functions (keys
+        ``'tfem'``, ``'tfpm'``, ``'tem'``, ``'tpm'``, ``'fem'``, ``'fpm'``,
+        ``'em'`` and ``'pm'``) and goodness-of-fit functions (keys
+        ``'tfeg'``, ``'tfpg'``, ``'teg'``, ``'tpg'``, ``'feg'``, ``'fpg'``,
+        ``'eg'`` and ``'pg'``) of this module, each with the same type and
+        shape as returned by the individual function.
+    """
+    _check_norm(norm)
+    w_1, w_2 = _cwt_pair(st1, st2, dt, w0, fmin, fmax, nf)
+    single = len(np.shape(st1)) == 1
+    result = {}
+    for name, func in _MISFITS.items():
+        misfit = func(w_1, w_2, norm, st2_isref)
+        if single:
+            misfit = misfit[0]
+        result[name] = misfit
+        if name[-2] == 'e':
+            result[name[:-1] + 'g'] = a * np.exp(-np.abs(misfit) ** k)
+        else:
+            result[name[:-1] + 'g'] = a * (1 - np.abs(misfit) ** k)
+    return result
 
 
 def tfem(st1, st2, dt=0.01, fmin=1., fmax=10., nf=100, w0=6, norm='global',
@@ -104,42 +326,8 @@ def tfem(st1, st2, dt=0.01, fmin=1., fmax=10., nf=100, w0=6, norm='global',
         type numpy.ndarray with shape (nf, len(st1)) for single component data
         and (number of components, nf, len(st1)) for multicomponent data
     """
-    if len(st1.shape) == 1:
-        w_1 = np.zeros((1, nf, st1.shape[0]), dtype=np.complex)
-        w_2 = np.zeros((1, nf, st1.shape[0]), dtype=np.complex)
-
-        w_1[0] = cwt(st1, dt, w0, fmin, fmax, nf)
-        w_2[0] = cwt(st2, dt, w0, fmin, fmax, nf)
-    else:
-        w_1 = np.zeros((st1.shape[0], nf, st1.shape[1]), dtype=np.complex)
-        w_2 = np.zeros((st2.shape[0], nf, st2.shape[1]), dtype=np.complex)
-
-        for i in np.arange(st1.shape[0]):
-            w_1[i] = cwt(st1[i], dt, w0, fmin, fmax, nf)
-            w_2[i] = cwt(st2[i], dt, w0, fmin, fmax, nf)
-
-    if st2_isref:
-        ar = np.abs(w_2)
-    else:
-        if np.abs(w_1).max() > np.abs(w_2).max():
-            ar = np.abs(w_1)
-        else:
-            ar = np.abs(w_2)
-
-    _tfem = (np.abs(w_1) - np.abs(w_2))
-
-    if norm == 'global':
-        if len(st1.shape) == 1:
-            return _tfem[0] / np.max(ar)
-        else:
-            return _tfem / np.max(ar)
-    elif norm == 'local':
-        if len(st1.shape) == 1:
-            return _tfem[0] / ar[0]
-        else:
-            return _tfem / ar
-    else:
-        raise ValueError('norm "' + norm + '" not defined!')
+    return _misfit('tfem', st1, st2, dt, fmin, fmax, nf, w0, norm,
+                   st2_isref)
 
 
 def tfpm(st1, st2, dt=0.01, fmin=1., fmax=10., nf=100, w0=6, norm='global',
@@ -168,42 +356,8 @@ def tfpm(st1, st2, dt=0.01, fmin=1., fmax=10., nf=100, w0=6, norm='global',
         type numpy.ndarray with shape (nf, len(st1)) for single component data
         and (number of components, nf, len(st1)) for multicomponent data
     """
-    if len(st1.shape) == 1:
-        w_1 = np.zeros((1, nf, st1.shape[0]), dtype=np.complex)
-        w_2 = np.zeros((1, nf, st1.shape[0]), dtype=np.complex)
-
-        w_1[0] = cwt(st1, dt, w0, fmin, fmax, nf)
-        w_2[0] = cwt(st2, dt, w0, fmin, fmax, nf)
-    else:
-        w_1 = np.zeros((st1.shape[0], nf, st1.shape[1]), dtype=np.complex)
-        w_2 = np.zeros((st2.shape[0], nf, st2.shape[1]), dtype=np.complex)
-
-        for i in np.arange(st1.shape[0]):
-            w_1[i] = cwt(st1[i], dt, w0, fmin, fmax, nf)
-            w_2[i] = cwt(st2[i], dt, w0, fmin, fmax, nf)
-
-    if st2_isref:
-        _ar = np.abs(w_2)
-    else:
-        if np.abs(w_1).max() > np.abs(w_2).max():
-            _ar = np.abs(w_1)
-        else:
-            _ar = np.abs(w_2)
-
-    _tfpm = np.angle(w_1 / w_2) / np.pi
-
-    if norm == 'global':
-        if len(st1.shape) == 1:
-            return _ar[0] * _tfpm[0] / np.max(_ar)
-        else:
-            return _ar * _tfpm / np.max(_ar)
-    elif norm == 'local':
-        if len(st1.shape) == 1:
-            return _tfpm[0]
-        else:
-            return _tfpm
-    else:
-        raise ValueError('norm "' + norm + '" not defined!')
+    return _misfit('tfpm', st1, st2, dt, fmin, fmax, nf, w0, norm,
+                   st2_isref)
 
 
 def tem(st1, st2, dt=0.01, fmin=1., fmax=10., nf=100, w0=6, norm='global',
@@ -232,42 +386,8 @@ def tem(st1, st2, dt=0.01, fmin=1., fmax=10., nf=100, w0=6, norm='global',
         (len(st1),) for single component data and (number of components,
         len(st1)) for multicomponent data
     """
-    if len(st1.shape) == 1:
-        w_1 = np.zeros((1, nf, st1.shape[0]), dtype=np.complex)
-        w_2 = np.zeros((1, nf, st1.shape[0]), dtype=np.complex)
-
-        w_1[0] = cwt(st1, dt, w0, fmin, fmax, nf)
-        w_2[0] = cwt(st2, dt, w0, fmin, fmax, nf)
-    else:
-        w_1 = np.zeros((st1.shape[0], nf, st1.shape[1]), dtype=np.complex)
-        w_2 = np.zeros((st2.shape[0], nf, st2.shape[1]), dtype=np.complex)
-
-        for i in np.arange(st1.shape[0]):
-            w_1[i] = cwt(st1[i], dt, w0, fmin, fmax, nf)
-            w_2[i] = cwt(st2[i], dt, w0, fmin, fmax, nf)
-
-    if st2_isref:
-        _ar = np.abs(w_2)
-    else:
-        if np.abs(w_1).max() > np.abs(w_2).max():
-            _ar = np.abs(w_1)
-        else:
-            _ar = np.abs(w_2)
-
-    _tem = np.sum((np.abs(w_1) - np.abs(w_2)), axis=1)
-
-    if norm == 'global':
-        if len(st1.shape) == 1:
-            return _tem[0] / np.max(np.sum(_ar, axis=1))
-        else:
-            return _tem / np.max(np.sum(_ar, axis=1))
-    elif norm == 'local':
-        if len(st1.shape) == 1:
-            return _tem[0] / np.sum(_ar, axis=1)[0]
-        else:
-            return _tem / np.sum(_ar, axis=1)
-    else:
-        raise ValueError('norm "' + norm + '" not defined!')
+    return _misfit('tem', st1, st2, dt, fmin, fmax, nf, w0, norm,
+                   st2_isref)
 
 
 def tpm(st1, st2, dt=0.01, fmin=1., fmax=10., nf=100, w0=6, norm='global',
@@ -296,43 +416,8 @@ def tpm(st1, st2, dt=0.01, fmin=1., fmax=10., nf=100, w0=6, norm='global',
         (len(st1),) for single component data and (number of components,
         len(st1)) for multicomponent data
     """
-    if len(st1.shape) == 1:
-        w_1 = np.zeros((1, nf, st1.shape[0]), dtype=np.complex)
-        w_2 = np.zeros((1, nf, st1.shape[0]), dtype=np.complex)
-
-        w_1[0] = cwt(st1, dt, w0, fmin, fmax, nf)
-        w_2[0] = cwt(st2, dt, w0, fmin, fmax, nf)
-    else:
-        w_1 = np.zeros((st1.shape[0], nf, st1.shape[1]), dtype=np.complex)
-        w_2 = np.zeros((st2.shape[0], nf, st2.shape[1]), dtype=np.complex)
-
-        for i in np.arange(st1.shape[0]):
-            w_1[i] = cwt(st1[i], dt, w0, fmin, fmax, nf)
-            w_2[i] = cwt(st2[i], dt, w0, fmin, fmax, nf)
-
-    if st2_isref:
-        _ar = np.abs(w_2)
-    else:
-        if np.abs(w_1).max() > np.abs(w_2).max():
-            _ar = np.abs(w_2)
-        else:
-            _ar = np.abs(w_1)
-
-    _tpm = np.angle(w_1 / w_2) / np.pi
-    _tpm = np.sum(_ar * _tpm, axis=1)
-
-    if norm == 'global':
-        if len(st1.shape) == 1:
-            return _tpm[0] / np.max(np.sum(_ar, axis=1))
-        else:
-            return _tpm / np.max(np.sum(_ar, axis=1))
-    elif norm == 'local':
-        if len(st1.shape) == 1:
-            return _tpm[0] / np.sum(_ar, axis=1)[0]
-        else:
-            return _tpm / np.sum(_ar, axis=1)
-    else:
-        raise ValueError('norm "' + norm + '" not defined!')
+    return _misfit('tpm', st1, st2, dt, fmin, fmax, nf, w0, norm,
+                   st2_isref)
 
 
 def fem(st1, st2, dt=0.01, fmin=1., fmax=10., nf=100, w0=6, norm='global',
@@ -361,43 +446,8 @@ def fem(st1, st2, dt=0.01, fmin=1., fmax=10., nf=100, w0=6, norm='global',
         (nf,) for single component data and (number of components, nf) for
         multicomponent data
     """
-    if len(st1.shape) == 1:
-        w_1 = np.zeros((1, nf, st1.shape[0]), dtype=np.complex)
-        w_2 = np.zeros((1, nf, st1.shape[0]), dtype=np.complex)
-
-        w_1[0] = cwt(st1, dt, w0, fmin, fmax, nf)
-        w_2[0] = cwt(st2, dt, w0, fmin, fmax, nf)
-    else:
-        w_1 = np.zeros((st1.shape[0], nf, st1.shape[1]), dtype=np.complex)
-        w_2 = np.zeros((st2.shape[0], nf, st2.shape[1]), dtype=np.complex)
-
-        for i in np.arange(st1.shape[0]):
-            w_1[i] = cwt(st1[i], dt, w0, fmin, fmax, nf)
-            w_2[i] = cwt(st2[i], dt, w0, fmin, fmax, nf)
-
-    if st2_isref:
-        _ar = np.abs(w_2)
-    else:
-        if np.abs(w_1).max() > np.abs(w_2).max():
-            _ar = np.abs(w_1)
-        else:
-            _ar = np.abs(w_2)
-
-    _tem = np.abs(w_1) - np.abs(w_2)
-    _tem = np.sum(_tem, axis=2)
-
-    if norm == 'global':
-        if len(st1.shape) == 1:
-            return _tem[0] / np.max(np.sum(_ar, axis=2))
-        else:
-            return _tem / np.max(np.sum(_ar, axis=2))
-    elif norm == 'local':
-        if len(st1.shape) == 1:
-            return _tem[0] / np.sum(_ar, axis=2)[0]
-        else:
-            return _tem / np.sum(_ar, axis=2)
-    else:
-        raise ValueError('norm "' + norm + '" not defined!')
+    return _misfit('fem', st1, st2, dt, fmin, fmax, nf, w0, norm,
+                   st2_isref)
 
 
 def fpm(st1, st2, dt=0.01, fmin=1., fmax=10., nf=100, w0=6, norm='global',
@@ -426,43 +476,8 @@ def fpm(st1, st2, dt=0.01, fmin=1., fmax=10., nf=100, w0=6, norm='global',
         (nf,) for single component data and (number of components, nf) for
         multicomponent data
     """
-    if len(st1.shape) == 1:
-        w_1 = np.zeros((1, nf, st1.shape[0]), dtype=np.complex)
-        w_2 = np.zeros((1, nf, st1.shape[0]), dtype=np.complex)
-
-        w_1[0] = cwt(st1, dt, w0, fmin, fmax, nf)
-        w_2[0] = cwt(st2, dt, w0, fmin, fmax, nf)
-    else:
-        w_1 = np.zeros((st1.shape[0], nf, st1.shape[1]), dtype=np.complex)
-        w_2 = np.zeros((st2.shape[0], nf, st2.shape[1]), dtype=np.complex)
-
-        for i in np.arange(st1.shape[0]):
-            w_1[i] = cwt(st1[i], dt, w0, fmin, fmax, nf)
-            w_2[i] = cwt(st2[i], dt, w0, fmin, fmax, nf)
-
-    if st2_isref:
-        _ar = np.abs(w_2)
-    else:
-        if np.abs(w_1).max() > np.abs(w_2).max():
-            _ar = np.abs(w_1)
-        else:
-            _ar = np.abs(w_2)
-
-    _tpm = np.angle(w_1 / w_2) / np.pi
-    _tpm = np.sum(_ar * _tpm, axis=2)
-
-    if norm == 'global':
-        if len(st1.shape) == 1:
-            return _tpm[0] / np.max(np.sum(_ar, axis=2))
-        else:
-            return _tpm / np.max(np.sum(_ar, axis=2))
-    elif norm == 'local':
-        if len(st1.shape) == 1:
-            return _tpm[0] / np.sum(_ar, axis=2)[0]
-        else:
-            return _tpm / np.sum(_ar, axis=2)
-    else:
-        raise ValueError('norm "' + norm + '" not defined!')
+    return _misfit('fpm', st1, st2, dt, fmin, fmax, nf, w0, norm,
+                   st2_isref)
 
 
 def em(st1, st2, dt=0.01, fmin=1., fmax=10., nf=100, w0=6, norm='global',
@@ -489,44 +504,8 @@ def em(st1, st2, dt=0.01, fmin=1., fmax=10., nf=100, w0=6, norm='global',
 
     :return: Single Valued Envelope Misfit
     """
-    if len(st1.shape) == 1:
-        w_1 = np.zeros((1, nf, st1.shape[0]), dtype=np.complex)
-        w_2 = np.zeros((1, nf, st1.shape[0]), dtype=np.complex)
-
-        w_1[0] = cwt(st1, dt, w0, fmin, fmax, nf)
-        w_2[0] = cwt(st2, dt, w0, fmin, fmax, nf)
-    else:
-        w_1 = np.zeros((st1.shape[0], nf, st1.shape[1]), dtype=np.complex)
-        w_2 = np.zeros((st2.shape[0], nf, st2.shape[1]), dtype=np.complex)
-
-        for i in np.arange(st1.shape[0]):
-            w_1[i] = cwt(st1[i], dt, w0, fmin, fmax, nf)
-            w_2[i] = cwt(st2[i], dt, w0, fmin, fmax, nf)
-
-    if st2_isref:
-        _ar = np.abs(w_2)
-    else:
-        if np.abs(w_1).max() > np.abs(w_2).max():
-            _ar = np.abs(w_1)
-        else:
-            _ar = np.abs(w_2)
-
-    _em = (np.sum(np.sum((np.abs(w_1) - np.abs(w_2)) ** 2, axis=2),
-                  axis=1)) ** .5
-
-    if norm == 'global':
-        if len(st1.shape) == 1:
-            return _em[0] / (np.sum(_ar ** 2)) ** .5
-        else:
-            return _em / ((np.sum(np.sum(_ar ** 2, axis=2),
-                                  axis=1)) ** .5).max()
-    elif norm == 'local':
-        if len(st1.shape) == 1:
-            return _em[0] / (np.sum(_ar ** 2)) ** .5
-        else:
-            return _em / (np.sum(np.sum(_ar ** 2, axis=2), axis=1)) ** .5
-    else:
-        raise ValueError('norm "' + norm + '" not defined!')
+    return _misfit('em', st1, st2, dt, fmin, fmax, nf, w0, norm,
+                   st2_isref)
 
 
 def pm(st1, st2, dt=0.01, fmin=1., fmax=10., nf=100, w0=6, norm='global',
@@ -553,45 +532,8 @@ def pm(st1, st2, dt=0.01, fmin=1., fmax=10., nf=100, w0=6, norm='global',
 
     :return: Single Valued Phase Misfit
     """
-    if len(st1.shape) == 1:
-        w_1 = np.zeros((1, nf, st1.shape[0]), dtype=np.complex)
-        w_2 = np.zeros((1, nf, st1.shape[0]), dtype=np.complex)
-
-        w_1[0] = cwt(st1, dt, w0, fmin, fmax, nf)
-        w_2[0] = cwt(st2, dt, w0, fmin, fmax, nf)
-    else:
-        w_1 = np.zeros((st1.shape[0], nf, st1.shape[1]), dtype=np.complex)
-        w_2 = np.zeros((st2.shape[0], nf, st2.shape[1]), dtype=np.complex)
-
-        for i in np.arange(st1.shape[0]):
-            w_1[i] = cwt(st1[i], dt, w0, fmin, fmax, nf)
-            w_2[i] = cwt(st2[i], dt, w0, fmin, fmax, nf)
-
-    if st2_isref:
-        _ar = np.abs(w_2)
-    else:
-        if np.abs(w_1).max() > np.abs(w_2).max():
-            _ar = np.abs(w_1)
-        else:
-            _ar = np.abs(w_2)
-
-    _pm = np.angle(w_1 / w_2) / np.pi
-
-    _pm = (np.sum(np.sum((_ar * _pm) ** 2, axis=2), axis=1)) ** .5
-
-    if norm == 'global':
-        if len(st1.shape) == 1:
-            return _pm[0] / (np.sum(_ar ** 2)) ** .5
-        else:
-            return _pm / ((np.sum(np.sum(_ar ** 2, axis=2),
-                                  axis=1)) ** .5).max()
-    elif norm == 'local':
-        if len(st1.shape) == 1:
-            return _pm[0] / (np.sum(_ar ** 2)) ** .5
-        else:
-            return _pm / (np.sum(np.sum(_ar ** 2, axis=2), axis=1)) ** .5
-    else:
-        raise ValueError('norm "' + norm + '" not defined!')
+    return _misfit('pm', st1, st2, dt, fmin, fmax, nf, w0, norm,
+                   st2_isref)
 
 
 def tfeg(st1, st2, dt=0.01, fmin=1., fmax=10., nf=100, w0=6, norm='global',
@@ -962,22 +904,16 @@ def plot_tf_misfits(st1, st2, dt=0.01, t0=0., fmin=1., fmax=10., nf=100, w0=6,
     f = np.logspace(np.log10(fmin), np.log10(fmax), nf)
 
     # compute time frequency misfits
-    _tfem = tfem(st1, st2, dt=dt, fmin=fmin, fmax=fmax, nf=nf, w0=w0,
-                 norm=norm, st2_isref=st2_isref)
-    _tem = tem(st1, st2, dt=dt, fmin=fmin, fmax=fmax, nf=nf, w0=w0, norm=norm,
-               st2_isref=st2_isref)
-    _fem = fem(st1, st2, dt=dt, fmin=fmin, fmax=fmax, nf=nf, w0=w0, norm=norm,
-               st2_isref=st2_isref)
-    _em = em(st1, st2, dt=dt, fmin=fmin, fmax=fmax, nf=nf, w0=w0, norm=norm,
-             st2_isref=st2_isref)
-    _tfpm = tfpm(st1, st2, dt=dt, fmin=fmin, fmax=fmax, nf=nf, w0=w0,
-                 norm=norm, st2_isref=st2_isref)
-    _tpm = tpm(st1, st2, dt=dt, fmin=fmin, fmax=fmax, nf=nf, w0=w0, norm=norm,
-               st2_isref=st2_isref)
-    _fpm = fpm(st1, st2, dt=dt, fmin=fmin, fmax=fmax, nf=nf, w0=w0, norm=norm,
-               st2_isref=st2_isref)
-    _pm = pm(st1, st2, dt=dt, fmin=fmin, fmax=fmax, nf=nf, w0=w0, norm=norm,
-             st2_isref=st2_isref)
+    misfits = all_misfits(st1, st2, dt=dt, fmin=fmin, fmax=fmax, nf=nf,
+                          w0=w0, norm=norm, st2_isref=st2_isref)
+    _tfem = misfits['tfem']
+    _tem = misfits['tem']
+    _fem = misfits['fem']
+    _em = misfits['em']
+    _tfpm = misfits['tfpm']
+    _tpm = misfits['tpm']
+    _fpm = misfits['fpm']
+    _pm = misfits['pm']
 
     if len(st1.shape) == 1:
         _tfem = _tfem.reshape((1, nf, npts))
@@ -1222,22 +1158,16 @@ def plot_tf_gofs(st1, st2, dt=0.01, t0=0., fmin=1., fmax=10., nf=100, w0=6,
     f = np.logspace(np.log10(fmin), np.log10(fmax), nf)
 
     # compute time frequency misfits
-    _tfeg = tfeg(st1, st2, dt=dt, fmin=fmin, fmax=fmax, nf=nf, w0=w0,
-                 norm=norm, st2_isref=st2_isref, a=a, k=k)
-    _teg = teg(st1, st2, dt=dt, fmin=fmin, fmax=fmax, nf=nf, w0=w0, norm=norm,
-               st2_isref=st2_isref, a=a, k=k)
-    _feg = feg(st1, st2, dt=dt, fmin=fmin, fmax=fmax, nf=nf, w0=w0, norm=norm,
-               st2_isref=st2_isref, a=a, k=k)
-    _eg = eg(st1, st2, dt=dt, fmin=fmin, fmax=fmax, nf=nf, w0=w0, norm=norm,
-             st2_isref=st2_isref, a=a, k=k)
-    _tfpg = tfpg(st1, st2, dt=dt, fmin=fmin, fmax=fmax, nf=nf, w0=w0,
-                 norm=norm, st2_isref=st2_isref, a=a, k=k)
-    _tpg = tpg(st1, st2, dt=dt, fmin=fmin, fmax=fmax, nf=nf, w0=w0, norm=norm,
-               st2_isref=st2_isref, a=a, k=k)
-    _fpg = fpg(st1, st2, dt=dt, fmin=fmin, fmax=fmax, nf=nf, w0=w0, norm=norm,
-               st2_isref=st2_isref, a=a, k=k)
-    _pg = pg(st1, st2, dt=dt, fmin=fmin, fmax=fmax, nf=nf, w0=w0, norm=norm,
-             st2_isref=st2_isref, a=a, k=k)
+    gofs = all_misfits(st1, st2, dt=dt, fmin=fmin, fmax=fmax, nf=nf, w0=w0,
+                       norm=norm, st2_isref=st2_isref, a=a, k=k)
+    _tfeg = gofs['tfeg']
+    _teg = gofs['teg']
+    _feg = gofs['feg']
+    _eg = gofs['eg']
+    _tfpg = gofs['tfpg']
+    _tpg = gofs['tpg']
+    _fpg = gofs['fpg']
+    _pg = gofs['pg']
 
     if len(st1.shape) == 1:
         _tfeg = _tfeg.reshape((1, nf, npts))
@@ -1452,8 +1382,7 @@ def plot_tfr(st, dt=0.01, t0=0., fmin=1., fmax=10., nf=100, w0=6, left=0.1,
     f_lin = np.linspace(0, 0.5 / dt, nfft // 2 + 1)
 
     if len(st.shape) == 1:
-        _w = np.zeros((1, nf, npts), dtype=np.complex)
-        _w[0] = cwt(st, dt, w0, fmin, fmax, nf)
+        _w = cwt(st.reshape((1, npts)), dt, w0, fmin, fmax, nf)
         ntr = 1
 
         spec = np.zeros((1, nfft // 2 + 1), dtype=np.complex)
@@ -1461,11 +1390,10 @@ def plot_tfr(st, dt=0.01, t0=0., fmin=1., fmax=10., nf=100, w0=6, left=0.1,
 
         st = st.reshape((1, npts))
     else:
-        _w = np.zeros((st.shape[0], nf, npts), dtype=np.complex)
+        _w = cwt(st, dt, w0, fmin, fmax, nf)
         spec = np.zeros((st.shape[0], nfft // 2 + 1), dtype=np.complex)
 
         for i in np.arange(st.shape[0]):
-            _w[i] = cwt(st[i], dt, w0, fmin, fmax, nf)
             spec[i] = np.fft.rfft(st[i], n=nfft) * dt
 
         ntr = st.shape[0]
@@ -27,12 +27,14 @@ characteristic functions and a coincidence triggering routine.
 """
 from collections import deque
 import ctypes as C  # NOQA
+from multiprocessing.pool import ThreadPool
 import warnings
 
 import numpy as np
 import scipy
 
 from obspy import UTCDateTime
+from obspy.core.util.base import _get_function_from_entry_point
 from obspy.signal.cross_correlation import templates_max_similarity
 from obspy.signal.headers import clibsignal, head_stalta_t
 
@@ -560,12 +562,29 @@ def plot_trigger(trace, cft, thr_on, thr_off, show=True):
         plt.show()
 
 
+def _characteristic_function(trace, trigger_type, options):
+    """
+    Return characteristic function of trace without modifying the trace.
+
+    See :meth:`obspy.core.trace.Trace.trigger`.
+    """
+    if trigger_type is None:
+        return trace.data
+    func = _get_function_from_entry_point('trigger', trigger_type.lower())
+    options = options.copy()
+    spr = trace.stats.sampling_rate
+    for key in ['sta', 'lta']:
+        if key in options:
+            options['n%s' % (key)] = int(options.pop(key) * spr)
+    return func(trace.data, **options)
+
+
 def coincidence_trigger(trigger_type, thr_on, thr_off, stream,
                         thr_coincidence_sum, trace_ids=None,
                         max_trigger_length=1e6, delete_long_trigger=False,
                         trigger_off_extension=0, details=False,
                         event_templates={}, similarity_threshold=0.7,
-                        **options):
+                        threads=1, **options):
     """
     Perform a network coincidence trigger.
 
@@ -606,8 +625,7 @@ def coincidence_trigger(trigger_type, thr_on, thr_off, stream,
     :type thr_off: float
     :param thr_off: threshold for switching single station trigger off
     :type stream: :class:`~obspy.core.stream.Stream`
-    :param stream: Stream containing waveform data for all stations. These
-        data are changed inplace, make a copy to keep the raw waveform data.
+    :param stream: Stream containing waveform data for all stations.
     :type thr_coincidence_sum: int or float
     :param thr_coincidence_sum: Threshold for coincidence sum. The network
         coincidence sum has to be at least equal to this value for a trigger to
@@ -661,10 +679,14 @@ def coincidence_trigger(trigger_type, thr_on, thr_off, stream,
         trigger list. A common threshold can be set for all stations (float) or
         a dictionary mapping station names to float values for each station.
     :type similarity_threshold: float or dict
+    :type threads: int
+    :param threads: Number of threads used to calculate the characteristic
+        functions and single station triggers of different traces in
+        parallel.
     :rtype: list
     :returns: List of event triggers sorted chronologically.
     """
-    st = stream.copy()
+    st = stream
     # if no trace ids are specified use all traces ids found in stream
     if trace_ids is None:
         trace_ids = [tr.id for tr in st]
@@ -677,81 +699,102 @@ def coincidence_trigger(trigger_type, thr_on, thr_off, stream,
                                              similarity_threshold)
 
     # the single station triggering
-    triggers = []
-    # prepare kwargs for trigger_onset
-    kwargs = {'max_len_delete': delete_long_trigger}
+    traces = []
     for tr in st:
         if tr.id not in trace_ids:
             msg = "At least one trace's ID was not found in the " + \
                   "trace ID list and was disregarded (%s)" % tr.id
             warnings.warn(msg, UserWarning)
             continue
-        if trigger_type is not None:
-            tr.trigger(trigger_type, **options)
-        kwargs['max_len'] = int(
-            max_trigger_length * tr.stats.sampling_rate + 0.5)
-        tmp_triggers = trigger_onset(tr.data, thr_on, thr_off, **kwargs)
+        traces.append(tr)
+
+    def _single_station_triggers(tr):
+        cft = _characteristic_function(tr, trigger_type, options)
+        max_len = int(max_trigger_length * tr.stats.sampling_rate + 0.5)
+        tmp_triggers = trigger_onset(cft, thr_on, thr_off, max_len=max_len,
+                                     max_len_delete=delete_long_trigger)
+        if len(tmp_triggers) == 0:
+            return []
+        tmp_triggers = np.asarray(tmp_triggers)
+        cft_peaks = []
+        cft_stds = []
         for on, off in tmp_triggers:
             try:
-                cft_peak = tr.data[on:off].max()
-                cft_std = tr.data[on:off].std()
+                cft_peaks.append(cft[on:off].max())
+                cft_stds.append(cft[on:off].std())
             except ValueError:
-                cft_peak = tr.data[on]
-                cft_std = 0
-            on = tr.stats.starttime + float(on) / tr.stats.sampling_rate
-            off = tr.stats.starttime + float(off) / tr.stats.sampling_rate
-            triggers.append((on.timestamp, off.timestamp, tr.id, cft_peak,
-                             cft_std))
+                cft_peaks.append(cft[on])
+                cft_stds.append(0)
+        # same as (tr.stats.starttime + on / sampling_rate).timestamp
+        ons, offs = [
+            (tr.stats.starttime._ns + np.round(
+                x.astype(np.float64) / tr.stats.sampling_rate * 1e9
+            ).astype(np.int64)) / 1e9
+            for x in tmp_triggers.T]
+        return list(zip(ons.tolist(), offs.tolist(), [tr.id] * len(ons),
+                        cft_peaks, cft_stds))
+
+    # characteristic functions calculated in C release the GIL
+    if threads > 1:
+        pool = ThreadPool(threads)
+        try:
+            results = pool.map(_single_station_triggers, traces)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = map(_single_station_triggers, traces)
+    triggers = [trigger for result in results for trigger in result]
     triggers.sort()
 
     # the coincidence triggering and coincidence sum computation
     coincidence_triggers = []
     last_off_time = 0.0
-    while triggers != []:
-        # remove first trigger from list and look for overlaps
-        on, off, tr_id, cft_peak, cft_std = triggers.pop(0)
-        sta = tr_id.split(".")[1]
-        event = {}
-        event['time'] = UTCDateTime(on)
-        event['stations'] = [tr_id.split(".")[1]]
-        event['trace_ids'] = [tr_id]
-        event['coincidence_sum'] = float(trace_ids[tr_id])
-        event['similarity'] = {}
-        if details:
-            event['cft_peaks'] = [cft_peak]
-            event['cft_stds'] = [cft_std]
-        # evaluate maximum similarity for station if event templates were
-        # provided
-        templates = event_templates.get(sta)
-        if templates:
-            event['similarity'][sta] = \
-                templates_max_similarity(stream, event['time'], templates)
-        # compile the list of stations that overlap with the current trigger
-        for trigger in triggers:
-            tmp_on, tmp_off, tmp_tr_id, tmp_cft_peak, tmp_cft_std = trigger
-            tmp_sta = tmp_tr_id.split(".")[1]
+    trigger_ons = [trigger[0] for trigger in triggers]
+    trigger_offs = [trigger[1] for trigger in triggers]
+    trigger_ids = [trigger[2] for trigger in triggers]
+    for i, (on, off, tr_id, _, _) in enumerate(triggers):
+        # compile the list of triggers that overlap with the current trigger
+        overlapping = [i]
+        event_trace_ids = {tr_id}
+        for j in range(i + 1, len(triggers)):
+            tmp_tr_id = trigger_ids[j]
             # skip retriggering of already present station in current
             # coincidence trigger
-            if tmp_tr_id in event['trace_ids']:
+            if tmp_tr_id in event_trace_ids:
                 continue
             # check for overlapping trigger,
             # break if there is a gap in between the two triggers
-            if tmp_on > off + trigger_off_extension:
+            if trigger_ons[j] > off + trigger_off_extension:
                 break
-            event['stations'].append(tmp_sta)
-            event['trace_ids'].append(tmp_tr_id)
-            event['coincidence_sum'] += trace_ids[tmp_tr_id]
-            if details:
-                event['cft_peaks'].append(tmp_cft_peak)
-                event['cft_stds'].append(tmp_cft_std)
+            event_trace_ids.add(tmp_tr_id)
+            overlapping.append(j)
             # allow sets of triggers that overlap only on subsets of all
             # stations (e.g. A overlaps with B and B overlaps w/ C => ABC)
-            off = max(off, tmp_off)
-            # evaluate maximum similarity for station if event templates were
-            # provided
-            templates = event_templates.get(tmp_sta)
+            if trigger_offs[j] > off:
+                off = trigger_offs[j]
+        # skip coincidence trigger if it is just a subset of the previous
+        # (determined by a shared off-time, this is a bit sloppy)
+        if off <= last_off_time:
+            continue
+        event = {}
+        event['time'] = UTCDateTime(on)
+        event['stations'] = [trigger_ids[j].split(".")[1]
+                             for j in overlapping]
+        event['trace_ids'] = [trigger_ids[j] for j in overlapping]
+        event['coincidence_sum'] = float(trace_ids[tr_id])
+        for tmp_tr_id in event['trace_ids'][1:]:
+            event['coincidence_sum'] += trace_ids[tmp_tr_id]
+        event['similarity'] = {}
+        if details:
+            event['cft_peaks'] = [triggers[j][3] for j in overlapping]
+            event['cft_stds'] = [triggers[j][4] for j in overlapping]
+        # evaluate maximum similarity for stations if event templates were
+        # provided
+        for sta in event['stations']:
+            templates = event_templates.get(sta)
             if templates:
-                event['similarity'][tmp_sta] = \
+                event['similarity'][sta] = \
                     templates_max_similarity(stream, event['time'], templates)
         # skip if both coincidence sum and similarity thresholds are not met
         if event['coincidence_sum'] < thr_coincidence_sum:
@@ -760,10 +803,6 @@ def coincidence_trigger(trigger_type, thr_on, thr_off, stream,
             elif not any([val > similarity_threshold[_s]
                           for _s, val in event['similarity'].items()]):
                 continue
-        # skip coincidence trigger if it is just a subset of the previous
-        # (determined by a shared off-time, this is a bit sloppy)
-        if off <= last_off_time:
-            continue
         event['duration'] = off - on
         if details:
             weights = np.array([trace_ids[i] for i in event['trace_ids']])
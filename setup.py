@@ -124,7 +124,8 @@ INSTALL_REQUIRES = [
     'setuptools',
     'sqlalchemy',
     'decorator',
-    'requests']
+    'requests',
+    'urllib3>=1.26']
 EXTRAS_REQUIRE = {
     'tests': ['flake8>=2', 'pyimgur', 'pyproj', 'pep8-naming'],
     # arclink decryption also works with: pycrypto, m2crypto, pycryptodome